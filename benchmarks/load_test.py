@@ -0,0 +1,340 @@
+"""
+Load test for the FAS analysis API.
+Purpose: Drives an API route (/api/analyze-transaction by default, or the streaming route) at a
+series of open-loop arrival rates or closed-loop concurrency levels and reports throughput,
+latency percentiles, error rate and event-loop lag of the serving process for each level, plus
+the level at which the single-process service saturates.
+
+Usage:
+    python -m benchmarks.load_test --mode closed --concurrency 1 2 4 8 16 --duration 20
+    python -m benchmarks.load_test --mode open --rates 1 2 4 8 --latency-distribution lognormal
+    python -m benchmarks.load_test --route /api/analyze-transaction/stream --params view=verdicts
+    python -m benchmarks.load_test --url http://staging:8000 --mode closed --concurrency 4 8
+
+By default the app is served by uvicorn in a thread of this process, against the offline provider
+stand-ins (latencies from the OFFLINE_* settings or the --*-latency-ms options), and a monitor task
+on the server's event loop measures how late it wakes up: the time the loop was blocked by
+synchronous work. With --url the lag of a remote server is not measured.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import random
+import socket
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from benchmarks.run_benchmark import DEFAULT_CORPUS, load_transactions, peak_rss_mb, percentile
+from src.core.config import settings
+
+DEFAULT_ROUTE = "/api/analyze-transaction"
+
+
+class LoopLagMonitor:
+    """Samples how late an event loop resumes a task that sleeps for a fixed interval."""
+
+    def __init__(self, interval_s: float = 0.01):
+        self.interval_s = interval_s
+        self.samples: List[float] = []
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval_s)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval_s))
+
+    def start(self) -> None:
+        """Start sampling on the running loop."""
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def take(self) -> List[float]:
+        """Return the samples collected since the last call and start a new window."""
+        samples, self.samples = self.samples, []
+        return samples
+
+
+class LocalServer:
+    """The FastAPI app served by uvicorn on a free loopback port in a background thread."""
+
+    def __init__(self):
+        import uvicorn
+        from src.api.main import app
+
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.monitor = LoopLagMonitor()
+        self._server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning", lifespan="off"))
+        self._thread = threading.Thread(target=self._serve, name="load-test-server", daemon=True)
+
+    def _serve(self) -> None:
+        async def serve():
+            self.monitor.start()
+            await self._server.serve()
+        asyncio.run(serve())
+
+    def __enter__(self) -> "LocalServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline or not self._thread.is_alive():
+                raise RuntimeError("Load test server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+async def send_request(client, route: str, params: Dict, transaction_text: str, stream: bool) -> Dict[str, float]:
+    """
+    Send one analysis request and time it.
+
+    Returns:
+        Sample with latency (and first_event for streams) in seconds, or error set to 1.0
+    """
+    sample = {}
+    start = time.perf_counter()
+    try:
+        if stream:
+            async with client.stream("POST", route, params=params, json={"transaction_text": transaction_text}) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if line.startswith("event:"):
+                        sample.setdefault("first_event", time.perf_counter() - start)
+                        if line.strip() == "event: error":
+                            sample["error"] = 1.0
+        else:
+            response = await client.post(route, params=params, json={"transaction_text": transaction_text})
+            response.raise_for_status()
+            await response.aread()
+    except Exception:
+        sample["error"] = 1.0
+    sample["latency"] = time.perf_counter() - start
+    return sample
+
+
+async def run_closed_loop(client, route, params, transactions, stream, concurrency: int, duration_s: float) -> List[Dict]:
+    """Keep `concurrency` requests in flight for duration_s; each worker sends its next request when one completes."""
+    samples: List[Dict] = []
+    stop = time.perf_counter() + duration_s
+
+    async def worker(offset: int):
+        i = offset
+        while time.perf_counter() < stop:
+            samples.append(await send_request(client, route, params, transactions[i % len(transactions)], stream))
+            i += concurrency
+
+    await asyncio.gather(*[worker(offset) for offset in range(concurrency)])
+    return samples
+
+
+async def run_open_loop(client, route, params, transactions, stream, rate: float, duration_s: float,
+                        drain_s: float, seed: int) -> List[Dict]:
+    """
+    Send requests at Poisson arrival times of the given rate for duration_s, whether or not earlier
+    ones have completed; requests still running drain_s after the last arrival count as errors.
+    """
+    rng = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+    next_arrival = start
+    i = 0
+    while next_arrival < start + duration_s:
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send_request(client, route, params, transactions[i % len(transactions)], stream)))
+        i += 1
+        next_arrival += rng.expovariate(rate)
+
+    done, pending = await asyncio.wait(tasks, timeout=drain_s) if tasks else (set(), set())
+    for task in pending:
+        task.cancel()
+    return [task.result() for task in done] + [{"error": 1.0, "latency": drain_s} for _ in pending]
+
+
+def summarize_level(samples: List[Dict], wall_seconds: float, lag_samples: Optional[List[float]], meta: Dict) -> Dict:
+    """
+    Aggregate the samples of one load level.
+
+    Args:
+        samples: Per-request samples
+        wall_seconds: Duration of the level
+        lag_samples: Event-loop lag samples of the server in seconds (None when not measured)
+        meta: Level description (mode with rate or concurrency)
+
+    Returns:
+        JSON-serialisable level report
+    """
+    ok = [sample for sample in samples if "error" not in sample]
+    latencies = [sample["latency"] * 1000.0 for sample in ok]
+    report = dict(meta)
+    report.update({
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0.0,
+        "latency_ms": {name: round(percentile(latencies, pct), 3) for name, pct in (("p50", 50), ("p95", 95), ("p99", 99))}
+    })
+    first_events = [sample["first_event"] * 1000.0 for sample in ok if "first_event" in sample]
+    if first_events:
+        report["first_event_ms"] = {"p50": round(percentile(first_events, 50), 3), "p95": round(percentile(first_events, 95), 3)}
+    if lag_samples is not None:
+        lags = [lag * 1000.0 for lag in lag_samples]
+        report["loop_lag_ms"] = {
+            "p50": round(percentile(lags, 50), 3),
+            "p99": round(percentile(lags, 99), 3),
+            "max": round(max(lags), 3) if lags else 0.0
+        }
+    return report
+
+
+def find_saturation(levels: List[Dict], gain: float = 0.1, max_error_rate: float = 0.01) -> Optional[Dict]:
+    """
+    Return the first level beyond which load stops paying off: the next level raises throughput by
+    less than `gain` (relative) or has an error rate above max_error_rate.
+
+    Args:
+        levels: Level reports in increasing load order
+
+    Returns:
+        The saturating level report, or None if throughput kept scaling
+    """
+    for current, following in zip(levels, levels[1:]):
+        if following["error_rate"] > max_error_rate or following["throughput_rps"] < current["throughput_rps"] * (1 + gain):
+            return current
+    return None
+
+
+async def run_levels(url: str, args, transactions: List[str], monitor: Optional[LoopLagMonitor]) -> List[Dict]:
+    """Run the warm-up and every load level against a server."""
+    import httpx
+
+    params = dict(item.split("=", 1) for item in args.params)
+    stream = args.route.endswith("/stream")
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        for i in range(args.warmup):
+            await send_request(client, args.route, params, transactions[i % len(transactions)], stream)
+
+        levels = []
+        for level in (args.rates if args.mode == "open" else args.concurrency):
+            if monitor is not None:
+                monitor.take()
+            start = time.perf_counter()
+            if args.mode == "open":
+                samples = await run_open_loop(client, args.route, params, transactions, stream, level,
+                                              args.duration, args.drain, settings.OFFLINE_SEED)
+                meta = {"mode": "open", "rate_rps": level}
+            else:
+                samples = await run_closed_loop(client, args.route, params, transactions, stream, level, args.duration)
+                meta = {"mode": "closed", "concurrency": level}
+            wall_seconds = time.perf_counter() - start
+            levels.append(summarize_level(samples, wall_seconds, monitor.take() if monitor is not None else None, meta))
+            print_level(levels[-1])
+        return levels
+
+
+def print_level(level: Dict) -> None:
+    """Print one level as a table row."""
+    load = f"{level['rate_rps']} rps" if level["mode"] == "open" else f"{level['concurrency']} conc"
+    lag = level.get("loop_lag_ms", {})
+    lag_text = f"{lag['p99']:>9.1f}{lag['max']:>9.1f}" if lag else f"{'-':>9}{'-':>9}"
+    print(f"{load:<12}{level['requests']:>7}{level['throughput_rps']:>9.2f}{level['latency_ms']['p50']:>9.1f}"
+          f"{level['latency_ms']['p95']:>9.1f}{level['latency_ms']['p99']:>9.1f}{level['error_rate']:>8.1%}{lag_text}", file=sys.__stdout__)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the load test and write the level reports as JSON."""
+    parser = argparse.ArgumentParser(description="Load test for the FAS analysis API")
+    parser.add_argument("--url", help="Base URL of a running server (default: serve the app in this process)")
+    parser.add_argument("--route", default=DEFAULT_ROUTE, help="Route to POST to; routes ending in /stream are read as event streams")
+    parser.add_argument("--params", nargs="*", default=[], help="Query parameters as name=value, e.g. view=verdicts")
+    parser.add_argument("--mode", choices=["open", "closed"], default="closed")
+    parser.add_argument("--rates", type=float, nargs="+", default=[1, 2, 4, 8], help="Open-loop arrival rates (requests/s)")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8, 16], help="Closed-loop concurrency levels")
+    parser.add_argument("--duration", type=float, default=15.0, help="Seconds per level")
+    parser.add_argument("--drain", type=float, default=30.0, help="Open loop: seconds to wait for outstanding requests")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Per-request timeout in seconds")
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--llm-latency-ms", type=float, help="Offline LLM latency (default: OFFLINE_LLM_LATENCY_MS)")
+    parser.add_argument("--embedding-latency-ms", type=float, help="Offline embedding latency")
+    parser.add_argument("--vector-latency-ms", type=float, help="Offline vector query latency")
+    parser.add_argument("--jitter-ms", type=float, help="Offline latency jitter (uniform/normal)")
+    parser.add_argument("--latency-distribution", choices=["uniform", "normal", "lognormal", "exponential"])
+    parser.add_argument("--output", type=Path, default=Path("load_test.json"))
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' console output")
+    args = parser.parse_args(argv)
+
+    if not args.url:
+        settings.PROVIDER_MODE = "offline"
+        overrides = {
+            "OFFLINE_LLM_LATENCY_MS": args.llm_latency_ms,
+            "OFFLINE_EMBEDDING_LATENCY_MS": args.embedding_latency_ms,
+            "OFFLINE_VECTOR_LATENCY_MS": args.vector_latency_ms,
+            "OFFLINE_JITTER_MS": args.jitter_ms,
+            "OFFLINE_LATENCY_DISTRIBUTION": args.latency_distribution
+        }
+        for name, value in overrides.items():
+            if value is not None:
+                setattr(settings, name, value)
+    transactions = load_transactions(args.corpus)
+
+    print(f"\n=== Load test: POST {args.route} ({args.mode} loop, {args.duration:.0f}s per level, "
+          f"{'offline ' + settings.OFFLINE_LATENCY_DISTRIBUTION + ' latencies' if not args.url else args.url}) ===")
+    print(f"{'load':<12}{'reqs':>7}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}{'lag p99':>9}{'lag max':>9}")
+    print("-" * 81)
+    sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with sink:
+        if args.url:
+            levels = asyncio.run(run_levels(args.url, args, transactions, None))
+        else:
+            with LocalServer() as server:
+                levels = asyncio.run(run_levels(server.url, args, transactions, server.monitor))
+
+    saturation = find_saturation(levels)
+    if saturation is None:
+        print("Throughput was still scaling at the highest level")
+    else:
+        load = f"{saturation['rate_rps']} rps" if saturation["mode"] == "open" else f"concurrency {saturation['concurrency']}"
+        print(f"Saturates at {load}: {saturation['throughput_rps']:.2f} req/s, p95 {saturation['latency_ms']['p95']:.1f} ms")
+
+    report = {
+        "meta": {
+            "route": args.route,
+            "params": args.params,
+            "mode": args.mode,
+            "duration_s": args.duration,
+            "target": args.url or "in-process",
+            "latency_distribution": settings.OFFLINE_LATENCY_DISTRIBUTION if not args.url else None,
+            "llm_latency_ms": settings.OFFLINE_LLM_LATENCY_MS if not args.url else None
+        },
+        "levels": levels,
+        "saturation": saturation,
+        "peak_rss_mb": round(peak_rss_mb(), 1)
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
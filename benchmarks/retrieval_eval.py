@@ -0,0 +1,311 @@
+"""
+Retrieval quality versus latency evaluation for the FAS analysis system.
+Purpose: Runs FASRetriever over a labeled set of transactions under each retrieval configuration
+(top_n, routing, reranking, multi-resolution dimension, corpus/chunking, ...) and reports
+recall@k of the expected standards and key paragraphs and MRR next to query latency percentiles
+and index size, so a performance knob is only turned with its quality cost in view.
+
+Usage:
+    python -m benchmarks.retrieval_eval
+    python -m benchmarks.retrieval_eval --configs eval_configs.json --synthetic 5000 --output eval.json
+    python -m benchmarks.retrieval_eval --output new.json --baseline old.json   # exit 1 on regression
+
+Key paragraphs are phrases matched in the retrieved text (case and whitespace insensitive), so the
+labels stay valid when chunk boundaries or IDs change. A configuration is a JSON object:
+    {"name": "mmr_top10", "top_n": 10, "settings": {"RETRIEVAL_RERANK": "mmr"}, "corpus": "chunks.json"}
+"settings" overrides Settings fields for the run; "corpus" (an OFFLINE_CORPUS_PATH file, e.g.
+re-chunked text) or "snapshot" builds a separate offline index for the configuration.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import re
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from benchmarks.retrieval_resolution import synthetic_chunks
+from benchmarks.run_benchmark import DEFAULT_CORPUS, percentile
+from src.core.centroids import StandardCentroids, build_centroids
+from src.core.config import settings
+from src.core.multires import build_coarse_index, coarse_index_name
+from src.core.providers import create_vector_index
+
+DEFAULT_LABELS = Path(__file__).parent / "retrieval_labels.json"
+OFFLINE_INDEX_NAME = "retrieval-eval"
+
+DEFAULT_CONFIGS = [
+    {"name": "baseline", "top_n": 5},
+    {"name": "top_3", "top_n": 3},
+    {"name": "top_10", "top_n": 10},
+    {"name": "routing_off", "top_n": 5, "settings": {"RETRIEVAL_ROUTING": "off"}},
+    {"name": "mmr", "top_n": 5, "settings": {"RETRIEVAL_RERANK": "mmr"}},
+    {"name": "multires_256", "top_n": 5, "settings": {"MULTIRES_DIMENSION": 256}},
+]
+
+# Settings every offline run starts from, so local data files do not change the results
+_OFFLINE_DEFAULTS = {
+    "RETRIEVAL_ROUTING": "centroid",
+    "CENTROIDS_PATH": "",  # Centroids are built from the evaluation index (prepare_offline_index)
+    "SHARD_MANIFEST_PATH": "",
+    "CHUNK_STORE_PATH": "",
+    "RETRIEVAL_SOURCES": "fas",
+    "RETRIEVAL_RERANK": "off",
+    "MULTIRES_DIMENSION": 0,
+    "PINECONE_INDEX_FAS_COARSE": "",
+    "OFFLINE_CORPUS_PATH": "",
+    "OFFLINE_SNAPSHOT_PATH": "",
+}
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def load_labels(path: Path = DEFAULT_LABELS, transactions_path: Path = DEFAULT_CORPUS) -> List[Dict]:
+    """
+    Load a labeled set, resolving "transaction_id" entries against the benchmark corpus.
+
+    Each label has "id", a "query" or "transaction_id", "expected_standards" (document types) and
+    optional "key_paragraphs" (phrases of the passages that should be retrieved).
+    """
+    with open(transactions_path, "r", encoding="utf-8") as f:
+        transactions = {item["id"]: item["transaction_text"] for item in json.load(f)}
+    with open(path, "r", encoding="utf-8") as f:
+        labels = json.load(f)
+    for label in labels:
+        if "query" not in label:
+            label["query"] = transactions[label["transaction_id"]]
+    return labels
+
+
+def score_ranking(documents: Sequence, label: Dict, k: int) -> Dict[str, float]:
+    """
+    Score one ranked result list against its label.
+
+    A document is relevant when its standard is expected and, if the label lists key paragraphs,
+    its text contains one of them.
+
+    Args:
+        documents: Ranked FASDocuments
+        label: Label with expected_standards and optional key_paragraphs
+        k: Cut-off for the recall metrics
+
+    Returns:
+        Dictionary with standard_recall, paragraph_recall (None without key paragraphs) and
+        reciprocal_rank
+    """
+    expected = set(label["expected_standards"])
+    phrases = [_normalize(phrase) for phrase in label.get("key_paragraphs", [])]
+    top = documents[:k]
+    found_standards = expected & {doc.document_type for doc in top}
+    texts = [_normalize(doc.text) for doc in top]
+    found_phrases = [phrase for phrase in phrases if any(phrase in text for text in texts)]
+
+    reciprocal_rank = 0.0
+    for rank, doc in enumerate(documents, start=1):
+        text = _normalize(doc.text)
+        if doc.document_type in expected and (not phrases or any(phrase in text for phrase in phrases)):
+            reciprocal_rank = 1.0 / rank
+            break
+    return {
+        "standard_recall": len(found_standards) / len(expected) if expected else 1.0,
+        "paragraph_recall": len(found_phrases) / len(phrases) if phrases else None,
+        "reciprocal_rank": reciprocal_rank
+    }
+
+
+@contextlib.contextmanager
+def _overridden(overrides: Dict):
+    previous = {name: getattr(settings, name) for name in overrides}
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(settings, name, value)
+
+
+def _index_name(config: Dict) -> str:
+    if config.get("corpus") or config.get("snapshot"):
+        return f"{OFFLINE_INDEX_NAME}-{config['name']}"
+    return OFFLINE_INDEX_NAME
+
+
+def prepare_offline_index(config: Dict, synthetic: int, directory: str) -> Dict:
+    """
+    Create (once) the offline index a configuration searches, with its companion index if needed,
+    and the centroid file in directory when routing is on.
+
+    Returns:
+        Index size: vectors, dimension and megabytes searched (full plus coarse vectors)
+    """
+    index = create_vector_index(settings.PINECONE_INDEX_FAS)
+    stats = index.describe_index_stats()
+    if synthetic and not index.fetch(ids=["synthetic-0"], namespace="default").vectors:
+        records = synthetic_chunks(synthetic, settings.OFFLINE_SEED)
+        for start in range(0, len(records), 1000):
+            index.upsert(vectors=records[start:start + 1000], namespace="default")
+        stats = index.describe_index_stats()
+
+    vectors = stats.total_vector_count
+    size_bytes = vectors * stats.dimension * 4
+    dimension = settings.MULTIRES_DIMENSION
+    if dimension:
+        coarse = create_vector_index(coarse_index_name(settings.PINECONE_INDEX_FAS, dimension), dimension=dimension)
+        if coarse.describe_index_stats().total_vector_count < vectors:
+            build_coarse_index(index, coarse, dimension, batch_size=1000)
+        size_bytes += vectors * dimension * 4
+    if settings.RETRIEVAL_ROUTING == "centroid":
+        # The retriever only loads a centroid file, so build one for this index as the CLI would
+        settings.CENTROIDS_PATH = str(Path(directory) / "centroids.json")
+        StandardCentroids(build_centroids(index, ["default"])).save(settings.CENTROIDS_PATH)
+    return {"vectors": vectors, "dimension": stats.dimension, "index_mb": round(size_bytes / (1024 * 1024), 3)}
+
+
+def evaluate_config(config: Dict, labels: List[Dict], synthetic: int = 0, offline: bool = True) -> Dict:
+    """
+    Run every label through a fresh FASRetriever under one configuration.
+
+    Args:
+        config: Configuration with name, top_n and optional settings, corpus or snapshot
+        labels: Labeled queries
+        synthetic: Offline distractor chunks added to the index
+        offline: Build the offline index (False searches the configured live index)
+
+    Returns:
+        Result dictionary of the configuration
+    """
+    from src.agents.fas_retriever import FASRetriever
+
+    top_n = int(config.get("top_n", 5))
+    overrides = dict(_OFFLINE_DEFAULTS) if offline else {}
+    if offline:
+        overrides["PINECONE_INDEX_FAS"] = _index_name(config)
+        overrides["OFFLINE_CORPUS_PATH"] = config.get("corpus", "")
+        overrides["OFFLINE_SNAPSHOT_PATH"] = config.get("snapshot", "")
+    overrides.update(config.get("settings", {}))
+
+    with _overridden(overrides), tempfile.TemporaryDirectory() as directory:
+        size = prepare_offline_index(config, synthetic, directory) if offline else {}
+        retriever = FASRetriever()
+        retriever.retrieve(labels[0]["query"], top_n=top_n)  # Loads centroids and companion indexes
+
+        samples, scores = [], []
+        for label in labels:
+            start = time.perf_counter()
+            documents = retriever.retrieve(label["query"], top_n=top_n)
+            samples.append((time.perf_counter() - start) * 1000.0)
+            scores.append(score_ranking(documents, label, top_n))
+
+    paragraph_recalls = [score["paragraph_recall"] for score in scores if score["paragraph_recall"] is not None]
+    return {
+        "name": config["name"],
+        "top_n": top_n,
+        "settings": config.get("settings", {}),
+        "standard_recall_at_k": round(sum(score["standard_recall"] for score in scores) / len(scores), 4),
+        "paragraph_recall_at_k": round(sum(paragraph_recalls) / len(paragraph_recalls), 4) if paragraph_recalls else None,
+        "mrr": round(sum(score["reciprocal_rank"] for score in scores) / len(scores), 4),
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        **size
+    }
+
+
+def compare_to_baseline(results: List[Dict], baseline: Dict, quality_drop: float, latency_threshold: float) -> List[str]:
+    """
+    List the configurations whose quality or latency regressed against a previous run.
+
+    Args:
+        results: Current results
+        baseline: Previous report ({"results": [...]}); configurations are matched by name
+        quality_drop: Allowed absolute drop of recall or MRR (0.02 = two points)
+        latency_threshold: Allowed relative p95 increase (0.2 = 20%)
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        before = previous.get(result["name"])
+        if before is None:
+            continue
+        for metric in ("standard_recall_at_k", "paragraph_recall_at_k", "mrr"):
+            old, new = before.get(metric), result.get(metric)
+            if old is not None and new is not None and new < old - quality_drop:
+                regressions.append(f"{result['name']} {metric}: {old:.3f} -> {new:.3f}")
+        old, new = before.get("p95_ms", 0.0), result["p95_ms"]
+        if old > 0 and new > old * (1 + latency_threshold):
+            regressions.append(f"{result['name']} p95: {old:.2f} ms -> {new:.2f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def print_results(results: List[Dict], meta: Dict) -> None:
+    """Print the configurations as a table."""
+    print(f"\n=== Retrieval evaluation: {meta['labels']} labeled queries ({meta['providers']}) ===")
+    print(f"{'config':<18}{'k':>4}{'std R@k':>9}{'para R@k':>10}{'MRR':>8}{'p50 ms':>9}{'p95 ms':>9}{'vectors':>9}{'MB':>9}")
+    print("-" * 85)
+    for result in results:
+        paragraph = result["paragraph_recall_at_k"]
+        paragraph = f"{paragraph:.3f}" if paragraph is not None else "-"
+        print(f"{result['name']:<18}{result['top_n']:>4}{result['standard_recall_at_k']:>9.3f}{paragraph:>10}"
+              f"{result['mrr']:>8.3f}{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}"
+              f"{result.get('vectors', '-'):>9}{result.get('index_mb', '-'):>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Evaluate the configurations and write the results as JSON."""
+    parser = argparse.ArgumentParser(description="Retrieval quality versus latency evaluation")
+    parser.add_argument("--providers", choices=["offline", "live"], default="offline")
+    parser.add_argument("--labels", type=Path, default=DEFAULT_LABELS)
+    parser.add_argument("--configs", type=Path, help="JSON list of configurations (default: built-in set)")
+    parser.add_argument("--synthetic", type=int, default=2000, help="Offline distractor chunks added to the seed corpus")
+    parser.add_argument("--output", type=Path, default=Path("retrieval_eval.json"))
+    parser.add_argument("--baseline", type=Path, help="Previous results to compare against")
+    parser.add_argument("--quality-drop", type=float, default=0.02, help="Allowed absolute recall/MRR drop")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed relative p95 latency increase")
+    parser.add_argument("--verbose", action="store_true", help="Show the retriever's console output")
+    args = parser.parse_args(argv)
+
+    offline = args.providers == "offline"
+    settings.PROVIDER_MODE = "offline" if offline else "live"
+    labels = load_labels(args.labels)
+    configs = DEFAULT_CONFIGS
+    if args.configs:
+        with open(args.configs, "r", encoding="utf-8") as f:
+            configs = json.load(f)
+
+    sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with sink:
+        results = [evaluate_config(config, labels, args.synthetic if offline else 0, offline) for config in configs]
+
+    meta = {"providers": args.providers, "labels": len(labels), "synthetic": args.synthetic if offline else None}
+    print_results(results, meta)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(results, json.load(f), args.quality_drop, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""
+Recall and latency benchmark for multi-resolution retrieval.
+Purpose: Compares a plain full-dimension search with coarse searches on truncated vectors (with and
+without the exact full-vector rescore) for each dimension and candidate multiplier, and reports
+recall@top_n against the full-dimension ranking, query latency percentiles and vector storage.
+
+Usage:
+    python -m benchmarks.retrieval_resolution --dimensions 256 512 --multipliers 4 8
+    python -m benchmarks.retrieval_resolution --synthetic 20000 --output resolution.json
+    python -m benchmarks.retrieval_resolution --providers live   # companion indexes built with src.core.multires
+
+Offline, the index is the seed corpus plus --synthetic distractor chunks, embedded with the hash
+stand-in. The live mode uses the configured FAS index and OpenAI query embeddings.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from benchmarks.run_benchmark import load_transactions, percentile
+from src.core.config import settings
+from src.core.multires import build_coarse_index, coarse_index_name, truncate_embedding
+from src.core.offline import OFFLINE_SEED_CORPUS, hash_embedding
+from src.core.providers import create_vector_index
+
+OFFLINE_INDEX_NAME = "resolution-benchmark"
+
+
+def synthetic_chunks(count: int, seed: int) -> List[Dict]:
+    """
+    Build distractor chunks that mix the vocabulary of one standard with words of the others.
+
+    Args:
+        count: Number of chunks
+        seed: Random seed
+
+    Returns:
+        Upsert records with hash embeddings and the retriever's metadata layout
+    """
+    rng = random.Random(seed)
+    vocabulary = sorted({word for _, _, passages in OFFLINE_SEED_CORPUS for passage in passages for word in passage.split()})
+    records = []
+    for i in range(count):
+        document_type, source_filename, passages = rng.choice(OFFLINE_SEED_CORPUS)
+        words = rng.choice(passages).split()
+        text = " ".join(word if rng.random() < 0.5 else rng.choice(vocabulary) for word in words)
+        records.append({
+            "id": f"synthetic-{i}",
+            "values": hash_embedding(text),
+            "metadata": {
+                "text": text,
+                "document_type": document_type,
+                "section_heading": "Synthetic",
+                "source_filename": source_filename,
+                "chunk_index": i,
+                "total_chunks": count
+            }
+        })
+    return records
+
+
+def build_queries(transactions: List[str], count: int, seed: int) -> List[str]:
+    """Use the benchmark transactions plus opening phrases of seed passages as queries."""
+    rng = random.Random(seed)
+    passages = [passage for _, _, items in OFFLINE_SEED_CORPUS for passage in items]
+    queries = list(transactions)
+    while len(queries) < count:
+        words = rng.choice(passages).split()
+        start = rng.randrange(max(1, len(words) - 12))
+        queries.append(" ".join(words[start:start + 12]))
+    return queries[:count]
+
+
+def prepare_offline_indexes(dimensions: List[int], synthetic: int) -> int:
+    """
+    Fill the offline full index and build one companion index per dimension.
+
+    Returns:
+        Number of vectors in the full index
+    """
+    settings.PINECONE_INDEX_FAS = OFFLINE_INDEX_NAME
+    settings.PINECONE_INDEX_FAS_COARSE = ""
+    index = create_vector_index(OFFLINE_INDEX_NAME)
+    records = synthetic_chunks(synthetic, settings.OFFLINE_SEED)
+    for start in range(0, len(records), 1000):
+        index.upsert(vectors=records[start:start + 1000], namespace="default")
+    for dimension in dimensions:
+        coarse = create_vector_index(coarse_index_name(OFFLINE_INDEX_NAME, dimension), dimension=dimension)
+        build_coarse_index(index, coarse, dimension, batch_size=1000)
+    return index.describe_index_stats().total_vector_count
+
+
+def _timed_ids(search, query_vector: list, top_n: int) -> (List[str], float):
+    start = time.perf_counter()
+    documents = search(query_vector, top_n)
+    return [doc.id for doc in documents], time.perf_counter() - start
+
+
+def run(dimensions: List[int], multipliers: List[int], queries: List[str], top_n: int) -> List[Dict]:
+    """
+    Run every configuration over the queries.
+
+    Args:
+        dimensions: Truncated dimensions to test
+        multipliers: Coarse candidate multipliers to test
+        queries: Query texts
+        top_n: Results per query
+
+    Returns:
+        One result dictionary per configuration, the full-dimension baseline first
+    """
+    from src.agents.fas_retriever import FASRetriever
+
+    settings.RETRIEVAL_ROUTING = "off"
+    settings.RETRIEVAL_RERANK = "off"
+    retriever = FASRetriever()
+    vectors = [retriever.embed_query(query) for query in queries]
+
+    def full_search(query_vector, n):
+        settings.MULTIRES_DIMENSION = 0
+        return retriever._search(query_vector, n, None, "default")
+
+    baseline, samples = [], []
+    for vector in vectors:
+        ids, seconds = _timed_ids(full_search, vector, top_n)
+        baseline.append(set(ids))
+        samples.append(seconds)
+    results = [_summarize("full", settings.VECTOR_DIMENSION, None, samples, [1.0] * len(vectors))]
+
+    for dimension in dimensions:
+        # Coarse ranking alone, to show what the rescore adds
+        def coarse_search(query_vector, n, dimension=dimension):
+            settings.MULTIRES_DIMENSION = dimension
+            matches = retriever.coarse_index.query(vector=truncate_embedding(query_vector, dimension), top_k=n, namespace="default").matches
+            return [type("Match", (), {"id": match.get("id")}) for match in matches]
+        results.append(_measure("coarse_only", dimension, None, coarse_search, vectors, baseline, top_n))
+
+        for multiplier in multipliers:
+            def multires_search(query_vector, n, dimension=dimension, multiplier=multiplier):
+                settings.MULTIRES_DIMENSION = dimension
+                settings.MULTIRES_CANDIDATE_MULTIPLIER = multiplier
+                return retriever._search(query_vector, n, None, "default")
+            results.append(_measure("coarse_rescore", dimension, multiplier, multires_search, vectors, baseline, top_n))
+    settings.MULTIRES_DIMENSION = 0
+    return results
+
+
+def _measure(mode: str, dimension: int, multiplier: Optional[int], search, vectors: List[list], baseline: List[set], top_n: int) -> Dict:
+    samples, recalls = [], []
+    for vector, expected in zip(vectors, baseline):
+        ids, seconds = _timed_ids(search, vector, top_n)
+        samples.append(seconds)
+        recalls.append(len(expected & set(ids)) / len(expected) if expected else 1.0)
+    return _summarize(mode, dimension, multiplier, samples, recalls)
+
+
+def _summarize(mode: str, dimension: int, multiplier: Optional[int], samples: List[float], recalls: List[float]) -> Dict:
+    latencies = [seconds * 1000.0 for seconds in samples]
+    return {
+        "mode": mode,
+        "dimension": dimension,
+        "candidate_multiplier": multiplier,
+        "recall": round(sum(recalls) / len(recalls), 4) if recalls else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "searched_bytes_per_vector": dimension * 4
+    }
+
+
+def print_results(results: List[Dict], meta: Dict) -> None:
+    """Print the configurations as a table."""
+    print(f"\n=== Retrieval resolution: {meta['vectors']} vectors, {meta['queries']} queries, top {meta['top_n']} ({meta['providers']}) ===")
+    print(f"{'mode':<16}{'dim':>6}{'mult':>6}{'recall':>9}{'p50 ms':>10}{'p95 ms':>10}{'bytes/vec':>11}")
+    print("-" * 68)
+    for result in results:
+        multiplier = result["candidate_multiplier"] or "-"
+        print(f"{result['mode']:<16}{result['dimension']:>6}{multiplier:>6}{result['recall']:>9.3f}"
+              f"{result['p50_ms']:>10.2f}{result['p95_ms']:>10.2f}{result['searched_bytes_per_vector']:>11}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark and write the results as JSON."""
+    parser = argparse.ArgumentParser(description="Recall and latency of multi-resolution retrieval")
+    parser.add_argument("--providers", choices=["offline", "live"], default="offline")
+    parser.add_argument("--dimensions", type=int, nargs="+", default=[256, 512])
+    parser.add_argument("--multipliers", type=int, nargs="+", default=[4, 8])
+    parser.add_argument("--synthetic", type=int, default=5000, help="Offline distractor chunks added to the seed corpus")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-n", type=int, default=5)
+    parser.add_argument("--output", type=Path, default=Path("retrieval_resolution.json"))
+    parser.add_argument("--verbose", action="store_true", help="Show the retriever's console output")
+    args = parser.parse_args(argv)
+
+    settings.PROVIDER_MODE = "offline" if args.providers == "offline" else "live"
+    vectors = prepare_offline_indexes(args.dimensions, args.synthetic) if args.providers == "offline" else None
+    queries = build_queries(load_transactions(), args.queries, settings.OFFLINE_SEED)
+
+    sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with sink:
+        results = run(args.dimensions, args.multipliers, queries, args.top_n)
+
+    meta = {"providers": args.providers, "vectors": vectors or "live", "queries": len(queries), "top_n": args.top_n}
+    print_results(results, meta)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "results": results}, f, indent=2)
+    print(f"Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
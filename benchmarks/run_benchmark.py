@@ -0,0 +1,462 @@
+"""
+End-to-end performance benchmark for the FAS analysis system.
+Purpose: Runs a corpus of sample transactions through Orchestrator.analyze_transaction or the
+FastAPI app at a configurable concurrency, against the offline stand-ins or a recorded cassette,
+and reports per-stage latency percentiles, throughput and peak RSS as JSON. Time to first request
+of a cold API process is measured in a fresh interpreter.
+
+Usage:
+    python -m benchmarks.run_benchmark --target orchestrator --concurrency 4 --requests 50
+    python -m benchmarks.run_benchmark --target api --providers replay --cassette cassettes/prod.jsonl
+    python -m benchmarks.run_benchmark --output new.json --baseline old.json --threshold 0.15
+    python -m benchmarks.run_benchmark --skip-startup   # no time-to-first-request measurement
+
+Offline latencies are taken from the OFFLINE_*_LATENCY_MS / OFFLINE_JITTER_MS settings.
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.metrics import PROVIDER_HEDGES, PROVIDER_RETRIES
+from src.core.providers import register_middleware
+
+STAGES = ["deconstruct", "embed", "vector_query", "summarize", "applicability", "total"]
+DEFAULT_CORPUS = Path(__file__).parent / "transactions.json"
+
+# Provider operations timed as their own stage
+_PROVIDER_STAGES = {
+    "embeddings.create": "embed",
+    "query": "vector_query",
+}
+
+# Per-request stage timings (seconds) of the request running in the current context
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("benchmark_timings", default=None)
+
+
+def _stage_middleware(call, proceed: Callable):
+    """Provider middleware adding embedding and vector query time to the current request."""
+    timings = _current_timings.get()
+    stage = _PROVIDER_STAGES.get(call.operation)
+    if timings is None or stage is None:
+        return proceed()
+    start = time.perf_counter()
+    try:
+        return proceed()
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+
+
+def _timed(stage: str, fn: Callable) -> Callable:
+    """Wrap an agent method so that its duration is added to the current request."""
+    def wrapper(*args, **kwargs):
+        timings = _current_timings.get()
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start
+    return wrapper
+
+
+def instrument_orchestrator(orchestrator) -> None:
+    """
+    Time the agent stages of an Orchestrator instance.
+
+    Args:
+        orchestrator: Orchestrator whose agents should be timed
+    """
+    register_middleware("benchmark", _stage_middleware, order=50)
+    agents = [
+        (orchestrator.transaction_deconstructor, "deconstruct", "deconstruct"),
+        (orchestrator.retrieval_summarizer, "summarize_findings", "summarize"),
+        (orchestrator.fas_applicability, "analyze_applicability", "applicability"),
+    ]
+    for agent, method, stage in agents:
+        setattr(agent, method, _timed(stage, getattr(agent, method)))
+
+
+def configure_providers(providers: str, cassette: Optional[str] = None, replay_latency: str = "recorded") -> None:
+    """
+    Select the provider backend for the benchmark.
+
+    Args:
+        providers: "offline" for the local stand-ins, "replay" for a recorded cassette
+        cassette: Cassette file (required for replay)
+        replay_latency: "recorded" or "none"
+    """
+    if providers == "replay":
+        if not cassette:
+            raise ValueError("--cassette is required with --providers replay")
+        settings.CASSETTE_MODE = "replay"
+        settings.CASSETTE_PATH = cassette
+        settings.CASSETTE_REPLAY_LATENCY = replay_latency
+    else:
+        settings.PROVIDER_MODE = "offline"
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """
+    Linearly interpolated percentile.
+
+    Args:
+        values: Samples
+        pct: Percentile between 0 and 100
+
+    Returns:
+        The percentile, or 0.0 for no samples
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+def peak_rss_mb() -> float:
+    """Return the peak resident set size of this process in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def load_transactions(path: Path = DEFAULT_CORPUS) -> List[str]:
+    """Load the transaction texts of a benchmark corpus."""
+    with open(path, "r", encoding="utf-8") as f:
+        return [item["transaction_text"] for item in json.load(f)]
+
+
+def _run_one(fn: Callable[[str], object], transaction_text: str) -> Dict[str, float]:
+    timings = {}
+    token = _current_timings.set(timings)
+    start = time.perf_counter()
+    try:
+        result = fn(transaction_text)
+        usage = getattr(result, "usage", None)
+        if usage:
+            timings["cost_usd"] = usage["total"]["cost_usd"]
+    except Exception as e:
+        timings["error"] = 1.0
+        print(f"Benchmark request failed: {e}", file=sys.stderr)
+    finally:
+        timings["total"] = time.perf_counter() - start
+        _current_timings.reset(token)
+    return timings
+
+
+def run_orchestrator_benchmark(transactions: List[str], requests: int, concurrency: int, warmup: int = 1):
+    """
+    Run transactions through Orchestrator.analyze_transaction with a thread pool.
+
+    Args:
+        transactions: Transaction texts, cycled through
+        requests: Number of measured requests
+        concurrency: Number of worker threads
+        warmup: Unmeasured requests run first
+
+    Returns:
+        Tuple of (per-request timings, wall-clock seconds)
+    """
+    from src.agents.orchestrator import Orchestrator
+
+    orchestrator = Orchestrator()
+    instrument_orchestrator(orchestrator)
+
+    for i in range(warmup):
+        orchestrator.analyze_transaction(transactions[i % len(transactions)])
+
+    workload = [transactions[i % len(transactions)] for i in range(requests)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        samples = list(pool.map(lambda text: _run_one(orchestrator.analyze_transaction, text), workload))
+    return samples, time.perf_counter() - start
+
+
+def run_api_benchmark(transactions: List[str], requests: int, concurrency: int, warmup: int = 1):
+    """
+    Run transactions through POST /api/analyze-transaction of the FastAPI app in-process.
+
+    Args:
+        transactions: Transaction texts, cycled through
+        requests: Number of measured requests
+        concurrency: Maximum number of requests in flight
+        warmup: Unmeasured requests run first
+
+    Returns:
+        Tuple of (per-request timings, wall-clock seconds)
+    """
+    import httpx
+    from src.api import endpoints
+    from src.api.main import app
+
+    instrument_orchestrator(endpoints.get_orchestrator())
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            async def post(text: str):
+                response = await client.post("/api/analyze-transaction", json={"transaction_text": text})
+                response.raise_for_status()
+
+            async def measured(text: str, semaphore: asyncio.Semaphore) -> Dict[str, float]:
+                async with semaphore:
+                    timings = {}
+                    token = _current_timings.set(timings)
+                    start = time.perf_counter()
+                    try:
+                        await post(text)
+                    except Exception as e:
+                        timings["error"] = 1.0
+                        print(f"Benchmark request failed: {e}", file=sys.stderr)
+                    finally:
+                        timings["total"] = time.perf_counter() - start
+                        _current_timings.reset(token)
+                    return timings
+
+            for i in range(warmup):
+                await post(transactions[i % len(transactions)])
+
+            semaphore = asyncio.Semaphore(concurrency)
+            start = time.perf_counter()
+            samples = await asyncio.gather(*[
+                measured(transactions[i % len(transactions)], semaphore) for i in range(requests)
+            ])
+            return list(samples), time.perf_counter() - start
+
+    return asyncio.run(run())
+
+
+# Run in a fresh interpreter so that module imports and agent construction are measured cold
+_STARTUP_PROBE = """
+import asyncio, json, sys, time
+start = time.perf_counter()
+sys.path.insert(0, {root!r})
+import httpx
+from src.api.main import app
+imported = time.perf_counter()
+
+async def first_request():
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+        response = await client.post("/api/analyze-transaction", json={{"transaction_text": {text!r}}})
+        response.raise_for_status()
+
+asyncio.run(first_request())
+done = time.perf_counter()
+print(json.dumps({{"import_ms": (imported - start) * 1000.0, "first_request_ms": (done - imported) * 1000.0,
+                  "time_to_first_request_ms": (done - start) * 1000.0}}))
+"""
+
+
+def measure_startup(transaction_text: str) -> Dict[str, float]:
+    """
+    Measure time to first request of a cold API process.
+
+    The app is imported and serves one analysis in a new interpreter that inherits the provider
+    settings of this process (startup warm-up is disabled so the first request pays for agent
+    construction, as it does when a worker restarts under load).
+
+    Args:
+        transaction_text: Transaction analysed by the first request
+
+    Returns:
+        Dictionary with import_ms, first_request_ms and time_to_first_request_ms
+    """
+    env = dict(os.environ)
+    env.update({
+        "PROVIDER_MODE": settings.PROVIDER_MODE,
+        "CASSETTE_MODE": settings.CASSETTE_MODE,
+        "CASSETTE_PATH": settings.CASSETTE_PATH,
+        "CASSETTE_REPLAY_LATENCY": settings.CASSETTE_REPLAY_LATENCY,
+        "WARMUP_ON_STARTUP": "False"
+    })
+    code = _STARTUP_PROBE.format(root=project_root, text=transaction_text)
+    completed = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    # The agents print while they work; the measurements are the last line
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+    return {key: round(value, 3) for key, value in result.items()}
+
+
+def build_report(samples: List[Dict[str, float]], wall_seconds: float, meta: Dict) -> Dict:
+    """
+    Aggregate per-request timings into a benchmark report.
+
+    Args:
+        samples: Per-request stage timings in seconds
+        wall_seconds: Wall-clock duration of the measured run
+        meta: Run configuration
+
+    Returns:
+        JSON-serialisable report
+    """
+    ok = [sample for sample in samples if "error" not in sample]
+    latency = {}
+    for stage in STAGES:
+        values = [sample[stage] * 1000.0 for sample in ok if stage in sample]
+        latency[stage] = {
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "p99": round(percentile(values, 99), 3),
+            "mean": round(sum(values) / len(values), 3) if values else 0.0,
+            "count": len(values)
+        }
+    costs = [sample["cost_usd"] for sample in ok if "cost_usd" in sample]
+    return {
+        "meta": meta,
+        "latency_ms": latency,
+        "throughput_rps": round(len(ok) / wall_seconds, 3) if wall_seconds else 0.0,
+        "requests": len(samples),
+        "errors": len(samples) - len(ok),
+        "wall_seconds": round(wall_seconds, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "cost_usd_per_request": round(sum(costs) / len(costs), 6) if costs else None
+    }
+
+
+def compare_to_baseline(report: Dict, baseline: Dict, threshold: float) -> List[str]:
+    """
+    List the metrics that regressed by more than the threshold.
+
+    Args:
+        report: Current report
+        baseline: Previous report
+        threshold: Allowed relative regression (0.1 = 10%)
+
+    Returns:
+        Human-readable regression descriptions (empty if none)
+    """
+    regressions = []
+    for stage, metrics in baseline.get("latency_ms", {}).items():
+        current = report["latency_ms"].get(stage, {})
+        for name in ("p50", "p95", "p99"):
+            before, after = metrics.get(name, 0.0), current.get(name, 0.0)
+            if before > 0 and after > before * (1 + threshold):
+                regressions.append(f"{stage} {name}: {before:.1f} ms -> {after:.1f} ms (+{(after / before - 1) * 100:.0f}%)")
+
+    before, after = baseline.get("throughput_rps", 0.0), report["throughput_rps"]
+    if before > 0 and after < before * (1 - threshold):
+        regressions.append(f"throughput: {before:.2f} rps -> {after:.2f} rps ({(after / before - 1) * 100:.0f}%)")
+
+    before = baseline.get("startup", {}).get("time_to_first_request_ms", 0.0)
+    after = report.get("startup", {}).get("time_to_first_request_ms", 0.0)
+    if before > 0 and after > before * (1 + threshold):
+        regressions.append(f"time to first request: {before:.1f} ms -> {after:.1f} ms (+{(after / before - 1) * 100:.0f}%)")
+
+    before, after = baseline.get("peak_rss_mb", 0.0), report["peak_rss_mb"]
+    if before > 0 and after > before * (1 + threshold):
+        regressions.append(f"peak RSS: {before:.1f} MB -> {after:.1f} MB")
+    return regressions
+
+
+def print_report(report: Dict) -> None:
+    """Print a benchmark report as a table."""
+    meta = report["meta"]
+    print(f"\n=== Benchmark: {meta['target']} ({meta['providers']}), concurrency {meta['concurrency']} ===")
+    print(f"{'stage':<15}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}")
+    print("-" * 55)
+    for stage, metrics in report["latency_ms"].items():
+        print(f"{stage:<15}{metrics['p50']:>10.1f}{metrics['p95']:>10.1f}{metrics['p99']:>10.1f}{metrics['mean']:>10.1f}")
+    print("-" * 55)
+    print(f"Throughput: {report['throughput_rps']:.2f} req/s   Requests: {report['requests']}   "
+          f"Errors: {report['errors']}   Peak RSS: {report['peak_rss_mb']:.1f} MB")
+    if "provider_retries" in report:
+        print(f"Provider retries: {report['provider_retries']}   Hedged calls: {report['provider_hedges']}")
+    if report.get("cost_usd_per_request") is not None:
+        print(f"Estimated cost: ${report['cost_usd_per_request']:.6f} per request")
+    if "startup" in report:
+        startup = report["startup"]
+        print(f"Time to first request: {startup['time_to_first_request_ms']:.1f} ms "
+              f"(import {startup['import_ms']:.1f} ms, first request {startup['first_request_ms']:.1f} ms)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Run the benchmark from the command line."""
+    parser = argparse.ArgumentParser(description="FAS analysis performance benchmark")
+    parser.add_argument("--target", choices=["orchestrator", "api"], default="orchestrator")
+    parser.add_argument("--providers", choices=["offline", "replay"], default="offline")
+    parser.add_argument("--cassette", help="Cassette file for --providers replay")
+    parser.add_argument("--replay-latency", choices=["recorded", "none"], default="recorded")
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--output", type=Path, default=Path("benchmark_results.json"))
+    parser.add_argument("--baseline", type=Path, help="Previous results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed relative regression")
+    parser.add_argument("--verbose", action="store_true", help="Show the agents' console output")
+    parser.add_argument("--applicability-mode", choices=["single", "cascade"], help="Override APPLICABILITY_MODE")
+    parser.add_argument("--rerank", choices=["off", "mmr"], help="Override RETRIEVAL_RERANK")
+    parser.add_argument("--skip-startup", action="store_true", help="Do not measure time to first request")
+    args = parser.parse_args(argv)
+
+    configure_providers(args.providers, args.cassette, args.replay_latency)
+    if args.applicability_mode:
+        settings.APPLICABILITY_MODE = args.applicability_mode
+    if args.rerank:
+        settings.RETRIEVAL_RERANK = args.rerank
+    transactions = load_transactions(args.corpus)
+    runner = run_api_benchmark if args.target == "api" else run_orchestrator_benchmark
+
+    # The agents print every step; keep that out of the measurements unless asked for
+    sink = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    retries, hedges = PROVIDER_RETRIES.total(), PROVIDER_HEDGES.total()
+    with sink:
+        samples, wall_seconds = runner(transactions, args.requests, args.concurrency, args.warmup)
+
+    report = build_report(samples, wall_seconds, {
+        "target": args.target,
+        "providers": args.providers,
+        "concurrency": args.concurrency,
+        "applicability_mode": settings.APPLICABILITY_MODE,
+        "rerank": settings.RETRIEVAL_RERANK,
+        "requests": args.requests,
+        "corpus": str(args.corpus),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version()
+    })
+    report["provider_retries"] = int(PROVIDER_RETRIES.total() - retries)
+    report["provider_hedges"] = int(PROVIDER_HEDGES.total() - hedges)
+    if not args.skip_startup:
+        report["startup"] = measure_startup(transactions[0])
+    print_report(report)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regressions = compare_to_baseline(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\nRegressions above {args.threshold:.0%}:")
+            for regression in regressions:
+                print(f"- {regression}")
+            return 1
+        print(f"\nNo regressions above {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
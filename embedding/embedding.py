@@ -5,8 +5,8 @@ from dotenv import load_dotenv
 import openai
 from typing import List, Dict, Any
 from pathlib import Path
-import time # For batching and rate limits
 import re # For cleaning names for namespace
+import sys
 from chunking import process_pdf_to_chunks
 from pinecone import Pinecone, ServerlessSpec
 # FAS_NAME_MAPPING will be defined in this script based on the one from chunking.py's context
@@ -20,6 +20,16 @@ PROJECT_ROOT = SCRIPT_DIR_EMBEDDING.parent # Assuming 'embedding.py' is in a sub
                                         # If 'embedding.py' is at the project root, then PROJECT_ROOT = SCRIPT_DIR_EMBEDDING
 
 
+# Provider calls go through the shared middleware (rate-limit scheduler, tracing, usage) of the app
+if str(PROJECT_ROOT) not in sys.path:
+    sys.path.append(str(PROJECT_ROOT))
+from src.core.chunk_store import ChunkStore
+from src.core.dedup import DedupReport, deduplicate_chunks
+from src.core.multires import coarse_index_name, coarse_record
+from src.core.providers import wrap_openai_client, wrap_vector_index
+from src.core.ratelimit import BATCH, call_priority
+from src.core.shards import ShardManifest, shard_namespace
+
 # Load environment variables
 load_dotenv()
 
@@ -47,7 +57,7 @@ SS_FILES_TO_PROCESS_MAP = {
 # Initialize OpenAI client
 if OPENAI_API_KEY:
     # For openai >= 1.0.0
-    client = openai.OpenAI(api_key=OPENAI_API_KEY)
+    client = wrap_openai_client(openai.OpenAI(api_key=OPENAI_API_KEY))
     # If you are using openai < 1.0.0, use: openai.api_key = OPENAI_API_KEY
 else:
     print("Error: OPENAI_API_KEY not found in .env file")
@@ -59,7 +69,7 @@ if PINECONE_API_KEY and PINECONE_ENV and PINECONE_INDEX_NAME:
     if PINECONE_INDEX_NAME not in pc.list_indexes().names():
         print(f"Error: Pinecone index '{PINECONE_INDEX_NAME}' not found in environment '{PINECONE_ENV}'. Please create it first.")
         exit()
-    index = pc.Index(PINECONE_INDEX_NAME)
+    index = wrap_vector_index(pc.Index(PINECONE_INDEX_NAME), PINECONE_INDEX_NAME)
     print(f"Successfully connected to Pinecone index: {PINECONE_INDEX_NAME}")
 else:
     print("Error: Pinecone API key, environment, or index name not found in .env file.")
@@ -68,6 +78,66 @@ else:
 EMBEDDING_MODEL = "text-embedding-3-small"
 TARGET_EMBEDDING_DIMENSION = 1536 # Default for text-embedding-3-small. Ensure Pinecone index matches.
 
+# --- Multi-resolution copies ---
+# With COARSE_EMBEDDING_DIMENSION set (256 or 512), each vector is also written to a companion index,
+# truncated and renormalised. That index is PINECONE_INDEX_FAS_COARSE, created with this dimension, and
+# the retriever's coarse search (MULTIRES_DIMENSION) reads it. No extra embedding calls are made.
+COARSE_EMBEDDING_DIMENSION = int(os.getenv("COARSE_EMBEDDING_DIMENSION", "0"))
+coarse_index = None
+if COARSE_EMBEDDING_DIMENSION:
+    PINECONE_COARSE_INDEX_NAME = coarse_index_name(PINECONE_INDEX_NAME, COARSE_EMBEDDING_DIMENSION, os.getenv("PINECONE_INDEX_FAS_COARSE", ""))
+    if PINECONE_COARSE_INDEX_NAME not in pc.list_indexes().names():
+        print(f"Error: Pinecone index '{PINECONE_COARSE_INDEX_NAME}' for the {COARSE_EMBEDDING_DIMENSION}-dimension copies not found. Please create it first.")
+        exit()
+    coarse_index = wrap_vector_index(pc.Index(PINECONE_COARSE_INDEX_NAME), PINECONE_COARSE_INDEX_NAME)
+    print(f"Writing {COARSE_EMBEDDING_DIMENSION}-dimension copies to Pinecone index: {PINECONE_COARSE_INDEX_NAME}")
+
+# --- Local chunk text store ---
+# Vector metadata only keeps a snippet; the full text of each chunk goes to a SQLite file keyed by
+# the vector ID, from which the retriever hydrates its top-k results. Ship it with the app (CHUNK_STORE_PATH).
+CHUNK_STORE_PATH = PROJECT_ROOT / os.getenv("CHUNK_STORE_PATH", "data/chunks.sqlite")
+chunk_store = ChunkStore(str(CHUNK_STORE_PATH))
+print(f"Writing chunk texts to local store: {CHUNK_STORE_PATH}")
+
+# --- Per-standard shards ---
+# Each standard is written to its own namespace and listed in the manifest read by the retriever
+# (SHARD_MANIFEST_PATH), so re-indexing one standard replaces only its shard.
+SHARD_MANIFEST_PATH = PROJECT_ROOT / os.getenv("SHARD_MANIFEST_PATH", "data/shard_manifest.json")
+shard_manifest = ShardManifest.load(str(SHARD_MANIFEST_PATH)) if SHARD_MANIFEST_PATH.exists() else ShardManifest()
+
+# --- Shariah Standards shards ---
+# With SS_SHARD_MANIFEST_PATH set, the standards of SS_FILES_TO_PROCESS_MAP are also written, one shard
+# each, to the Shariah Standards index (PINECONE_INDEX_SS) and listed in that manifest, which the
+# federated retriever reads for RETRIEVAL_SOURCES=fas,ss. They never go to the FAS index or its manifest.
+SS_SHARD_MANIFEST_PATH = PROJECT_ROOT / os.getenv("SS_SHARD_MANIFEST_PATH") if os.getenv("SS_SHARD_MANIFEST_PATH") else None
+PINECONE_INDEX_SS_NAME = os.getenv("PINECONE_INDEX_SS")
+ss_index = None
+ss_shard_manifest = None
+if SS_SHARD_MANIFEST_PATH:
+    if not PINECONE_INDEX_SS_NAME or PINECONE_INDEX_SS_NAME not in pc.list_indexes().names():
+        print(f"Error: Shariah Standards index '{PINECONE_INDEX_SS_NAME}' (PINECONE_INDEX_SS) not found. Please create it first.")
+        exit()
+    ss_index = wrap_vector_index(pc.Index(PINECONE_INDEX_SS_NAME), PINECONE_INDEX_SS_NAME)
+    ss_shard_manifest = ShardManifest.load(str(SS_SHARD_MANIFEST_PATH)) if SS_SHARD_MANIFEST_PATH.exists() else ShardManifest()
+    print(f"Writing Shariah Standards to Pinecone index: {PINECONE_INDEX_SS_NAME}")
+
+# --- Near-duplicate elimination ---
+# Boilerplate shared by the standards (preface, definitions, appendices) yields near-identical chunks.
+# They are dropped before embedding when their MinHash similarity to a kept chunk reaches the threshold;
+# the kept chunk lists them in duplicate_refs. "standard" compares chunks within each standard, so
+# every shard stays complete; "corpus" also drops chunks repeating another standard's text.
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "True").lower() == "true"
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.85"))
+DEDUP_SCOPE = os.getenv("DEDUP_SCOPE", "standard")
+
+# --- Precomputed chunk summaries ---
+# When enabled, every chunk gets a compact summary stored next to it in the vector metadata,
+# so the RetrievalSummarizer can assemble them at query time instead of re-reading full text.
+GENERATE_CHUNK_SUMMARIES = os.getenv("GENERATE_CHUNK_SUMMARIES", "False").lower() == "true"
+CHUNK_SUMMARY_MODEL = os.getenv("CHUNK_SUMMARY_MODEL", "gpt-3.5-turbo")
+CHUNK_SUMMARY_MAX_TOKENS = 120
+CHUNK_SUMMARY_MAX_CHARS = 600 # Keeps the metadata payload of each vector small
+
 def get_openai_embedding(text: str, model: str = EMBEDDING_MODEL, target_dimensions: int = None) -> List[float]:
     """Generates an embedding for the given text using OpenAI."""
     try:
@@ -86,6 +156,28 @@ def get_openai_embedding(text: str, model: str = EMBEDDING_MODEL, target_dimensi
         print(f"Error getting embedding for text: '{text_to_embed[:100]}...': {e}")
         return None
 
+def generate_chunk_summary(text: str, standard_name: str = "", model: str = CHUNK_SUMMARY_MODEL) -> str:
+    """Generates a compact summary of a single chunk for storage alongside its vector."""
+    prompt = (
+        f"Summarize the following excerpt from the AAOIFI standard '{standard_name}' in at most "
+        "two sentences. Keep the accounting requirement, any conditions, and paragraph references.\n\n"
+        f"Excerpt:\n{text}\n\nSummary:"
+    )
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=[
+                {"role": "system", "content": "You are a financial accounting expert specializing in Islamic finance and AAOIFI standards. Write terse, precise summaries."},
+                {"role": "user", "content": prompt}
+            ],
+            temperature=0.0,
+            max_tokens=CHUNK_SUMMARY_MAX_TOKENS
+        )
+        return response.choices[0].message.content.strip()[:CHUNK_SUMMARY_MAX_CHARS]
+    except Exception as e:
+        print(f"Error generating summary for chunk: '{text[:100]}...': {e}")
+        return None
+
 def clean_for_namespace(name: str) -> str:
     """Cleans a string to be suitable for a Pinecone namespace."""
     name = name.lower()
@@ -94,14 +186,21 @@ def clean_for_namespace(name: str) -> str:
     return name[:512] # Pinecone namespace max length is 512
 
 # --- Pinecone Upsert Function (MODIFIED to accept namespace) ---
-def prepare_and_upsert_to_pinecone(chunks_data: List[Dict[str, Any]], pinecone_namespace: str, batch_size: int = 100):
+def prepare_and_upsert_to_pinecone(chunks_data: List[Dict[str, Any]], pinecone_namespace: str, batch_size: int = 100, with_summaries: bool = GENERATE_CHUNK_SUMMARIES, document_type: str = None, target_index=None, target_coarse_index=None) -> int:
+    """Embeds the chunks and upserts them to target_index (the FAS index and its coarse copy by default)."""
+    if target_index is None:
+        target_index, target_coarse_index = index, coarse_index
     if not chunks_data:
         print(f"No chunks to process for namespace '{pinecone_namespace}'.")
-        return
+        return 0
 
     vectors_to_upsert = []
+    upserted = 0
+    chunk_texts = {} # Full text of the vectors in the current batch, by ID
     total_chunks = len(chunks_data)
     print(f"\n--- Preparing to upsert {total_chunks} chunks to namespace: {pinecone_namespace} ---")
+    if with_summaries:
+        print(f"  Generating chunk summaries with '{CHUNK_SUMMARY_MODEL}' (GENERATE_CHUNK_SUMMARIES=True)")
 
     for i, chunk_item in enumerate(chunks_data):
         content = chunk_item.get("content")
@@ -125,9 +224,19 @@ def prepare_and_upsert_to_pinecone(chunks_data: List[Dict[str, Any]], pinecone_n
                 "main_section": metadata.get("main_section", "N/A"),
                 "text_snippet": content[:500] # Store a snippet 
             }
+            if document_type:
+                pinecone_metadata["document_type"] = document_type
+            if metadata.get("duplicate_count"):
+                pinecone_metadata["duplicate_count"] = metadata["duplicate_count"]
+                pinecone_metadata["duplicate_refs"] = metadata["duplicate_refs"]
             if "heading_path" in metadata and metadata["heading_path"]:
                 pinecone_metadata["heading_path"] = [f"{hp[0]}: {hp[1]}" for hp in metadata["heading_path"] if isinstance(hp, tuple) and len(hp) == 2]
+            if with_summaries:
+                chunk_summary = generate_chunk_summary(content, standard_name=pinecone_metadata["standard_name"])
+                if chunk_summary:
+                    pinecone_metadata["chunk_summary"] = chunk_summary
             
+            chunk_texts[chunk_id] = content
             vectors_to_upsert.append({
                 "id": chunk_id,
                 "values": embedding,
@@ -138,24 +247,66 @@ def prepare_and_upsert_to_pinecone(chunks_data: List[Dict[str, Any]], pinecone_n
             print(f"  Upserting batch of {len(vectors_to_upsert)} vectors to namespace '{pinecone_namespace}'...")
             try:
                 # --- MODIFIED: Added namespace to upsert call ---
-                index.upsert(vectors=vectors_to_upsert, namespace=pinecone_namespace)
+                target_index.upsert(vectors=vectors_to_upsert, namespace=pinecone_namespace)
+                if target_coarse_index is not None:
+                    target_coarse_index.upsert(vectors=[
+                        coarse_record(vector["id"], vector["values"], vector["metadata"], COARSE_EMBEDDING_DIMENSION)
+                        for vector in vectors_to_upsert
+                    ], namespace=pinecone_namespace)
+                chunk_store.put_many(
+                    (vector["id"], chunk_texts[vector["id"]], dict(vector["metadata"], namespace=pinecone_namespace))
+                    for vector in vectors_to_upsert
+                )
                 print(f"  Successfully upserted batch to namespace '{pinecone_namespace}'.")
+                upserted += len(vectors_to_upsert)
                 vectors_to_upsert = [] 
+                chunk_texts = {}
             except Exception as e:
                 print(f"  Error upserting batch to Pinecone namespace '{pinecone_namespace}': {e}")
-            if i < total_chunks - 1 : # Avoid sleep after the very last batch
-                time.sleep(0.5) 
 
     print(f"--- Finished processing and upserting for namespace: {pinecone_namespace} ---")
+    return upserted
 
 
-# --- Main Workflow (MODIFIED to loop through PDF files) ---
-if __name__ == "__main__":
-    if not FAS_FILES_TO_PROCESS_MAP:
-        print("No PDF files defined in FAS_FILES_TO_PROCESS_MAP. Exiting.")
-        exit()
+def deduplicate_documents(documents: List[tuple]) -> tuple:
+    """Drop near-duplicate chunks per standard or across the corpus (DEDUP_SCOPE); returns (documents, report)."""
+    report = DedupReport()
+    if DEDUP_SCOPE == "corpus":
+        kept, report = deduplicate_chunks([chunk for *_, chunks in documents for chunk in chunks], threshold=DEDUP_THRESHOLD)
+        kept_ids = {id(chunk) for chunk in kept}
+        documents = [(pdf_path, document_type, namespace, [chunk for chunk in chunks if id(chunk) in kept_ids])
+                     for pdf_path, document_type, namespace, chunks in documents]
+    else:
+        deduplicated = []
+        for pdf_path, document_type, namespace, chunks in documents:
+            kept, document_report = deduplicate_chunks(chunks, threshold=DEDUP_THRESHOLD)
+            print(f"  {pdf_path.name}: {document_report.summary()}")
+            report.add(document_report)
+            deduplicated.append((pdf_path, document_type, namespace, kept))
+        documents = deduplicated
+    return documents, report
+
+
+def clear_shard(pinecone_namespace: str, target_index=None, target_coarse_index=None, manifest: ShardManifest = None) -> None:
+    """Delete a standard's previous vectors and stored texts before it is re-indexed (FAS index by default)."""
+    if target_index is None:
+        target_index, target_coarse_index, manifest = index, coarse_index, shard_manifest
+    if pinecone_namespace not in manifest.namespaces:
+        return
+    print(f"Replacing existing shard '{pinecone_namespace}'...")
+    try:
+        target_index.delete(delete_all=True, namespace=pinecone_namespace)
+        if target_coarse_index is not None:
+            target_coarse_index.delete(delete_all=True, namespace=pinecone_namespace)
+    except Exception as e:
+        print(f"  Error clearing namespace '{pinecone_namespace}': {e}")
+    chunk_store.delete_namespace(pinecone_namespace)
 
-    for pdf_path, standard_name_from_map in SS_FILES_TO_PROCESS_MAP.items():
+
+def chunk_documents(files_to_process: Dict[Path, str]) -> List[tuple]:
+    """Chunk every PDF of a file map; returns (pdf_path, document_type, namespace, chunks) per document."""
+    documents = []
+    for pdf_path, standard_name_from_map in files_to_process.items():
         print(f"\n======================================================================")
         print(f"Processing Document: {pdf_path.name}")
         print(f"======================================================================")
@@ -165,17 +316,9 @@ if __name__ == "__main__":
             continue
         
         # --- Determine Namespace ---
-        pinecone_namespace = clean_for_namespace(standard_name_from_map)
-        fn_match_num = re.search(r"FAS(?:_|\s|-)?(\d+)", pdf_path.name, re.IGNORECASE)
-        if fn_match_num:
-            standard_no_for_ns = fn_match_num.group(1)
-            pinecone_namespace = f"SS{standard_no_for_ns}"
-        else:
-            pinecone_namespace = clean_for_namespace(standard_name_from_map if standard_name_from_map else pdf_path.stem)
-            print(f"Warning: Could not extract SS number from filename '{pdf_path.name}'. Using namespace: '{pinecone_namespace}'")
-            pinecone_namespace = "FAS_FULL"
-
-        pinecone_namespace = "FAS_FULL"
+        # One shard per standard, named after its document type (e.g. "FAS_32_Ijarah")
+        document_type = standard_name_from_map or pdf_path.stem
+        pinecone_namespace = shard_namespace(document_type)
         
         print(f"Target Pinecone Namespace: {pinecone_namespace}")
 
@@ -185,13 +328,59 @@ if __name__ == "__main__":
 
         if all_chunks:
             print(f"Step 1: Successfully chunked PDF. Found {len(all_chunks)} chunks.")
-            print(f"Step 2: Preparing chunks and upserting to Pinecone index '{PINECONE_INDEX_NAME}' (Namespace: '{pinecone_namespace}')...")
-            prepare_and_upsert_to_pinecone(all_chunks, pinecone_namespace=pinecone_namespace)
+            documents.append((pdf_path, document_type, pinecone_namespace, all_chunks))
         else:
             print(f"No chunks were generated from {pdf_path.name}. Nothing to embed for this file.")
-        
+    return documents
+
+
+def write_shards(documents: List[tuple], index_name: str, target_index, target_coarse_index, manifest: ShardManifest, manifest_path: Path) -> None:
+    """Replace each document's shard in target_index and record it in the manifest at manifest_path."""
+    for pdf_path, document_type, pinecone_namespace, all_chunks in documents:
+        print(f"Step 3: Preparing chunks and upserting to Pinecone index '{index_name}' (Namespace: '{pinecone_namespace}')...")
+        clear_shard(pinecone_namespace, target_index, target_coarse_index, manifest)
+        upserted = prepare_and_upsert_to_pinecone(
+            all_chunks, pinecone_namespace=pinecone_namespace, document_type=document_type,
+            target_index=target_index, target_coarse_index=target_coarse_index
+        )
+        manifest.record(document_type, pinecone_namespace, upserted, source_file=pdf_path.name)
+        manifest.save(str(manifest_path))
+        print(f"Recorded shard '{pinecone_namespace}' ({upserted} vectors) in {manifest_path}")
         print(f"--- Completed processing for {pdf_path.name} ---")
 
+
+# --- Main Workflow (MODIFIED to loop through PDF files) ---
+def main():
+    # --- Step 1: Chunk every document first, so near-duplicates can be found across them ---
+    fas_documents = chunk_documents(FAS_FILES_TO_PROCESS_MAP)
+    ss_documents = chunk_documents(SS_FILES_TO_PROCESS_MAP) if ss_index is not None else []
+
+    # --- Step 2: Drop near-duplicate chunks before paying for their embeddings ---
+    # Each index is deduplicated on its own, so an SS chunk is never dropped for repeating FAS text
+    if DEDUP_ENABLED:
+        fas_documents, report = deduplicate_documents(fas_documents)
+        if ss_documents:
+            ss_documents, ss_report = deduplicate_documents(ss_documents)
+            report.add(ss_report)
+        print(f"\nNear-duplicate elimination ({DEDUP_SCOPE} scope, threshold {DEDUP_THRESHOLD}): {report.summary()}")
+        if GENERATE_CHUNK_SUMMARIES:
+            print(f"  {report.chunks_removed} chunk summary calls saved as well")
+
+    # --- Step 3: Replace each standard's shard in its own index and manifest ---
+    write_shards(fas_documents, PINECONE_INDEX_NAME, index, coarse_index, shard_manifest, SHARD_MANIFEST_PATH)
+    if ss_index is not None:
+        write_shards(ss_documents, PINECONE_INDEX_SS_NAME, ss_index, None, ss_shard_manifest, SS_SHARD_MANIFEST_PATH)
+
     print("\n======================================================================")
     print("All specified PDF files have been processed.")
-    print("======================================================================")
\ No newline at end of file
+    print("======================================================================")
+
+
+if __name__ == "__main__":
+    if not FAS_FILES_TO_PROCESS_MAP:
+        print("No PDF files defined in FAS_FILES_TO_PROCESS_MAP. Exiting.")
+        exit()
+
+    # Ingestion yields to interactive API traffic in the rate-limit scheduler (no fixed sleeps)
+    with call_priority(BATCH):
+        main()
\ No newline at end of file
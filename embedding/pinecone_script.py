@@ -52,6 +52,12 @@ def create_index_if_not_exists(index_name, dimension, metric, environment_for_sp
 # Create indexes if they don't exist
 create_index_if_not_exists(PINECONE_INDEX_SS_NAME_UPDATE, DIMENSION, METRIC, PINECONE_PINE_ENV)
 
+# Companion index for the truncated copies used by multi-resolution retrieval (see src/core/multires.py)
+COARSE_DIMENSION = int(os.getenv("COARSE_EMBEDDING_DIMENSION", "0"))
+if COARSE_DIMENSION and PINECONE_INDEX_FAS_NAME_UPDATE:
+    coarse_name = os.getenv("PINECONE_INDEX_FAS_COARSE") or f"{PINECONE_INDEX_FAS_NAME_UPDATE}-{COARSE_DIMENSION}d"
+    create_index_if_not_exists(coarse_name, COARSE_DIMENSION, METRIC, PINECONE_PINE_ENV)
+
 
 # --- Get Index Objects ---
 
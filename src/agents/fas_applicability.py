@@ -3,10 +3,23 @@ FAS Applicability Agent
 Purpose: Determines the applicability of AAOIFI FAS standards to a given financial transaction.
 """
 
-from typing import Dict, List
+import json
+import math
+import re
+import time
+from typing import Dict, List, Optional
 from pydantic import BaseModel
-from openai import OpenAI
 from ..core.config import settings
+from ..core.metrics import APPLICABILITY_TIER_DURATION, APPLICABILITY_TIER_OUTCOMES
+from ..core.providers import create_openai_client
+from ..core.tracing import span
+
+# Function words left out of the local scorer's term overlap
+_STOPWORDS = frozenset({
+    "the", "and", "for", "with", "are", "was", "were", "this", "that", "from", "under", "shall", "its",
+    "which", "has", "have", "been", "not", "into", "over", "any", "all", "each", "per", "who", "whom",
+    "their", "there", "when", "where", "upon", "such", "other", "than", "then", "also", "being", "due"
+})
 
 class FASApplicability(BaseModel):
     """Model for FAS applicability assessment."""
@@ -18,7 +31,7 @@ class FASApplicability(BaseModel):
 class FASApplicabilityAgent:
     def __init__(self):
         """Initialize the FAS Applicability agent."""
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = create_openai_client()
         
         # Core FAS standards to evaluate
         self.core_fas = {
@@ -47,23 +60,64 @@ class FASApplicabilityAgent:
         
         return "\n".join(formatted_excerpts)
 
-    def analyze_applicability(
+    def _format_priors(self, priors: Optional[Dict[str, float]]) -> str:
+        """
+        Format the retrieval priors as a prompt section (empty if there are none).
+        
+        Args:
+            priors: Dictionary mapping FAS IDs to routing priors
+            
+        Returns:
+            Formatted prompt section
+        """
+        if not priors:
+            return ""
+        lines = [f"- {fas_id}: {prior:.2f}" for fas_id, prior in sorted(priors.items(), key=lambda item: item[1], reverse=True)]
+        return (
+            "\nRetrieval prior (similarity of the transaction to each standard's indexed text, 0-1; "
+            "a hint only, base your assessment on the excerpts and the transaction):\n" + "\n".join(lines) + "\n"
+        )
+
+    def _format_shariah_excerpts(self, shariah_excerpts: Optional[Dict[str, List[str]]]) -> str:
+        """
+        Format Shariah Standards excerpts as a context section of the prompt (empty if there are none).
+        
+        Args:
+            shariah_excerpts: Dictionary mapping SS IDs to lists of excerpts
+            
+        Returns:
+            Formatted prompt section
+        """
+        if not shariah_excerpts:
+            return ""
+        return (
+            "\nRelated AAOIFI Shariah Standards (context for the Shariah rules of the transaction; "
+            "they are not FAS and must not be listed as applicable standards):\n"
+            + self._format_fas_excerpts(shariah_excerpts) + "\n"
+        )
+
+    def _build_prompt(
         self,
         original_transaction: str,
-        fas_excerpts: Dict[str, List[str]]
-    ) -> List[FASApplicability]:
+        fas_excerpts: Dict[str, List[str]],
+        priors: Optional[Dict[str, float]] = None,
+        shariah_excerpts: Optional[Dict[str, List[str]]] = None
+    ) -> str:
         """
-        Analyze the applicability of FAS standards to a transaction.
+        Build the applicability prompt sent to the LLM tiers.
         
         Args:
             original_transaction: The original transaction text
             fas_excerpts: Dictionary mapping FAS IDs to lists of excerpts
+            priors: Optional routing prior per FAS ID
+            shariah_excerpts: Optional Shariah Standards excerpts added as context
             
         Returns:
-            List of FASApplicability objects
+            Prompt text
         """
         # Format FAS excerpts
         formatted_excerpts = self._format_fas_excerpts(fas_excerpts)
+        formatted_priors = self._format_priors(priors) + self._format_shariah_excerpts(shariah_excerpts)
         
         # Create the prompt
         prompt = f"""You are an expert AAOIFI (Accounting and Auditing Organization for Islamic Financial Institutions) Standards Analyst. Your task is to determine the applicability of specific AAOIFI Financial Accounting Standards (FAS) to a given financial transaction.
@@ -71,7 +125,7 @@ class FASApplicabilityAgent:
 Here are relevant FAS findings that may be relevant to the situation ,found from RAG system:
 
 {formatted_excerpts}
-
+{formatted_priors}
 Original Transaction:
 {original_transaction}
 
@@ -106,26 +160,35 @@ Please provide your analysis in the following JSON format:
     // ... other standards
   ]
 }}"""
+        return prompt
 
+    def _llm_applicability(self, prompt: str, model: str, max_tokens: int) -> List[FASApplicability]:
+        """
+        Ask an LLM for the applicability assessment.
+        
+        Args:
+            prompt: Prompt from _build_prompt
+            model: OpenAI model name
+            max_tokens: Completion token budget
+            
+        Returns:
+            List of FASApplicability objects (empty if the call or parsing failed)
+        """
         try:
             # Get analysis from OpenAI
             response = self.client.chat.completions.create(
-                model="gpt-4.1-mini",
+                model=model,
                 messages=[
                     {"role": "system", "content": "You are a financial accounting expert specializing in Islamic finance and AAOIFI standards."},
                     {"role": "user", "content": prompt}
                 ],
                 temperature=0.3,  # Lower temperature for more focused and consistent outputs
-                max_tokens=2000
+                max_tokens=max_tokens
             )
             
             # Parse the response
             analysis_text = response.choices[0].message.content.strip()
             
-            # Extract the JSON part from the response
-            import json
-            import re
-            
             # Find JSON in the response
             json_match = re.search(r'\{.*\}', analysis_text, re.DOTALL)
             if json_match:
@@ -138,6 +201,162 @@ Please provide your analysis in the following JSON format:
             print(f"Error analyzing FAS applicability: {e}")
             return []
 
+    def _fas_key(self, excerpt_id: str) -> str:
+        """Map an excerpt ID such as "FAS 28 Murabaha Deferred Payment Sales" to "FAS 28"."""
+        match = re.search(r"FAS\D*(\d+)", excerpt_id)
+        return f"FAS {match.group(1)}" if match else excerpt_id
+
+    def _local_applicability(
+        self,
+        original_transaction: str,
+        fas_excerpts: Dict[str, List[str]],
+        priors: Optional[Dict[str, float]] = None
+    ) -> List[FASApplicability]:
+        """
+        Score the candidate standards locally, without an LLM call.
+        
+        Each standard's share is the IDF-weighted share of the transaction's terms found in its
+        excerpts (terms present in every standard's excerpts carry no weight; with a single
+        standard every shared term counts once), blended with the routing prior when one is
+        available. The shares sum to 1 whatever the evidence, so before they are compared with the
+        cascade thresholds they are calibrated by an evidence factor, 1 - exp(-n / k), where n is
+        the number of distinctive terms the standard shares with the transaction and k is
+        settings.CASCADE_LOCAL_EVIDENCE_TERMS: a standard needs both to dominate and to match
+        several terms to get a high probability.
+        
+        Args:
+            original_transaction: The original transaction text
+            fas_excerpts: Dictionary mapping FAS IDs to lists of excerpts
+            priors: Optional routing prior per FAS ID
+            
+        Returns:
+            List of FASApplicability objects (empty if no standard shares any term with the transaction)
+        """
+        if not fas_excerpts:
+            return []
+        terms = lambda text: set(re.findall(r"[a-z][a-z'\-]{2,}", text.lower())) - _STOPWORDS
+        transaction_terms = terms(original_transaction)
+        excerpt_terms = {fas_id: terms(" ".join(excerpts)) for fas_id, excerpts in fas_excerpts.items()}
+        
+        count = len(excerpt_terms)
+        if count == 1:
+            idf = lambda term: 1.0
+        else:
+            idf = lambda term: math.log((1 + count) / (1 + sum(term in words for words in excerpt_terms.values())))
+        matched = {
+            fas_id: [term for term in transaction_terms & words if idf(term) > 0]
+            for fas_id, words in excerpt_terms.items()
+        }
+        lexical = {fas_id: sum(idf(term) for term in found) for fas_id, found in matched.items()}
+        lexical_total = sum(lexical.values())
+        if lexical_total <= 0:
+            return []
+        
+        prior_total = sum((priors or {}).get(fas_id, 0.0) for fas_id in fas_excerpts)
+        scores = {}
+        for fas_id in fas_excerpts:
+            share = lexical[fas_id] / lexical_total
+            if prior_total > 0:
+                weight = settings.CASCADE_PRIOR_WEIGHT
+                share = (1 - weight) * share + weight * priors.get(fas_id, 0.0) / prior_total
+            evidence = 1 - math.exp(-len(matched[fas_id]) / max(settings.CASCADE_LOCAL_EVIDENCE_TERMS, 1e-9))
+            scores[fas_id] = share * evidence
+        
+        results = []
+        for fas_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+            key = self._fas_key(fas_id)
+            reasoning = (f"Local estimate: {len(matched[fas_id])} distinctive terms ({lexical[fas_id]:.2f} weighted) "
+                         "shared by the transaction and the excerpts")
+            if prior_total > 0:
+                reasoning += f", retrieval prior {priors.get(fas_id, 0.0):.2f}"
+            results.append(FASApplicability(
+                fas_id=key,
+                fas_name=self.core_fas.get(key, fas_id),
+                probability=round(score, 2),
+                reasoning=reasoning + "."
+            ))
+        return results
+
+    def _is_confident(self, applicability_list: List[FASApplicability]) -> bool:
+        """
+        Decide whether a tier's answer is clear enough to stop the cascade.
+        
+        The top standard must reach settings.CASCADE_MIN_CONFIDENCE and lead the runner-up by at
+        least settings.CASCADE_MIN_MARGIN.
+        """
+        if not applicability_list:
+            return False
+        probabilities = sorted((item.probability for item in applicability_list), reverse=True)
+        runner_up = probabilities[1] if len(probabilities) > 1 else 0.0
+        return probabilities[0] >= settings.CASCADE_MIN_CONFIDENCE and probabilities[0] - runner_up >= settings.CASCADE_MIN_MARGIN
+
+    def _cascade(
+        self,
+        original_transaction: str,
+        fas_excerpts: Dict[str, List[str]],
+        priors: Optional[Dict[str, float]],
+        shariah_excerpts: Optional[Dict[str, List[str]]] = None
+    ) -> List[FASApplicability]:
+        """
+        Run the tiers in settings.APPLICABILITY_CASCADE until one is confident.
+        
+        Each tier is "local" or an OpenAI model name; the last tier's answer is always accepted.
+        Tier latency and outcome are recorded in the fas_applicability_tier_* metrics.
+        """
+        tiers = [tier.strip() for tier in settings.APPLICABILITY_CASCADE.split(",") if tier.strip()]
+        prompt = None
+        applicability_list = []
+        for position, tier in enumerate(tiers):
+            last = position == len(tiers) - 1
+            start = time.perf_counter()
+            with span(f"applicability.{tier}", kind="tier", tier=tier) as tier_span:
+                if tier == "local":
+                    applicability_list = self._local_applicability(original_transaction, fas_excerpts, priors)
+                else:
+                    prompt = prompt or self._build_prompt(original_transaction, fas_excerpts, priors, shariah_excerpts)
+                    max_tokens = 2000 if last else settings.CASCADE_SMALL_MAX_TOKENS
+                    applicability_list = self._llm_applicability(prompt, tier, max_tokens)
+                confident = self._is_confident(applicability_list)
+                outcome = "accepted" if confident or last else "escalated"
+                tier_span.set(outcome=outcome, standards=len(applicability_list))
+            APPLICABILITY_TIER_DURATION.observe(time.perf_counter() - start, tier=tier)
+            APPLICABILITY_TIER_OUTCOMES.inc(tier=tier, outcome=outcome)
+            if outcome == "accepted":
+                break
+        return applicability_list
+
+    def analyze_applicability(
+        self,
+        original_transaction: str,
+        fas_excerpts: Dict[str, List[str]],
+        priors: Optional[Dict[str, float]] = None,
+        mode: Optional[str] = None,
+        shariah_excerpts: Optional[Dict[str, List[str]]] = None
+    ) -> List[FASApplicability]:
+        """
+        Analyze the applicability of FAS standards to a transaction.
+        
+        With settings.APPLICABILITY_MODE set to "cascade", cheaper tiers answer first and only
+        low-confidence cases escalate to the larger model.
+        
+        Args:
+            original_transaction: The original transaction text
+            fas_excerpts: Dictionary mapping FAS IDs to lists of excerpts
+            priors: Optional routing prior per FAS ID from the retriever's centroid classifier
+            mode: Overrides settings.APPLICABILITY_MODE; "local" uses only the local scorer
+            shariah_excerpts: Optional Shariah Standards excerpts given to the LLM tiers as context
+            
+        Returns:
+            List of FASApplicability objects
+        """
+        mode = mode or settings.APPLICABILITY_MODE
+        if mode == "local":
+            return self._local_applicability(original_transaction, fas_excerpts, priors)
+        if mode == "cascade":
+            return self._cascade(original_transaction, fas_excerpts, priors, shariah_excerpts)
+        prompt = self._build_prompt(original_transaction, fas_excerpts, priors, shariah_excerpts)
+        return self._llm_applicability(prompt, "gpt-4.1-mini", 2000)
+
     def print_applicability(self, applicability_list: List[FASApplicability]) -> None:
         """
         Print the applicability analysis in a formatted way.
@@ -3,12 +3,21 @@ FAS Document Retriever Agent
 Purpose: Retrieves relevant sections from FAS documents based on queries.
 """
 
-from typing import List, Dict, Optional, Union
-from pydantic import BaseModel
-from pinecone import Pinecone
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple, Union
+from pydantic import BaseModel, PrivateAttr
+from ..core.chunk_store import get_chunk_store
+from ..core.centroids import StandardCentroids, fetch_vectors
 from ..core.config import settings
-import openai
-from openai import OpenAI
+from ..core.federation import merge_calibrated
+from ..core.multires import coarse_index_name, rescore, truncate_embedding
+from ..core.providers import create_openai_client, create_vector_index
+from ..core.rerank import mmr
+from ..core.shards import ShardManifest, get_shard_manifest
+from ..core.tracing import span
 
 class FASDocument(BaseModel):
     """Model for FAS document chunks."""
@@ -21,35 +30,107 @@ class FASDocument(BaseModel):
     chunk_index: int
     total_chunks: int
     metadata: Optional[Dict] = None
+    source: str = "fas"  # Index the chunk was retrieved from ("fas" or "ss")
+    # Chunk vector, kept only when it was fetched for reranking; never serialized
+    _values: Optional[List[float]] = PrivateAttr(default=None)
 
 
+# Indexes that retrieval can federate: source tag -> (index name setting, shard manifest setting)
+RETRIEVAL_SOURCES = {
+    "fas": ("PINECONE_INDEX_FAS", "SHARD_MANIFEST_PATH"),
+    "ss": ("PINECONE_INDEX_SS", "SS_SHARD_MANIFEST_PATH"),
+}
+
 
 class FASRetriever:
-    def __init__(self):
-        """Initialize the FAS Retriever agent."""
-        # Initialize Pinecone client
-        self.pc = Pinecone(
-            api_key=settings.PINECONE_API_KEY,
-            environment=settings.PINECONE_ENVIRONMENT
-        )
+    def __init__(self, source: str = "fas", client=None):
+        """
+        Initialize the FAS Retriever agent.
+        
+        Args:
+            source: Index to search, a key of RETRIEVAL_SOURCES. Centroid routing and
+                multi-resolution search are built from the FAS index and only apply to "fas".
+            client: Embedding client to share (created if omitted)
+        """
+        self.source = source
+        index_setting, self._manifest_setting = RETRIEVAL_SOURCES[source]
         
-        # Get the FAS index
-        self.index = self.pc.Index(settings.PINECONE_INDEX_FAS)
+        # Get the index (Pinecone, or the in-memory stand-in in offline mode)
+        self.index = create_vector_index(getattr(settings, index_setting))
         
-        # Verify index connection
+        # Initialize the embedding client once instead of per query
+        self.client = client or create_openai_client()
+        
+        # Retrievers of the other indexes federated with this one, opened on first use
+        self._federated: Dict[str, "FASRetriever"] = {}
+        self._federated_lock = threading.Lock()
+        
+        # Per-standard centroids for query routing, loaded on first use
+        self._centroids: Optional[StandardCentroids] = None
+        self._centroids_loaded = False
+        self._centroids_lock = threading.Lock()
+
+        # Companion index of truncated vectors for multi-resolution search, opened on first use
+        self._coarse_index = None
+        self._coarse_dimension = None
+
+    def warm_up(self) -> None:
+        """Verify the index connection; called by the startup warm-up rather than on construction."""
         try:
             stats = self.index.describe_index_stats()
             print(f"Connected to Pinecone index. Stats: {stats}")
         except Exception as e:
             print(f"Error connecting to Pinecone index: {e}")
             raise
+        if settings.RETRIEVAL_ROUTING == "centroid":
+            self.get_centroids()
+
+    def get_centroids(self) -> Optional[StandardCentroids]:
+        """
+        Return the per-standard centroids used for routing.
+        
+        They are read once from settings.CENTROIDS_PATH, which is built offline by
+        `python -m src.core.centroids` (it reads every shard in the manifest). Requests never scan
+        the index: without the file, this returns None and retrieval searches all standards.
+        """
+        if not self._centroids_loaded:
+            with self._centroids_lock:
+                if not self._centroids_loaded:
+                    try:
+                        if settings.CENTROIDS_PATH and os.path.exists(settings.CENTROIDS_PATH):
+                            self._centroids = StandardCentroids.load(settings.CENTROIDS_PATH)
+                        else:
+                            print(f"No centroid file at '{settings.CENTROIDS_PATH}' (build it with python -m src.core.centroids), searching all standards")
+                            self._centroids = None
+                    except Exception as e:
+                        print(f"Standard centroids unavailable, searching all standards: {e}")
+                        self._centroids = None
+                    self._centroids_loaded = True
+        return self._centroids
+
+    def route(self, query_vector: list, top_k: Optional[int] = None) -> List[Tuple[str, float]]:
+        """
+        Pick the standards whose centroids are closest to the query embedding.
+        
+        Args:
+            query_vector: Query embedding
+            top_k: Number of standards (defaults to settings.ROUTING_TOP_STANDARDS)
+            
+        Returns:
+            List of (document_type, prior) pairs, best first; empty if routing is unavailable
+        """
+        centroids = self.get_centroids()
+        if not centroids:
+            return []
+        priors = centroids.priors(query_vector, settings.ROUTING_PRIOR_TEMPERATURE)
+        ranked = sorted(priors.items(), key=lambda item: item[1], reverse=True)
+        return ranked[:top_k or settings.ROUTING_TOP_STANDARDS]
 
     def embed_query(self, query: str) -> list:
         """
         Embed a query string into a vector using OpenAI's text-embedding-3-small model.
         """
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        response = client.embeddings.create(input=query, model="text-embedding-3-small")
+        response = self.client.embeddings.create(input=query, model="text-embedding-3-small")
         return response.data[0].embedding
 
     def _format_search_results(self, results: List[Dict]) -> List[FASDocument]:
@@ -69,15 +150,17 @@ class FASRetriever:
             # Create FASDocument object with new structure
             doc = FASDocument(
                 id=match.get('id', ''),
-                text=metadata.get('text', ''),
+                text=metadata.get('text') or metadata.get('text_snippet', ''),
                 relevance_score=match.get('score', 0.0),
                 document_type=metadata.get('document_type', ''),
                 section_heading=metadata.get('section_heading', ''),
                 source_filename=metadata.get('source_filename', ''),
                 chunk_index=metadata.get('chunk_index', 0),
                 total_chunks=metadata.get('total_chunks', 0),
-                metadata=metadata
+                metadata=metadata,
+                source=self.source
             )
+            doc._values = match.get('values') or None
             formatted_results.append(doc)
         
         return formatted_results
@@ -88,7 +171,7 @@ class FASRetriever:
         top_n: int = 5,
         document_types: Optional[Union[str, List[str]]] = None,
         section_heading: Optional[str] = None,
-        namespace: str = "default"
+        namespace: Optional[str] = None
     ) -> List[FASDocument]:
         """
         Retrieve relevant FAS document chunks based on the query.
@@ -98,7 +181,8 @@ class FASRetriever:
             top_n: Number of top results to return
             document_types: Optional document type(s) to filter by
             section_heading: Optional section heading to filter by
-            namespace: Namespace to search in (defaults to "default")
+            namespace: Namespace to search in (defaults to the standard shards listed in the shard
+                manifest, or "default" without one)
             
         Returns:
             List of FASDocument objects containing relevant chunks
@@ -106,45 +190,289 @@ class FASRetriever:
         try:
             query_vector = self.embed_query(query)
             
-            # Build filter criteria
-            filter_criteria = {}
-            if document_types:
-                if isinstance(document_types, str):
-                    filter_criteria["document_type"] = {"$eq": document_types}
-                else:
-                    filter_criteria["document_type"] = {"$in": document_types}
-            
-            if section_heading:
-                if filter_criteria:
-                    filter_criteria = {
-                        "$and": [
-                            filter_criteria,
-                            {"section_heading": {"$eq": section_heading}}
-                        ]
-                    }
-                else:
-                    filter_criteria["section_heading"] = {"$eq": section_heading}
-
-            search_results = self.index.query(
-                vector=query_vector,
-                top_k=top_n,
-                include_metadata=True,
-                filter=filter_criteria if filter_criteria else None,
-                namespace=namespace
-            )
-            
-            return self._format_search_results(search_results.matches)
+            # Requests for specific standards or a namespace target this index only
+            federated = self.federated_retrievers() if not document_types and not namespace else []
+            if federated:
+                documents = self._federated_search(query_vector, top_n, section_heading, federated)
+            else:
+                documents = self.search_vector(query_vector, top_n, document_types, section_heading, namespace)
+            return self._hydrate(documents)
         except Exception as e:
             print(f"Error retrieving documents: {e}")
             return []
 
+    def search_vector(
+        self,
+        query_vector: list,
+        top_n: int = 5,
+        document_types: Optional[Union[str, List[str]]] = None,
+        section_heading: Optional[str] = None,
+        namespace: Optional[str] = None
+    ) -> List[FASDocument]:
+        """
+        Search this index with an embedded query (routing, shards and reranking as configured).
+        
+        Arguments are those of retrieve(); texts are not hydrated from the chunk store.
+        """
+        # With MMR reranking, over-fetch candidates with their vectors and keep a diverse top_n
+        rerank = settings.RETRIEVAL_RERANK == "mmr"
+        fetch_n = max(top_n, top_n * settings.MMR_FETCH_MULTIPLIER) if rerank else top_n
+        
+        # Without an explicit namespace, search the per-standard shards when a manifest lists them
+        manifest = None if namespace else get_shard_manifest(getattr(settings, self._manifest_setting))
+        namespace = namespace or "default"
+        
+        # Route to the closest standards unless the caller already chose them
+        candidates = None
+        if document_types:
+            if manifest:
+                types = [document_types] if isinstance(document_types, str) else list(document_types)
+                candidates = [(document_type, None) for document_type in types if manifest.namespace(document_type)]
+        else:
+            if self.source == "fas" and settings.RETRIEVAL_ROUTING == "centroid":
+                candidates = self.route(query_vector) or None
+            if manifest:
+                # Only standards with a shard can be searched; fall back to every shard
+                candidates = [candidate for candidate in candidates or [] if manifest.namespace(candidate[0])]
+                if not candidates:
+                    candidates = [(document_type, None) for document_type in manifest.document_types]
+        
+        if candidates:
+            documents = self._routed_search(query_vector, candidates, fetch_n, section_heading, namespace, include_values=rerank, manifest=manifest)
+        else:
+            filter_criteria = self._build_filter(document_types, section_heading)
+            documents = self._search(query_vector, fetch_n, filter_criteria, namespace, include_values=rerank)
+        
+        if rerank:
+            documents = self._rerank(query_vector, documents, top_n)
+        return documents
+
+    def federated_retrievers(self) -> List["FASRetriever"]:
+        """Return retrievers for the other configured indexes in settings.RETRIEVAL_SOURCES."""
+        if self.source != "fas":
+            return []
+        sources = [source.strip() for source in settings.RETRIEVAL_SOURCES.split(",") if source.strip()]
+        retrievers = []
+        for source in sources:
+            if source == self.source or source not in RETRIEVAL_SOURCES or not getattr(settings, RETRIEVAL_SOURCES[source][0]):
+                continue
+            with self._federated_lock:
+                if source not in self._federated:
+                    self._federated[source] = FASRetriever(source, client=self.client)
+                retrievers.append(self._federated[source])
+        return retrievers
+
+    def _federated_search(
+        self,
+        query_vector: list,
+        top_n: int,
+        section_heading: Optional[str],
+        federated: List["FASRetriever"]
+    ) -> List[FASDocument]:
+        """
+        Search this index and the federated ones in parallel with one query embedding.
+        
+        This index keeps its top_n results and each federated index adds at most
+        settings.FEDERATED_SOURCE_TOP_N, so their chunks never displace FAS chunks. Scores are
+        calibrated per index to order the merged list. An index that fails contributes no
+        documents instead of failing the query.
+        """
+        quota = settings.FEDERATED_SOURCE_TOP_N
+        retrievers = [self] + federated
+        with span("retrieve.federated", kind="federation", sources=",".join(r.source for r in retrievers)) as record:
+            # Each search runs in a copy of the caller's context so tracing, deadlines and usage see it
+            with ThreadPoolExecutor(max_workers=len(retrievers)) as pool:
+                futures = [
+                    (retriever.source, pool.submit(
+                        contextvars.copy_context().run, retriever.search_vector,
+                        query_vector, top_n if retriever is self else quota, None, section_heading
+                    ))
+                    for retriever in retrievers
+                ]
+                results = {}
+                for source, future in futures:
+                    try:
+                        results[source] = future.result()
+                    except Exception as e:
+                        print(f"Error retrieving documents from the {source} index: {e}")
+                        results[source] = []
+            documents = merge_calibrated(results, top_n, primary=self.source, quota=quota)
+            record.set(**{f"{source}_results": sum(doc.source == source for doc in documents) for source in results})
+        return documents
+
+    def _rerank(self, query_vector: list, documents: List[FASDocument], top_n: int) -> List[FASDocument]:
+        """
+        Pick a diverse top_n from over-fetched candidates by maximal marginal relevance.
+        
+        Args:
+            query_vector: Query embedding
+            documents: Candidates fetched with their vectors, best first
+            top_n: Number of documents to keep
+            
+        Returns:
+            Selected documents in MMR order (the first top_n candidates if any vector is missing)
+        """
+        if len(documents) <= top_n or any(doc._values is None for doc in documents):
+            return documents[:top_n]
+        with span("retrieve.mmr", kind="rerank", candidates=len(documents), lambda_mult=settings.MMR_LAMBDA) as record:
+            selected = mmr(query_vector, [doc._values for doc in documents], top_n, settings.MMR_LAMBDA)
+            record.set(replaced=len(set(selected) - set(range(top_n))))
+        return [documents[i] for i in selected]
+
+    def _hydrate(self, documents: List[FASDocument]) -> List[FASDocument]:
+        """
+        Replace the metadata text of the final documents with the full chunk text from the local store.
+        
+        All texts are read in one query. Documents missing from the store (or every document, when
+        no store has been written) keep their metadata text or snippet.
+        """
+        store = get_chunk_store(settings.CHUNK_STORE_PATH)
+        if store is None or not documents:
+            return documents
+        with span("retrieve.hydrate", kind="chunk_store", requested=len(documents)) as record:
+            texts = store.get_texts([doc.id for doc in documents])
+            record.set(found=len(texts))
+        for doc in documents:
+            if doc.id in texts:
+                doc.text = texts[doc.id]
+        return documents
+
+    def _build_filter(
+        self,
+        document_types: Optional[Union[str, List[str]]],
+        section_heading: Optional[str]
+    ) -> Optional[Dict]:
+        """Build the metadata filter for a query (None if unfiltered)."""
+        filter_criteria = {}
+        if document_types:
+            if isinstance(document_types, str):
+                filter_criteria["document_type"] = {"$eq": document_types}
+            else:
+                filter_criteria["document_type"] = {"$in": document_types}
+        
+        if section_heading:
+            if filter_criteria:
+                filter_criteria = {
+                    "$and": [
+                        filter_criteria,
+                        {"section_heading": {"$eq": section_heading}}
+                    ]
+                }
+            else:
+                filter_criteria["section_heading"] = {"$eq": section_heading}
+        return filter_criteria or None
+
+    @property
+    def coarse_index(self):
+        """Companion index holding the settings.MULTIRES_DIMENSION-sized copies of the chunk vectors."""
+        dimension = settings.MULTIRES_DIMENSION
+        if self._coarse_index is None or self._coarse_dimension != dimension:
+            name = coarse_index_name(settings.PINECONE_INDEX_FAS, dimension, settings.PINECONE_INDEX_FAS_COARSE)
+            self._coarse_index = create_vector_index(name, dimension=dimension)
+            self._coarse_dimension = dimension
+        return self._coarse_index
+
+    def _multires_search(
+        self,
+        query_vector: list,
+        top_n: int,
+        filter_criteria: Optional[Dict],
+        namespace: str
+    ) -> List[FASDocument]:
+        """
+        Search the short vectors coarsely, then rescore the candidates on their full vectors.
+        
+        Args:
+            query_vector: Full query embedding
+            top_n: Number of documents to return
+            filter_criteria: Metadata filter (None if unfiltered)
+            namespace: Namespace to search in
+            
+        Returns:
+            Documents ranked by exact full-dimension similarity
+        """
+        dimension = settings.MULTIRES_DIMENSION
+        candidates = top_n * max(1, settings.MULTIRES_CANDIDATE_MULTIPLIER)
+        with span("retrieve.multires", kind="multires", dimension=dimension, candidates=candidates) as record:
+            coarse_results = self.coarse_index.query(
+                vector=truncate_embedding(query_vector, dimension),
+                top_k=candidates,
+                filter=filter_criteria,
+                namespace=namespace
+            )
+            ids = [match.get('id') for match in coarse_results.matches]
+            matches = rescore(query_vector, fetch_vectors(self.index, ids, namespace), top_n) if ids else []
+            record.set(fetched=len(ids))
+        return self._format_search_results(matches)
+
+    def _search(
+        self,
+        query_vector: list,
+        top_n: int,
+        filter_criteria: Optional[Dict],
+        namespace: str,
+        include_values: bool = False
+    ) -> List[FASDocument]:
+        """Run one vector query (coarse search and rescore if multi-resolution is on) and format the matches."""
+        if settings.MULTIRES_DIMENSION and self.source == "fas":
+            return self._multires_search(query_vector, top_n, filter_criteria, namespace)
+        search_results = self.index.query(
+            vector=query_vector,
+            top_k=top_n,
+            include_metadata=True,
+            include_values=include_values,
+            filter=filter_criteria,
+            namespace=namespace
+        )
+        return self._format_search_results(search_results.matches)
+
+    def _routed_search(
+        self,
+        query_vector: list,
+        candidates: List[Tuple[str, Optional[float]]],
+        top_n: int,
+        section_heading: Optional[str],
+        namespace: str,
+        include_values: bool = False,
+        manifest: Optional[ShardManifest] = None
+    ) -> List[FASDocument]:
+        """
+        Query each candidate standard in parallel and merge the matches by score.
+        
+        A standard with a shard in the manifest is searched in its own namespace; otherwise the
+        query filters `namespace` by document type. Documents of routed standards carry the routing
+        prior of their standard in metadata["standard_prior"].
+        """
+        def search(document_type: str) -> List[FASDocument]:
+            shard = manifest.namespace(document_type) if manifest else None
+            if shard:
+                return self._search(query_vector, top_n, self._build_filter(None, section_heading), shard, include_values)
+            return self._search(query_vector, top_n, self._build_filter(document_type, section_heading), namespace, include_values)
+
+        # Each query runs in a copy of the caller's context so tracing and usage see it
+        with ThreadPoolExecutor(max_workers=len(candidates)) as pool:
+            futures = [
+                pool.submit(contextvars.copy_context().run, search, document_type)
+                for document_type, _ in candidates
+            ]
+            results = [future.result() for future in futures]
+
+        documents = []
+        for (document_type, prior), docs in zip(candidates, results):
+            for doc in docs:
+                if prior is not None:
+                    doc.metadata = dict(doc.metadata or {}, standard_prior=round(prior, 4))
+                documents.append(doc)
+        documents.sort(key=lambda doc: doc.relevance_score, reverse=True)
+        return documents[:top_n]
+
     def retrieve_by_keywords(
         self,
         keywords: List[str],
         top_n: int = 5,
         document_types: Optional[Union[str, List[str]]] = None,
         section_heading: Optional[str] = None,
-        namespace: str = "default"
+        namespace: Optional[str] = None
     ) -> List[FASDocument]:
         """
         Retrieve documents using a list of keywords.
@@ -154,7 +482,8 @@ class FASRetriever:
             top_n: Number of top results to return
             document_types: Optional document type(s) to filter by
             section_heading: Optional section heading to filter by
-            namespace: Namespace to search in (defaults to "default")
+            namespace: Namespace to search in (defaults to the standard shards listed in the shard
+                manifest, or "default" without one)
             
         Returns:
             List of FASDocument objects containing relevant chunks
@@ -3,12 +3,27 @@ Orchestrator Agent
 Purpose: Coordinates the workflow between Transaction Deconstructor, FAS Retriever, Retrieval Summarizer, and FAS Applicability agents.
 """
 
-from typing import Dict, List, Optional
+import threading
+from typing import Dict, List, Optional, Tuple
 from pydantic import BaseModel
 from .transaction_deconstructor import TransactionDeconstructor
 from .fas_retriever import FASRetriever, FASDocument
 from .retrieval_summarizer import RetrievalSummarizer
 from .fas_applicability import FASApplicabilityAgent, FASApplicability
+from ..core.config import settings
+from ..core.metrics import STAGE_DEGRADED
+from ..core.resilience import remaining_time, request_deadline
+from ..core.tracing import span, start_trace
+from ..core.usage import track_usage
+
+# Analysis returned when the deconstructor cannot answer before the deadline
+EMPTY_TRANSACTION_ANALYSIS = {
+    "primary_financial_event": "",
+    "key_financial_items": [],
+    "accounting_treatments": [],
+    "transaction_nature": "",
+    "search_keywords": []
+}
 
 class OrchestratorResult(BaseModel):
     """Model for the complete analysis result."""
@@ -16,79 +31,306 @@ class OrchestratorResult(BaseModel):
     fas_documents: List[FASDocument]
     fas_summaries: Dict[str, str]
     fas_applicability: List[FASApplicability]
+    usage: Optional[Dict] = None  # Token usage and cost, total and by stage
+    degraded: Dict[str, str] = {}  # Stages shortened or skipped to meet the deadline, with the reason
 
 class Orchestrator:
     def __init__(self):
-        """Initialize the Orchestrator with all required agents."""
-        self.transaction_deconstructor = TransactionDeconstructor()
-        self.fas_retriever = FASRetriever()
-        self.retrieval_summarizer = RetrievalSummarizer()
-        self.fas_applicability = FASApplicabilityAgent()
+        """Initialize the Orchestrator; agents are created on first use."""
+        self._agents = {}
+        self._agents_lock = threading.Lock()
+
+    def _agent(self, name: str, factory):
+        """Return the named agent, creating it once even when called from several threads."""
+        agent = self._agents.get(name)
+        if agent is None:
+            with self._agents_lock:
+                agent = self._agents.get(name)
+                if agent is None:
+                    agent = factory()
+                    self._agents[name] = agent
+        return agent
+
+    @property
+    def transaction_deconstructor(self) -> TransactionDeconstructor:
+        return self._agent("transaction_deconstructor", TransactionDeconstructor)
+
+    @property
+    def fas_retriever(self) -> FASRetriever:
+        return self._agent("fas_retriever", FASRetriever)
+
+    @property
+    def retrieval_summarizer(self) -> RetrievalSummarizer:
+        return self._agent("retrieval_summarizer", RetrievalSummarizer)
+
+    @property
+    def fas_applicability(self) -> FASApplicabilityAgent:
+        return self._agent("fas_applicability", FASApplicabilityAgent)
 
-    def analyze_transaction(self, transaction_text: str) -> OrchestratorResult:
+    def warm_up(self) -> None:
         """
-        Analyze a transaction through the complete agent chain.
+        Create every agent and open its provider connections ahead of the first request.
+        
+        Checks the vector index connection and primes the deconstructor chat session.
+        """
+        self.fas_retriever.warm_up()
+        self.transaction_deconstructor.warm_up()
+        self.retrieval_summarizer
+        self.fas_applicability
+
+    def _formulate_search_query(self, transaction_analysis: Dict) -> str:
+        """
+        Build the retrieval query from the transaction analysis.
         
         Args:
-            transaction_text: The original transaction text to analyze
+            transaction_analysis: Output of the transaction deconstructor
             
         Returns:
-            OrchestratorResult containing the complete analysis
+            Search query string
         """
-        print("\n=== Starting Transaction Analysis ===")
-        
-        # Step 1: Transaction Deconstruction
-        print("\n1. Deconstructing Transaction...")
-        transaction_analysis = self.transaction_deconstructor.deconstruct(transaction_text)
-        print(f"Transaction Analysis: {transaction_analysis}")
-        
-        # Step 2: FAS Retrieval
-        print("\n2. Retrieving Relevant FAS Documents...")
         # Use search keywords from transaction analysis for better retrieval
-        search_query = " ".join(transaction_analysis.get("search_keywords", []))
-        fas_documents = self.fas_retriever.retrieve(
-            query=search_query,
-            top_n=5  # Get top 5 most relevant documents
-        )
-        print(f"Retrieved {len(fas_documents)} relevant documents")
+        return " ".join(transaction_analysis.get("search_keywords", []))
+
+    def _group_documents_by_type(self, fas_documents: List[FASDocument]) -> Dict[str, List[FASDocument]]:
+        """
+        Group retrieved documents by their document type.
         
-        # Step 3: FAS Summarization
-        print("\n3. Summarizing FAS Findings...")
-        # Group documents by their document type for better summarization
+        Args:
+            fas_documents: Retrieved FAS documents
+            
+        Returns:
+            Dictionary mapping document types to their documents
+        """
         documents_by_type = {}
         for doc in fas_documents:
             if doc.document_type not in documents_by_type:
                 documents_by_type[doc.document_type] = []
             documents_by_type[doc.document_type].append(doc)
+        return documents_by_type
+
+    def _prepare_fas_excerpts(self, fas_documents: List[FASDocument], source: str = "fas") -> Dict[str, List[str]]:
+        """
+        Prepare excerpts for applicability analysis.
         
-        # Generate summaries for each document type
-        fas_summaries = self.retrieval_summarizer.summarize_findings(documents_by_type)
-        print(f"Generated summaries for {len(fas_summaries)} document types")
-        
-        # Step 4: FAS Applicability Analysis
-        print("\n4. Analyzing FAS Applicability...")
-        # Prepare excerpts for applicability analysis
+        Args:
+            fas_documents: Retrieved documents
+            source: Index whose documents are used ("fas", or "ss" for the Shariah context)
+            
+        Returns:
+            Dictionary mapping FAS IDs to lists of excerpts
+        """
         fas_excerpts = {}
         for doc in fas_documents:
+            if doc.source != source:
+                continue
             # Extract FAS ID from document type (e.g., "FAS_32" -> "FAS 32")
             fas_id = doc.document_type.replace("_", " ")
             if fas_id not in fas_excerpts:
                 fas_excerpts[fas_id] = []
             fas_excerpts[fas_id].append(doc.text)
+        return fas_excerpts
+
+    def _standard_priors(self, fas_documents: List[FASDocument]) -> Dict[str, float]:
+        """
+        Collect the routing prior of each retrieved standard.
         
-        # Analyze applicability using both original transaction and summarized findings
-        applicability_list = self.fas_applicability.analyze_applicability(
-            original_transaction=transaction_text,
-            fas_excerpts=fas_excerpts
-        )
-        print(f"Analyzed applicability for {len(applicability_list)} FAS standards")
+        Args:
+            fas_documents: Retrieved FAS documents
+            
+        Returns:
+            Dictionary mapping FAS IDs (as in the excerpts) to priors; empty if retrieval was not routed
+        """
+        priors = {}
+        for doc in fas_documents:
+            prior = (doc.metadata or {}).get("standard_prior")
+            if prior is not None:
+                priors[doc.document_type.replace("_", " ")] = prior
+        return priors
+
+    def _has_budget(self, minimum: float) -> bool:
+        """Return whether the request deadline leaves at least `minimum` seconds (True without a deadline)."""
+        remaining = remaining_time()
+        return remaining is None or remaining >= minimum
+
+    def _degrade(self, degraded: Dict[str, str], stage: str, reason: str, record=None) -> None:
+        """Record that a stage was shortened or skipped to meet the deadline."""
+        degraded[stage] = reason
+        STAGE_DEGRADED.inc(stage=stage)
+        if record is not None:
+            record.set(degraded=reason)
+        print(f"Degraded {stage}: {reason}")
+
+    def run_deconstruct(self, transaction_text: str, degraded: Dict[str, str]) -> Dict:
+        """
+        Deconstruct the transaction; an empty analysis is returned if the deadline passes first.
         
-        return OrchestratorResult(
-            transaction_analysis=transaction_analysis,
-            fas_documents=fas_documents,
-            fas_summaries=fas_summaries,
-            fas_applicability=applicability_list
-        )
+        Args:
+            transaction_text: The original transaction text
+            degraded: Degraded stages of this request, updated in place
+            
+        Returns:
+            Transaction analysis dictionary
+        """
+        with span("deconstruct") as record:
+            try:
+                return self.transaction_deconstructor.deconstruct(transaction_text)
+            except Exception as e:
+                if self._has_budget(0.0):
+                    raise
+                self._degrade(degraded, "deconstruct", f"deadline reached ({e}); searching with the transaction text", record)
+                return dict(EMPTY_TRANSACTION_ANALYSIS)
+
+    def run_retrieve(
+        self,
+        transaction_analysis: Dict,
+        transaction_text: str,
+        degraded: Dict[str, str],
+        top_n: int = 5
+    ) -> Tuple[str, List[FASDocument]]:
+        """
+        Retrieve FAS chunks for the transaction, fetching fewer when the deadline is near.
+        
+        Args:
+            transaction_analysis: Output of the transaction deconstructor
+            transaction_text: The original transaction text, searched when there are no keywords
+            degraded: Degraded stages of this request, updated in place
+            top_n: Number of chunks to retrieve with a full budget
+            
+        Returns:
+            Tuple of (search query, retrieved documents)
+        """
+        search_query = self._formulate_search_query(transaction_analysis) or transaction_text
+        reason = None
+        if not self._has_budget(settings.DEADLINE_RETRIEVE_MIN_S):
+            top_n = min(top_n, settings.DEADLINE_REDUCED_TOP_N)
+            reason = f"top_n reduced to {top_n}"
+        with span("retrieve", top_n=top_n) as record:
+            fas_documents = self.fas_retriever.retrieve(query=search_query, top_n=top_n)
+            record.set(results=len(fas_documents))
+            if not fas_documents and not self._has_budget(0.0):
+                reason = "deadline reached; no documents retrieved"
+            if reason:
+                self._degrade(degraded, "retrieve", reason, record)
+        return search_query, fas_documents
+
+    def run_summarize(self, documents_by_type: Dict[str, List[FASDocument]], degraded: Dict[str, str]) -> Dict[str, str]:
+        """
+        Summarize the retrieved documents within the budget left over by applicability.
+        
+        Summarization is optional: when the deadline is near, only the chunk summaries stored at
+        ingestion time are assembled (no LLM call), and groups without them are left out.
+        
+        Args:
+            documents_by_type: Retrieved documents grouped by document type
+            degraded: Degraded stages of this request, updated in place
+            
+        Returns:
+            Dictionary mapping FAS IDs to summaries
+        """
+        with span("summarize", groups=len(documents_by_type)) as record:
+            if not self._has_budget(settings.DEADLINE_SUMMARIZE_MIN_S):
+                fas_summaries = self.retrieval_summarizer.summarize_findings(documents_by_type, mode="stored")
+                skipped = len(documents_by_type) - len(fas_summaries)
+                self._degrade(degraded, "summarize", f"assembled stored chunk summaries; {skipped} of {len(documents_by_type)} groups skipped", record)
+                return fas_summaries
+
+            # Leave the applicability stage its minimum budget
+            remaining = remaining_time()
+            budget = None if remaining is None else remaining - settings.DEADLINE_APPLICABILITY_MIN_S
+            with request_deadline(budget):
+                fas_summaries = self.retrieval_summarizer.summarize_findings(documents_by_type)
+                if not self._has_budget(0.0):
+                    self._degrade(degraded, "summarize", "summarization budget ran out; some summaries may be incomplete", record)
+            return fas_summaries
+
+    def run_applicability(
+        self,
+        transaction_text: str,
+        fas_documents: List[FASDocument],
+        degraded: Dict[str, str]
+    ) -> List[FASApplicability]:
+        """
+        Assess FAS applicability, falling back to the local scorer when the deadline is near.
+        
+        Args:
+            transaction_text: The original transaction text
+            fas_documents: Retrieved FAS documents
+            degraded: Degraded stages of this request, updated in place
+            
+        Returns:
+            List of FASApplicability objects
+        """
+        fas_excerpts = self._prepare_fas_excerpts(fas_documents)
+        shariah_excerpts = self._prepare_fas_excerpts(fas_documents, source="ss")
+        priors = self._standard_priors(fas_documents)
+        with span("applicability") as record:
+            if not self._has_budget(settings.DEADLINE_APPLICABILITY_MIN_S):
+                applicability_list = self.fas_applicability.analyze_applicability(
+                    transaction_text, fas_excerpts, priors=priors, mode="local")
+                self._degrade(degraded, "applicability", "local scorer used; not enough time for an LLM call", record)
+            else:
+                applicability_list = self.fas_applicability.analyze_applicability(
+                    transaction_text, fas_excerpts, priors=priors, shariah_excerpts=shariah_excerpts)
+                if not applicability_list and fas_excerpts and not self._has_budget(0.0):
+                    applicability_list = self.fas_applicability.analyze_applicability(
+                        transaction_text, fas_excerpts, priors=priors, mode="local")
+                    self._degrade(degraded, "applicability", "deadline reached during the LLM call; local scorer used", record)
+            record.set(standards=len(applicability_list))
+        return applicability_list
+
+    def analyze_transaction(self, transaction_text: str, deadline_s: Optional[float] = None) -> OrchestratorResult:
+        """
+        Analyze a transaction through the complete agent chain.
+        
+        Args:
+            transaction_text: The original transaction text to analyze
+            deadline_s: Time budget for the whole analysis in seconds (defaults to
+                settings.REQUEST_DEADLINE_S; None or 0 for no deadline). Stages that would not fit
+                are degraded and listed in the result's `degraded` field.
+            
+        Returns:
+            OrchestratorResult containing the complete analysis
+        """
+        if deadline_s is None:
+            deadline_s = settings.REQUEST_DEADLINE_S
+        degraded = {}
+        with start_trace("analyze_transaction", transaction_chars=len(transaction_text)), track_usage() as usage, \
+                request_deadline(deadline_s or None):
+            print("\n=== Starting Transaction Analysis ===")
+            
+            # Step 1: Transaction Deconstruction
+            print("\n1. Deconstructing Transaction...")
+            transaction_analysis = self.run_deconstruct(transaction_text, degraded)
+            print(f"Transaction Analysis: {transaction_analysis}")
+            
+            # Step 2: FAS Retrieval
+            print("\n2. Retrieving Relevant FAS Documents...")
+            _, fas_documents = self.run_retrieve(transaction_analysis, transaction_text, degraded)
+            print(f"Retrieved {len(fas_documents)} relevant documents")
+            
+            # Step 3: FAS Summarization
+            print("\n3. Summarizing FAS Findings...")
+            # Group documents by their document type for better summarization
+            documents_by_type = self._group_documents_by_type(fas_documents)
+            
+            # Generate summaries for each document type
+            fas_summaries = self.run_summarize(documents_by_type, degraded)
+            print(f"Generated summaries for {len(fas_summaries)} document types")
+            
+            # Step 4: FAS Applicability Analysis
+            print("\n4. Analyzing FAS Applicability...")
+            # Analyze applicability using both original transaction and retrieved excerpts
+            applicability_list = self.run_applicability(transaction_text, fas_documents, degraded)
+            print(f"Analyzed applicability for {len(applicability_list)} FAS standards")
+            
+            return OrchestratorResult(
+                transaction_analysis=transaction_analysis,
+                fas_documents=fas_documents,
+                fas_summaries=fas_summaries,
+                fas_applicability=applicability_list,
+                usage=usage.to_dict(),
+                degraded=degraded
+            )
 
     def print_analysis(self, result: OrchestratorResult) -> None:
         """
@@ -140,4 +382,20 @@ class Orchestrator:
             print(f"\n📈 {fas.fas_id} - {fas.fas_name}")
             print(f"Probability: {fas.probability:.2f}")
             print("-" * 30)
-            print(f"Reasoning:\n{fas.reasoning}") 
\ No newline at end of file
+            print(f"Reasoning:\n{fas.reasoning}")
+        
+        # Print Degraded Stages
+        if result.degraded:
+            print("\n⏱️ Degraded to Meet the Deadline:")
+            print("=" * 50)
+            for stage, reason in result.degraded.items():
+                print(f"{stage}: {reason}")
+        
+        # Print Token Usage
+        if result.usage:
+            print("\n🧮 Token Usage:")
+            print("=" * 50)
+            for stage, usage in result.usage["by_stage"].items():
+                print(f"{stage}: {usage['total_tokens']} tokens in {usage['calls']} calls (${usage['cost_usd']:.4f})")
+            total = result.usage["total"]
+            print(f"Total: {total['total_tokens']} tokens (${total['cost_usd']:.4f})")
\ No newline at end of file
@@ -3,29 +3,112 @@ Retrieval Summarizer Agent
 Purpose: Summarizes findings from FAS documents retrieved by FASRetriever.
 """
 
-from typing import Dict, List
-from openai import OpenAI
+from typing import Dict, List, Optional
 from ..core.config import settings
+from ..core.providers import create_openai_client
 from .fas_retriever import FASDocument
 
 class RetrievalSummarizer:
     def __init__(self):
         """Initialize the Retrieval Summarizer agent."""
-        self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = create_openai_client()
 
-    def _summarize_fas_findings(self, documents: List[FASDocument]) -> str:
+    def _get_stored_summaries(self, documents: List[FASDocument]) -> Optional[List[str]]:
+        """
+        Collect the chunk summaries written at ingestion time.
+        
+        Args:
+            documents: List of FASDocument objects
+            
+        Returns:
+            One stored summary per document, or None if any document lacks one
+        """
+        stored = [(doc.metadata or {}).get("chunk_summary") for doc in documents]
+        return stored if all(stored) else None
+
+    def _assemble_stored_summaries(self, documents: List[FASDocument], stored: List[str]) -> str:
+        """
+        Join precomputed chunk summaries into a single summary without an LLM call.
+        
+        Args:
+            documents: List of FASDocument objects
+            stored: Stored summary for each document
+            
+        Returns:
+            Assembled summary
+        """
+        lines = []
+        seen = set()
+        for doc, summary in zip(documents, stored):
+            # Overlapping chunks often produce the same summary; keep the first one only
+            if summary in seen:
+                continue
+            seen.add(summary)
+            lines.append(f"- {doc.document_type} ({doc.section_heading}): {summary}")
+        return "\n".join(lines)
+
+    def _condense_stored_summaries(self, documents: List[FASDocument], stored: List[str]) -> str:
+        """
+        Condense precomputed chunk summaries with a short, cheap LLM call.
+        
+        Args:
+            documents: List of FASDocument objects
+            stored: Stored summary for each document
+            
+        Returns:
+            Condensed summary, or the assembled summaries if the call fails
+        """
+        assembled = self._assemble_stored_summaries(documents, stored)
+        prompt = f"""Combine these summaries of FAS document excerpts into one concise summary of the key accounting requirements, conditions and exceptions. Keep the FAS number and title of each document.
+
+Excerpt summaries:
+{assembled}
+
+Summary:"""
+
+        try:
+            response = self.client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[
+                    {"role": "system", "content": "You are a financial accounting expert specializing in Islamic finance and FAS standards."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2,
+                max_tokens=settings.SUMMARIZER_CONDENSE_MAX_TOKENS
+            )
+            
+            return response.choices[0].message.content.strip()
+
+        except Exception as e:
+            print(f"Error condensing stored summaries: {e}")
+            return assembled
+
+    def _summarize_fas_findings(self, documents: List[FASDocument], mode: Optional[str] = None) -> Optional[str]:
         """
         Summarize findings from a list of FAS documents.
         
         Args:
             documents: List of FASDocument objects from a specific FAS
+            mode: "full", "condense", "assemble" or "stored" (assemble without ever calling the LLM);
+                defaults to settings.SUMMARIZER_MODE
             
         Returns:
-            Summary of the findings
+            Summary of the findings (None in "stored" mode when a document has no stored summary)
         """
+        mode = mode or settings.SUMMARIZER_MODE
         if not documents:
             return "No relevant findings found."
 
+        # Prefer the summaries precomputed at ingestion time over re-reading the full text
+        if mode != "full":
+            stored = self._get_stored_summaries(documents)
+            if stored:
+                if mode in ("assemble", "stored"):
+                    return self._assemble_stored_summaries(documents, stored)
+                return self._condense_stored_summaries(documents, stored)
+            if mode == "stored":
+                return None
+
         # Prepare context from documents with enhanced metadata
         context = "\n\n".join([
             f"Document {i+1} (Relevance: {doc.relevance_score:.2f}):\n"
@@ -73,12 +156,18 @@ class RetrievalSummarizer:
             print(f"Error generating summary: {e}")
             return "Error generating summary."
 
-    def summarize_findings(self, results_by_namespace: Dict[str, List[FASDocument]]) -> Dict[str, str]:
+    def summarize_findings(
+        self,
+        results_by_namespace: Dict[str, List[FASDocument]],
+        mode: Optional[str] = None
+    ) -> Dict[str, str]:
         """
         Summarize findings from all FAS documents across namespaces.
         
         Args:
             results_by_namespace: Dictionary mapping FAS namespaces to their retrieved documents
+            mode: Overrides settings.SUMMARIZER_MODE; "stored" makes no LLM call and leaves out
+                namespaces without stored chunk summaries
             
         Returns:
             Dictionary mapping FAS namespaces to their summaries
@@ -90,8 +179,9 @@ class RetrievalSummarizer:
             fas_number = namespace.replace("fas_", "FAS ")
             
             # Generate summary for this FAS
-            summary = self._summarize_fas_findings(documents)
-            summaries[fas_number] = summary
+            summary = self._summarize_fas_findings(documents, mode)
+            if summary is not None:
+                summaries[fas_number] = summary
             
         return summaries
 
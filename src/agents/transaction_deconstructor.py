@@ -3,10 +3,11 @@ Transaction Deconstructor Agent
 Purpose: Breaks down input reverse transactions into core components and formulates queries.
 """
 
+import threading
 from typing import Dict, List, Tuple
 from pydantic import BaseModel
-import google.generativeai as genai
 from ..core.config import settings
+from ..core.providers import create_gemini_model
 from ..core.prompts import TRANSACTION_DECONSTRUCTOR_PROMPT
 
 class TransactionAnalysis(BaseModel):
@@ -20,16 +21,30 @@ class TransactionAnalysis(BaseModel):
 class TransactionDeconstructor:
     def __init__(self):
         """Initialize the Transaction Deconstructor agent."""
-        # Configure Gemini
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        self.model = genai.GenerativeModel(
+        # Configure Gemini (or the offline stand-in)
+        self.model = create_gemini_model(
             model_name=settings.MODEL_NAME,
             generation_config={"temperature": settings.TEMPERATURE}
         )
         
-        # Initialize chat
-        self.chat = self.model.start_chat(history=[])
-        self.chat.send_message(TRANSACTION_DECONSTRUCTOR_PROMPT)
+        # The chat is primed with the system prompt on first use (or by warm_up), not on construction
+        self._chat = None
+        self._chat_lock = threading.Lock()
+
+    @property
+    def chat(self):
+        """Chat session primed with the deconstructor prompt, started on first use."""
+        if self._chat is None:
+            with self._chat_lock:
+                if self._chat is None:
+                    chat = self.model.start_chat(history=[])
+                    chat.send_message(TRANSACTION_DECONSTRUCTOR_PROMPT)
+                    self._chat = chat
+        return self._chat
+
+    def warm_up(self) -> None:
+        """Start and prime the chat session ahead of the first request."""
+        self.chat
 
     def _parse_analysis_response(self, response: str) -> TransactionAnalysis:
         """
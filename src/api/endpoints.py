@@ -2,9 +2,12 @@
 FastAPI endpoints for the FAS analysis system.
 """
 
+import threading
 import time
-from typing import Dict, List
-from fastapi import APIRouter, HTTPException
+from typing import Dict, List, Optional
+from fastapi import APIRouter, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from src.api.models import (
     TransactionInput,
@@ -16,6 +19,11 @@ from src.api.models import (
     StepResult
 )
 from src.agents.orchestrator import Orchestrator
+from src.api.responses import FastJSONResponse, select_fields, snippet_document, sse_event
+from src.core.config import settings
+from src.core.profiling import check_profile_token, profile_request
+from src.core.resilience import request_deadline
+from src.core.usage import track_usage
 
 # Define models
 class FASDocument(BaseModel):
@@ -54,6 +62,7 @@ class StepResult(BaseModel):
 class TransactionInput(BaseModel):
     """Input model for transaction analysis."""
     transaction_text: str
+    deadline_s: Optional[float] = None  # Defaults to settings.REQUEST_DEADLINE_S
 
 class OrchestratorResponse(BaseModel):
     """Response model for the complete analysis."""
@@ -63,130 +72,323 @@ class OrchestratorResponse(BaseModel):
     fas_applicability: List[FASApplicability]
     steps: List[StepResult]
     processing_time: float
+    partial: bool = False  # True when a stage was degraded to meet the deadline
+    degraded_stages: Dict[str, str] = {}
 
 router = APIRouter()
-orchestrator = Orchestrator()
 
-@router.post("/analyze-transaction", response_model=OrchestratorResponse)
-async def analyze_transaction(input_data: TransactionInput) -> OrchestratorResponse:
+# The orchestrator is created on first use so that importing the app makes no provider calls
+_orchestrator: Optional[Orchestrator] = None
+_orchestrator_lock = threading.Lock()
+_warmup_state = {"status": "pending", "error": None, "duration_ms": None}
+
+def get_orchestrator() -> Orchestrator:
+    """Return the shared Orchestrator, creating it on first use."""
+    global _orchestrator
+    if _orchestrator is None:
+        with _orchestrator_lock:
+            if _orchestrator is None:
+                _orchestrator = Orchestrator()
+    return _orchestrator
+
+def warm_up() -> None:
+    """
+    Create the agents and open their provider connections ahead of the first request.
+    
+    Failures are recorded for /ready instead of raised; requests still create agents lazily.
+    """
+    _warmup_state["status"] = "warming"
+    start = time.perf_counter()
+    try:
+        get_orchestrator().warm_up()
+        _warmup_state["status"] = "ready"
+    except Exception as e:
+        print(f"Warm-up failed: {e}")
+        _warmup_state["status"] = "failed"
+        _warmup_state["error"] = str(e)
+    finally:
+        _warmup_state["duration_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+
+def warmup_status() -> Dict:
+    """Return the warm-up state: pending, warming, ready or failed."""
+    return dict(_warmup_state)
+
+def _document_dicts(fas_results: Dict[str, List], view: str, snippet_chars: int) -> Dict[str, List[Dict]]:
+    """Convert grouped FASDocuments to response dictionaries (snippets in the snippets view)."""
+    documents = {
+        namespace: [
+            {
+                "fas_id": doc.document_type,
+                "text": doc.text,
+                "relevance_score": doc.relevance_score,
+                "metadata": doc.metadata or {}
+            } for doc in docs
+        ] for namespace, docs in fas_results.items()
+    }
+    if view == "snippets":
+        documents = {
+            namespace: [snippet_document(doc, snippet_chars) for doc in docs]
+            for namespace, docs in documents.items()
+        }
+    return documents
+
+def _applicability_dicts(applicability_list: List) -> List[Dict]:
+    """Convert FASApplicability objects to response dictionaries."""
+    return [
+        {
+            "fas_id": item.fas_id,
+            "fas_name": item.fas_name,
+            "probability": item.probability,
+            "reasoning": item.reasoning
+        }
+        for item in applicability_list
+    ]
+
+@router.post("/analyze-transaction", response_model=OrchestratorResponse, response_class=FastJSONResponse)
+async def analyze_transaction(
+    input_data: TransactionInput,
+    view: str = Query("full", description="full, snippets (shortened document texts) or verdicts (fas_applicability only)"),
+    fields: Optional[str] = Query(None, description="Comma-separated top-level fields to return instead of the view's"),
+    exclude: Optional[str] = Query(None, description="Comma-separated top-level fields to leave out"),
+    include_documents: bool = Query(True, description="False leaves out fas_documents"),
+    snippet_chars: int = Query(settings.RESPONSE_SNIPPET_CHARS, ge=20, description="Document text length in the snippets view"),
+    profile_token: Optional[str] = Query(None, description="PROFILE_TOKEN, to profile this request (prefer the header)"),
+    x_profile_token: Optional[str] = Header(None, description="PROFILE_TOKEN, to profile this request")
+) -> FastJSONResponse:
     """
     Analyze a financial transaction using the complete agent chain.
     
+    Only the selected fields are built and serialized; summarization is skipped when
+    fas_summaries is not selected. The blocking stages run in the threadpool, in the request's
+    context, so that the event loop keeps serving other requests meanwhile. A request presenting the profiling token is run under the
+    stack sampler of core/profiling.py and gets the profile in a "profile" field. Only the threads
+    running its stages are sampled, not the event loop shared with other requests.
+    
     Args:
         input_data: Transaction text to analyze
+        view: Response view (full, snippets or verdicts)
+        fields: Top-level fields to return, overriding the view
+        exclude: Top-level fields to leave out
+        include_documents: Whether to return fas_documents
+        snippet_chars: Maximum document text length in the snippets view
+        profile_token: Profiling token passed as a query parameter
+        x_profile_token: Profiling token passed in the X-Profile-Token header
         
     Returns:
-        Complete analysis results including all intermediate steps
+        The selected parts of the analysis, including the intermediate steps by default
     """
+    selected = select_fields(view, fields, exclude, include_documents)
+    try:
+        profiled = check_profile_token(x_profile_token or profile_token)
+    except PermissionError as e:
+        raise HTTPException(status_code=403, detail=str(e))
     start_time = time.time()
     steps = []
+    degraded = {}
+    orchestrator = get_orchestrator()
+    deadline_s = input_data.deadline_s if input_data.deadline_s is not None else settings.REQUEST_DEADLINE_S
+    
+    def step_result(step_name: str, stage: str, data: Dict) -> StepResult:
+        """Build the step result of a completed stage, marked degraded if it was shortened."""
+        if stage in degraded:
+            return StepResult(step_name=step_name, status="degraded", data=data, message=degraded[stage])
+        return StepResult(step_name=step_name, status="success", data=data)
     
     try:
-        # Step 1: Transaction Deconstruction
-        try:
-            transaction_analysis = orchestrator.transaction_deconstructor.deconstruct(
-                input_data.transaction_text
-            )
-            steps.append(StepResult(
-                step_name="Transaction Deconstruction",
-                status="success",
-                data=transaction_analysis
-            ))
-        except Exception as e:
-            steps.append(StepResult(
-                step_name="Transaction Deconstruction",
-                status="error",
-                message=str(e)
-            ))
-            raise HTTPException(status_code=500, detail=f"Transaction deconstruction failed: {str(e)}")
+        with track_usage() as usage, request_deadline(deadline_s or None), \
+                profile_request("analyze_transaction", enabled=profiled, include_caller=False) as profile:
+            # Step 1: Transaction Deconstruction
+            try:
+                transaction_analysis = await run_in_threadpool(
+                    orchestrator.run_deconstruct, input_data.transaction_text, degraded
+                )
+                steps.append(step_result(
+                    "Transaction Deconstruction", "deconstruct",
+                    {**transaction_analysis, "usage": usage.stage_usage("deconstruct")}
+                ))
+            except Exception as e:
+                steps.append(StepResult(
+                    step_name="Transaction Deconstruction",
+                    status="error",
+                    message=str(e)
+                ))
+                raise HTTPException(status_code=500, detail=f"Transaction deconstruction failed: {str(e)}")
         
-        # Step 2: FAS Retrieval
-        try:
-            search_query = orchestrator._formulate_search_query(transaction_analysis)
-            fas_results = orchestrator.fas_retriever.retrieve_across_namespaces(search_query)
-            steps.append(StepResult(
-                step_name="FAS Retrieval",
-                status="success",
-                data={"query": search_query, "results_count": len(fas_results)}
-            ))
-        except Exception as e:
-            steps.append(StepResult(
-                step_name="FAS Retrieval",
-                status="error",
-                message=str(e)
-            ))
-            raise HTTPException(status_code=500, detail=f"FAS retrieval failed: {str(e)}")
+            # Step 2: FAS Retrieval
+            try:
+                search_query, fas_documents = await run_in_threadpool(
+                    orchestrator.run_retrieve, transaction_analysis, input_data.transaction_text, degraded
+                )
+                fas_results = orchestrator._group_documents_by_type(fas_documents)
+                steps.append(step_result(
+                    "FAS Retrieval", "retrieve",
+                    {"query": search_query, "results_count": len(fas_documents), "usage": usage.stage_usage("retrieve")}
+                ))
+            except Exception as e:
+                steps.append(StepResult(
+                    step_name="FAS Retrieval",
+                    status="error",
+                    message=str(e)
+                ))
+                raise HTTPException(status_code=500, detail=f"FAS retrieval failed: {str(e)}")
         
-        # Step 3: FAS Summarization
-        try:
-            fas_summaries = orchestrator.retrieval_summarizer.summarize_findings(fas_results)
-            steps.append(StepResult(
-                step_name="FAS Summarization",
-                status="success",
-                data={"summaries_count": len(fas_summaries)}
-            ))
-        except Exception as e:
-            steps.append(StepResult(
-                step_name="FAS Summarization",
-                status="error",
-                message=str(e)
-            ))
-            raise HTTPException(status_code=500, detail=f"FAS summarization failed: {str(e)}")
+            # Step 3: FAS Summarization (not needed when the caller does not want the summaries)
+            try:
+                if "fas_summaries" in selected:
+                    fas_summaries = await run_in_threadpool(orchestrator.run_summarize, fas_results, degraded)
+                    steps.append(step_result(
+                        "FAS Summarization", "summarize",
+                        {"summaries_count": len(fas_summaries), "usage": usage.stage_usage("summarize")}
+                    ))
+                else:
+                    fas_summaries = {}
+                    steps.append(StepResult(
+                        step_name="FAS Summarization",
+                        status="skipped",
+                        message="fas_summaries not requested"
+                    ))
+            except Exception as e:
+                steps.append(StepResult(
+                    step_name="FAS Summarization",
+                    status="error",
+                    message=str(e)
+                ))
+                raise HTTPException(status_code=500, detail=f"FAS summarization failed: {str(e)}")
+        
+            # Step 4: FAS Applicability Analysis
+            try:
+                applicability_list = await run_in_threadpool(
+                    orchestrator.run_applicability, input_data.transaction_text, fas_documents, degraded
+                )
+                steps.append(step_result(
+                    "FAS Applicability Analysis", "applicability",
+                    {"applicability_count": len(applicability_list), "usage": usage.stage_usage("applicability")}
+                ))
+            except Exception as e:
+                steps.append(StepResult(
+                    step_name="FAS Applicability Analysis",
+                    status="error",
+                    message=str(e)
+                ))
+                raise HTTPException(status_code=500, detail=f"FAS applicability analysis failed: {str(e)}")
         
-        # Step 4: FAS Applicability Analysis
-        try:
-            fas_excerpts = orchestrator._prepare_fas_excerpts(fas_results)
-            applicability_list = orchestrator.fas_applicability.analyze_applicability(
-                input_data.transaction_text,
-                fas_excerpts
-            )
             steps.append(StepResult(
-                step_name="FAS Applicability Analysis",
+                step_name="Token Usage",
                 status="success",
-                data={"applicability_count": len(applicability_list)}
-            ))
-        except Exception as e:
-            steps.append(StepResult(
-                step_name="FAS Applicability Analysis",
-                status="error",
-                message=str(e)
+                data=usage.to_dict()
             ))
-            raise HTTPException(status_code=500, detail=f"FAS applicability analysis failed: {str(e)}")
-        
-        # Convert FASApplicability objects to dictionaries
-        applicability_dicts = [
-            {
-                "fas_id": item.fas_id,
-                "fas_name": item.fas_name,
-                "probability": item.probability,
-                "reasoning": item.reasoning
-            }
-            for item in applicability_list
-        ]
+            
+            # Build only the selected fields, as plain data for orjson
+            content = {}
+            if "transaction_analysis" in selected:
+                content["transaction_analysis"] = TransactionAnalysis(**transaction_analysis).model_dump()
+            if "fas_documents" in selected:
+                content["fas_documents"] = _document_dicts(fas_results, view, snippet_chars)
+            if "fas_summaries" in selected:
+                content["fas_summaries"] = [
+                    {"fas_id": fas_id, "summary": summary} for fas_id, summary in fas_summaries.items()
+                ]
+            if "fas_applicability" in selected:
+                content["fas_applicability"] = _applicability_dicts(applicability_list)
+            if "steps" in selected:
+                content["steps"] = [step.model_dump() for step in steps]
+            if "processing_time" in selected:
+                content["processing_time"] = time.time() - start_time
+            if "partial" in selected:
+                content["partial"] = bool(degraded)
+            if "degraded_stages" in selected:
+                content["degraded_stages"] = degraded
+            if profile is None:
+                return FastJSONResponse(content)
+            content["profile"] = profile.stop()
+            return FastJSONResponse(content, headers={"X-Profile-Id": profile.profile_id})
         
-        # Prepare the response
-        return OrchestratorResponse(
-            transaction_analysis=TransactionAnalysis(**transaction_analysis),
-            fas_documents={
-                namespace: [
-                    FASDocument(
-                        fas_id=doc.fas_id,
-                        text=doc.text,
-                        relevance_score=doc.relevance_score,
-                        metadata=doc.metadata or {}
-                    ) for doc in docs
-                ] for namespace, docs in fas_results.items()
-            },
-            fas_summaries=[
-                FASSummary(
-                    fas_id=fas_id,
-                    summary=summary
-                ) for fas_id, summary in fas_summaries.items()
-            ],
-            fas_applicability=[FASApplicability(**item) for item in applicability_dicts],
-            steps=steps,
-            processing_time=time.time() - start_time
-        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}")
+
+@router.post("/analyze-transaction/stream")
+async def analyze_transaction_stream(
+    input_data: TransactionInput,
+    view: str = Query("snippets", description="full, snippets (shortened document texts) or verdicts (fas_applicability only)"),
+    include_documents: bool = Query(True, description="False leaves out the retrieved documents"),
+    snippet_chars: int = Query(settings.RESPONSE_SNIPPET_CHARS, ge=20, description="Document text length in the snippets view")
+) -> StreamingResponse:
+    """
+    Analyze a financial transaction and stream each stage's result as soon as it completes.
+    
+    The response is a server-sent event stream with one event per stage: deconstruct, retrieve,
+    summarize (omitted in the verdicts view), applicability and done, or an error event for the
+    stage that failed.
+    
+    Args:
+        input_data: Transaction text to analyze
+        view: Response view (full, snippets or verdicts)
+        include_documents: Whether the retrieve event carries the documents
+        snippet_chars: Maximum document text length in the snippets view
         
+    Returns:
+        text/event-stream response
+    """
+    selected = select_fields(view, include_documents=include_documents)
+    return StreamingResponse(
+        _stream_analysis(input_data, selected, view, snippet_chars),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _stream_analysis(input_data: TransactionInput, selected, view: str, snippet_chars: int):
+    """Run the stages in the threadpool (in the request's context) and yield an event after each."""
+    start_time = time.time()
+    degraded = {}
+    orchestrator = get_orchestrator()
+    deadline_s = input_data.deadline_s if input_data.deadline_s is not None else settings.REQUEST_DEADLINE_S
+    stage = "deconstruct"
+    
+    def status(name: str) -> Dict:
+        return {"status": "degraded", "message": degraded[name]} if name in degraded else {"status": "success"}
+    
+    try:
+        with track_usage() as usage, request_deadline(deadline_s or None):
+            transaction_analysis = await run_in_threadpool(
+                orchestrator.run_deconstruct, input_data.transaction_text, degraded
+            )
+            yield sse_event("deconstruct", {
+                "transaction_analysis": TransactionAnalysis(**transaction_analysis).model_dump(),
+                **status("deconstruct")
+            })
+            
+            stage = "retrieve"
+            search_query, fas_documents = await run_in_threadpool(
+                orchestrator.run_retrieve, transaction_analysis, input_data.transaction_text, degraded
+            )
+            fas_results = orchestrator._group_documents_by_type(fas_documents)
+            event = {"query": search_query, "results_count": len(fas_documents), **status("retrieve")}
+            if "fas_documents" in selected:
+                event["fas_documents"] = _document_dicts(fas_results, view, snippet_chars)
+            yield sse_event("retrieve", event)
+            
+            if "fas_summaries" in selected:
+                stage = "summarize"
+                fas_summaries = await run_in_threadpool(orchestrator.run_summarize, fas_results, degraded)
+                yield sse_event("summarize", {
+                    "fas_summaries": [{"fas_id": fas_id, "summary": summary} for fas_id, summary in fas_summaries.items()],
+                    **status("summarize")
+                })
+            
+            stage = "applicability"
+            applicability_list = await run_in_threadpool(
+                orchestrator.run_applicability, input_data.transaction_text, fas_documents, degraded
+            )
+            yield sse_event("applicability", {
+                "fas_applicability": _applicability_dicts(applicability_list),
+                **status("applicability")
+            })
+            
+            yield sse_event("done", {
+                "processing_time": time.time() - start_time,
+                "partial": bool(degraded),
+                "degraded_stages": degraded,
+                "usage": usage.to_dict()
+            })
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis failed: {str(e)}") 
\ No newline at end of file
+        yield sse_event("error", {"stage": stage, "message": str(e)})
@@ -10,14 +10,30 @@ project_root = str(Path(__file__).parent.parent.parent)
 if project_root not in sys.path:
     sys.path.append(project_root)
 
-from fastapi import FastAPI
+import threading
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from src.api.endpoints import router as api_router
+from fastapi.responses import JSONResponse, PlainTextResponse
+from src.api.endpoints import router as api_router, warm_up, warmup_status
+from src.api.responses import CompressionMiddleware
+from src.core.config import settings
+from src.core.metrics import HTTP_REQUEST_DURATION, HTTP_REQUESTS, registry
+from src.core.tracing import start_trace
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the agent warm-up in the background so the app can serve requests immediately."""
+    if settings.WARMUP_ON_STARTUP:
+        threading.Thread(target=warm_up, name="fas-warmup", daemon=True).start()
+    yield
 
 app = FastAPI(
     title="FAS Analysis API",
     description="API for analyzing financial transactions against AAOIFI FAS standards",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -29,9 +45,50 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (brotli or gzip, see api/responses.py)
+if settings.RESPONSE_COMPRESSION_MIN_BYTES > 0:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.RESPONSE_COMPRESSION_MIN_BYTES,
+        gzip_level=settings.RESPONSE_GZIP_LEVEL,
+        brotli_quality=settings.RESPONSE_BROTLI_QUALITY
+    )
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Give every request a trace and record HTTP metrics."""
+    start = time.perf_counter()
+    status = 500
+    with start_trace(f"{request.method} {request.url.path}") as trace:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+        finally:
+            # Label by route template so that arbitrary paths (e.g. 404s) cannot grow the label set
+            route = request.scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            HTTP_REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method, path=path)
+            HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+    response.headers["X-Trace-Id"] = trace.trace_id
+    return response
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus metrics for stages, provider calls and HTTP requests."""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def ready():
+    """Readiness probe: 200 once the agents are warmed up, 503 while warming or after a failure."""
+    state = warmup_status()
+    if not settings.WARMUP_ON_STARTUP and state["status"] == "pending":
+        # Without a startup warm-up the agents are created by the first request
+        state["status"] = "ready"
+    return JSONResponse(state, status_code=200 if state["status"] == "ready" else 503)
+
 @app.get("/")
 async def root():
     """Root endpoint returning API information."""
@@ -40,6 +97,9 @@ async def root():
         "version": "1.0.0",
         "description": "API for analyzing financial transactions against AAOIFI FAS standards",
         "endpoints": {
-            "/api/analyze-transaction": "POST - Analyze a financial transaction"
+            "/api/analyze-transaction": "POST - Analyze a financial transaction",
+            "/api/analyze-transaction/stream": "POST - Analyze a transaction, streaming each stage as a server-sent event",
+            "/ready": "GET - Readiness probe (agent warm-up state)",
+            "/metrics": "GET - Prometheus metrics"
         }
     } 
\ No newline at end of file
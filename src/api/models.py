@@ -12,6 +12,7 @@ class TransactionInput(BaseModel):
         description="The transaction text to analyze",
         example="Al Baraka Bank acquires 100% ownership of GreenTech's equity stake for $1,750,000."
     )
+    deadline_s: Optional[float] = Field(None, description="Time budget for the analysis in seconds (defaults to REQUEST_DEADLINE_S)")
 
 class TransactionAnalysis(BaseModel):
     """Model for transaction deconstruction results."""
@@ -42,7 +43,7 @@ class FASApplicability(BaseModel):
 class StepResult(BaseModel):
     """Model for individual step results."""
     step_name: str = Field(..., description="Name of the processing step")
-    status: str = Field(..., description="Status of the step (success/error)")
+    status: str = Field(..., description="Status of the step (success/degraded/error)")
     message: Optional[str] = Field(None, description="Additional message or error details")
     data: Optional[Dict] = Field(None, description="Step-specific data")
 
@@ -53,4 +54,6 @@ class OrchestratorResponse(BaseModel):
     fas_summaries: List[FASSummary] = Field(..., description="Summaries of FAS documents")
     fas_applicability: List[FASApplicability] = Field(..., description="FAS applicability analysis")
     steps: List[StepResult] = Field(..., description="Results of each processing step")
-    processing_time: float = Field(..., description="Total processing time in seconds") 
\ No newline at end of file
+    processing_time: float = Field(..., description="Total processing time in seconds")
+    partial: bool = Field(False, description="True when a stage was degraded to meet the deadline")
+    degraded_stages: Dict[str, str] = Field({}, description="Degraded stages and what was done instead") 
\ No newline at end of file
@@ -0,0 +1,214 @@
+"""
+Response shaping for the FAS analysis API.
+Purpose: Lets callers select the parts of an analysis they need (full, snippets or verdicts views,
+with or without documents, explicit field lists), serializes responses with orjson (whole, or as
+server-sent events for the streaming endpoint) and compresses them with brotli or gzip according
+to the client's Accept-Encoding.
+"""
+
+from typing import Dict, FrozenSet, List, Optional, Sequence
+
+import orjson
+from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipResponder, IdentityResponder
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Listed in requirements.txt; without it responses are gzip-compressed only
+    brotli = None
+
+RESPONSE_FIELDS = (
+    "transaction_analysis", "fas_documents", "fas_summaries", "fas_applicability",
+    "steps", "processing_time", "partial", "degraded_stages"
+)
+
+# view -> top-level fields it returns ("snippets" also shortens the document texts)
+VIEWS: Dict[str, FrozenSet[str]] = {
+    "full": frozenset(RESPONSE_FIELDS),
+    "snippets": frozenset(RESPONSE_FIELDS),
+    "verdicts": frozenset({"fas_applicability", "processing_time", "partial", "degraded_stages"})
+}
+
+# Bulky metadata left out of snippet documents (full text copies, summaries, duplicate references)
+SNIPPET_DROPPED_METADATA = ("text", "text_snippet", "chunk_summary", "duplicate_refs")
+
+
+def _field_list(value: Optional[str]) -> List[str]:
+    names = [name.strip() for name in (value or "").split(",") if name.strip()]
+    unknown = [name for name in names if name not in RESPONSE_FIELDS]
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown response fields {unknown}; available: {', '.join(RESPONSE_FIELDS)}"
+        )
+    return names
+
+
+def select_fields(
+    view: str = "full",
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None,
+    include_documents: bool = True
+) -> FrozenSet[str]:
+    """
+    Resolve the query parameters of a request into the top-level fields to return.
+
+    Args:
+        view: "full", "snippets" or "verdicts"
+        fields: Comma-separated fields to return instead of the view's fields
+        exclude: Comma-separated fields to leave out
+        include_documents: False leaves out fas_documents
+
+    Returns:
+        Set of response field names
+
+    Raises:
+        HTTPException: 400 for an unknown view or field
+    """
+    if view not in VIEWS:
+        raise HTTPException(status_code=400, detail=f"Unknown view {view!r}; available: {', '.join(VIEWS)}")
+    selected = set(_field_list(fields) or VIEWS[view])
+    selected.difference_update(_field_list(exclude))
+    if not include_documents:
+        selected.discard("fas_documents")
+    return frozenset(selected)
+
+
+def snippet_document(document: Dict, snippet_chars: int) -> Dict:
+    """
+    Shorten a document dictionary to a text snippet and its light metadata.
+
+    Args:
+        document: Dictionary with fas_id, text, relevance_score and metadata
+        snippet_chars: Maximum snippet length (cut at a word boundary)
+
+    Returns:
+        New document dictionary
+    """
+    text = document.get("text") or ""
+    if len(text) > snippet_chars:
+        cut = text[:snippet_chars]
+        text = (cut.rsplit(" ", 1)[0] if " " in cut else cut).rstrip() + "..."
+    metadata = {key: value for key, value in (document.get("metadata") or {}).items() if key not in SNIPPET_DROPPED_METADATA}
+    return dict(document, text=text, metadata=metadata)
+
+
+def dumps(content) -> bytes:
+    """Serialize to JSON with orjson, accepting numpy scalars and arrays and non-string dictionary keys."""
+    return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+
+
+def sse_event(event: str, data: Dict) -> bytes:
+    """Encode one server-sent event (orjson output has no newlines, so data fits on one line)."""
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+class FastJSONResponse(ORJSONResponse):
+    """orjson response that also accepts numpy values and non-string dictionary keys."""
+
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+def accepted_encodings(header: str) -> Dict[str, float]:
+    """
+    Parse an Accept-Encoding header into the quality value of each content coding.
+
+    Args:
+        header: Accept-Encoding header value, e.g. "br;q=1.0, gzip;q=0.8, *;q=0"
+
+    Returns:
+        Dictionary of lower-case coding ("x-gzip" as "gzip") -> q between 0 and 1 (1 when omitted,
+        0 when malformed)
+    """
+    codings = {}
+    for item in header.split(","):
+        coding, *params = [part.strip() for part in item.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        coding = coding.lower()
+        codings["gzip" if coding == "x-gzip" else coding] = q
+    return codings
+
+
+def choose_encoding(header: str, available: Sequence[str]) -> Optional[str]:
+    """
+    Pick the response coding the client prefers among those the server can produce.
+
+    A coding the header does not name gets the q of "*", if any; q=0 means not acceptable. Ties go
+    to the earlier coding in available. The response stays uncompressed when nothing is acceptable
+    or the client explicitly prefers identity.
+
+    Args:
+        header: Accept-Encoding header value
+        available: Codings the server supports, most preferred first
+
+    Returns:
+        The chosen coding, or None for an uncompressed response
+    """
+    codings = accepted_encodings(header)
+    default = codings.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = codings.get(coding, default)
+        if q > best_q:
+            best, best_q = coding, q
+    if best is not None and codings.get("identity", 0.0) > best_q:
+        return None
+    return best
+
+
+class BrotliResponder(IdentityResponder):
+    """Starlette responder compressing the body with brotli (streamed bodies included)."""
+
+    content_encoding = "br"
+
+    def __init__(self, app: ASGIApp, minimum_size: int, quality: int = 5) -> None:
+        super().__init__(app, minimum_size)
+        self.compressor = brotli.Compressor(quality=quality)
+
+    def apply_compression(self, body: bytes, *, more_body: bool) -> bytes:
+        compressed = self.compressor.process(body)
+        return compressed + (self.compressor.flush() if more_body else self.compressor.finish())
+
+
+class CompressionMiddleware:
+    """
+    Compress responses of at least minimum_size bytes.
+
+    The coding is negotiated from the client's Accept-Encoding by quality value (choose_encoding):
+    brotli when the brotli package is installed, or gzip. Event streams and responses that already have a Content-Encoding
+    are passed through unchanged.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1000, gzip_level: int = 6, brotli_quality: int = 5) -> None:
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        available = ("br", "gzip") if brotli is not None else ("gzip",)
+        encoding = choose_encoding(Headers(scope=scope).get("Accept-Encoding", ""), available)
+        if encoding == "br":
+            responder = BrotliResponder(self.app, self.minimum_size, self.brotli_quality)
+        elif encoding == "gzip":
+            responder = GZipResponder(self.app, self.minimum_size, compresslevel=self.gzip_level)
+        else:
+            responder = IdentityResponder(self.app, self.minimum_size)
+        await responder(scope, receive, send)
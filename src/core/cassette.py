@@ -0,0 +1,217 @@
+"""
+Provider call cassettes for the FAS analysis system.
+Purpose: Records every OpenAI, Gemini and Pinecone request/response pair made by the agents, with
+its latency, into a local JSON-lines file, and replays them offline for performance regression runs.
+
+Modes (settings.CASSETTE_MODE):
+- "off": calls go straight to the provider
+- "record": calls go to the provider and are appended to settings.CASSETTE_PATH
+- "replay": responses are served from the cassette, with the recorded latency or none
+  (settings.CASSETTE_REPLAY_LATENCY = "recorded" | "none")
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from .config import settings
+
+
+class CassetteMissError(LookupError):
+    """Raised in replay mode when a call has no recorded response."""
+
+
+def request_key(provider: str, operation: str, model: Optional[str], kwargs: Dict) -> str:
+    """
+    Compute the key used to match a call against recorded interactions.
+
+    Args:
+        provider: Provider name
+        operation: Operation name
+        model: Model or index name
+        kwargs: Call arguments
+
+    Returns:
+        Hex digest identifying the request
+    """
+    canonical = json.dumps(
+        {"provider": provider, "operation": operation, "model": model, "kwargs": kwargs},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _summarize_request(kwargs: Dict) -> Dict:
+    """Replace long numeric lists (vectors) so the cassette stays readable."""
+    summary = {}
+    for key, value in kwargs.items():
+        if isinstance(value, list) and len(value) > 16 and all(isinstance(v, (int, float)) for v in value[:16]):
+            summary[key] = f"<vector dim={len(value)}>"
+        else:
+            summary[key] = value
+    return summary
+
+
+def serialize_response(provider: str, response: Any) -> Any:
+    """
+    Convert an SDK response into JSON-compatible data.
+
+    Args:
+        provider: Provider that produced the response
+        response: OpenAI, Gemini or Pinecone response object
+
+    Returns:
+        Plain dictionaries and lists
+    """
+    if provider == "gemini" and not isinstance(response, dict):
+        usage = getattr(response, "usage_metadata", None)
+        return {
+            "text": response.text,
+            "usage_metadata": {
+                "prompt_token_count": getattr(usage, "prompt_token_count", 0),
+                "candidates_token_count": getattr(usage, "candidates_token_count", 0),
+                "total_token_count": getattr(usage, "total_token_count", 0)
+            }
+        }
+    if hasattr(response, "model_dump"):
+        return response.model_dump()
+    if hasattr(response, "to_dict"):
+        return response.to_dict()
+    if isinstance(response, (dict, list, str, int, float, bool)) or response is None:
+        return response
+    return {"value": str(response)}
+
+
+class Cassette:
+    """A JSON-lines file of recorded provider interactions."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict]] = {}
+        self._replay_positions: Dict[str, int] = {}
+        if self.path.is_file():
+            self._load()
+
+    def _load(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    interaction = json.loads(line)
+                    self._interactions.setdefault(interaction["key"], []).append(interaction)
+
+    def __len__(self) -> int:
+        return sum(len(items) for items in self._interactions.values())
+
+    def record(self, call, response: Any, duration_ms: float) -> None:
+        """
+        Append one interaction to the cassette file.
+
+        Args:
+            call: The ProviderCall that was made
+            response: The provider response
+            duration_ms: Wall-clock latency of the call
+        """
+        interaction = {
+            "key": request_key(call.provider, call.operation, call.model, call.kwargs),
+            "provider": call.provider,
+            "operation": call.operation,
+            "model": call.model,
+            "request": _summarize_request(call.kwargs),
+            "response": serialize_response(call.provider, response),
+            "duration_ms": round(duration_ms, 3),
+            "recorded_at": time.time()
+        }
+        line = json.dumps(interaction, default=str)
+        with self._lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+            self._interactions.setdefault(interaction["key"], []).append(interaction)
+
+    def lookup(self, call) -> Dict:
+        """
+        Find the recorded interaction for a call.
+
+        Repeated identical calls are served in recording order; once exhausted the
+        last recording is reused.
+
+        Args:
+            call: The ProviderCall being replayed
+
+        Returns:
+            The recorded interaction
+
+        Raises:
+            CassetteMissError: If the call was never recorded
+        """
+        key = request_key(call.provider, call.operation, call.model, call.kwargs)
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMissError(f"No recorded {call.provider} {call.operation} call ({call.model}) in {self.path}")
+            position = self._replay_positions.get(key, 0)
+            self._replay_positions[key] = position + 1
+            return recorded[min(position, len(recorded) - 1)]
+
+
+_cassettes: Dict[str, Cassette] = {}
+_cassettes_lock = threading.Lock()
+
+
+def get_cassette(path: str = None) -> Cassette:
+    """Return the shared Cassette for a path (defaults to settings.CASSETTE_PATH)."""
+    path = os.path.abspath(path or settings.CASSETTE_PATH)
+    with _cassettes_lock:
+        if path not in _cassettes:
+            _cassettes[path] = Cassette(path)
+        return _cassettes[path]
+
+
+def cassette_middleware(call, proceed: Callable[[], Any]) -> Any:
+    """Provider middleware implementing the record and replay modes."""
+    mode = settings.CASSETTE_MODE.lower()
+    if mode == "replay":
+        from .providers import ProviderResponse
+        interaction = get_cassette().lookup(call)
+        if settings.CASSETTE_REPLAY_LATENCY.lower() == "recorded":
+            time.sleep(interaction["duration_ms"] / 1000.0)
+        return ProviderResponse.wrap(interaction["response"])
+
+    if mode == "record":
+        start = time.perf_counter()
+        response = proceed()
+        get_cassette().record(call, response, (time.perf_counter() - start) * 1000.0)
+        return response
+
+    return proceed()
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = "replay", replay_latency: str = None):
+    """
+    Temporarily record to or replay from a cassette.
+
+    Agents must be constructed inside the block in replay mode, so that they
+    are given the stand-in clients instead of live SDK clients.
+
+    Args:
+        path: Cassette file
+        mode: "record" or "replay"
+        replay_latency: "recorded" or "none" (defaults to the configured value)
+    """
+    previous = (settings.CASSETTE_MODE, settings.CASSETTE_PATH, settings.CASSETTE_REPLAY_LATENCY)
+    settings.CASSETTE_MODE = mode
+    settings.CASSETTE_PATH = path
+    if replay_latency:
+        settings.CASSETTE_REPLAY_LATENCY = replay_latency
+    try:
+        yield get_cassette(path)
+    finally:
+        settings.CASSETTE_MODE, settings.CASSETTE_PATH, settings.CASSETTE_REPLAY_LATENCY = previous
@@ -0,0 +1,216 @@
+"""
+Standard centroids for the FAS analysis system.
+Purpose: Precomputes one mean embedding per standard (document_type) from the indexed chunks and
+scores query embeddings against them, so retrieval can be routed to the most likely standards
+and the applicability agent gets a cheap prior for each standard.
+
+Build the centroid file after (re)ingesting the index:
+    python -m src.core.centroids --output data/fas_centroids.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+def _get(obj: Any, name: str, default: Any = None) -> Any:
+    """Read a field from an SDK object or a dictionary."""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def fetch_vectors(index, ids: List[str], namespace: str = "default") -> Dict[str, Tuple[List[float], Dict]]:
+    """
+    Fetch stored vectors by ID.
+
+    Args:
+        index: Vector index exposing fetch
+        ids: Vector IDs
+        namespace: Namespace to read
+
+    Returns:
+        Dictionary mapping IDs to (values, metadata); missing IDs are left out
+    """
+    fetched = _get(index.fetch(ids=ids, namespace=namespace), "vectors", {}) or {}
+    return {
+        vector_id: (_get(record, "values"), _get(record, "metadata", {}) or {})
+        for vector_id, record in fetched.items()
+    }
+
+
+def iter_index_vectors(index, namespace: str = "default", batch_size: int = 100) -> Iterator[Tuple[str, List[float], Dict]]:
+    """
+    Page through every vector of an index namespace.
+
+    Args:
+        index: Vector index exposing list_paginated and fetch
+        namespace: Namespace to read
+        batch_size: Vectors listed and fetched per request
+
+    Yields:
+        (id, values, metadata) of each vector
+    """
+    token = None
+    while True:
+        page = index.list_paginated(namespace=namespace, limit=batch_size, pagination_token=token)
+        ids = [_get(vector, "id") for vector in _get(page, "vectors", []) or []]
+        if ids:
+            for vector_id, (values, metadata) in fetch_vectors(index, ids, namespace).items():
+                yield vector_id, values, metadata
+
+        token = _get(_get(page, "pagination"), "next")
+        if not token:
+            break
+
+
+def compute_centroids(index, namespace: str = "default", batch_size: int = 100) -> Dict[str, List[float]]:
+    """
+    Average the vectors of each document type in an index namespace.
+
+    Args:
+        index: Vector index exposing list_paginated and fetch
+        namespace: Namespace to read
+        batch_size: Vectors listed and fetched per request
+
+    Returns:
+        Dictionary mapping document types to unit-length centroid vectors
+    """
+    sums: Dict[str, np.ndarray] = {}
+    for _, values, metadata in iter_index_vectors(index, namespace, batch_size):
+        document_type = metadata.get("document_type")
+        if not document_type or not values:
+            continue
+        vector = np.asarray(values, dtype=np.float32)
+        sums[document_type] = sums[document_type] + vector if document_type in sums else vector
+
+    centroids = {}
+    for document_type, total in sorted(sums.items()):
+        norm = np.linalg.norm(total) or 1.0
+        centroids[document_type] = (total / norm).tolist()
+    return centroids
+
+
+def build_centroids(index, namespaces: List[str], batch_size: int = 100) -> Dict[str, List[float]]:
+    """
+    Compute the centroids of every document type found in the given namespaces.
+
+    Args:
+        index: Vector index exposing list_paginated and fetch
+        namespaces: Namespaces to read (the shards of the manifest, or "default")
+        batch_size: Vectors listed and fetched per request
+
+    Returns:
+        Dictionary mapping document types to unit-length centroid vectors
+    """
+    centroids = {}
+    for namespace in namespaces:
+        centroids.update(compute_centroids(index, namespace=namespace, batch_size=batch_size))
+    return centroids
+
+
+class StandardCentroids:
+    """Cosine classifier over per-standard centroid vectors."""
+
+    def __init__(self, centroids: Dict[str, List[float]]):
+        self.document_types = list(centroids)
+        matrix = np.asarray([centroids[name] for name in self.document_types], dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True) if len(matrix) else 1.0
+        self._matrix = matrix / np.where(norms == 0, 1.0, norms)
+
+    @classmethod
+    def load(cls, path: str) -> "StandardCentroids":
+        """Load centroids written by save()."""
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f)["centroids"])
+
+    def save(self, path: str) -> None:
+        """Write the centroids as JSON."""
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"centroids": dict(zip(self.document_types, self._matrix.tolist()))}, f)
+
+    def __len__(self) -> int:
+        return len(self.document_types)
+
+    def scores(self, query_vector: List[float]) -> Dict[str, float]:
+        """
+        Cosine similarity of a query embedding to every centroid.
+
+        Args:
+            query_vector: Query embedding
+
+        Returns:
+            Dictionary mapping document types to similarity scores
+        """
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+        return dict(zip(self.document_types, (self._matrix @ query).tolist()))
+
+    def priors(self, query_vector: List[float], temperature: float) -> Dict[str, float]:
+        """
+        Softmax of the centroid similarities, usable as a prior probability per standard.
+
+        Args:
+            query_vector: Query embedding
+            temperature: Softmax temperature; lower values sharpen the distribution
+
+        Returns:
+            Dictionary mapping document types to probabilities summing to 1
+        """
+        scores = self.scores(query_vector)
+        values = np.asarray(list(scores.values()), dtype=np.float64) / max(temperature, 1e-6)
+        weights = np.exp(values - values.max())
+        weights /= weights.sum()
+        return dict(zip(scores, weights.tolist()))
+
+    def classify(self, query_vector: List[float], top_k: int) -> List[Tuple[str, float]]:
+        """
+        Return the top_k document types closest to a query embedding.
+
+        Args:
+            query_vector: Query embedding
+            top_k: Number of standards to return
+
+        Returns:
+            List of (document_type, score) pairs, best first
+        """
+        scores = self.scores(query_vector)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Build the centroid file from the configured FAS index."""
+    project_root = str(Path(__file__).parent.parent.parent)
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from src.core.config import settings
+    from src.core.providers import create_vector_index
+    from src.core.shards import get_shard_manifest
+
+    parser = argparse.ArgumentParser(description="Build per-standard centroid vectors from the FAS index")
+    parser.add_argument("--index", default=settings.PINECONE_INDEX_FAS)
+    parser.add_argument("--namespace", default=None, help="Namespace to read (default: every shard in the manifest, or \"default\")")
+    parser.add_argument("--output", default=settings.CENTROIDS_PATH)
+    args = parser.parse_args(argv)
+
+    manifest = get_shard_manifest(settings.SHARD_MANIFEST_PATH)
+    namespaces = [args.namespace] if args.namespace else (manifest.namespaces if manifest else ["default"])
+    centroids = build_centroids(create_vector_index(args.index), namespaces)
+    if not centroids:
+        print(f"No vectors with a document_type found in {args.index}/{', '.join(namespaces)}")
+        return 1
+    StandardCentroids(centroids).save(args.output)
+    print(f"Wrote {len(centroids)} centroids to {os.path.abspath(args.output)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Local chunk text store for the FAS analysis system.
+Purpose: Keeps the full text of every ingested chunk in a SQLite file keyed by chunk ID, so that
+vector metadata stays small and the retriever can hydrate the complete excerpts of its top-k
+results with a single local read.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# SQLite limits the number of bound parameters per statement
+_MAX_IDS_PER_QUERY = 500
+
+
+class ChunkStore:
+    """SQLite table of chunk texts (and their ingestion metadata) keyed by chunk ID."""
+
+    def __init__(self, path: str):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, text TEXT NOT NULL, metadata TEXT NOT NULL DEFAULT '{}')"
+            )
+
+    def put_many(self, chunks: Iterable[Tuple[str, str, Optional[Dict]]]) -> int:
+        """
+        Insert or replace chunks.
+
+        Args:
+            chunks: (chunk_id, text, metadata) tuples
+
+        Returns:
+            Number of chunks written
+        """
+        rows = [(chunk_id, text, json.dumps(metadata or {})) for chunk_id, text, metadata in chunks]
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO chunks (id, text, metadata) VALUES (?, ?, ?)", rows)
+        return len(rows)
+
+    def get_texts(self, ids: List[str]) -> Dict[str, str]:
+        """
+        Read the texts of several chunks at once.
+
+        Args:
+            ids: Chunk IDs
+
+        Returns:
+            Dictionary mapping the IDs found to their text
+        """
+        texts = {}
+        unique = list(dict.fromkeys(ids))
+        with self._lock:
+            for start in range(0, len(unique), _MAX_IDS_PER_QUERY):
+                batch = unique[start:start + _MAX_IDS_PER_QUERY]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._connection.execute(f"SELECT id, text FROM chunks WHERE id IN ({placeholders})", batch)
+                texts.update(rows.fetchall())
+        return texts
+
+    def delete(self, ids: List[str]) -> None:
+        """Remove chunks, e.g. when their vectors are deleted."""
+        with self._lock, self._connection:
+            self._connection.executemany("DELETE FROM chunks WHERE id = ?", [(chunk_id,) for chunk_id in ids])
+
+    def delete_namespace(self, namespace: str) -> int:
+        """Remove the chunks written for one namespace, e.g. before its standard is re-indexed."""
+        with self._lock, self._connection:
+            cursor = self._connection.execute("DELETE FROM chunks WHERE json_extract(metadata, '$.namespace') = ?", (namespace,))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM chunks").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+_stores: Dict[str, ChunkStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_chunk_store(path: str) -> Optional[ChunkStore]:
+    """
+    Return the shared store for a path, or None if no store has been written there.
+
+    Args:
+        path: SQLite file written at ingestion time
+
+    Returns:
+        ChunkStore, or None when the path is empty or the file does not exist
+    """
+    if not path or not os.path.exists(path):
+        return None
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = ChunkStore(path)
+            _stores[path] = store
+        return store
@@ -34,6 +34,155 @@ class Settings(BaseSettings):
     # LLM Settings
     MODEL_NAME: str = "gemini-2.0-flash"
     TEMPERATURE: float = 0.7
+
+    # Provider Settings
+    # "live" talks to OpenAI, Gemini and Pinecone; "offline" uses the deterministic stand-ins in core/offline.py
+    PROVIDER_MODE: str = os.getenv("PROVIDER_MODE", "live")
+    OFFLINE_LLM_LATENCY_MS: float = float(os.getenv("OFFLINE_LLM_LATENCY_MS", "0"))
+    OFFLINE_EMBEDDING_LATENCY_MS: float = float(os.getenv("OFFLINE_EMBEDDING_LATENCY_MS", "0"))
+    OFFLINE_VECTOR_LATENCY_MS: float = float(os.getenv("OFFLINE_VECTOR_LATENCY_MS", "0"))
+    OFFLINE_JITTER_MS: float = float(os.getenv("OFFLINE_JITTER_MS", "0"))
+    OFFLINE_LATENCY_DISTRIBUTION: str = os.getenv("OFFLINE_LATENCY_DISTRIBUTION", "uniform")  # uniform | normal | lognormal | exponential
+    OFFLINE_LATENCY_SIGMA: float = float(os.getenv("OFFLINE_LATENCY_SIGMA", "0.5"))  # Shape of the lognormal distribution
+    OFFLINE_SEED: int = int(os.getenv("OFFLINE_SEED", "42"))
+    OFFLINE_CORPUS_PATH: str = os.getenv("OFFLINE_CORPUS_PATH", "")
+    OFFLINE_SS_CORPUS_PATH: str = os.getenv("OFFLINE_SS_CORPUS_PATH", "")  # Corpus of the PINECONE_INDEX_SS stand-in (built-in SS excerpts otherwise)
+    OFFLINE_SNAPSHOT_PATH: str = os.getenv("OFFLINE_SNAPSHOT_PATH", "")  # Snapshot loaded into in-memory indexes of its dimension (see core/snapshot.py)
+
+    # Cassette Settings (record/replay of provider calls, see core/cassette.py)
+    CASSETTE_MODE: str = os.getenv("CASSETTE_MODE", "off")  # off | record | replay
+    CASSETTE_PATH: str = os.getenv("CASSETTE_PATH", "cassettes/provider_calls.jsonl")
+    CASSETTE_REPLAY_LATENCY: str = os.getenv("CASSETTE_REPLAY_LATENCY", "recorded")  # recorded | none
+
+    # Rate Limit Settings (see core/ratelimit.py)
+    RATE_LIMIT_MODE: str = os.getenv("RATE_LIMIT_MODE", "auto")  # "auto", "on" or "off"
+    # JSON overriding the default limits, e.g. {"openai:gpt-4.1-mini": {"rpm": 5000, "tpm": 2000000}}
+    RATE_LIMITS: str = os.getenv("RATE_LIMITS", "")
+    RATE_LIMIT_BATCH_RESERVE: float = float(os.getenv("RATE_LIMIT_BATCH_RESERVE", "0.2"))  # Capacity kept for interactive calls
+    RATE_LIMIT_MAX_WAIT_S: float = float(os.getenv("RATE_LIMIT_MAX_WAIT_S", "30"))
+
+    # Retry, Hedging and Deadline Settings (see core/resilience.py)
+    RETRY_MAX_ATTEMPTS: int = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY_S: float = float(os.getenv("RETRY_BASE_DELAY_S", "0.5"))
+    RETRY_MAX_DELAY_S: float = float(os.getenv("RETRY_MAX_DELAY_S", "8"))
+    PROVIDER_CALL_DEADLINE_S: float = float(os.getenv("PROVIDER_CALL_DEADLINE_S", "60"))  # 0 disables
+    # Abandoned calls still running (the SDK timeout normally ends them) above which new calls fail fast; 0 disables
+    PROVIDER_MAX_ABANDONED_CALLS: int = int(os.getenv("PROVIDER_MAX_ABANDONED_CALLS", "32"))
+    HEDGING_ENABLED: bool = os.getenv("HEDGING_ENABLED", "False").lower() == "true"
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))  # Latencies observed before hedging starts
+    HEDGE_LLM_CALLS: bool = os.getenv("HEDGE_LLM_CALLS", "False").lower() == "true"  # Also hedge LLM generations (doubles their cost when hedged)
+
+    # Request Deadline Settings
+    # Budget for a whole analysis (0 disables; the API accepts a per-request deadline_s). When the
+    # time left before a stage is below its minimum, the orchestrator degrades that stage instead
+    # of running it in full: retrieval fetches fewer chunks, summarization assembles the stored
+    # chunk summaries (or is skipped) and applicability uses the local scorer.
+    REQUEST_DEADLINE_S: float = float(os.getenv("REQUEST_DEADLINE_S", "0"))
+    DEADLINE_RETRIEVE_MIN_S: float = float(os.getenv("DEADLINE_RETRIEVE_MIN_S", "4"))
+    DEADLINE_REDUCED_TOP_N: int = int(os.getenv("DEADLINE_REDUCED_TOP_N", "3"))
+    DEADLINE_SUMMARIZE_MIN_S: float = float(os.getenv("DEADLINE_SUMMARIZE_MIN_S", "6"))
+    DEADLINE_APPLICABILITY_MIN_S: float = float(os.getenv("DEADLINE_APPLICABILITY_MIN_S", "3"))
+
+    # Tracing Settings (see core/tracing.py; metrics are served at /metrics)
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "True").lower() == "true"
+    TRACE_BUFFER_SIZE: int = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+    TRACE_EXPORT_PATH: str = os.getenv("TRACE_EXPORT_PATH", "")  # JSON-lines file of completed traces
+
+    # Profiling Settings (see core/profiling.py)
+    # A request presenting PROFILE_TOKEN (X-Profile-Token header or profile_token query parameter) is
+    # profiled by a stack sampler; empty disables profiling. Profiles are returned in the response and,
+    # when PROFILE_DIR is set, also written there as collapsed stacks and a JSON summary.
+    PROFILE_TOKEN: str = os.getenv("PROFILE_TOKEN", "")
+    PROFILE_INTERVAL_MS: float = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "")  # e.g. data/profiles; empty keeps profiles in the response only
+
+    # Startup Settings
+    # Agents are created on first use; with warm-up enabled the API creates them in a background
+    # thread at startup and reports progress at /ready.
+    WARMUP_ON_STARTUP: bool = os.getenv("WARMUP_ON_STARTUP", "True").lower() == "true"
+
+    # Workflow Settings (see core/workflow.py)
+    # The LangGraph workflow saves each node's output here (SQLite, needs langgraph-checkpoint-sqlite;
+    # empty keeps checkpoints in memory) so a failed or timed-out run resumes from its last node.
+    WORKFLOW_CHECKPOINT_PATH: str = os.getenv("WORKFLOW_CHECKPOINT_PATH", "data/workflow_checkpoints.sqlite")
+
+    # API Response Settings (see api/responses.py)
+    # Responses of at least RESPONSE_COMPRESSION_MIN_BYTES are compressed with brotli (when the
+    # client accepts it and the brotli package is installed) or gzip; 0 disables compression.
+    RESPONSE_COMPRESSION_MIN_BYTES: int = int(os.getenv("RESPONSE_COMPRESSION_MIN_BYTES", "1000"))
+    RESPONSE_GZIP_LEVEL: int = int(os.getenv("RESPONSE_GZIP_LEVEL", "6"))
+    RESPONSE_BROTLI_QUALITY: int = int(os.getenv("RESPONSE_BROTLI_QUALITY", "5"))
+    RESPONSE_SNIPPET_CHARS: int = int(os.getenv("RESPONSE_SNIPPET_CHARS", "300"))  # Text length of documents in the snippets view
+
+    # UI Settings (see ui/app.py)
+    # The Streamlit UI streams analyses from the API and memoizes them by transaction text, so
+    # reruns and repeated transactions are answered without calling the API again.
+    UI_API_URL: str = os.getenv("UI_API_URL", "http://localhost:8000")
+    UI_REQUEST_TIMEOUT_S: float = float(os.getenv("UI_REQUEST_TIMEOUT_S", "120"))
+    UI_RESULT_CACHE_SIZE: int = int(os.getenv("UI_RESULT_CACHE_SIZE", "256"))
+
+    # Retrieval Routing Settings (see core/centroids.py)
+    # "centroid" scores the query against per-standard centroid vectors and runs filtered queries
+    # for the closest standards only; "off" searches the whole index. The centroids are read from
+    # CENTROIDS_PATH, built with `python -m src.core.centroids`; without that file every standard is searched.
+    RETRIEVAL_ROUTING: str = os.getenv("RETRIEVAL_ROUTING", "off")
+    CENTROIDS_PATH: str = os.getenv("CENTROIDS_PATH", "data/fas_centroids.json")
+    ROUTING_TOP_STANDARDS: int = int(os.getenv("ROUTING_TOP_STANDARDS", "2"))
+    ROUTING_PRIOR_TEMPERATURE: float = float(os.getenv("ROUTING_PRIOR_TEMPERATURE", "0.05"))
+
+    # Shard Settings (see core/shards.py)
+    # Ingestion writes each standard to its own namespace and lists them in this manifest. When it
+    # exists, the retriever queries the shards of the requested or routed standards in parallel, or
+    # every shard when the standards are unknown; without it, the "default" namespace is searched.
+    SHARD_MANIFEST_PATH: str = os.getenv("SHARD_MANIFEST_PATH", "data/shard_manifest.json")
+
+    # Federated Retrieval Settings (see core/federation.py)
+    # Indexes searched together for each unfiltered query: "fas" alone, or "fas,ss" to add the
+    # Shariah Standards index (PINECONE_INDEX_SS). They are queried in parallel with one embedding
+    # and merged by per-index calibrated score; Shariah chunks reach applicability as context.
+    # The FAS index keeps its top_n results and each other index adds at most FEDERATED_SOURCE_TOP_N.
+    RETRIEVAL_SOURCES: str = os.getenv("RETRIEVAL_SOURCES", "fas")
+    FEDERATED_SOURCE_TOP_N: int = int(os.getenv("FEDERATED_SOURCE_TOP_N", "2"))
+    SS_SHARD_MANIFEST_PATH: str = os.getenv("SS_SHARD_MANIFEST_PATH", "")
+
+    # Retrieval Rerank Settings (see core/rerank.py)
+    # "mmr" over-fetches top_n * MMR_FETCH_MULTIPLIER chunks with their vectors and keeps a diverse
+    # top_n by maximal marginal relevance, dropping overlapping neighbours; "off" keeps the raw ranking.
+    RETRIEVAL_RERANK: str = os.getenv("RETRIEVAL_RERANK", "off")
+    MMR_FETCH_MULTIPLIER: int = int(os.getenv("MMR_FETCH_MULTIPLIER", "4"))
+    MMR_LAMBDA: float = float(os.getenv("MMR_LAMBDA", "0.7"))  # 1.0 ranks by relevance only
+
+    # Multi-Resolution Retrieval Settings (see core/multires.py)
+    # With MULTIRES_DIMENSION set to 256 or 512, queries first search a companion index of truncated,
+    # renormalised vectors for top_n * MULTIRES_CANDIDATE_MULTIPLIER candidates, then rescore those
+    # exactly on the full vectors; 0 searches the full index only.
+    MULTIRES_DIMENSION: int = int(os.getenv("MULTIRES_DIMENSION", "0"))
+    MULTIRES_CANDIDATE_MULTIPLIER: int = int(os.getenv("MULTIRES_CANDIDATE_MULTIPLIER", "8"))
+    PINECONE_INDEX_FAS_COARSE: str = os.getenv("PINECONE_INDEX_FAS_COARSE", "")  # Defaults to "<PINECONE_INDEX_FAS>-<dimension>d"
+
+    # Chunk Store Settings (see core/chunk_store.py)
+    # Ingestion writes the full text of every chunk to this SQLite file, keyed by vector ID, and keeps
+    # only a snippet in the vector metadata; the retriever reads the texts of its top-k results here.
+    CHUNK_STORE_PATH: str = os.getenv("CHUNK_STORE_PATH", "data/chunks.sqlite")
+
+    # Applicability Settings
+    # "single" sends every transaction to gpt-4.1-mini; "cascade" tries the tiers in
+    # APPLICABILITY_CASCADE in order ("local" is a lexical/prior scorer, anything else an OpenAI
+    # model) and escalates only when the top standard is below the confidence or margin threshold.
+    APPLICABILITY_MODE: str = os.getenv("APPLICABILITY_MODE", "single")
+    APPLICABILITY_CASCADE: str = os.getenv("APPLICABILITY_CASCADE", "local,gpt-4.1-nano,gpt-4.1-mini")
+    CASCADE_MIN_CONFIDENCE: float = float(os.getenv("CASCADE_MIN_CONFIDENCE", "0.75"))
+    CASCADE_MIN_MARGIN: float = float(os.getenv("CASCADE_MIN_MARGIN", "0.25"))
+    CASCADE_PRIOR_WEIGHT: float = float(os.getenv("CASCADE_PRIOR_WEIGHT", "0.5"))
+    # Distinctive shared terms at which the local tier's evidence factor reaches 1 - 1/e (see _local_applicability)
+    CASCADE_LOCAL_EVIDENCE_TERMS: float = float(os.getenv("CASCADE_LOCAL_EVIDENCE_TERMS", "4"))
+    CASCADE_SMALL_MAX_TOKENS: int = int(os.getenv("CASCADE_SMALL_MAX_TOKENS", "1000"))
+
+    # Summarization Settings
+    # "full" always summarizes the retrieved text, "condense" makes a short call over the
+    # chunk summaries stored at ingestion time, "assemble" joins them without any LLM call.
+    SUMMARIZER_MODE: str = os.getenv("SUMMARIZER_MODE", "condense")
+    SUMMARIZER_CONDENSE_MAX_TOKENS: int = int(os.getenv("SUMMARIZER_CONDENSE_MAX_TOKENS", "300"))
     
     # Additional Settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
@@ -0,0 +1,197 @@
+"""
+Near-duplicate chunk elimination for the FAS analysis system.
+Purpose: The standards share boilerplate (preface, definitions, appendices) and fixed-window
+chunking repeats it in many near-identical chunks. At ingestion, each chunk gets a MinHash
+signature of its word shingles; locality-sensitive hashing over signature bands finds earlier
+chunks that are likely near-duplicates, and a chunk whose estimated Jaccard similarity to one of
+them reaches the threshold is dropped. The kept representative records back-references to the
+chunks it replaces, and the report gives the index and embedding savings.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+_PRIME = (1 << 31) - 1  # Mersenne prime; a * h stays below 2**63 for 32-bit shingle hashes
+
+# Back-references kept in a representative's metadata (vector metadata size is limited)
+MAX_DUPLICATE_REFS = 50
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Return the overlapping word n-grams of a text (the whole text if it is shorter)."""
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) <= size:
+        return [" ".join(words)] if words else []
+    return [" ".join(words[i:i + size]) for i in range(len(words) - size + 1)]
+
+
+def lsh_bands(num_perm: int, threshold: float) -> Tuple[int, int]:
+    """
+    Choose (bands, rows per band) for a signature length.
+
+    Two signatures share a bucket with probability 1 - (1 - s**rows)**bands for Jaccard similarity
+    s; the curve is steepest near (1 / bands) ** (1 / rows). The highest such point not above
+    90% of the threshold is chosen, so that true near-duplicates are rarely missed.
+
+    Returns:
+        Tuple of (bands, rows)
+    """
+    options = [(num_perm // rows, rows) for rows in range(1, num_perm + 1) if num_perm % rows == 0]
+    below = [option for option in options if (1 / option[0]) ** (1 / option[1]) <= 0.9 * threshold]
+    return max(below, key=lambda option: (1 / option[0]) ** (1 / option[1])) if below else options[-1]
+
+
+class MinHasher:
+    """MinHash signatures of word-shingle sets under num_perm random universal hash functions."""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self._a = rng.randint(1, _PRIME, num_perm).astype(np.uint64)
+        self._b = rng.randint(0, _PRIME, num_perm).astype(np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """Return the MinHash signature of a text (all maxima for an empty text)."""
+        items = shingles(text, self.shingle_size)
+        if not items:
+            return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=4).digest(), "little") for item in set(items)],
+            dtype=np.uint64
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+
+def estimated_jaccard(first: np.ndarray, second: np.ndarray) -> float:
+    """Fraction of agreeing signature positions, an unbiased estimate of Jaccard similarity."""
+    return float(np.mean(first == second))
+
+
+class NearDuplicateIndex:
+    """
+    Streaming LSH index of representative chunks.
+
+    Each added chunk is compared with the representatives sharing one of its signature bands; it
+    becomes a representative itself unless one of them is similar enough.
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.threshold = threshold
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.bands, self.rows = lsh_bands(num_perm, threshold)
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[str, np.ndarray] = {}
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def add(self, key: str, text: str) -> Optional[Tuple[str, float]]:
+        """
+        Check a chunk against the representatives and index it if it is new.
+
+        Args:
+            key: Unique chunk key
+            text: Chunk text
+
+        Returns:
+            (representative key, estimated similarity) if the chunk is a near-duplicate, else None
+        """
+        signature = self.hasher.signature(text)
+        band_keys = self._band_keys(signature)
+        candidates = {member for band, band_key in enumerate(band_keys) for member in self._buckets[band].get(band_key, ())}
+        best = None
+        for candidate in candidates:
+            similarity = estimated_jaccard(signature, self._signatures[candidate])
+            if similarity >= self.threshold and (best is None or similarity > best[1]):
+                best = (candidate, similarity)
+        if best is not None:
+            return best
+
+        self._signatures[key] = signature
+        for band, band_key in enumerate(band_keys):
+            self._buckets[band].setdefault(band_key, []).append(key)
+        return None
+
+
+@dataclass
+class DedupReport:
+    """Savings of one deduplication pass."""
+    chunks_in: int = 0
+    chunks_kept: int = 0
+    chars_in: int = 0
+    chars_kept: int = 0
+    clusters: int = 0  # Representatives that replaced at least one chunk
+
+    @property
+    def chunks_removed(self) -> int:
+        return self.chunks_in - self.chunks_kept
+
+    @property
+    def shrink_ratio(self) -> float:
+        """Fraction of vectors not written to the index."""
+        return self.chunks_removed / self.chunks_in if self.chunks_in else 0.0
+
+    def add(self, other: "DedupReport") -> None:
+        self.chunks_in += other.chunks_in
+        self.chunks_kept += other.chunks_kept
+        self.chars_in += other.chars_in
+        self.chars_kept += other.chars_kept
+        self.clusters += other.clusters
+
+    def summary(self) -> str:
+        return (f"{self.chunks_in} chunks -> {self.chunks_kept} kept, {self.chunks_removed} near-duplicates removed "
+                f"in {self.clusters} clusters (index {self.shrink_ratio:.1%} smaller, "
+                f"{self.chars_in - self.chars_kept} characters and {self.chunks_removed} embedding calls saved)")
+
+
+def chunk_ref(chunk: Dict, position: int) -> str:
+    """Readable reference to a chunk, e.g. "FAS_32.pdf#14"."""
+    metadata = chunk.get("metadata", {})
+    return f"{metadata.get('source_file', 'unknown')}#{metadata.get('chunk_index', position)}"
+
+
+def deduplicate_chunks(chunks: List[Dict], threshold: float = 0.85, num_perm: int = 128) -> Tuple[List[Dict], DedupReport]:
+    """
+    Drop near-duplicate chunks, keeping the first occurrence of each cluster.
+
+    Kept representatives get metadata["duplicate_refs"] (references to the chunks they replace,
+    at most MAX_DUPLICATE_REFS) and metadata["duplicate_count"].
+
+    Args:
+        chunks: Chunks as produced by process_pdf_to_chunks ({"content", "metadata"})
+        threshold: Minimum estimated Jaccard similarity of a near-duplicate
+        num_perm: MinHash signature length
+
+    Returns:
+        Tuple of (kept chunks in their original order, report)
+    """
+    index = NearDuplicateIndex(threshold, num_perm)
+    report = DedupReport()
+    representatives: Dict[str, Dict] = {}
+    kept = []
+    for position, chunk in enumerate(chunks):
+        content = chunk.get("content") or ""
+        report.chunks_in += 1
+        report.chars_in += len(content)
+        key = chunk_ref(chunk, position)
+        match = index.add(key, content)
+        if match is None:
+            representatives[key] = chunk
+            kept.append(chunk)
+            report.chunks_kept += 1
+            report.chars_kept += len(content)
+            continue
+
+        metadata = representatives[match[0]].setdefault("metadata", {})
+        if not metadata.get("duplicate_count"):
+            report.clusters += 1
+        metadata["duplicate_count"] = metadata.get("duplicate_count", 0) + 1
+        refs = metadata.setdefault("duplicate_refs", [])
+        if len(refs) < MAX_DUPLICATE_REFS:
+            refs.append(key)
+    return kept, report
@@ -0,0 +1,58 @@
+"""
+Federated retrieval scoring for the FAS analysis system.
+Purpose: Raw similarity scores from different indexes are not directly comparable (corpus size
+and density shift their range), so the results of each index are standardised against that
+index's own score distribution for the query before they are merged into one ranking. Because
+every index's best hit standardises to about the same value however relevant it is, calibrated
+scores only order the merged list: the primary index keeps its top_n slots and each other index
+adds at most its own quota of results.
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+
+def calibrate_scores(scores: Sequence[float]) -> List[float]:
+    """
+    Standardise one index's scores for a query (z-scores).
+
+    Args:
+        scores: Raw similarity scores of the index's results
+
+    Returns:
+        (score - mean) / std per result; a single result, or equal scores, get 0.0
+    """
+    if not scores:
+        return []
+    values = np.asarray(scores, dtype=np.float64)
+    std = values.std()
+    return ((values - values.mean()) / std).tolist() if std > 0 else [0.0] * len(values)
+
+
+def merge_calibrated(results: Dict[str, List], top_n: int, primary: str = "fas", quota: int = 2) -> List:
+    """
+    Merge the results of several indexes, ordered by calibrated score.
+
+    The primary index keeps its best top_n documents and every other index adds at most quota,
+    so a secondary index never takes the primary's slots, however poor or good its scores. Every
+    document gets metadata["calibrated_score"]; its relevance_score stays the raw score.
+
+    Args:
+        results: Dictionary mapping source tags to documents (with relevance_score and metadata)
+        top_n: Number of documents kept from the primary index
+        primary: Source tag of the primary index
+        quota: Number of documents kept from each other index
+
+    Returns:
+        The kept documents across sources, best calibrated score first, ties broken by raw score
+    """
+    merged = []
+    for source, documents in results.items():
+        documents = sorted(documents, key=lambda doc: doc.relevance_score, reverse=True)
+        documents = documents[:top_n if source == primary else max(0, quota)]
+        for doc, calibrated in zip(documents, calibrate_scores([doc.relevance_score for doc in documents])):
+            doc.metadata = dict(doc.metadata or {}, calibrated_score=round(calibrated, 4))
+            merged.append(doc)
+    merged.sort(key=lambda doc: (doc.metadata["calibrated_score"], doc.relevance_score), reverse=True)
+    return merged
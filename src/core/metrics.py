@@ -0,0 +1,189 @@
+"""
+Process-wide metrics for the FAS analysis system.
+Purpose: Minimal Prometheus-style counters and histograms, rendered in the text exposition
+format by the /metrics endpoint.
+"""
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, values)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels) -> None:
+        """Increase the counter for the given label values."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        """Return the current value for the given label values."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            return self._values.get(key, 0.0)
+
+    def total(self) -> float:
+        """Return the sum over all label values."""
+        with self._lock:
+            return sum(self._values.values())
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    """Value that can go up and down."""
+
+    def set(self, value: float, **labels) -> None:
+        """Set the gauge for the given label values."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def collect(self) -> List[str]:
+        lines = super().collect()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        """Record one observation for the given label values."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            # One slot per bucket, then sum and count
+            series = self._series.setdefault(key, [0.0] * (len(self.buckets) + 2))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels) -> int:
+        """Return the number of observations for the given label values."""
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            return int(series[-1]) if series else 0
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, cumulative in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': repr(bound)})} {_format_value(cumulative)}")
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': '+Inf'})} {_format_value(series[-1])}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(series[-2])}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {_format_value(series[-1])}")
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Register a metric, returning the existing one if the name is taken."""
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Render all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# --- Metrics shared across the system ---
+HTTP_REQUESTS = registry.counter(
+    "fas_http_requests_total", "HTTP requests by method, route and status code", ["method", "path", "status"])
+HTTP_REQUEST_DURATION = registry.histogram(
+    "fas_http_request_duration_seconds", "HTTP request latency", ["method", "path"])
+STAGE_DURATION = registry.histogram(
+    "fas_stage_duration_seconds", "Duration of each analysis stage", ["stage"])
+STAGE_ERRORS = registry.counter(
+    "fas_stage_errors_total", "Analysis stages that raised an error", ["stage"])
+STAGE_DEGRADED = registry.counter(
+    "fas_stage_degraded_total", "Analysis stages shortened, replaced or skipped to meet the request deadline", ["stage"])
+PROVIDER_CALL_DURATION = registry.histogram(
+    "fas_provider_call_duration_seconds", "Latency of outbound provider calls", ["provider", "operation", "model"])
+PROVIDER_CALLS = registry.counter(
+    "fas_provider_calls_total", "Outbound provider calls by outcome", ["provider", "operation", "status"])
+PROVIDER_REQUEST_CHARS = registry.counter(
+    "fas_provider_request_chars_total", "Characters of text sent to providers", ["provider", "operation"])
+PROVIDER_TOKENS = registry.counter(
+    "fas_provider_tokens_total", "Tokens consumed by provider calls", ["provider", "model", "stage", "kind"])
+PROVIDER_COST = registry.counter(
+    "fas_provider_cost_usd_total", "Estimated provider cost in USD", ["provider", "model", "stage"])
+PROVIDER_RETRIES = registry.counter(
+    "fas_provider_retries_total", "Provider calls retried after a transient error", ["provider", "operation"])
+PROVIDER_HEDGES = registry.counter(
+    "fas_provider_hedges_total", "Hedged provider calls by which copy answered first", ["provider", "operation", "outcome"])
+PROVIDER_ABANDONED_CALLS = registry.counter(
+    "fas_provider_abandoned_calls_total", "Provider calls left running after their deadline or a winning hedge", ["provider", "operation"])
+PROVIDER_ABANDONED_IN_FLIGHT = registry.gauge(
+    "fas_provider_abandoned_calls_in_flight", "Abandoned provider calls that have not finished yet")
+RATE_LIMIT_WAIT = registry.histogram(
+    "fas_rate_limit_wait_seconds", "Time provider calls waited for the rate-limit scheduler", ["provider", "priority"])
+RATE_LIMIT_HITS = registry.counter(
+    "fas_rate_limit_hits_total", "Rate-limit (429) responses from providers", ["provider", "model"])
+APPLICABILITY_TIER_DURATION = registry.histogram(
+    "fas_applicability_tier_duration_seconds", "Latency of each applicability cascade tier", ["tier"])
+APPLICABILITY_TIER_OUTCOMES = registry.counter(
+    "fas_applicability_tier_total", "Applicability cascade tier results, accepted or escalated", ["tier", "outcome"])
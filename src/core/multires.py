@@ -0,0 +1,150 @@
+"""
+Multi-resolution vectors for the FAS analysis system.
+Purpose: text-embedding-3 vectors keep most of their meaning when truncated to their first few
+hundred dimensions and renormalised. A companion index holds such short copies of the chunk vectors;
+retrieval searches it coarsely and rescores the best candidates exactly on the full vectors.
+
+Build the companion index from an existing full index:
+    python -m src.core.multires --dimension 256
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .centroids import iter_index_vectors
+
+# Metadata copied to the short vectors: only what the retriever filters on
+COARSE_METADATA_FIELDS = ("document_type", "section_heading")
+
+
+def truncate_embedding(vector: Sequence[float], dimension: int) -> List[float]:
+    """
+    Shorten an embedding to its first `dimension` values and renormalise it to unit length.
+
+    Args:
+        vector: Full embedding
+        dimension: Target size (vectors already this short are only renormalised)
+
+    Returns:
+        Shortened, L2-normalised embedding
+    """
+    short = np.asarray(vector[:dimension], dtype=np.float32)
+    return (short / (np.linalg.norm(short) or 1.0)).tolist()
+
+
+def coarse_index_name(index_name: str, dimension: int, override: str = "") -> str:
+    """Name of the companion index holding the `dimension`-sized copies (override wins if set)."""
+    return override or f"{index_name}-{dimension}d"
+
+
+def coarse_record(vector_id: str, values: Sequence[float], metadata: Dict, dimension: int) -> Dict:
+    """
+    Build the upsert record of the short copy of one vector.
+
+    Args:
+        vector_id: ID shared with the full vector
+        values: Full embedding
+        metadata: Metadata of the full vector
+        dimension: Target size
+
+    Returns:
+        Upsert record with the truncated values and the filterable metadata fields
+    """
+    return {
+        "id": vector_id,
+        "values": truncate_embedding(values, dimension),
+        "metadata": {name: metadata[name] for name in COARSE_METADATA_FIELDS if name in metadata}
+    }
+
+
+def build_coarse_index(index, coarse_index, dimension: int, namespace: str = "default", batch_size: int = 100) -> int:
+    """
+    Copy every vector of a namespace into the companion index at reduced dimension.
+
+    Args:
+        index: Full-dimension vector index
+        coarse_index: Companion index created with `dimension`
+        dimension: Target size
+        namespace: Namespace to copy
+        batch_size: Vectors read and upserted per request
+
+    Returns:
+        Number of vectors copied
+    """
+    batch = []
+    copied = 0
+    for vector_id, values, metadata in iter_index_vectors(index, namespace, batch_size):
+        if not values:
+            continue
+        batch.append(coarse_record(vector_id, values, metadata, dimension))
+        if len(batch) >= batch_size:
+            coarse_index.upsert(vectors=batch, namespace=namespace)
+            copied += len(batch)
+            batch = []
+    if batch:
+        coarse_index.upsert(vectors=batch, namespace=namespace)
+        copied += len(batch)
+    return copied
+
+
+def rescore(query_vector: Sequence[float], candidates: Dict[str, Tuple[List[float], Dict]], top_n: int) -> List[Dict]:
+    """
+    Rank candidates by exact cosine similarity of their full vectors.
+
+    Args:
+        query_vector: Full query embedding
+        candidates: Dictionary mapping IDs to (values, metadata), e.g. from fetch_vectors
+        top_n: Number of matches to return
+
+    Returns:
+        Matches as {"id", "score", "values", "metadata"} dictionaries, best first
+    """
+    ids = [vector_id for vector_id, (values, _) in candidates.items() if values]
+    if not ids:
+        return []
+    matrix = np.asarray([candidates[vector_id][0] for vector_id in ids], dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1)
+    query = np.asarray(query_vector, dtype=np.float32)
+    scores = (matrix @ query) / (np.where(norms == 0, 1.0, norms) * (np.linalg.norm(query) or 1.0))
+
+    matches = []
+    for position in np.argsort(-scores)[:top_n]:
+        vector_id = ids[position]
+        values, metadata = candidates[vector_id]
+        matches.append({"id": vector_id, "score": float(scores[position]), "values": values, "metadata": metadata})
+    return matches
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Build the companion index of short vectors from the configured FAS index."""
+    project_root = str(Path(__file__).parent.parent.parent)
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from src.core.config import settings
+    from src.core.providers import create_vector_index
+    from src.core.shards import get_shard_manifest
+
+    parser = argparse.ArgumentParser(description="Copy the FAS index into a companion index of truncated vectors")
+    parser.add_argument("--index", default=settings.PINECONE_INDEX_FAS)
+    parser.add_argument("--dimension", type=int, default=settings.MULTIRES_DIMENSION or 256)
+    parser.add_argument("--coarse-index", default=settings.PINECONE_INDEX_FAS_COARSE,
+                        help="Companion index, created beforehand with --dimension (default: <index>-<dimension>d)")
+    parser.add_argument("--namespace", default=None, help="Namespace to copy (default: every shard in the manifest, or \"default\")")
+    args = parser.parse_args(argv)
+
+    manifest = get_shard_manifest(settings.SHARD_MANIFEST_PATH)
+    namespaces = [args.namespace] if args.namespace else (manifest.namespaces if manifest else ["default"])
+    coarse_name = coarse_index_name(args.index, args.dimension, args.coarse_index)
+    index = create_vector_index(args.index)
+    coarse_index = create_vector_index(coarse_name, dimension=args.dimension)
+    copied = sum(build_coarse_index(index, coarse_index, args.dimension, namespace=namespace) for namespace in namespaces)
+    print(f"Copied {copied} vectors from {args.index} to {coarse_name} at {args.dimension} dimensions")
+    return 0 if copied else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
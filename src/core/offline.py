@@ -0,0 +1,612 @@
+"""
+Offline provider stand-ins for the FAS analysis system.
+Purpose: Deterministic local replacements for the OpenAI, Gemini and Pinecone clients, used to
+benchmark and test the agents without network access or API keys.
+"""
+
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from .config import settings
+from .multires import truncate_embedding
+from .providers import ProviderResponse
+from .snapshot import import_snapshot, load_snapshot
+
+# --- Standard vocabulary used by the templated responses ---
+STANDARD_KEYWORDS = {
+    "FAS 4": ["musharaka", "musharakah", "partnership", "partner", "equity", "profit sharing", "capital", "buyout", "diminishing"],
+    "FAS 7": ["salam", "parallel salam", "forward", "advance payment", "commodity", "delivery"],
+    "FAS 10": ["istisna", "istisna'a", "construction", "manufacturing", "work-in-progress", "contract revenue", "project", "completion"],
+    "FAS 28": ["murabaha", "murabahah", "deferred payment", "cost-plus", "markup", "receivable", "bad debt", "default", "installment"],
+    "FAS 32": ["ijarah", "lease", "lessee", "lessor", "rental", "right-of-use", "usufruct", "muntahia bittamleek"],
+}
+
+STANDARD_NAMES = {
+    "FAS 4": "Musharaka Financing",
+    "FAS 7": "Salam and Parallel Salam",
+    "FAS 10": "Istisna'a and Parallel Istisna'a",
+    "FAS 28": "Murabaha and Other Deferred Payment Sales",
+    "FAS 32": "Ijarah",
+}
+
+# --- Seed corpus for the in-memory index ---
+OFFLINE_SEED_CORPUS = [
+    ("FAS_4_Musharaka", "FAS_4_Musharaka.pdf", [
+        "Musharaka is a form of partnership between the Islamic bank and its clients whereby each party contributes to the capital of the partnership. Profit is shared in a pre-agreed ratio, while losses are shared in proportion to each partner's share in capital.",
+        "The Islamic bank's share in Musharaka capital shall be recognised when it is paid to the partner or made available to the partnership. In a diminishing Musharaka the bank's share is progressively bought out by the partner and the equity is derecognised at the buyout price.",
+    ]),
+    ("FAS_7_Salam_Parallel_Salam", "FAS_7_Salam_Parallel_Salam.pdf", [
+        "Salam is the purchase of a commodity for deferred delivery in exchange for immediate payment. Salam capital paid in advance shall be recognised when it is paid to the seller.",
+        "In parallel Salam the Islamic bank sells a commodity of the same specification for future delivery. Gains or losses on delivery of the commodity are recognised in the income statement.",
+    ]),
+    ("FAS_10_Istisna", "FAS_10_Istisna.pdf", [
+        "Istisna'a is a contract for the manufacturing or construction of an asset according to agreed specifications. Revenue and profit are recognised using the percentage-of-completion method as work-in-progress advances.",
+        "Where the buyer defaults and project completion stops, the Islamic bank shall recognise impairment of Istisna'a receivables and adjust the valuation of work-in-progress to its recoverable amount.",
+    ]),
+    ("FAS_28_Murabaha_Deferred_Payment_Sales", "FAS_28_Murabaha_Deferred_Payment_Sales.pdf", [
+        "Murabaha is a sale of goods at cost plus an agreed markup with deferred payment. The seller shall recognise the sale when control of the goods is transferred to the buyer.",
+        "Deferred payment receivables are measured at amortised cost. Expected credit losses and bad debt arising from customer default are recognised as an allowance for impairment and reversed when the outstanding amounts are collected.",
+    ]),
+    ("FAS_32_Ijarah", "FAS_32.pdf", [
+        "Ijarah is a contract for the transfer of the usufruct of an asset for an agreed rental. At commencement the lessee shall recognise a right-of-use asset and a net Ijarah liability.",
+        "The lessor shall recognise the Ijarah asset at cost and depreciate it over its useful life. In Ijarah Muntahia Bittamleek ownership of the asset is transferred to the lessee at the end of the lease term.",
+    ]),
+]
+
+
+# Seed corpus of the Shariah Standards index (PINECONE_INDEX_SS), kept apart from the FAS excerpts
+OFFLINE_SS_SEED_CORPUS = [
+    ("SS_8_Murabahah", "SS_8_Murabahah.pdf", [
+        "The institution must acquire ownership and possession of the commodity before selling it in Murabahah to the purchase orderer. A promise to purchase binds the customer only for the actual damage suffered if it is not honoured.",
+        "The deferred Murabahah price may not be increased when the customer delays payment. The customer may undertake to donate an amount to charity in case of late payment.",
+    ]),
+    ("SS_9_Ijarah", "SS_9_Ijarah.pdf", [
+        "The lessor bears the major maintenance of the leased asset and the risks of its ownership throughout the lease term. Rental may be fixed or variable by reference to a known benchmark.",
+    ]),
+    ("SS_12_Sharikah", "SS_12_Sharikah.pdf", [
+        "Profit in Sharikah is distributed according to the agreed ratio, while losses are borne in proportion to each partner's share in capital. No partner may guarantee the capital of another.",
+    ]),
+]
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the token count of a text (about four characters per token)."""
+    return max(1, math.ceil(len(text or "") / 4))
+
+
+def hash_embedding(text: str, dimension: int = None) -> List[float]:
+    """
+    Embed a text by hashing its words and word pairs into a fixed-size vector.
+
+    Texts that share vocabulary get a high cosine similarity, which is enough to make
+    offline retrieval behave sensibly. Like text-embedding-3's `dimensions` parameter, a
+    dimension below settings.VECTOR_DIMENSION returns the full vector truncated and renormalised.
+
+    Args:
+        text: Text to embed
+        dimension: Size of the vector (defaults to settings.VECTOR_DIMENSION)
+
+    Returns:
+        L2-normalised embedding
+    """
+    dimension = dimension or settings.VECTOR_DIMENSION
+    if dimension < settings.VECTOR_DIMENSION:
+        return truncate_embedding(hash_embedding(text), dimension)
+    vector = [0.0] * dimension
+    words = re.findall(r"[a-z0-9']+", (text or "").lower())
+    features = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    if not features:
+        features = [text or ""]
+
+    for feature in features:
+        digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+        bucket = int.from_bytes(digest[:4], "little") % dimension
+        sign = 1.0 if digest[4] & 1 else -1.0
+        vector[bucket] += sign
+
+    norm = math.sqrt(sum(value * value for value in vector)) or 1.0
+    return [value / norm for value in vector]
+
+
+class OfflineLatency:
+    """Artificial latency drawn from OFFLINE_LATENCY_DISTRIBUTION with a deterministic seed."""
+
+    def __init__(self, seed: int = None):
+        self._rng = random.Random(settings.OFFLINE_SEED if seed is None else seed)
+        self._lock = threading.Lock()
+
+    def draw(self, base_ms: float) -> float:
+        """
+        Draw a delay in milliseconds around base_ms.
+
+        "uniform" is base_ms plus or minus up to OFFLINE_JITTER_MS, "normal" adds a Gaussian with
+        OFFLINE_JITTER_MS standard deviation, "lognormal" has median base_ms and shape
+        OFFLINE_LATENCY_SIGMA (a long tail), "exponential" has mean base_ms.
+        """
+        distribution = settings.OFFLINE_LATENCY_DISTRIBUTION
+        with self._lock:
+            if distribution == "normal":
+                delay = base_ms + self._rng.gauss(0.0, settings.OFFLINE_JITTER_MS)
+            elif distribution == "lognormal":
+                delay = base_ms * self._rng.lognormvariate(0.0, settings.OFFLINE_LATENCY_SIGMA)
+            elif distribution == "exponential":
+                delay = self._rng.expovariate(1.0 / base_ms) if base_ms > 0 else 0.0
+            else:
+                delay = base_ms + self._rng.uniform(-settings.OFFLINE_JITTER_MS, settings.OFFLINE_JITTER_MS)
+        return max(0.0, delay)
+
+    def sleep(self, base_ms: float) -> float:
+        """
+        Sleep for a delay drawn around base_ms.
+
+        Returns:
+            Seconds slept
+        """
+        delay = self.draw(base_ms) / 1000.0
+        if delay:
+            time.sleep(delay)
+        return delay
+
+
+_latency = OfflineLatency()
+
+
+# --- Templated LLM responses ---
+
+def _find_standards(text: str) -> Dict[str, int]:
+    """Count keyword hits for each core standard in a text."""
+    lowered = (text or "").lower()
+    hits = {}
+    for fas_id, keywords in STANDARD_KEYWORDS.items():
+        count = sum(lowered.count(keyword) for keyword in keywords)
+        if count:
+            hits[fas_id] = count
+    return hits
+
+
+def _deconstruction_response(prompt: str) -> str:
+    """Build a deconstruction in the format TransactionDeconstructor parses."""
+    match = re.search(r"---\s*(.*?)\s*---", prompt, re.DOTALL)
+    transaction = match.group(1) if match else prompt
+    lines = [line.strip(" -*\t") for line in transaction.splitlines() if line.strip()]
+    first_line = lines[0] if lines else transaction[:120]
+    hits = _find_standards(transaction)
+
+    keywords = []
+    for fas_id in sorted(hits, key=hits.get, reverse=True):
+        keywords.extend(keyword for keyword in STANDARD_KEYWORDS[fas_id] if keyword in transaction.lower())
+    for word in re.findall(r"[A-Za-z][A-Za-z\-]{5,}", transaction):
+        if word.lower() not in keywords and len(keywords) < 10:
+            keywords.append(word.lower())
+
+    items = [line for line in lines if line.startswith(("Dr.", "Cr.")) or "$" in line][:5]
+    treatments = [line for line in lines if re.match(r"(Recognition|Derecognition|Reduction|Adjustment|Reversal)", line)][:5]
+    nature = ", ".join(STANDARD_NAMES[fas_id] for fas_id in hits) or "General financing transaction"
+
+    return (
+        f"**Primary Financial Event**\n{first_line}\n"
+        f"**Key Financial Items**\n" + "\n".join(f"- {item}" for item in items) + "\n"
+        f"**Explicit Accounting Treatments**\n" + "\n".join(f"- {treatment}" for treatment in treatments) + "\n"
+        f"**Transaction Nature**\n{nature}\n"
+        f"**Search Keywords**\n[{', '.join(keywords)}]"
+    )
+
+
+def _applicability_response(prompt: str) -> str:
+    """Build an applicability JSON document from keyword overlap."""
+    transaction = prompt.split("Original Transaction:", 1)[-1].split("Please analyze", 1)[0]
+    excerpt_ids = re.findall(r"=== (.+?) ===", prompt)
+    hits = _find_standards(transaction)
+    candidates = set(hits)
+    for excerpt_id in excerpt_ids:
+        number = re.search(r"FAS\D*(\d+)", excerpt_id)
+        if number and f"FAS {number.group(1)}" in STANDARD_NAMES:
+            candidates.add(f"FAS {number.group(1)}")
+
+    top = max(hits.values()) if hits else 1
+    standards = []
+    for fas_id in sorted(candidates, key=lambda fid: (-hits.get(fid, 0), fid)):
+        probability = round(0.1 + 0.85 * hits.get(fas_id, 0) / top, 2)
+        standards.append({
+            "fas_id": fas_id,
+            "fas_name": STANDARD_NAMES[fas_id],
+            "probability": probability,
+            "reasoning": f"{hits.get(fas_id, 0)} keyword matches for {STANDARD_NAMES[fas_id]} in the transaction (offline estimate)."
+        })
+    return json.dumps({"applicable_standards": standards}, indent=2)
+
+
+def _summary_response(prompt: str) -> str:
+    """Build a summary listing the first sentence of each excerpt."""
+    sections = re.findall(r"Document Type: (.*?)\n.*?Content:\n(.*?)(?=\n\nDocument \d+ \(|\n\s*Please provide|\Z)", prompt, re.DOTALL)
+    if not sections:
+        sections = [("", line) for line in re.findall(r"^- (.+)$", prompt, re.MULTILINE)]
+    lines = []
+    for document_type, content in sections:
+        sentence = content.strip().split(". ")[0].strip()
+        lines.append(f"- {document_type}: {sentence}" if document_type else f"- {sentence}")
+    return "Summary of key findings (offline):\n" + "\n".join(lines)
+
+
+def templated_completion(prompt: str) -> str:
+    """
+    Pick the templated response matching the agent prompt.
+
+    Args:
+        prompt: The user prompt sent to the model
+
+    Returns:
+        Response text
+    """
+    if "applicable_standards" in prompt:
+        return _applicability_response(prompt)
+    if "Search Keywords for FAS Lookup" in prompt:
+        return _deconstruction_response(prompt)
+    if prompt.rstrip().endswith("Summary:"):
+        return _summary_response(prompt)
+    return "Understood."
+
+
+# --- OpenAI stand-in ---
+
+class _OfflineEmbeddings:
+    def create(self, input: Union[str, List[str]], model: str = "text-embedding-3-small", dimensions: int = None, **kwargs) -> ProviderResponse:
+        """Return hash embeddings in the shape of an OpenAI embeddings response."""
+        _latency.sleep(settings.OFFLINE_EMBEDDING_LATENCY_MS)
+        texts = [input] if isinstance(input, str) else list(input)
+        tokens = sum(estimate_tokens(text) for text in texts)
+        return ProviderResponse.wrap({
+            "object": "list",
+            "model": model,
+            "data": [
+                {"object": "embedding", "index": i, "embedding": hash_embedding(text, dimensions)}
+                for i, text in enumerate(texts)
+            ],
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+        })
+
+
+class _OfflineCompletions:
+    def create(self, model: str, messages: List[Dict], max_tokens: int = None, **kwargs) -> ProviderResponse:
+        """Return a templated answer in the shape of an OpenAI chat completion."""
+        _latency.sleep(settings.OFFLINE_LLM_LATENCY_MS)
+        prompt = messages[-1]["content"] if messages else ""
+        content = templated_completion(prompt)
+        prompt_tokens = sum(estimate_tokens(message.get("content", "")) for message in messages)
+        completion_tokens = estimate_tokens(content)
+        return ProviderResponse.wrap({
+            "object": "chat.completion",
+            "model": model,
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content}
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens
+            }
+        })
+
+
+class _OfflineChat:
+    def __init__(self):
+        self.completions = _OfflineCompletions()
+
+
+class OfflineOpenAI:
+    """Stand-in for openai.OpenAI with embeddings and chat completions."""
+
+    def __init__(self, **kwargs):
+        self.embeddings = _OfflineEmbeddings()
+        self.chat = _OfflineChat()
+
+
+# --- Gemini stand-in ---
+
+def _gemini_response(prompt: str) -> ProviderResponse:
+    _latency.sleep(settings.OFFLINE_LLM_LATENCY_MS)
+    text = templated_completion(prompt)
+    prompt_tokens = estimate_tokens(prompt)
+    candidates_tokens = estimate_tokens(text)
+    return ProviderResponse.wrap({
+        "text": text,
+        "usage_metadata": {
+            "prompt_token_count": prompt_tokens,
+            "candidates_token_count": candidates_tokens,
+            "total_token_count": prompt_tokens + candidates_tokens
+        }
+    })
+
+
+class OfflineChatSession:
+    """Stand-in for a Gemini ChatSession."""
+
+    def __init__(self, history: Optional[List] = None):
+        self.history = list(history or [])
+
+    def send_message(self, content: str, **kwargs) -> ProviderResponse:
+        response = _gemini_response(content)
+        self.history.extend([content, response.text])
+        return response
+
+
+class OfflineGenerativeModel:
+    """Stand-in for google.generativeai.GenerativeModel."""
+
+    def __init__(self, model_name: str = "", generation_config: Optional[Dict] = None, **kwargs):
+        self.model_name = model_name
+        self.generation_config = generation_config or {}
+
+    def start_chat(self, history: Optional[List] = None, **kwargs) -> OfflineChatSession:
+        return OfflineChatSession(history)
+
+    def generate_content(self, contents: str, **kwargs) -> ProviderResponse:
+        return _gemini_response(contents if isinstance(contents, str) else str(contents))
+
+
+# --- Pinecone stand-in ---
+
+def _matches_filter(metadata: Dict, filter_criteria: Optional[Dict]) -> bool:
+    """Evaluate a Pinecone metadata filter against a metadata dictionary."""
+    if not filter_criteria:
+        return True
+    for key, condition in filter_criteria.items():
+        if key == "$and":
+            if not all(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        if key == "$or":
+            if not any(_matches_filter(metadata, sub) for sub in condition):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        for operator, operand in condition.items():
+            if operator == "$eq" and value != operand:
+                return False
+            if operator == "$ne" and value == operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+            if operator == "$nin" and value in operand:
+                return False
+    return True
+
+
+class _Namespace:
+    """Vectors of one namespace, with a lazily rebuilt matrix for scoring."""
+
+    def __init__(self):
+        self.records: Dict[str, Dict] = {}
+        self._ids: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+
+    def invalidate(self):
+        self._matrix = None
+
+    def matrix(self):
+        if self._matrix is None:
+            self._ids = list(self.records)
+            if self._ids:
+                matrix = np.asarray([self.records[vid]["values"] for vid in self._ids], dtype=np.float32)
+                norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+                norms[norms == 0] = 1.0
+                self._matrix = matrix / norms
+            else:
+                self._matrix = np.zeros((0, 0), dtype=np.float32)
+        return self._ids, self._matrix
+
+
+class InMemoryIndex:
+    """Stand-in for a Pinecone Index that keeps vectors in process memory."""
+
+    def __init__(self, name: str = "offline", dimension: int = None):
+        self.name = name
+        self.dimension = dimension or settings.VECTOR_DIMENSION
+        self._namespaces: Dict[str, _Namespace] = {}
+        self._lock = threading.RLock()
+
+    def upsert(self, vectors: List[Any], namespace: str = "", **kwargs) -> ProviderResponse:
+        """Insert or replace vectors given as dicts or (id, values, metadata) tuples."""
+        with self._lock:
+            ns = self._namespaces.setdefault(namespace, _Namespace())
+            for vector in vectors:
+                if isinstance(vector, dict):
+                    record = {"id": vector["id"], "values": list(vector["values"]), "metadata": dict(vector.get("metadata") or {})}
+                else:
+                    record = {"id": vector[0], "values": list(vector[1]), "metadata": dict(vector[2] if len(vector) > 2 else {})}
+                ns.records[record["id"]] = record
+            ns.invalidate()
+        return ProviderResponse.wrap({"upserted_count": len(vectors)})
+
+    def query(
+        self,
+        vector: List[float],
+        top_k: int = 10,
+        include_metadata: bool = False,
+        include_values: bool = False,
+        filter: Optional[Dict] = None,
+        namespace: str = "",
+        **kwargs
+    ) -> ProviderResponse:
+        """Exact cosine search over one namespace."""
+        _latency.sleep(settings.OFFLINE_VECTOR_LATENCY_MS)
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is None or not ns.records:
+                return ProviderResponse.wrap({"matches": [], "namespace": namespace})
+            ids, matrix = ns.matrix()
+            records = ns.records
+
+            query = np.asarray(vector, dtype=np.float32)
+            query_norm = np.linalg.norm(query) or 1.0
+            scores = matrix @ (query / query_norm)
+            if filter:
+                mask = np.array([_matches_filter(records[vid]["metadata"], filter) for vid in ids])
+                scores = np.where(mask, scores, -np.inf)
+            order = np.argsort(-scores)[:top_k]
+
+            matches = []
+            for position in order:
+                if not np.isfinite(scores[position]):
+                    break
+                record = records[ids[position]]
+                match = {"id": record["id"], "score": float(scores[position])}
+                if include_metadata:
+                    match["metadata"] = dict(record["metadata"])
+                if include_values:
+                    match["values"] = list(record["values"])
+                matches.append(match)
+        return ProviderResponse.wrap({"matches": matches, "namespace": namespace})
+
+    def list_paginated(self, namespace: str = "", limit: int = 100, pagination_token: Optional[str] = None, prefix: str = "", **kwargs) -> ProviderResponse:
+        """List vector IDs a page at a time; the token is the offset of the next page."""
+        with self._lock:
+            ns = self._namespaces.get(namespace) or _Namespace()
+            ids = sorted(vid for vid in ns.records if vid.startswith(prefix))
+        offset = int(pagination_token or 0)
+        page = ids[offset:offset + limit]
+        next_token = str(offset + limit) if offset + limit < len(ids) else None
+        return ProviderResponse.wrap({
+            "vectors": [{"id": vid} for vid in page],
+            "pagination": {"next": next_token} if next_token else None,
+            "namespace": namespace
+        })
+
+    def fetch(self, ids: List[str], namespace: str = "", **kwargs) -> ProviderResponse:
+        """Return stored vectors by ID."""
+        with self._lock:
+            ns = self._namespaces.get(namespace) or _Namespace()
+            vectors = {vid: ns.records[vid] for vid in ids if vid in ns.records}
+        return ProviderResponse.wrap({"vectors": vectors, "namespace": namespace})
+
+    def delete(self, ids: Optional[List[str]] = None, delete_all: bool = False, namespace: str = "", **kwargs) -> ProviderResponse:
+        """Delete vectors by ID, or a whole namespace."""
+        with self._lock:
+            ns = self._namespaces.get(namespace)
+            if ns is not None:
+                if delete_all:
+                    del self._namespaces[namespace]
+                else:
+                    for vid in ids or []:
+                        ns.records.pop(vid, None)
+                    ns.invalidate()
+        return ProviderResponse.wrap({})
+
+    def describe_index_stats(self, **kwargs) -> ProviderResponse:
+        """Return vector counts per namespace."""
+        with self._lock:
+            namespaces = {name: {"vector_count": len(ns.records)} for name, ns in self._namespaces.items()}
+        return ProviderResponse.wrap({
+            "dimension": self.dimension,
+            "namespaces": namespaces,
+            "total_vector_count": sum(ns["vector_count"] for ns in namespaces.values())
+        })
+
+
+def _load_corpus_file(path: str) -> List[Dict]:
+    """Load chunks from a JSON list of {"id", "text"/"content", "metadata"} items."""
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    chunks = []
+    for i, item in enumerate(items):
+        metadata = dict(item.get("metadata") or {})
+        text = item.get("text") or item.get("content") or metadata.get("text", "")
+        metadata.setdefault("text", text)
+        chunks.append({"id": item.get("id") or f"offline-{i}", "metadata": metadata})
+    return chunks
+
+
+def _seed_chunks(corpus: List = None) -> List[Dict]:
+    """Build a built-in seed corpus (OFFLINE_SEED_CORPUS by default) in the metadata layout FASRetriever reads."""
+    chunks = []
+    for document_type, source_filename, passages in (OFFLINE_SEED_CORPUS if corpus is None else corpus):
+        for i, text in enumerate(passages):
+            chunks.append({
+                "id": f"{document_type.lower()}-{i}",
+                "metadata": {
+                    "text": text,
+                    "document_type": document_type,
+                    "section_heading": "Full Document",
+                    "source_filename": source_filename,
+                    "chunk_index": i,
+                    "total_chunks": len(passages)
+                }
+            })
+    return chunks
+
+
+def seed_index(index: InMemoryIndex, namespace: str = "default", corpus_path: str = None, corpus: List = None) -> int:
+    """
+    Fill an in-memory index with hash-embedded chunks.
+
+    Args:
+        index: Index to fill
+        namespace: Target namespace
+        corpus_path: Optional JSON corpus; a built-in seed corpus is used otherwise
+        corpus: Built-in seed corpus to use (defaults to OFFLINE_SEED_CORPUS)
+
+    Returns:
+        Number of vectors upserted
+    """
+    chunks = _load_corpus_file(corpus_path) if corpus_path else _seed_chunks(corpus)
+    vectors = [
+        {"id": chunk["id"], "values": hash_embedding(chunk["metadata"]["text"], index.dimension), "metadata": chunk["metadata"]}
+        for chunk in chunks
+    ]
+    index.upsert(vectors=vectors, namespace=namespace)
+    return len(vectors)
+
+
+def _load_snapshot_into(index: InMemoryIndex, path: str) -> bool:
+    """Bulk-load a snapshot with the index's dimension; returns False if the dimensions differ."""
+    snapshot = load_snapshot(path)
+    if snapshot.meta.get("dimension") != index.dimension:
+        return False
+    import_snapshot(index, snapshot, text_in_metadata=True, batch_size=1000)
+    return True
+
+
+_indexes: Dict[str, InMemoryIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def is_ss_index(name: str) -> bool:
+    """Whether an index name is one of the configured Shariah Standards indexes."""
+    return bool(name) and name in (settings.PINECONE_INDEX_SS, settings.PINECONE_INDEX_SS_UPDATE)
+
+
+def get_in_memory_index(name: str, dimension: int = None) -> InMemoryIndex:
+    """
+    Return the process-wide in-memory index with the given name, creating and seeding it on first use.
+
+    The Shariah Standards indexes are seeded with OFFLINE_SS_CORPUS_PATH or OFFLINE_SS_SEED_CORPUS;
+    every other index with OFFLINE_SNAPSHOT_PATH, OFFLINE_CORPUS_PATH or the FAS seed corpus.
+
+    Args:
+        name: Index name
+        dimension: Vector size used when the index is created (defaults to settings.VECTOR_DIMENSION)
+
+    Returns:
+        Shared InMemoryIndex
+    """
+    with _indexes_lock:
+        index = _indexes.get(name)
+        if index is None:
+            index = InMemoryIndex(name, dimension)
+            if is_ss_index(name):
+                seed_index(index, corpus_path=settings.OFFLINE_SS_CORPUS_PATH or None, corpus=OFFLINE_SS_SEED_CORPUS)
+            elif not (settings.OFFLINE_SNAPSHOT_PATH and _load_snapshot_into(index, settings.OFFLINE_SNAPSHOT_PATH)):
+                seed_index(index, corpus_path=settings.OFFLINE_CORPUS_PATH or None)
+            _indexes[name] = index
+        return index
@@ -0,0 +1,295 @@
+"""
+On-demand request profiling for the FAS analysis system.
+Purpose: Samples the call stacks of the threads working on one profiled request (every thread inside
+one of the request's trace spans or provider calls, plus the thread that started the profile unless
+it is an event loop shared with other requests) and reports where the wall-clock and on-CPU time
+went, per stage and per function, with collapsed stacks for flame graphs. Requests that are not profiled start no sampler; the only cost is one context variable
+lookup per span.
+"""
+
+import hmac
+import json
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from .config import settings
+
+TOP_FUNCTIONS = 20
+
+_current_profile: ContextVar[Optional["Profile"]] = ContextVar("fas_profile", default=None)
+
+
+def current_profile() -> Optional["Profile"]:
+    """Return the profile of the request running in the current context."""
+    return _current_profile.get()
+
+
+def check_profile_token(token: Optional[str]) -> bool:
+    """
+    Decide whether a request asked for profiling with a valid token.
+
+    Args:
+        token: Token presented by the caller (None when profiling was not requested)
+
+    Returns:
+        True if the request is to be profiled, False if it did not ask
+
+    Raises:
+        PermissionError: If a token was presented but profiling is disabled or the token is wrong
+    """
+    if token is None:
+        return False
+    if not settings.PROFILE_TOKEN:
+        raise PermissionError("Request profiling is disabled (PROFILE_TOKEN is not set)")
+    if not hmac.compare_digest(token.encode("utf-8"), settings.PROFILE_TOKEN.encode("utf-8")):
+        raise PermissionError("Invalid profiling token")
+    return True
+
+
+def collapse_stack(frame) -> str:
+    """Return a frame's call stack as module:function names joined by ";", outermost first."""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def folded(weights: Counter) -> str:
+    """Format stack weights (seconds) as collapsed stacks in microseconds, as read by flamegraph.pl and speedscope."""
+    lines = [f"{stack} {round(seconds * 1e6)}" for stack, seconds in sorted(weights.items())]
+    return "\n".join(line for line in lines if not line.endswith(" 0"))
+
+
+def _thread_cpu_clock(thread_id: int) -> Optional[int]:
+    """CPU-time clock of a thread, or None where per-thread clocks are not available."""
+    try:
+        return time.pthread_getcpuclockid(thread_id)
+    except (AttributeError, OSError):
+        return None
+
+
+class _ThreadState:
+    """A thread taking part in a profile: its span depth, stages and last CPU reading."""
+
+    def __init__(self):
+        self.depth = 0
+        self.stages: List[Optional[str]] = []
+        self.clock = _thread_cpu_clock(threading.get_ident())
+        self.cpu = time.thread_time()
+
+
+class Profile:
+    """Sampling profiler for the threads of one request."""
+
+    def __init__(self, name: str, interval_ms: Optional[float] = None, include_caller: bool = True):
+        self.profile_id = uuid.uuid4().hex[:16]
+        self.include_caller = include_caller
+        self._excluded_thread: Optional[int] = None
+        self.name = name
+        self.interval_s = (interval_ms or settings.PROFILE_INTERVAL_MS) / 1000.0
+        self.samples = 0
+        self.wall: Counter = Counter()
+        self.cpu: Counter = Counter()
+        self.stage_wall: Counter = Counter()
+        self.stage_cpu: Counter = Counter()
+        self.cpu_clock = True
+        self._threads: Dict[int, _ThreadState] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._run, name=f"fas-profiler-{self.profile_id}", daemon=True)
+        self._summary: Optional[Dict] = None
+
+    def enter(self, stage: Optional[str] = None) -> None:
+        """Add the calling thread to the profile, e.g. at the start of a span; calls nest."""
+        thread_id = threading.get_ident()
+        if thread_id == self._excluded_thread:
+            return
+        with self._lock:
+            state = self._threads.get(thread_id)
+            if state is None:
+                state = self._threads[thread_id] = _ThreadState()
+            state.depth += 1
+            state.stages.append(stage or (state.stages[-1] if state.stages else None))
+
+    def exit(self) -> None:
+        """Undo the calling thread's latest enter()."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            state = self._threads.get(thread_id)
+            if state is None:
+                return
+            state.depth -= 1
+            state.stages.pop()
+            if state.depth == 0:
+                del self._threads[thread_id]
+
+    def start(self) -> "Profile":
+        """
+        Start sampling, with the calling thread taking part until stop().
+
+        Without include_caller, the calling thread is never sampled, not even inside spans: an
+        event-loop thread also runs other requests' coroutines and idles in its selector, which
+        would be charged to this request.
+        """
+        self._start = time.perf_counter()
+        self._process_cpu = time.process_time()
+        if self.include_caller:
+            self.enter()
+        else:
+            self._excluded_thread = threading.get_ident()
+        self._sampler.start()
+        return self
+
+    def _cpu_delta(self, state: _ThreadState, elapsed: float) -> float:
+        """CPU seconds a thread used since its last sample, at most the elapsed wall time."""
+        if state.clock is None:
+            self.cpu_clock = False
+            return 0.0
+        try:
+            reading = time.clock_gettime(state.clock)
+        except OSError:
+            return 0.0
+        delta, state.cpu = reading - state.cpu, reading
+        return min(max(delta, 0.0), elapsed)
+
+    def _run(self) -> None:
+        last = time.perf_counter()
+        while not self._stop.wait(self.interval_s):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frames = sys._current_frames()
+            with self._lock:
+                threads = list(self._threads.items())
+            for thread_id, state in threads:
+                frame = frames.get(thread_id)
+                if frame is None:
+                    continue
+                stack = collapse_stack(frame)
+                stage = (state.stages[-1] if state.stages else None) or "other"
+                cpu = self._cpu_delta(state, elapsed)
+                self.samples += 1
+                self.wall[stack] += elapsed
+                self.cpu[stack] += cpu
+                self.stage_wall[stage] += elapsed
+                self.stage_cpu[stage] += cpu
+            del frames
+
+    def stop(self) -> Dict:
+        """
+        Stop sampling (once) and summarize the profile, saving it under PROFILE_DIR if set.
+
+        Returns:
+            Summary with wall-clock versus on-CPU totals, per stage and per function, and the
+            collapsed stacks weighted by wall and by CPU time
+        """
+        if self._summary is not None:
+            return self._summary
+        self._stop.set()
+        self._sampler.join()
+        self.exit()
+        wall_ms = (time.perf_counter() - self._start) * 1000.0
+        process_cpu_ms = (time.process_time() - self._process_cpu) * 1000.0
+
+        ms = lambda seconds: round(seconds * 1000.0, 3)
+        self_wall: Counter = Counter()
+        self_cpu: Counter = Counter()
+        total_wall: Counter = Counter()
+        for stack, seconds in self.wall.items():
+            functions = stack.split(";")
+            self_wall[functions[-1]] += seconds
+            self_cpu[functions[-1]] += self.cpu[stack]
+            for function in set(functions):
+                total_wall[function] += seconds
+
+        sampled_wall = sum(self.wall.values())
+        on_cpu = sum(self.cpu.values())
+        summary = {
+            "profile_id": self.profile_id,
+            "name": self.name,
+            "interval_ms": ms(self.interval_s),
+            "samples": self.samples,
+            "wall_ms": round(wall_ms, 3),
+            "sampled_wall_ms": ms(sampled_wall),
+            "on_cpu_ms": ms(on_cpu) if self.cpu_clock else None,
+            "off_cpu_ms": ms(sampled_wall - on_cpu) if self.cpu_clock else None,
+            "process_cpu_ms": round(process_cpu_ms, 3),
+            "stages": {
+                stage: {
+                    "wall_ms": ms(seconds),
+                    "on_cpu_ms": ms(self.stage_cpu[stage]) if self.cpu_clock else None,
+                    "off_cpu_ms": ms(seconds - self.stage_cpu[stage]) if self.cpu_clock else None
+                }
+                for stage, seconds in self.stage_wall.most_common()
+            },
+            "top_functions": [
+                {
+                    "function": function,
+                    "self_wall_ms": ms(seconds),
+                    "self_cpu_ms": ms(self_cpu[function]) if self.cpu_clock else None,
+                    "total_wall_ms": ms(total_wall[function])
+                }
+                for function, seconds in self_wall.most_common(TOP_FUNCTIONS)
+            ],
+            "folded": {"wall": folded(self.wall), "cpu": folded(self.cpu) if self.cpu_clock else ""}
+        }
+        if settings.PROFILE_DIR:
+            summary["files"] = self._save(summary)
+        self._summary = summary
+        return summary
+
+    def _save(self, summary: Dict) -> List[str]:
+        """Write the collapsed stacks and the summary to PROFILE_DIR."""
+        directory = Path(settings.PROFILE_DIR)
+        directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for weight, text in summary["folded"].items():
+            if text:
+                path = directory / f"{self.profile_id}.{weight}.folded"
+                path.write_text(text + "\n", encoding="utf-8")
+                files.append(str(path))
+        path = directory / f"{self.profile_id}.json"
+        path.write_text(json.dumps({key: value for key, value in summary.items() if key != "folded"}, indent=2), encoding="utf-8")
+        files.append(str(path))
+        return files
+
+
+@contextmanager
+def profile_request(
+    name: str,
+    enabled: bool = True,
+    interval_ms: Optional[float] = None,
+    include_caller: bool = True
+) -> Iterator[Optional[Profile]]:
+    """
+    Profile the code run in this context, including the spans it runs in other threads.
+
+    Args:
+        name: Name of the profiled request
+        enabled: False yields None without starting a profiler
+        interval_ms: Sampling interval (defaults to settings.PROFILE_INTERVAL_MS)
+        include_caller: Whether the calling thread is sampled; False for an event-loop thread,
+            so that only the worker threads entered through this context are
+
+    Yields:
+        The running Profile (call stop() for the summary before the block ends), or None
+    """
+    if not enabled:
+        yield None
+        return
+    profile = Profile(name, interval_ms, include_caller)
+    token = _current_profile.set(profile)
+    profile.start()
+    try:
+        yield profile
+    finally:
+        profile.stop()
+        _current_profile.reset(token)
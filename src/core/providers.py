@@ -0,0 +1,303 @@
+"""
+Provider clients for the FAS analysis system.
+Purpose: Creates the OpenAI, Gemini and Pinecone clients used by the agents. When
+settings.PROVIDER_MODE is "offline" (or a cassette is replayed) the deterministic stand-ins from
+core.offline are used instead.
+
+Every outbound call made through these clients is described by a ProviderCall and passed
+through the registered middleware (tracing, retries, usage accounting, rate limiting, cassette
+recording/replay, ...) before reaching the SDK.
+"""
+
+import threading
+import time
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .config import settings
+from .cassette import cassette_middleware
+from .ratelimit import rate_limit_middleware
+from .resilience import resilience_middleware
+from .tracing import tracing_middleware
+from .usage import usage_middleware
+
+
+class ProviderResponse(dict):
+    """Dictionary with attribute access, shaped like the SDK response objects."""
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def to_dict(self) -> Dict:
+        """Return a plain dictionary copy."""
+        return {
+            key: value.to_dict() if isinstance(value, ProviderResponse)
+            else [item.to_dict() if isinstance(item, ProviderResponse) else item for item in value] if isinstance(value, list)
+            else value
+            for key, value in self.items()
+        }
+
+    @classmethod
+    def wrap(cls, value: Any) -> Any:
+        """Recursively convert dictionaries into ProviderResponse objects."""
+        if isinstance(value, dict):
+            return cls({key: cls.wrap(item) for key, item in value.items()})
+        if isinstance(value, list):
+            # Vectors are long lists of floats: copy flat lists without visiting every item
+            if not value or not isinstance(value[0], (dict, list)):
+                return list(value)
+            return [cls.wrap(item) for item in value]
+        return value
+
+
+@dataclass
+class ProviderCall:
+    """Description of one outbound provider call."""
+    provider: str                     # "openai", "gemini" or "pinecone"
+    operation: str                    # e.g. "embeddings.create", "send_message", "query"
+    model: Optional[str] = None
+    kwargs: Dict = field(default_factory=dict)
+    deadline: Optional[float] = None  # time.monotonic() deadline, set by the resilience middleware
+
+
+Middleware = Callable[[ProviderCall, Callable[[], Any]], Any]
+
+_middleware: List[Tuple[int, str, Middleware]] = []
+_middleware_lock = threading.Lock()
+
+
+def register_middleware(name: str, middleware: Middleware, order: int = 100) -> None:
+    """
+    Register a middleware wrapped around every provider call.
+
+    Middleware with a lower order runs further out; the SDK call is innermost.
+    Registering a name twice replaces the previous middleware.
+
+    Args:
+        name: Unique middleware name
+        middleware: Callable taking (call, proceed) and returning the response
+        order: Position in the chain
+    """
+    global _middleware
+    with _middleware_lock:
+        entries = [entry for entry in _middleware if entry[1] != name]
+        entries.append((order, name, middleware))
+        _middleware = sorted(entries, key=lambda entry: entry[0])
+
+
+def unregister_middleware(name: str) -> None:
+    """Remove a registered middleware; unknown names are ignored."""
+    global _middleware
+    with _middleware_lock:
+        _middleware = [entry for entry in _middleware if entry[1] != name]
+
+
+def invoke(call: ProviderCall, fn: Callable[[], Any]) -> Any:
+    """
+    Run a provider call through the middleware chain.
+
+    Args:
+        call: Description of the call
+        fn: Performs the actual SDK call
+
+    Returns:
+        The provider response
+    """
+    chain = _middleware
+
+    def proceed_from(position: int) -> Callable[[], Any]:
+        if position == len(chain):
+            return fn
+        return lambda: chain[position][2](call, proceed_from(position + 1))
+
+    return proceed_from(0)()
+
+
+def _with_timeout(provider: str, deadline: Optional[float], kwargs: Dict) -> Dict:
+    """
+    Pass the time left before a call's deadline to the SDK as its own request timeout.
+
+    A call abandoned at its deadline is then also cancelled on the wire instead of running on.
+    A timeout given by the caller is kept.
+
+    Args:
+        provider: "openai", "gemini" or "pinecone"
+        deadline: time.monotonic() deadline of the call (None for no timeout)
+        kwargs: Keyword arguments of the SDK call
+
+    Returns:
+        The keyword arguments with the provider's timeout option added
+    """
+    if deadline is None:
+        return kwargs
+    timeout = max(0.001, deadline - time.monotonic())
+    if provider == "openai":
+        return {"timeout": timeout, **kwargs}
+    if provider == "gemini":
+        return dict(kwargs, request_options={"timeout": timeout, **(kwargs.get("request_options") or {})})
+    if provider == "pinecone":
+        return {"_request_timeout": timeout, **kwargs}
+    return kwargs
+
+
+def _instrument(provider: str, operation: str, fn: Callable, model: Optional[str] = None) -> Callable:
+    """Wrap an SDK method so that calls go through invoke()."""
+    def instrumented(*args, **kwargs):
+        call = ProviderCall(
+            provider=provider,
+            operation=operation,
+            model=kwargs.get("model", model),
+            kwargs=dict(kwargs, _args=list(args)) if args else dict(kwargs)
+        )
+        return invoke(call, lambda: fn(*args, **_with_timeout(provider, call.deadline, kwargs)))
+    return instrumented
+
+
+class _GeminiChatProxy:
+    def __init__(self, chat, model_name: str):
+        self._chat = chat
+        self.send_message = _instrument("gemini", "send_message", chat.send_message, model_name)
+
+    @property
+    def history(self):
+        return self._chat.history
+
+
+class _GeminiModelProxy:
+    def __init__(self, model, model_name: str):
+        self._model = model
+        self.model_name = model_name
+        self.generate_content = _instrument("gemini", "generate_content", model.generate_content, model_name)
+
+    def start_chat(self, history: Optional[List] = None, **kwargs) -> _GeminiChatProxy:
+        return _GeminiChatProxy(self._model.start_chat(history=history or [], **kwargs), self.model_name)
+
+
+class _IndexProxy:
+    def __init__(self, index, index_name: str):
+        self._index = index
+        self.name = index_name
+        for operation in ("query", "upsert", "fetch", "delete", "describe_index_stats", "list_paginated"):
+            setattr(self, operation, _instrument("pinecone", operation, getattr(index, operation), index_name))
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._index, name)
+
+
+def is_offline() -> bool:
+    """Return True if the agents should use the local provider stand-ins."""
+    return settings.PROVIDER_MODE.lower() == "offline"
+
+
+def _use_stand_ins() -> bool:
+    # A replayed cassette serves every response, so the live SDKs (and their keys) are not needed
+    return is_offline() or settings.CASSETTE_MODE.lower() == "replay"
+
+
+def create_openai_client():
+    """
+    Create an OpenAI client, or the offline stand-in.
+
+    Returns:
+        Object exposing embeddings.create and chat.completions.create
+    """
+    if _use_stand_ins():
+        from .offline import OfflineOpenAI
+        client = OfflineOpenAI()
+    else:
+        from openai import OpenAI
+        client = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    return wrap_openai_client(client)
+
+
+def wrap_openai_client(client):
+    """
+    Route the calls of an existing OpenAI client through the middleware chain.
+
+    Args:
+        client: openai.OpenAI instance (or the offline stand-in)
+
+    Returns:
+        Object exposing embeddings.create and chat.completions.create
+    """
+    return SimpleNamespace(
+        embeddings=SimpleNamespace(create=_instrument("openai", "embeddings.create", client.embeddings.create)),
+        chat=SimpleNamespace(completions=SimpleNamespace(
+            create=_instrument("openai", "chat.completions.create", client.chat.completions.create)
+        ))
+    )
+
+
+def create_gemini_model(model_name: str, generation_config: Optional[Dict] = None):
+    """
+    Create a Gemini generative model, or the offline stand-in.
+
+    Args:
+        model_name: Gemini model name
+        generation_config: Optional generation parameters
+
+    Returns:
+        Object exposing start_chat and generate_content
+    """
+    if _use_stand_ins():
+        from .offline import OfflineGenerativeModel
+        model = OfflineGenerativeModel(model_name=model_name, generation_config=generation_config)
+    else:
+        import google.generativeai as genai
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        model = genai.GenerativeModel(model_name=model_name, generation_config=generation_config)
+
+    return _GeminiModelProxy(model, model_name)
+
+
+def create_vector_index(index_name: str, dimension: int = None):
+    """
+    Open a Pinecone index, or the shared in-memory index with the same name.
+
+    Args:
+        index_name: Name of the index
+        dimension: Vector size of the in-memory stand-in (a Pinecone index has its own)
+
+    Returns:
+        Object exposing query, upsert, fetch, delete, list_paginated and describe_index_stats
+    """
+    if _use_stand_ins():
+        from .offline import get_in_memory_index
+        index = get_in_memory_index(index_name or "offline", dimension)
+    else:
+        from pinecone import Pinecone
+        pc = Pinecone(
+            api_key=settings.PINECONE_API_KEY,
+            environment=settings.PINECONE_ENVIRONMENT
+        )
+        index = pc.Index(index_name)
+
+    return wrap_vector_index(index, index_name)
+
+
+def wrap_vector_index(index, index_name: str):
+    """
+    Route the calls of an existing Pinecone index through the middleware chain.
+
+    Args:
+        index: pinecone Index (or an InMemoryIndex)
+        index_name: Name reported to the middleware
+
+    Returns:
+        Object exposing query, upsert, fetch, delete, list_paginated and describe_index_stats
+    """
+    return _IndexProxy(index, index_name)
+
+
+# Built-in middleware: tracing sees the whole call including retries; usage and the rate-limit
+# scheduler see every attempt; the cassette sits innermost around the SDK call
+register_middleware("tracing", tracing_middleware, order=10)
+register_middleware("resilience", resilience_middleware, order=15)
+register_middleware("usage", usage_middleware, order=20)
+register_middleware("rate_limit", rate_limit_middleware, order=30)
+register_middleware("cassette", cassette_middleware, order=1000)
@@ -0,0 +1,354 @@
+"""
+Rate-limit-aware scheduling of provider calls for the FAS analysis system.
+Purpose: A process-wide scheduler that admits every outbound OpenAI, Gemini and Pinecone call
+through token buckets per provider and model, counting both requests and tokens. It backs off
+automatically when a provider answers 429 (for as long as the error's Retry-After or
+x-ratelimit-reset headers say), and keeps headroom for interactive API traffic over batch ingestion.
+
+Modes (settings.RATE_LIMIT_MODE):
+- "auto": limits apply to live providers, not to the offline stand-ins or replayed cassettes
+- "on": limits always apply
+- "off": calls are never delayed
+"""
+
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from .config import settings
+from .metrics import RATE_LIMIT_HITS, RATE_LIMIT_WAIT
+from .tracing import current_span, extract_token_usage
+
+# Requests and tokens per minute. These are conservative defaults; set RATE_LIMITS to the limits
+# of your account tier. Keys are "provider:model" or "provider"; the most specific key wins.
+DEFAULT_RATE_LIMITS = {
+    "openai": {"rpm": 500, "tpm": 200000},
+    "openai:text-embedding-3-small": {"rpm": 3000, "tpm": 1000000},
+    "gemini": {"rpm": 300, "tpm": 1000000},
+    "pinecone": {"rpm": 6000},
+}
+
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+MIN_RATE_SCALE = 0.1      # Lowest fraction of the configured rate after repeated 429s
+RECOVERY_STEP = 0.05      # Rate fraction regained per successful call
+
+
+class RateLimitTimeout(TimeoutError):
+    """Raised when a call would have to wait longer than settings.RATE_LIMIT_MAX_WAIT_S or past its deadline."""
+
+
+_current_priority: ContextVar[str] = ContextVar("fas_call_priority", default=INTERACTIVE)
+
+
+def current_priority() -> str:
+    """Return the scheduling priority of calls made in the current context."""
+    return _current_priority.get()
+
+
+@contextmanager
+def call_priority(priority: str) -> Iterator[None]:
+    """
+    Run provider calls in this context with the given priority.
+
+    Args:
+        priority: "interactive" (API requests, the default) or "batch" (ingestion)
+    """
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a per-minute rate."""
+
+    def __init__(self, per_minute: float, burst_seconds: float = 10.0):
+        self.per_minute = float(per_minute)
+        self.capacity = max(1.0, self.per_minute * burst_seconds / 60.0)
+        self.tokens = self.capacity
+        self.scale = 1.0
+        self._updated = time.monotonic()
+
+    @property
+    def rate(self) -> float:
+        """Current refill rate in tokens per second."""
+        return self.per_minute * self.scale / 60.0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, amount: float, reserve: float) -> float:
+        """
+        Seconds until amount can be taken while leaving `reserve` of the capacity untouched.
+
+        The reserve is cut to what the bucket can hold besides the amount, so that a call larger
+        than the unreserved capacity waits for a full bucket instead of never being admitted.
+        """
+        amount = min(amount, self.capacity)
+        missing = amount + min(reserve * self.capacity, self.capacity - amount) - self.tokens
+        return max(0.0, missing / self.rate) if missing > 0 else 0.0
+
+    def take(self, amount: float) -> None:
+        # The bucket may go into debt (e.g. when a call used more tokens than estimated)
+        self.tokens = max(-self.capacity, self.tokens - amount)
+
+
+class ProviderLimiter:
+    """Request and token buckets for one provider/model, with adaptive slow-down."""
+
+    def __init__(self, key: str, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.key = key
+        self.requests = TokenBucket(rpm) if rpm else None
+        self.tokens = TokenBucket(tpm) if tpm else None
+        self.blocked_until = 0.0
+        self._interactive_waiting = 0
+        self._lock = threading.Lock()
+
+    def _buckets(self):
+        return [bucket for bucket in (self.requests, self.tokens) if bucket is not None]
+
+    def _wait_time(self, tokens: float, priority: str, now: float) -> float:
+        for bucket in self._buckets():
+            bucket.refill(now)
+        wait = max(0.0, self.blocked_until - now)
+        if priority == BATCH and self._interactive_waiting:
+            # Batch calls yield to waiting interactive calls
+            wait = max(wait, 0.05)
+        reserve = settings.RATE_LIMIT_BATCH_RESERVE if priority == BATCH else 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.wait_time(1, reserve))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.wait_time(tokens, reserve))
+        return wait
+
+    def acquire(self, tokens: float = 0.0, priority: str = INTERACTIVE, max_wait: Optional[float] = None) -> float:
+        """
+        Block until the call may proceed, then charge one request and the estimated tokens.
+
+        Args:
+            tokens: Estimated tokens of the call
+            priority: "interactive" or "batch"
+            max_wait: Longest acceptable wait in seconds
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            RateLimitTimeout: If the call would wait longer than max_wait
+        """
+        start = time.monotonic()
+        waiting = False
+        slept = False
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, priority, now)
+                    if wait <= 0:
+                        if self.requests is not None:
+                            self.requests.take(1)
+                        if self.tokens is not None and tokens:
+                            self.tokens.take(tokens)
+                        return now - start if slept else 0.0
+                    if max_wait is not None and now - start + wait > max_wait:
+                        raise RateLimitTimeout(f"Rate limit for {self.key} would delay the call by {now - start + wait:.1f}s")
+                    if priority == INTERACTIVE and not waiting:
+                        self._interactive_waiting += 1
+                        waiting = True
+                time.sleep(min(wait, 1.0))
+                slept = True
+        finally:
+            if waiting:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+    def settle(self, estimated_tokens: float, actual_tokens: Optional[int]) -> None:
+        """Charge the difference between the actual and estimated token count, and recover rate."""
+        with self._lock:
+            if self.tokens is not None and actual_tokens is not None:
+                self.tokens.take(actual_tokens - estimated_tokens)
+            for bucket in self._buckets():
+                bucket.scale = min(1.0, bucket.scale + RECOVERY_STEP)
+
+    def throttle(self, retry_after: Optional[float]) -> None:
+        """Halve the admitted rate and pause new calls after a rate-limit response."""
+        with self._lock:
+            for bucket in self._buckets():
+                bucket.scale = max(MIN_RATE_SCALE, bucket.scale / 2)
+                bucket.tokens = min(bucket.tokens, 0.0)
+            pause = retry_after if retry_after is not None else 1.0
+            self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+
+    @property
+    def scale(self) -> float:
+        buckets = self._buckets()
+        return min(bucket.scale for bucket in buckets) if buckets else 1.0
+
+
+def _parse_duration(value: Any) -> Optional[float]:
+    """Parse a Retry-After or x-ratelimit-reset value such as "2", "1.5s", "6m0s" or "20ms"."""
+    if value is None:
+        return None
+    text = str(value).strip()
+    try:
+        return float(text)
+    except ValueError:
+        pass
+    parts = re.findall(r"([\d.]+)(ms|s|m|h)", text)
+    if not parts:
+        return None
+    units = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+    return sum(float(number) * units[unit] for number, unit in parts)
+
+
+def _headers(obj: Any) -> Dict[str, str]:
+    headers = getattr(obj, "headers", None)
+    if headers is None:
+        headers = getattr(getattr(obj, "response", None), "headers", None)
+    try:
+        return {str(key).lower(): value for key, value in dict(headers or {}).items()}
+    except (TypeError, ValueError):
+        return {}
+
+
+def rate_limit_delay(error: Exception) -> Optional[float]:
+    """
+    Recognise a rate-limit error and read how long to back off.
+
+    Args:
+        error: Exception raised by a provider SDK
+
+    Returns:
+        Seconds to pause (0.0 if the provider gave no hint), or None if this is not a rate-limit error
+    """
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    code = getattr(error, "code", None)
+    limited = (
+        status == 429
+        or code == 429
+        or type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests")
+    )
+    if not limited:
+        return None
+    headers = _headers(error)
+    for name in ("retry-after", "x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        delay = _parse_duration(headers.get(name))
+        if delay is not None:
+            return delay
+    return 0.0
+
+
+def estimate_call_tokens(call) -> int:
+    """Estimate the tokens a call will consume: about 4 characters per prompt token plus the completion budget."""
+    chars = 0
+    for key, value in call.kwargs.items():
+        if key == "messages":
+            chars += sum(len(message.get("content") or "") for message in value)
+        elif key in ("input", "content", "contents", "_args"):
+            items = value if isinstance(value, list) else [value]
+            chars += sum(len(item) for item in items if isinstance(item, str))
+    return chars // 4 + int(call.kwargs.get("max_tokens") or 0)
+
+
+class RateLimitScheduler:
+    """Process-wide registry of provider limiters, one per entry of the limits."""
+
+    def __init__(self, limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self._limits = dict(limits or {})
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, limits: Dict[str, Dict[str, float]]) -> None:
+        """Replace the limits; existing limiters are discarded."""
+        with self._lock:
+            self._limits = dict(limits)
+            self._limiters = {}
+
+    def limits_for(self, provider: str, model: Optional[str]) -> Tuple[str, Dict[str, float]]:
+        """Return the key and the limits that apply to a provider/model."""
+        key = f"{provider}:{model}" if model else provider
+        if key in self._limits:
+            return key, self._limits[key]
+        return provider, self._limits.get(provider, {})
+
+    def limiter(self, provider: str, model: Optional[str]) -> Optional[ProviderLimiter]:
+        """
+        Return the limiter for a provider/model (None if it has no limits).
+
+        Limiters are shared per limits key: the models without an entry of their own all draw on
+        the one bucket of the provider-wide entry, as they share one quota at the provider.
+        """
+        key, limits = self.limits_for(provider, model)
+        if not limits:
+            return None
+        with self._lock:
+            limiter = self._limiters.get(key)
+            if limiter is None:
+                limiter = ProviderLimiter(key, limits.get("rpm"), limits.get("tpm"))
+                self._limiters[key] = limiter
+            return limiter
+
+
+def _load_limits() -> Dict[str, Dict[str, float]]:
+    limits = dict(DEFAULT_RATE_LIMITS)
+    if settings.RATE_LIMITS:
+        limits.update(json.loads(settings.RATE_LIMITS))
+    return limits
+
+
+scheduler = RateLimitScheduler(_load_limits())
+
+
+def _enabled() -> bool:
+    mode = settings.RATE_LIMIT_MODE.lower()
+    if mode == "auto":
+        # The stand-ins and replayed cassettes have no quota to protect
+        return settings.PROVIDER_MODE.lower() != "offline" and settings.CASSETTE_MODE.lower() != "replay"
+    return mode == "on"
+
+
+def rate_limit_middleware(call, proceed: Callable[[], Any]) -> Any:
+    """Provider middleware admitting each call through the scheduler and reacting to 429s."""
+    limiter = scheduler.limiter(call.provider, call.model) if _enabled() else None
+    if limiter is None:
+        return proceed()
+
+    priority = current_priority()
+    estimated = estimate_call_tokens(call) if limiter.tokens is not None else 0
+    # Never wait past the call's deadline: once it has passed the caller has given up on the
+    # answer (an abandoned pool thread would otherwise still send a paid call)
+    max_wait = settings.RATE_LIMIT_MAX_WAIT_S
+    deadline = getattr(call, "deadline", None)
+    if deadline is not None:
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise RateLimitTimeout(f"{call.provider}.{call.operation} reached its deadline before being admitted")
+        max_wait = left if max_wait is None else min(max_wait, left)
+    waited = limiter.acquire(estimated, priority, max_wait)
+    RATE_LIMIT_WAIT.observe(waited, provider=call.provider, priority=priority)
+    record = current_span()
+    if record is not None and waited > 0:
+        record.set(rate_limit_wait_ms=round(waited * 1000.0, 3))
+    if deadline is not None and time.monotonic() >= deadline:
+        raise RateLimitTimeout(f"{call.provider}.{call.operation} reached its deadline while waiting for the rate limit")
+
+    try:
+        response = proceed()
+    except Exception as e:
+        delay = rate_limit_delay(e)
+        if delay is not None:
+            RATE_LIMIT_HITS.inc(provider=call.provider, model=call.model or "")
+            limiter.throttle(delay or None)
+        raise
+
+    actual = extract_token_usage(call.provider, response).get("total_tokens")
+    limiter.settle(estimated, actual)
+    return response
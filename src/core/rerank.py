@@ -0,0 +1,58 @@
+"""
+Diversity reranking for the FAS analysis system.
+Purpose: Maximal marginal relevance (MMR) selection over retrieved chunk vectors, so that
+overlapping neighbouring chunks of the same page do not fill the top results with near-identical
+text and waste the LLM context on repeats.
+"""
+
+from typing import List, Sequence
+
+import numpy as np
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1.0, norms)
+
+
+def mmr(
+    query_vector: Sequence[float],
+    candidate_vectors: Sequence[Sequence[float]],
+    top_n: int,
+    lambda_mult: float = 0.7
+) -> List[int]:
+    """
+    Select a relevant but diverse subset of candidates by maximal marginal relevance.
+
+    Each step picks the candidate maximizing
+    lambda_mult * sim(query, c) - (1 - lambda_mult) * max(sim(c, s) for s already selected).
+    The candidate similarity matrix is computed once; each step only updates the running
+    maximum with one row of it.
+
+    Args:
+        query_vector: Query embedding
+        candidate_vectors: Embeddings of the candidates, in retrieval order
+        top_n: Number of candidates to select
+        lambda_mult: 1.0 ranks by relevance only, 0.0 by diversity only
+
+    Returns:
+        Indices of the selected candidates, in selection order
+    """
+    matrix = _normalize(np.asarray(candidate_vectors, dtype=np.float32))
+    if matrix.ndim != 2 or not len(matrix):
+        return []
+    query = _normalize(np.asarray(query_vector, dtype=np.float32))
+
+    relevance = matrix @ query
+    similarity = matrix @ matrix.T
+    redundancy = np.zeros(len(matrix), dtype=np.float32)
+    available = np.ones(len(matrix), dtype=bool)
+
+    selected = []
+    for _ in range(min(top_n, len(matrix))):
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        best = int(np.argmax(np.where(available, scores, -np.inf)))
+        selected.append(best)
+        available[best] = False
+        redundancy = np.maximum(redundancy, similarity[best])
+    return selected
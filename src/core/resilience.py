@@ -0,0 +1,339 @@
+"""
+Retries, hedging and deadlines for provider calls in the FAS analysis system.
+Purpose: Retries idempotent provider calls that fail with a transient error (429, 5xx, timeouts,
+connection errors) using jittered exponential backoff, optionally hedges slow calls by sending a
+duplicate once the operation's observed p95 latency has elapsed, and bounds every call by a
+deadline: the per-call limit or the remaining budget of the request, whichever is sooner. The time
+left is passed to the SDK as its request timeout, and calls abandoned at their deadline are counted
+and capped so that a stalled provider cannot pile up threads.
+"""
+
+import contextvars
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, Tuple
+
+from .config import settings
+from .metrics import PROVIDER_ABANDONED_CALLS, PROVIDER_ABANDONED_IN_FLIGHT, PROVIDER_HEDGES, PROVIDER_RETRIES
+from .profiling import current_profile
+from .ratelimit import RateLimitTimeout, rate_limit_delay
+from .tracing import current_span, current_stage
+
+# Operations that can be repeated without side effects beyond the first success.
+# send_message is excluded: a failed attempt may still have reached the server, and a retry would
+# append the turn to the chat history a second time.
+RETRYABLE_OPERATIONS = {
+    "embeddings.create", "chat.completions.create", "generate_content",
+    "query", "fetch", "upsert", "delete", "describe_index_stats", "list_paginated",
+}
+
+# Idempotent reads whose duplicate is cheap, so a second copy may race the first.
+# send_message is excluded: both copies would be appended to the chat history.
+HEDGEABLE_OPERATIONS = {"embeddings.create", "query", "fetch"}
+
+# LLM generations, hedged only with settings.HEDGE_LLM_CALLS, since a duplicate doubles their cost
+HEDGEABLE_LLM_OPERATIONS = {"chat.completions.create", "generate_content"}
+
+TRANSIENT_STATUS_CODES = {408, 429, 500, 502, 503, 504}
+TRANSIENT_ERROR_NAMES = {
+    "APITimeoutError", "APIConnectionError", "RateLimitError", "InternalServerError",
+    "ServiceUnavailable", "DeadlineExceeded", "ResourceExhausted", "TooManyRequests",
+    "ConnectTimeout", "ReadTimeout", "ConnectError",
+}
+
+
+class ProviderDeadlineExceeded(TimeoutError):
+    """Raised when a provider call does not complete before its deadline."""
+
+
+_request_deadline: ContextVar[Optional[float]] = ContextVar("fas_request_deadline", default=None)
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[Optional[float]]:
+    """
+    Bound every provider call made in this context by a shared deadline.
+
+    A nested deadline can only shorten the one already active.
+
+    Args:
+        seconds: Budget from now (None for no request deadline)
+
+    Yields:
+        The absolute deadline (time.monotonic() clock), or None
+    """
+    current = _request_deadline.get()
+    deadline = time.monotonic() + seconds if seconds is not None else None
+    if current is not None and (deadline is None or current < deadline):
+        deadline = current
+    token = _request_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _request_deadline.reset(token)
+
+
+def remaining_time() -> Optional[float]:
+    """Return the seconds left before the request deadline (None if there is none)."""
+    deadline = _request_deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def _call_deadline() -> Optional[float]:
+    deadlines = [deadline for deadline in (
+        _request_deadline.get(),
+        time.monotonic() + settings.PROVIDER_CALL_DEADLINE_S if settings.PROVIDER_CALL_DEADLINE_S > 0 else None
+    ) if deadline is not None]
+    return min(deadlines) if deadlines else None
+
+
+def is_transient(error: Exception) -> bool:
+    """
+    Decide whether a provider error is worth retrying.
+
+    Args:
+        error: Exception raised by the call
+
+    Returns:
+        True for rate limits, server errors, timeouts and connection failures
+    """
+    if isinstance(error, (RateLimitTimeout, ProviderDeadlineExceeded)):
+        return False
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None)
+    if status in TRANSIENT_STATUS_CODES or getattr(error, "code", None) in TRANSIENT_STATUS_CODES:
+        return True
+    return type(error).__name__ in TRANSIENT_ERROR_NAMES or isinstance(error, (TimeoutError, ConnectionError))
+
+
+def backoff_delay(attempt: int, hint: Optional[float] = None) -> float:
+    """
+    Jittered exponential backoff ("full jitter") before the next attempt.
+
+    Args:
+        attempt: Number of attempts made so far (1 after the first failure)
+        hint: Minimum delay requested by the provider (e.g. Retry-After)
+
+    Returns:
+        Seconds to sleep
+    """
+    ceiling = min(settings.RETRY_MAX_DELAY_S, settings.RETRY_BASE_DELAY_S * (2 ** (attempt - 1)))
+    return max(random.uniform(0, ceiling), hint or 0.0)
+
+
+class LatencyTracker:
+    """Recent successful latencies per operation, used to time hedged requests."""
+
+    def __init__(self, window: int = 200):
+        self._samples: Dict[Tuple[str, str, str], Deque[float]] = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, key: Tuple[str, str, str], seconds: float) -> None:
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def p95(self, key: Tuple[str, str, str]) -> Optional[float]:
+        """Return the p95 latency, or None until enough samples are recorded."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < settings.HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+
+
+latencies = LatencyTracker()
+
+
+class _CallPool:
+    """
+    Reusable daemon threads running provider calls.
+
+    Threads are started only when none is idle and exit after a minute without work. They are
+    daemons so that calls abandoned at their deadline never block interpreter exit. Abandoned calls
+    are counted until they finish, so that new calls can be refused while too many are stuck.
+    """
+
+    def __init__(self, idle_timeout: float = 60.0):
+        self._tasks: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._idle = 0
+        self._abandoned = 0
+        self._lock = threading.Lock()
+        self._idle_timeout = idle_timeout
+
+    @property
+    def abandoned(self) -> int:
+        """Number of abandoned calls still running."""
+        return self._abandoned
+
+    def abandon(self, future: Future, call) -> None:
+        """Record a call whose result is no longer awaited, until it finishes."""
+        if future.done():
+            return
+        with self._lock:
+            self._abandoned += 1
+            PROVIDER_ABANDONED_IN_FLIGHT.set(self._abandoned)
+        PROVIDER_ABANDONED_CALLS.inc(provider=call.provider, operation=call.operation)
+        future.add_done_callback(self._release)
+
+    def _release(self, future: Future) -> None:
+        with self._lock:
+            self._abandoned -= 1
+            PROVIDER_ABANDONED_IN_FLIGHT.set(self._abandoned)
+
+    def submit(self, fn: Callable[[], Any]) -> Future:
+        """Run fn on a pool thread with a copy of the caller's context."""
+        future = Future()
+        with self._lock:
+            start_thread = self._idle == 0
+            if not start_thread:
+                self._idle -= 1
+        self._tasks.put((future, contextvars.copy_context(), fn))
+        if start_thread:
+            threading.Thread(target=self._work, name="fas-provider-call", daemon=True).start()
+        return future
+
+    def _work(self) -> None:
+        while True:
+            try:
+                future, context, fn = self._tasks.get(timeout=self._idle_timeout)
+            except queue.Empty:
+                with self._lock:
+                    # Exit unless a task was handed to this thread while the wait timed out
+                    if self._idle > 0 and self._tasks.empty():
+                        self._idle -= 1
+                        return
+                continue
+            try:
+                future.set_result(context.run(_run_profiled, fn))
+            except BaseException as e:
+                future.set_exception(e)
+            with self._lock:
+                self._idle += 1
+
+
+def _run_profiled(fn: Callable[[], Any]) -> Any:
+    """Run a pooled call, sampled as part of its request's stage when the request is profiled."""
+    profile = current_profile()
+    if profile is None:
+        return fn()
+    profile.enter(current_stage())
+    try:
+        return fn()
+    finally:
+        profile.exit()
+
+
+_pool = _CallPool()
+
+
+def _spawn(fn: Callable[[], Any]) -> Future:
+    """Run fn on a pooled daemon thread with a copy of the caller's context."""
+    return _pool.submit(fn)
+
+
+def _abandoned_limit_reached() -> bool:
+    return 0 < settings.PROVIDER_MAX_ABANDONED_CALLS <= _pool.abandoned
+
+
+def _attempt(call, proceed: Callable[[], Any], deadline: Optional[float]) -> Tuple[Any, bool]:
+    """
+    Make one attempt, hedged if enabled, within the deadline.
+
+    Returns:
+        Tuple of (response, whether a hedge was sent)
+    """
+    key = (call.provider, call.operation, call.model or "")
+    hedge_after = None
+    hedgeable = call.operation in HEDGEABLE_OPERATIONS or (
+        settings.HEDGE_LLM_CALLS and call.operation in HEDGEABLE_LLM_OPERATIONS
+    )
+    if settings.HEDGING_ENABLED and hedgeable:
+        hedge_after = latencies.p95(key)
+
+    start = time.monotonic()
+    if deadline is None and hedge_after is None:
+        response = proceed()
+        latencies.record(key, time.monotonic() - start)
+        return response, False
+
+    if _abandoned_limit_reached():
+        # Calls are not returning in time: fail fast rather than park another thread on the provider
+        raise ProviderDeadlineExceeded(
+            f"{call.provider}.{call.operation} refused: {_pool.abandoned} abandoned provider calls are still running"
+        )
+    primary = _spawn(proceed)
+    pending = {primary}
+    hedged = False
+    last_error = None
+    while pending:
+        now = time.monotonic()
+        if deadline is not None and now >= deadline:
+            break
+        timeout = None if deadline is None else deadline - now
+        if hedge_after is not None and not hedged:
+            until_hedge = max(0.0, start + hedge_after - now)
+            timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                latencies.record(key, time.monotonic() - start)
+                if hedged:
+                    outcome = "primary_won" if future is primary else "hedge_won"
+                    PROVIDER_HEDGES.inc(provider=call.provider, operation=call.operation, outcome=outcome)
+                for loser in pending:
+                    _pool.abandon(loser, call)
+                return future.result(), hedged
+            last_error = future.exception()
+        if not pending:
+            raise last_error
+
+        # The primary is slower than the p95: race a duplicate against it
+        if hedge_after is not None and not hedged and time.monotonic() - start >= hedge_after:
+            if _abandoned_limit_reached():
+                hedge_after = None
+            else:
+                pending.add(_spawn(proceed))
+                hedged = True
+
+    for future in pending:
+        _pool.abandon(future, call)
+    raise ProviderDeadlineExceeded(f"{call.provider}.{call.operation} did not complete before its deadline")
+
+
+def resilience_middleware(call, proceed: Callable[[], Any]) -> Any:
+    """Provider middleware adding retries, hedging and deadlines to each call."""
+    max_attempts = max(1, settings.RETRY_MAX_ATTEMPTS) if call.operation in RETRYABLE_OPERATIONS else 1
+    deadline = _call_deadline()
+    call.deadline = deadline
+    record = current_span()
+    hedges = 0
+    attempt = 0
+    while True:
+        attempt += 1
+        if deadline is not None and time.monotonic() >= deadline:
+            # No time left: fail without sending a call whose answer would be discarded
+            raise ProviderDeadlineExceeded(f"{call.provider}.{call.operation} skipped: the deadline has already passed")
+        try:
+            response, hedged = _attempt(call, proceed, deadline)
+            hedges += int(hedged)
+            if record is not None and (attempt > 1 or hedges):
+                record.set(attempts=attempt, hedges=hedges)
+            return response
+        except Exception as e:
+            if attempt >= max_attempts or not is_transient(e):
+                if record is not None and attempt > 1:
+                    record.set(attempts=attempt, hedges=hedges)
+                raise
+            delay = backoff_delay(attempt, rate_limit_delay(e))
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            PROVIDER_RETRIES.inc(provider=call.provider, operation=call.operation)
+            print(f"Retrying {call.provider}.{call.operation} in {delay:.2f}s after {type(e).__name__}: {e} (attempt {attempt + 1}/{max_attempts})")
+            time.sleep(delay)
@@ -0,0 +1,163 @@
+"""
+Per-standard namespace shards for the FAS analysis system.
+Purpose: Each standard's chunks live in a namespace of their own, listed in a JSON manifest that
+maps document types to namespaces. The retriever queries only the shards of the standards it is
+looking for (in parallel), and re-indexing a standard replaces a single shard.
+
+Split an existing single-namespace index into shards and write the manifest:
+    python -m src.core.shards --from-namespace default
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .centroids import iter_index_vectors
+
+
+def shard_namespace(document_type: str) -> str:
+    """Namespace holding the chunks of one document type (e.g. "FAS_28_Murabaha_Deferred_Payment_Sales")."""
+    name = re.sub(r"[^A-Za-z0-9_-]+", "_", document_type.strip()).strip("_")
+    return name[:512] or "unknown"  # Pinecone namespace max length is 512
+
+
+class ShardManifest:
+    """Document type → shard namespace, with the source file and vector count of each shard."""
+
+    def __init__(self, shards: Optional[Dict[str, Dict]] = None):
+        self.shards: Dict[str, Dict] = dict(shards or {})
+
+    @classmethod
+    def load(cls, path: str) -> "ShardManifest":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f).get("shards", {}))
+
+    def save(self, path: str) -> None:
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"shards": self.shards}, f, indent=2, sort_keys=True)
+
+    def record(self, document_type: str, namespace: str, vector_count: int, source_file: str = "") -> None:
+        """Record (or replace) the shard of a document type."""
+        self.shards[document_type] = {
+            "namespace": namespace,
+            "source_file": source_file,
+            "vector_count": vector_count,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+        }
+
+    def namespace(self, document_type: str) -> Optional[str]:
+        """Return the shard namespace of a document type (None if it has no shard)."""
+        shard = self.shards.get(document_type)
+        return shard["namespace"] if shard else None
+
+    @property
+    def document_types(self) -> List[str]:
+        return sorted(self.shards)
+
+    @property
+    def namespaces(self) -> List[str]:
+        return [self.shards[document_type]["namespace"] for document_type in self.document_types]
+
+    def __len__(self) -> int:
+        return len(self.shards)
+
+
+_manifests: Dict[str, Tuple[float, ShardManifest]] = {}
+_manifests_lock = threading.Lock()
+
+
+def get_shard_manifest(path: str) -> Optional[ShardManifest]:
+    """
+    Return the manifest at a path, re-reading it when the file changes.
+
+    Args:
+        path: JSON manifest written by ingestion or by this module's CLI
+
+    Returns:
+        ShardManifest, or None when the path is empty, missing, unreadable or lists no shards
+    """
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        modified = os.path.getmtime(path)
+        with _manifests_lock:
+            cached = _manifests.get(path)
+            if cached is None or cached[0] != modified:
+                cached = (modified, ShardManifest.load(path))
+                _manifests[path] = cached
+    except (OSError, ValueError) as e:
+        print(f"Shard manifest {path} unreadable, searching the default namespace: {e}")
+        return None
+    return cached[1] or None
+
+
+def shard_index(index, manifest: ShardManifest, from_namespace: str = "default", batch_size: int = 100) -> int:
+    """
+    Copy the vectors of one namespace into per-document-type shard namespaces.
+
+    Args:
+        index: Vector index
+        manifest: Manifest updated with every shard written
+        from_namespace: Namespace holding all the chunks
+        batch_size: Vectors read and upserted per request
+
+    Returns:
+        Number of vectors copied (vectors without a document_type are skipped)
+    """
+    batches: Dict[str, List[Dict]] = {}
+    counts: Dict[str, int] = {}
+    sources: Dict[str, str] = {}
+
+    def flush(document_type: str) -> None:
+        index.upsert(vectors=batches.pop(document_type), namespace=shard_namespace(document_type))
+
+    for vector_id, values, metadata in iter_index_vectors(index, from_namespace, batch_size):
+        document_type = metadata.get("document_type")
+        if not document_type or not values:
+            continue
+        batches.setdefault(document_type, []).append({"id": vector_id, "values": values, "metadata": metadata})
+        counts[document_type] = counts.get(document_type, 0) + 1
+        sources.setdefault(document_type, metadata.get("source_filename") or metadata.get("source_file", ""))
+        if len(batches[document_type]) >= batch_size:
+            flush(document_type)
+    for document_type in list(batches):
+        flush(document_type)
+
+    for document_type, count in counts.items():
+        manifest.record(document_type, shard_namespace(document_type), count, sources[document_type])
+    return sum(counts.values())
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Split the configured FAS index into per-standard shards and write the manifest."""
+    project_root = str(Path(__file__).parent.parent.parent)
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from src.core.config import settings
+    from src.core.providers import create_vector_index
+
+    parser = argparse.ArgumentParser(description="Copy a single-namespace FAS index into per-standard namespaces")
+    parser.add_argument("--index", default=settings.PINECONE_INDEX_FAS)
+    parser.add_argument("--from-namespace", default="default")
+    parser.add_argument("--manifest", default=settings.SHARD_MANIFEST_PATH)
+    args = parser.parse_args(argv)
+
+    manifest = ShardManifest.load(args.manifest) if os.path.exists(args.manifest) else ShardManifest()
+    copied = shard_index(create_vector_index(args.index), manifest, from_namespace=args.from_namespace)
+    if not copied:
+        print(f"No vectors with a document_type found in {args.index}/{args.from_namespace}")
+        return 1
+    manifest.save(args.manifest)
+    print(f"Copied {copied} vectors into {len(manifest)} shards; manifest written to {os.path.abspath(args.manifest)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Portable index snapshots for the FAS analysis system.
+Purpose: Exports the vectors, metadata and chunk texts of an index (Pinecone or the in-memory
+backend) to a directory that can be bulk-loaded into either one, so a new environment is rebuilt
+without re-parsing the PDFs or calling the embedding API.
+
+A snapshot directory holds:
+    snapshot.json   format version, dimension, vector count per namespace and the shard manifest
+    vectors.npy     float32 matrix of all vectors, one row per record (memory-mappable)
+    records.jsonl   one {"id", "namespace", "metadata", "text"} line per row, in matrix order
+
+    python -m src.core.snapshot export --output snapshots/fas
+    python -m src.core.snapshot import --input snapshots/fas --index fas-staging
+"""
+
+import argparse
+import contextvars
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .centroids import _get, iter_index_vectors
+
+SNAPSHOT_FORMAT = 1
+META_FILE = "snapshot.json"
+VECTORS_FILE = "vectors.npy"
+RECORDS_FILE = "records.jsonl"
+
+
+@dataclass
+class Snapshot:
+    """A loaded snapshot; `vectors` is memory-mapped, so rows are read from disk on demand."""
+    meta: Dict
+    records: List[Dict]
+    vectors: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+
+def index_namespaces(index) -> List[str]:
+    """Return the namespaces of an index that hold vectors."""
+    namespaces = _get(index.describe_index_stats(), "namespaces", {}) or {}
+    return sorted(name for name, stats in namespaces.items() if _get(stats, "vector_count", 0))
+
+
+def export_snapshot(
+    index,
+    path: str,
+    namespaces: Optional[List[str]] = None,
+    chunk_store=None,
+    shards: Optional[Dict] = None,
+    batch_size: int = 100
+) -> int:
+    """
+    Write every vector of the given namespaces to a snapshot directory.
+
+    Args:
+        index: Vector index exposing describe_index_stats, list_paginated and fetch
+        path: Output directory
+        namespaces: Namespaces to export (defaults to all non-empty namespaces)
+        chunk_store: Optional ChunkStore supplying the full chunk texts
+        shards: Optional shard manifest entries stored with the snapshot
+        batch_size: Vectors listed and fetched per request
+
+    Returns:
+        Number of vectors written
+    """
+    namespaces = namespaces or index_namespaces(index)
+    Path(path).mkdir(parents=True, exist_ok=True)
+    rows, counts = [], {}
+    with open(os.path.join(path, RECORDS_FILE), "w", encoding="utf-8") as records_file:
+        for namespace in namespaces:
+            batch = []
+            for vector_id, values, metadata in iter_index_vectors(index, namespace, batch_size):
+                if values:
+                    batch.append((vector_id, values, metadata))
+            texts = chunk_store.get_texts([vector_id for vector_id, _, _ in batch]) if chunk_store is not None and batch else {}
+            for vector_id, values, metadata in batch:
+                text = texts.get(vector_id) or metadata.get("text", "")
+                records_file.write(json.dumps({"id": vector_id, "namespace": namespace, "metadata": metadata, "text": text}) + "\n")
+                rows.append(np.asarray(values, dtype=np.float32))
+            counts[namespace] = len(batch)
+
+    vectors = np.vstack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+    np.save(os.path.join(path, VECTORS_FILE), vectors)
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "index": getattr(index, "name", ""),
+        "dimension": int(vectors.shape[1]) if rows else 0,
+        "count": len(rows),
+        "namespaces": counts,
+        "shards": shards or {},
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    }
+    with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return len(rows)
+
+
+def load_snapshot(path: str) -> Snapshot:
+    """
+    Open a snapshot directory.
+
+    Raises:
+        ValueError: If the directory is not a snapshot of a supported format or its files disagree
+    """
+    with open(os.path.join(path, META_FILE), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta.get("format") != SNAPSHOT_FORMAT:
+        raise ValueError(f"Unsupported snapshot format {meta.get('format')!r} in {path}")
+    with open(os.path.join(path, RECORDS_FILE), "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    vectors = np.load(os.path.join(path, VECTORS_FILE), mmap_mode="r")
+    if len(records) != vectors.shape[0]:
+        raise ValueError(f"Snapshot {path} has {len(records)} records but {vectors.shape[0]} vectors")
+    return Snapshot(meta, records, vectors)
+
+
+def import_snapshot(
+    index,
+    snapshot: Snapshot,
+    chunk_store=None,
+    text_in_metadata: bool = False,
+    batch_size: int = 100,
+    workers: int = 1
+) -> int:
+    """
+    Bulk-load a snapshot into an index.
+
+    Args:
+        index: Vector index of the snapshot's dimension
+        snapshot: Loaded snapshot
+        chunk_store: Optional ChunkStore receiving the chunk texts
+        text_in_metadata: Put each text into metadata["text"] (for the in-memory backend, which
+            has no payload size concern)
+        batch_size: Vectors per upsert
+        workers: Upserts sent concurrently
+
+    Returns:
+        Number of vectors loaded
+    """
+    batches: List[tuple] = []
+    for namespace in snapshot.meta.get("namespaces", {}):
+        positions = [i for i, record in enumerate(snapshot.records) if record["namespace"] == namespace]
+        for start in range(0, len(positions), batch_size):
+            batches.append((namespace, positions[start:start + batch_size]))
+
+    def upsert(namespace: str, positions: List[int]) -> int:
+        vectors = []
+        for position in positions:
+            record = snapshot.records[position]
+            metadata = dict(record["metadata"], text=record["text"]) if text_in_metadata and record["text"] else record["metadata"]
+            vectors.append({"id": record["id"], "values": snapshot.vectors[position].tolist(), "metadata": metadata})
+        index.upsert(vectors=vectors, namespace=namespace)
+        return len(vectors)
+
+    if workers > 1:
+        # Each upsert runs in a copy of the caller's context so call priority and tracing apply
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, upsert, namespace, positions) for namespace, positions in batches]
+            loaded = sum(future.result() for future in futures)
+    else:
+        loaded = sum(upsert(namespace, positions) for namespace, positions in batches)
+
+    if chunk_store is not None:
+        chunk_store.put_many(
+            (record["id"], record["text"], dict(record["metadata"], namespace=record["namespace"]))
+            for record in snapshot.records if record["text"]
+        )
+    return loaded
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Export the configured FAS index to a snapshot, or load a snapshot into an index."""
+    project_root = str(Path(__file__).parent.parent.parent)
+    if project_root not in sys.path:
+        sys.path.append(project_root)
+    from src.core.chunk_store import ChunkStore, get_chunk_store
+    from src.core.config import settings
+    from src.core.providers import create_vector_index
+    from src.core.ratelimit import BATCH, call_priority
+    from src.core.shards import ShardManifest, get_shard_manifest
+
+    parser = argparse.ArgumentParser(description="Export or import a portable snapshot of the FAS index")
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write an index to a snapshot directory")
+    export_parser.add_argument("--index", default=settings.PINECONE_INDEX_FAS)
+    export_parser.add_argument("--output", required=True)
+    export_parser.add_argument("--namespace", action="append", help="Namespace to export (repeatable; default: all)")
+    import_parser = commands.add_parser("import", help="Bulk-load a snapshot directory into an index")
+    import_parser.add_argument("--input", required=True)
+    import_parser.add_argument("--index", default=settings.PINECONE_INDEX_FAS)
+    import_parser.add_argument("--workers", type=int, default=4)
+    import_parser.add_argument("--no-chunk-store", action="store_true", help=f"Do not write the texts to {settings.CHUNK_STORE_PATH}")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with call_priority(BATCH):
+        if args.command == "export":
+            manifest = get_shard_manifest(settings.SHARD_MANIFEST_PATH)
+            count = export_snapshot(
+                create_vector_index(args.index),
+                args.output,
+                namespaces=args.namespace,
+                chunk_store=get_chunk_store(settings.CHUNK_STORE_PATH),
+                shards=manifest.shards if manifest else None
+            )
+            print(f"Exported {count} vectors from {args.index} to {args.output} in {time.perf_counter() - start:.1f}s")
+            return 0 if count else 1
+
+        snapshot = load_snapshot(args.input)
+        chunk_store = None if args.no_chunk_store else ChunkStore(settings.CHUNK_STORE_PATH)
+        count = import_snapshot(
+            create_vector_index(args.index, dimension=snapshot.meta["dimension"]),
+            snapshot,
+            chunk_store=chunk_store,
+            workers=args.workers
+        )
+        if snapshot.meta.get("shards"):
+            ShardManifest(snapshot.meta["shards"]).save(settings.SHARD_MANIFEST_PATH)
+            print(f"Shard manifest written to {settings.SHARD_MANIFEST_PATH}")
+        print(f"Imported {count} vectors from {args.input} into {args.index} in {time.perf_counter() - start:.1f}s")
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Request tracing for the FAS analysis system.
+Purpose: Records a trace per analysis request with a span for every agent stage and every outbound
+provider call (embedding, vector query, LLM call), including payload sizes and token counts.
+Stage and provider durations are also aggregated into the histograms served at /metrics.
+"""
+
+import json
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from .config import settings
+from .metrics import (
+    PROVIDER_CALL_DURATION,
+    PROVIDER_CALLS,
+    PROVIDER_REQUEST_CHARS,
+    STAGE_DURATION,
+    STAGE_ERRORS
+)
+from .profiling import current_profile
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    def __init__(self, name: str, kind: str, parent_id: Optional[str], attributes: Dict):
+        self.name = name
+        self.kind = kind
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.status = "ok"
+        self.start_time = time.time()
+        self.duration_ms = 0.0
+
+    def set(self, **attributes) -> None:
+        """Add attributes to the span."""
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> Dict:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes
+        }
+
+
+class Trace:
+    """All spans recorded for one request."""
+
+    def __init__(self, name: str, attributes: Optional[Dict] = None):
+        self.name = name
+        self.trace_id = uuid.uuid4().hex
+        self.attributes = dict(attributes or {})
+        self.start_time = time.time()
+        self.duration_ms = 0.0
+        self.spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    def add(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def find(self, name: str) -> List[Span]:
+        """Return the spans with the given name."""
+        with self._lock:
+            return [span for span in self.spans if span.name == name]
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            spans = [span.to_dict() for span in self.spans]
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "spans": spans
+        }
+
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("fas_trace", default=None)
+_current_span: ContextVar[Optional[Span]] = ContextVar("fas_span", default=None)
+_current_stage: ContextVar[Optional[str]] = ContextVar("fas_stage", default=None)
+
+_recent_traces: deque = deque(maxlen=max(1, settings.TRACE_BUFFER_SIZE))
+_export_lock = threading.Lock()
+
+
+def current_trace() -> Optional[Trace]:
+    """Return the trace of the request running in the current context."""
+    return _current_trace.get()
+
+
+def current_span() -> Optional[Span]:
+    """Return the innermost open span in the current context."""
+    return _current_span.get()
+
+
+def current_stage() -> Optional[str]:
+    """Return the name of the innermost stage span in the current context."""
+    return _current_stage.get()
+
+
+def recent_traces() -> List[Dict]:
+    """Return the most recently completed traces, newest last."""
+    return [trace.to_dict() for trace in list(_recent_traces)]
+
+
+def _finish_trace(trace: Trace) -> None:
+    _recent_traces.append(trace)
+    if settings.TRACE_EXPORT_PATH:
+        line = json.dumps(trace.to_dict(), default=str)
+        with _export_lock:
+            with open(settings.TRACE_EXPORT_PATH, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+
+
+@contextmanager
+def start_trace(name: str, **attributes) -> Iterator[Trace]:
+    """
+    Start a trace for a request, or join the trace already active in this context.
+
+    Args:
+        name: Name of the request (e.g. the route)
+        **attributes: Attributes attached to a new trace
+
+    Yields:
+        The active Trace
+    """
+    existing = _current_trace.get()
+    if existing is not None:
+        yield existing
+        return
+
+    trace = Trace(name, attributes)
+    token = _current_trace.set(trace)
+    start = time.perf_counter()
+    try:
+        yield trace
+    finally:
+        trace.duration_ms = (time.perf_counter() - start) * 1000.0
+        _current_trace.reset(token)
+        if settings.TRACING_ENABLED:
+            _finish_trace(trace)
+
+
+@contextmanager
+def span(name: str, kind: str = "stage", **attributes) -> Iterator[Span]:
+    """
+    Time an operation as a span of the current trace.
+
+    Stage spans are also observed in the fas_stage_duration_seconds histogram.
+
+    Args:
+        name: Span name (e.g. "deconstruct")
+        kind: "stage" for agent steps, "provider" for outbound calls
+        **attributes: Initial span attributes
+
+    Yields:
+        The Span, so callers can add attributes
+    """
+    parent = _current_span.get()
+    record = Span(name, kind, parent.span_id if parent else None, dict(attributes))
+    token = _current_span.set(record)
+    stage_token = _current_stage.set(name) if kind == "stage" else None
+    # A profiled request samples every thread while it is inside one of the request's spans
+    profile = current_profile()
+    if profile is not None:
+        profile.enter(_current_stage.get())
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record.status = "error"
+        record.attributes["error"] = str(e)
+        if kind == "stage":
+            STAGE_ERRORS.inc(stage=name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        record.duration_ms = elapsed * 1000.0
+        if profile is not None:
+            profile.exit()
+        _current_span.reset(token)
+        if stage_token is not None:
+            _current_stage.reset(stage_token)
+        if kind == "stage":
+            STAGE_DURATION.observe(elapsed, stage=name)
+        trace = _current_trace.get()
+        if trace is not None and settings.TRACING_ENABLED:
+            trace.add(record)
+
+
+def _field(obj: Any, name: str, default: Any = None) -> Any:
+    """Read a field from an SDK object or a dictionary."""
+    if obj is None:
+        return default
+    if isinstance(obj, dict):
+        return obj.get(name, default)
+    return getattr(obj, name, default)
+
+
+def extract_token_usage(provider: str, response: Any) -> Dict[str, int]:
+    """
+    Read prompt, completion and total token counts from a provider response.
+
+    Args:
+        provider: "openai" or "gemini" (other providers report no tokens)
+        response: SDK response object or replayed dictionary
+
+    Returns:
+        Dictionary with prompt_tokens, completion_tokens and total_tokens (empty if unknown)
+    """
+    if provider == "openai":
+        usage = _field(response, "usage")
+        if usage is None:
+            return {}
+        prompt = _field(usage, "prompt_tokens", 0) or 0
+        completion = _field(usage, "completion_tokens", 0) or 0
+        total = _field(usage, "total_tokens", 0) or prompt + completion
+    elif provider == "gemini":
+        usage = _field(response, "usage_metadata")
+        if usage is None:
+            return {}
+        prompt = _field(usage, "prompt_token_count", 0) or 0
+        completion = _field(usage, "candidates_token_count", 0) or 0
+        total = _field(usage, "total_token_count", 0) or prompt + completion
+    else:
+        return {}
+    return {"prompt_tokens": int(prompt), "completion_tokens": int(completion), "total_tokens": int(total)}
+
+
+def _request_size(kwargs: Dict) -> Dict[str, int]:
+    """Measure the text and vectors sent in a provider call."""
+    chars = 0
+    sizes = {}
+    for key, value in kwargs.items():
+        if key in ("input", "content", "contents") and isinstance(value, str):
+            chars += len(value)
+        elif key == "messages":
+            chars += sum(len(message.get("content") or "") for message in value)
+        elif key == "input" and isinstance(value, list):
+            chars += sum(len(item) for item in value if isinstance(item, str))
+        elif key == "vector":
+            sizes["vector_dim"] = len(value)
+        elif key == "vectors":
+            sizes["vectors"] = len(value)
+        elif key == "_args":
+            chars += sum(len(item) for item in value if isinstance(item, str))
+    sizes["request_chars"] = chars
+    return sizes
+
+
+def _response_size(call, response: Any) -> Dict[str, int]:
+    """Measure the payload returned by a provider call."""
+    if call.operation == "query":
+        return {"matches": len(_field(response, "matches", []) or [])}
+    if call.operation == "embeddings.create":
+        return {"embeddings": len(_field(response, "data", []) or [])}
+    if call.operation == "chat.completions.create":
+        choices = _field(response, "choices", []) or []
+        content = _field(_field(choices[0], "message"), "content", "") if choices else ""
+        return {"response_chars": len(content or "")}
+    if call.provider == "gemini":
+        return {"response_chars": len(_field(response, "text", "") or "")}
+    return {}
+
+
+def tracing_middleware(call, proceed: Callable[[], Any]) -> Any:
+    """Provider middleware recording a span and metrics for each outbound call."""
+    name = f"{call.provider}.{call.operation}"
+    sizes = _request_size(call.kwargs)
+    PROVIDER_REQUEST_CHARS.inc(sizes.get("request_chars", 0), provider=call.provider, operation=call.operation)
+    start = time.perf_counter()
+    status = "ok"
+    with span(name, kind="provider", model=call.model, **sizes) as record:
+        try:
+            response = proceed()
+        except Exception:
+            status = "error"
+            raise
+        finally:
+            PROVIDER_CALL_DURATION.observe(time.perf_counter() - start, provider=call.provider, operation=call.operation, model=call.model or "")
+            PROVIDER_CALLS.inc(provider=call.provider, operation=call.operation, status=status)
+        record.set(**_response_size(call, response), **extract_token_usage(call.provider, response))
+        if call.kwargs.get("namespace") is not None:
+            record.set(namespace=call.kwargs["namespace"])
+    return response
@@ -0,0 +1,143 @@
+"""
+Token usage and cost accounting for the FAS analysis system.
+Purpose: Reads the token counts reported by every LLM and embedding call, attributes them to the
+agent stage that made the call, aggregates them per request and totals them in process-wide counters.
+"""
+
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from .metrics import PROVIDER_COST, PROVIDER_TOKENS
+from .tracing import current_stage, extract_token_usage
+
+# USD per 1M tokens as (input, output); update when provider pricing changes.
+# Model names are matched by longest prefix, so dated snapshots use the base price.
+MODEL_PRICES = {
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "text-embedding-3-small": (0.02, 0.0),
+    "text-embedding-3-large": (0.13, 0.0),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "gemini-pro": (0.50, 1.50),
+}
+
+
+def estimate_cost(model: Optional[str], prompt_tokens: int, completion_tokens: int) -> float:
+    """
+    Estimate the USD cost of a call from its token counts.
+
+    Args:
+        model: Model name (unknown models cost 0.0)
+        prompt_tokens: Input tokens
+        completion_tokens: Output tokens
+
+    Returns:
+        Estimated cost in USD
+    """
+    if not model:
+        return 0.0
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    if not matches:
+        return 0.0
+    input_price, output_price = MODEL_PRICES[max(matches, key=len)]
+    return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+
+
+def _empty_usage() -> Dict[str, float]:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "cost_usd": 0.0}
+
+
+class UsageTracker:
+    """Token usage of one request, broken down by stage."""
+
+    def __init__(self):
+        self.by_stage: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage: str, usage: Dict[str, int], cost: float) -> None:
+        """Add the usage of one call to a stage."""
+        with self._lock:
+            totals = self.by_stage.setdefault(stage, _empty_usage())
+            totals["calls"] += 1
+            for key in ("prompt_tokens", "completion_tokens", "total_tokens"):
+                totals[key] += usage.get(key, 0)
+            totals["cost_usd"] += cost
+
+    def stage_usage(self, stage: str) -> Dict[str, float]:
+        """Return the usage recorded for a stage."""
+        with self._lock:
+            usage = dict(self.by_stage.get(stage) or _empty_usage())
+        usage["cost_usd"] = round(usage["cost_usd"], 6)
+        return usage
+
+    def totals(self) -> Dict[str, float]:
+        """Return the usage summed over all stages."""
+        totals = _empty_usage()
+        with self._lock:
+            for usage in self.by_stage.values():
+                for key in totals:
+                    totals[key] += usage[key]
+        totals["cost_usd"] = round(totals["cost_usd"], 6)
+        return totals
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            stages = list(self.by_stage)
+        return {
+            "total": self.totals(),
+            "by_stage": {stage: self.stage_usage(stage) for stage in stages}
+        }
+
+
+_current_tracker: ContextVar[Optional[UsageTracker]] = ContextVar("fas_usage", default=None)
+
+
+def current_usage() -> Optional[UsageTracker]:
+    """Return the usage tracker of the request running in the current context."""
+    return _current_tracker.get()
+
+
+@contextmanager
+def track_usage() -> Iterator[UsageTracker]:
+    """
+    Track token usage for a request, or join the tracker already active in this context.
+
+    Yields:
+        The active UsageTracker
+    """
+    existing = _current_tracker.get()
+    if existing is not None:
+        yield existing
+        return
+
+    tracker = UsageTracker()
+    token = _current_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _current_tracker.reset(token)
+
+
+def usage_middleware(call, proceed: Callable[[], Any]) -> Any:
+    """Provider middleware recording the tokens and cost reported by each call."""
+    response = proceed()
+    usage = extract_token_usage(call.provider, response)
+    if not usage:
+        return response
+
+    stage = current_stage() or "other"
+    model = call.model or ""
+    cost = estimate_cost(model, usage["prompt_tokens"], usage["completion_tokens"])
+    PROVIDER_TOKENS.inc(usage["prompt_tokens"], provider=call.provider, model=model, stage=stage, kind="prompt")
+    PROVIDER_TOKENS.inc(usage["completion_tokens"], provider=call.provider, model=model, stage=stage, kind="completion")
+    PROVIDER_COST.inc(cost, provider=call.provider, model=model, stage=stage)
+
+    tracker = _current_tracker.get()
+    if tracker is not None:
+        tracker.add(stage, usage, cost)
+    return response
@@ -1,53 +1,199 @@
 """
 LangGraph workflow for FAS analysis system.
+Purpose: Runs the agent stages as a graph: deconstruct → retrieve, then summarize and applicability
+as parallel branches (both only need the retrieved documents). Node outputs are saved by a
+checkpointer keyed by thread, so a run that fails or times out resumes from the last completed
+node instead of repeating the LLM calls already made. Completed runs are only kept on threads the
+caller names; the default per-transaction thread is dropped once its run completes.
+
+    deconstruct → retrieve ─┬→ summarize ─────┬→ END
+                            └→ applicability ─┘
 """
 
-from typing import Dict, List, TypedDict, Annotated
-from langgraph.graph import Graph, StateGraph
-from langgraph.prebuilt import ToolNode
-import operator
+import hashlib
+import sqlite3
+from pathlib import Path
+from typing import Annotated, Dict, List, Optional, TypedDict
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
 
-from ..agents.transaction_deconstructor import TransactionDeconstructor
-from ..agents.fas_retriever import FASRetriever
 from ..agents.fas_applicability import FASApplicability
+from ..agents.fas_retriever import FASDocument
+from ..agents.orchestrator import Orchestrator, OrchestratorResult
+from .config import settings
+from .resilience import request_deadline
+from .tracing import start_trace
+from .usage import track_usage
+
+
+def _merge_degraded(current: Optional[Dict[str, str]], update: Optional[Dict[str, str]]) -> Dict[str, str]:
+    """Reducer for the degraded stages, which the parallel branches update in the same step."""
+    return {**(current or {}), **(update or {})}
+
 
-class AgentState(TypedDict):
-    """State for the agent workflow."""
+class AgentState(TypedDict, total=False):
+    """
+    State for the agent workflow.
+
+    Documents and verdicts are stored as plain dictionaries so that every checkpoint serializes.
+    """
     transaction_text: str
-    components: Dict
+    transaction_analysis: Dict
+    search_query: str
     fas_documents: List[Dict]
-    results: List[Dict]
+    fas_summaries: Dict[str, str]
+    fas_applicability: List[Dict]
+    degraded: Annotated[Dict[str, str], _merge_degraded]
+
+
+def create_checkpointer(path: Optional[str] = None):
+    """
+    Create the checkpointer that persists node outputs.
+
+    Args:
+        path: SQLite file for checkpoints (defaults to settings.WORKFLOW_CHECKPOINT_PATH; empty
+            keeps them in memory, which only resumes runs within this process)
+
+    Returns:
+        LangGraph checkpointer
+    """
+    path = settings.WORKFLOW_CHECKPOINT_PATH if path is None else path
+    if not path:
+        return MemorySaver()
+    try:
+        from langgraph.checkpoint.sqlite import SqliteSaver
+    except ImportError:
+        print("langgraph-checkpoint-sqlite is not installed; workflow checkpoints are kept in memory")
+        return MemorySaver()
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
 
-def create_workflow(
-    transaction_deconstructor: TransactionDeconstructor,
-    fas_retriever: FASRetriever,
-    fas_applicability: FASApplicability
-) -> Graph:
+def create_workflow(orchestrator: Optional[Orchestrator] = None, checkpointer=None):
     """
     Create the LangGraph workflow for FAS analysis.
-    
+
+    Each node runs one Orchestrator stage, so deadlines, degradation, tracing and usage tracking
+    behave as in Orchestrator.analyze_transaction.
+
     Args:
-        transaction_deconstructor: Transaction deconstructor agent
-        fas_retriever: FAS retriever agent
-        fas_applicability: FAS applicability agent
-        
+        orchestrator: Orchestrator whose agents run the stages (created if omitted)
+        checkpointer: Checkpointer for node outputs (create_checkpointer() if omitted)
+
     Returns:
-        Configured LangGraph workflow
+        Compiled LangGraph workflow
     """
+    orchestrator = orchestrator or Orchestrator()
+
+    def deconstruct(state: AgentState) -> Dict:
+        degraded = {}
+        analysis = orchestrator.run_deconstruct(state["transaction_text"], degraded)
+        return {"transaction_analysis": analysis, "degraded": degraded}
+
+    def retrieve(state: AgentState) -> Dict:
+        degraded = {}
+        search_query, documents = orchestrator.run_retrieve(
+            state["transaction_analysis"], state["transaction_text"], degraded
+        )
+        return {
+            "search_query": search_query,
+            "fas_documents": [doc.model_dump() for doc in documents],
+            "degraded": degraded
+        }
+
+    def summarize(state: AgentState) -> Dict:
+        degraded = {}
+        documents = [FASDocument(**doc) for doc in state["fas_documents"]]
+        summaries = orchestrator.run_summarize(orchestrator._group_documents_by_type(documents), degraded)
+        return {"fas_summaries": summaries, "degraded": degraded}
+
+    def applicability(state: AgentState) -> Dict:
+        degraded = {}
+        documents = [FASDocument(**doc) for doc in state["fas_documents"]]
+        verdicts = orchestrator.run_applicability(state["transaction_text"], documents, degraded)
+        return {"fas_applicability": [item.model_dump() for item in verdicts], "degraded": degraded}
+
     # Initialize workflow
     workflow = StateGraph(AgentState)
-    
+
     # Add nodes
-    workflow.add_node("deconstruct", transaction_deconstructor.deconstruct)
-    workflow.add_node("retrieve", fas_retriever.retrieve)
-    workflow.add_node("determine", fas_applicability.determine_applicability)
-    
-    # Define edges
+    workflow.add_node("deconstruct", deconstruct)
+    workflow.add_node("retrieve", retrieve)
+    workflow.add_node("summarize", summarize)
+    workflow.add_node("applicability", applicability)
+
+    # Define edges: summarization and applicability run in parallel after retrieval
+    workflow.add_edge(START, "deconstruct")
     workflow.add_edge("deconstruct", "retrieve")
-    workflow.add_edge("retrieve", "determine")
-    
-    # Set entry point
-    workflow.set_entry_point("deconstruct")
-    
+    workflow.add_edge("retrieve", "summarize")
+    workflow.add_edge("retrieve", "applicability")
+    workflow.add_edge("summarize", END)
+    workflow.add_edge("applicability", END)
+
     # Compile workflow
-    return workflow.compile() 
\ No newline at end of file
+    return workflow.compile(checkpointer=checkpointer if checkpointer is not None else create_checkpointer())
+
+
+def workflow_thread_id(transaction_text: str) -> str:
+    """Default checkpoint thread of a transaction, so a retry of the same text resumes its unfinished run."""
+    return "fas-" + hashlib.sha256(" ".join(transaction_text.split()).encode("utf-8")).hexdigest()[:32]
+
+
+def run_workflow(
+    workflow,
+    transaction_text: str,
+    thread_id: Optional[str] = None,
+    deadline_s: Optional[float] = None
+) -> OrchestratorResult:
+    """
+    Run the workflow for a transaction, resuming its thread if an earlier run stopped part-way.
+
+    If a node raised (an error or a deadline), re-running the same thread only executes the nodes
+    that had not completed; a branch that finished alongside the failed one is not repeated.
+    The default thread, derived from the text, only serves to resume: it is dropped when its run
+    completes, so the next analysis of the same text runs afresh. A thread_id passed by the caller
+    is kept, and running it again once completed returns its stored result. Concurrent runs of the
+    same text share the default thread, so they should pass their own thread_id.
+
+    Args:
+        workflow: Compiled workflow from create_workflow
+        transaction_text: The original transaction text to analyze
+        thread_id: Checkpoint thread whose completed result is kept (defaults to
+            workflow_thread_id(transaction_text), dropped on completion)
+        deadline_s: Time budget for this run in seconds (defaults to settings.REQUEST_DEADLINE_S;
+            None or 0 for no deadline)
+
+    Returns:
+        OrchestratorResult; its usage covers only the nodes executed by this call
+    """
+    keep_thread = thread_id is not None
+    thread_id = thread_id if keep_thread else workflow_thread_id(transaction_text)
+    config = {"configurable": {"thread_id": thread_id}}
+    if deadline_s is None:
+        deadline_s = settings.REQUEST_DEADLINE_S
+    snapshot = workflow.get_state(config)
+    with start_trace("workflow", thread_id=config["configurable"]["thread_id"]) as trace, track_usage() as usage, \
+            request_deadline(deadline_s or None):
+        if snapshot.next:
+            print(f"Resuming workflow at {', '.join(snapshot.next)}")
+            trace.attributes["resumed_at"] = list(snapshot.next)
+            state = workflow.invoke(None, config)
+        elif keep_thread and snapshot.values.get("fas_applicability") is not None:
+            state = snapshot.values
+        else:
+            if snapshot.values:
+                # Start from an empty state, not on top of a finished run's values
+                workflow.checkpointer.delete_thread(thread_id)
+            state = workflow.invoke({"transaction_text": transaction_text, "degraded": {}}, config)
+        if not keep_thread:
+            workflow.checkpointer.delete_thread(thread_id)
+
+        return OrchestratorResult(
+            transaction_analysis=state["transaction_analysis"],
+            fas_documents=[FASDocument(**doc) for doc in state["fas_documents"]],
+            fas_summaries=state.get("fas_summaries", {}),
+            fas_applicability=[FASApplicability(**item) for item in state["fas_applicability"]],
+            usage=usage.to_dict(),
+            degraded=state.get("degraded", {})
+        )
@@ -0,0 +1,57 @@
+"""
+Test script for the performance benchmark suite.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from benchmarks.run_benchmark import (
+    STAGES,
+    build_report,
+    compare_to_baseline,
+    load_transactions,
+    percentile,
+    run_orchestrator_benchmark
+)
+from src.tests.test_providers import OfflineTestCase
+
+class TestBenchmark(OfflineTestCase):
+    def test_percentile(self):
+        """Test interpolated percentiles."""
+        values = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.assertEqual(percentile(values, 50), 3.0)
+        self.assertEqual(percentile(values, 100), 5.0)
+        self.assertAlmostEqual(percentile(values, 95), 4.8)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_regression_threshold(self):
+        """Test that only regressions above the threshold are reported."""
+        baseline = {"latency_ms": {"total": {"p50": 100.0, "p95": 200.0, "p99": 300.0}}, "throughput_rps": 10.0}
+        report = {"latency_ms": {"total": {"p50": 105.0, "p95": 260.0, "p99": 300.0}}, "throughput_rps": 9.5, "peak_rss_mb": 50.0}
+        regressions = compare_to_baseline(report, baseline, threshold=0.1)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith("total p95"))
+
+    def test_orchestrator_run_reports_every_stage(self):
+        """Test a short offline run through the orchestrator."""
+        samples, wall_seconds = run_orchestrator_benchmark(load_transactions(), requests=3, concurrency=2, warmup=0)
+        report = build_report(samples, wall_seconds, {"target": "orchestrator"})
+
+        self.assertEqual(report["errors"], 0)
+        self.assertGreater(report["throughput_rps"], 0)
+        for stage in STAGES:
+            self.assertEqual(report["latency_ms"][stage]["count"], 3, stage)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
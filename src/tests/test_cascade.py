@@ -0,0 +1,104 @@
+"""
+Test script for the applicability model cascade.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agents.fas_applicability import FASApplicability, FASApplicabilityAgent
+from src.core.config import settings
+from src.core.metrics import APPLICABILITY_TIER_OUTCOMES
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+EXCERPTS = {
+    "FAS 28 Murabaha Deferred Payment Sales": [
+        "Murabaha is a sale of goods at cost plus an agreed markup with deferred payment.",
+        "Deferred payment receivables are measured at amortised cost."
+    ],
+    "FAS 32 Ijarah": [
+        "Ijarah is a contract for the transfer of the usufruct of an asset for an agreed rental.",
+        "The lessee shall recognise a right-of-use asset."
+    ]
+}
+
+MURABAHA = "The bank sold goods under Murabaha at cost plus markup; the deferred payment receivable is due in installments."
+
+class TestCascade(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._previous = (settings.APPLICABILITY_MODE, settings.APPLICABILITY_CASCADE)
+        settings.APPLICABILITY_MODE = "cascade"
+
+    def tearDown(self):
+        settings.APPLICABILITY_MODE, settings.APPLICABILITY_CASCADE = self._previous
+        super().tearDown()
+
+    def test_local_scorer(self):
+        """Test that the local tier ranks the standard sharing the transaction's terms first."""
+        results = FASApplicabilityAgent()._local_applicability(MURABAHA, EXCERPTS)
+        self.assertEqual(results[0].fas_id, "FAS 28")
+        self.assertEqual(results[0].fas_name, "Murabaha and Other Deferred Payment Sales")
+        self.assertLessEqual(sum(item.probability for item in results), 1.0)
+        self.assertGreaterEqual(results[0].probability, settings.CASCADE_MIN_CONFIDENCE)
+
+    def test_local_scorer_single_standard(self):
+        """Test that a single retrieved standard is scored by its shared terms instead of zero IDF."""
+        single = {"FAS 28 Murabaha Deferred Payment Sales": EXCERPTS["FAS 28 Murabaha Deferred Payment Sales"]}
+        results = FASApplicabilityAgent()._local_applicability(MURABAHA, single)
+        self.assertEqual([item.fas_id for item in results], ["FAS 28"])
+        self.assertGreaterEqual(results[0].probability, settings.CASCADE_MIN_CONFIDENCE)
+
+    def test_local_scorer_calibrates_weak_evidence(self):
+        """Test that a standard winning on one shared term is not reported as confident."""
+        results = FASApplicabilityAgent()._local_applicability("Markup memo.", EXCERPTS)
+        self.assertEqual(results[0].fas_id, "FAS 28")
+        self.assertLess(results[0].probability, settings.CASCADE_MIN_CONFIDENCE)
+        self.assertFalse(FASApplicabilityAgent()._is_confident(results))
+
+    def test_confidence_rule(self):
+        """Test the confidence and margin thresholds."""
+        agent = FASApplicabilityAgent()
+        item = lambda probability: FASApplicability(fas_id="FAS 4", fas_name="", probability=probability, reasoning="")
+        self.assertTrue(agent._is_confident([item(0.9), item(0.3)]))
+        self.assertFalse(agent._is_confident([item(0.9), item(0.8)]))
+        self.assertFalse(agent._is_confident([item(0.6)]))
+        self.assertFalse(agent._is_confident([]))
+
+    def test_clear_case_stops_at_local_tier(self):
+        """Test that a clear-cut transaction makes no LLM call."""
+        settings.APPLICABILITY_CASCADE = "local,gpt-4.1-mini"
+        accepted = APPLICABILITY_TIER_OUTCOMES.value(tier="local", outcome="accepted")
+        with start_trace("cascade") as trace:
+            results = FASApplicabilityAgent().analyze_applicability(MURABAHA, EXCERPTS)
+
+        self.assertEqual(results[0].fas_id, "FAS 28")
+        self.assertEqual(trace.find("openai.chat.completions.create"), [])
+        self.assertEqual(APPLICABILITY_TIER_OUTCOMES.value(tier="local", outcome="accepted"), accepted + 1)
+
+    def test_unclear_case_escalates(self):
+        """Test that a transaction the local tier cannot score escalates to the next model."""
+        settings.APPLICABILITY_CASCADE = "local,gpt-4.1-nano,gpt-4.1-mini"
+        escalated = APPLICABILITY_TIER_OUTCOMES.value(tier="local", outcome="escalated")
+        with start_trace("cascade") as trace:
+            results = FASApplicabilityAgent().analyze_applicability("Unrelated memo text.", EXCERPTS)
+
+        models = [span.attributes["model"] for span in trace.find("openai.chat.completions.create")]
+        self.assertEqual(models[0], "gpt-4.1-nano")
+        self.assertEqual(trace.find("applicability.local")[0].attributes["outcome"], "escalated")
+        self.assertEqual(APPLICABILITY_TIER_OUTCOMES.value(tier="local", outcome="escalated"), escalated + 1)
+        self.assertTrue(results)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Test script for provider call record/replay cassettes.
+"""
+
+import json
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.cassette import CassetteMissError, use_cassette
+from src.core.config import settings
+from src.core.providers import create_openai_client
+from src.tests.test_providers import TRANSACTION, OfflineTestCase
+
+class TestCassette(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.path = str(Path(tempfile.mkdtemp()) / "calls.jsonl")
+
+    def test_record_and_replay_orchestrator(self):
+        """Test that a recorded analysis replays to the same result."""
+        from src.agents.orchestrator import Orchestrator
+
+        with use_cassette(self.path, mode="record") as cassette:
+            recorded = Orchestrator().analyze_transaction(TRANSACTION)
+        self.assertGreater(len(cassette), 0)
+        with open(self.path) as f:
+            operations = {json.loads(line)["operation"] for line in f}
+        self.assertTrue({"embeddings.create", "chat.completions.create", "send_message", "query"} <= operations)
+
+        # Replay needs neither live clients nor API keys
+        settings.PROVIDER_MODE = "live"
+        with use_cassette(self.path, mode="replay", replay_latency="none"):
+            replayed = Orchestrator().analyze_transaction(TRANSACTION)
+
+        self.assertEqual(replayed.model_dump(), recorded.model_dump())
+
+    def test_replay_miss_raises(self):
+        """Test that an unrecorded call fails loudly in replay mode."""
+        with use_cassette(self.path, mode="replay"):
+            client = create_openai_client()
+            with self.assertRaises(CassetteMissError):
+                client.embeddings.create(input="never recorded", model="text-embedding-3-small")
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
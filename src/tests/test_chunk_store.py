@@ -0,0 +1,85 @@
+"""
+Test script for the local chunk text store.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.chunk_store import ChunkStore, get_chunk_store
+from src.core.config import settings
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+QUERY = "murabaha deferred payment receivable bad debt default"
+
+class TestChunkStore(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, "chunks.sqlite")
+        self._previous = (settings.CHUNK_STORE_PATH, settings.RETRIEVAL_ROUTING)
+        settings.CHUNK_STORE_PATH = self.path
+        settings.RETRIEVAL_ROUTING = "off"
+
+    def tearDown(self):
+        store = get_chunk_store(self.path)
+        if store is not None:
+            store.close()
+        settings.CHUNK_STORE_PATH, settings.RETRIEVAL_ROUTING = self._previous
+        self._directory.cleanup()
+        super().tearDown()
+
+    def test_put_and_get_many(self):
+        """Test that texts are returned for the IDs found and replaced on rewrite."""
+        store = ChunkStore(self.path)
+        self.assertEqual(store.put_many([("a", "first", {"page_start": "1"}), ("b", "second", None)]), 2)
+        store.put_many([("a", "first, revised", None)])
+        self.assertEqual(store.get_texts(["a", "b", "missing", "a"]), {"a": "first, revised", "b": "second"})
+        self.assertEqual(len(store), 2)
+        store.delete(["b"])
+        self.assertEqual(store.get_texts(["b"]), {})
+        store.put_many([("c", "third", {"namespace": "SS_8_Murabahah"})])
+        self.assertEqual(store.delete_namespace("SS_8_Murabahah"), 1)
+        self.assertEqual(len(store), 1)
+        store.close()
+
+    def test_missing_store(self):
+        """Test that no store is opened where none was written."""
+        self.assertIsNone(get_chunk_store(self.path))
+        self.assertIsNone(get_chunk_store(""))
+
+    def test_retriever_hydrates_top_results(self):
+        """Test that the retriever replaces metadata text with the stored full text in one read."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        plain = retriever.retrieve(QUERY, top_n=3)
+        seeded = ChunkStore(self.path)
+        seeded.put_many([(doc.id, f"full text of {doc.id}", None) for doc in plain[:2]])
+        seeded.close()
+
+        with start_trace("hydrate") as trace:
+            hydrated = retriever.retrieve(QUERY, top_n=3)
+
+        self.assertEqual([doc.id for doc in hydrated], [doc.id for doc in plain])
+        self.assertEqual(hydrated[0].text, f"full text of {plain[0].id}")
+        self.assertEqual(hydrated[2].text, plain[2].text)
+        spans = trace.find("retrieve.hydrate")
+        self.assertEqual(len(spans), 1)
+        self.assertEqual(spans[0].attributes["found"], 2)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Test script for deadline-aware orchestration and partial results.
+"""
+
+import sys
+import time
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.agents.orchestrator import Orchestrator
+from src.core.config import settings
+from src.core.metrics import STAGE_DEGRADED
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase, TRANSACTION
+
+class TestDeadline(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._previous = {
+            name: getattr(settings, name)
+            for name in (
+                "OFFLINE_LLM_LATENCY_MS", "DEADLINE_RETRIEVE_MIN_S", "DEADLINE_SUMMARIZE_MIN_S",
+                "DEADLINE_APPLICABILITY_MIN_S", "REQUEST_DEADLINE_S"
+            )
+        }
+
+    def tearDown(self):
+        for name, value in self._previous.items():
+            setattr(settings, name, value)
+        super().tearDown()
+
+    def test_no_deadline_runs_every_stage(self):
+        """Test that without a deadline nothing is degraded."""
+        result = Orchestrator().analyze_transaction(TRANSACTION)
+        self.assertEqual(result.degraded, {})
+        self.assertTrue(result.fas_applicability)
+
+    def test_tight_budget_degrades_optional_stages(self):
+        """Test that a budget below the stage minimums shrinks retrieval and avoids LLM summarization and applicability."""
+        settings.DEADLINE_RETRIEVE_MIN_S = 30
+        settings.DEADLINE_SUMMARIZE_MIN_S = 30
+        settings.DEADLINE_APPLICABILITY_MIN_S = 30
+        degraded = STAGE_DEGRADED.value(stage="applicability")
+        with start_trace("deadline") as trace:
+            result = Orchestrator().analyze_transaction(TRANSACTION, deadline_s=20)
+
+        self.assertEqual(set(result.degraded), {"retrieve", "summarize", "applicability"})
+        self.assertLessEqual(len(result.fas_documents), settings.DEADLINE_REDUCED_TOP_N)
+        self.assertTrue(result.fas_applicability)
+        self.assertTrue(all(item.reasoning.startswith("Local estimate") for item in result.fas_applicability))
+        self.assertEqual(trace.find("openai.chat.completions.create"), [])
+        self.assertEqual(trace.find("applicability")[0].attributes["degraded"], result.degraded["applicability"])
+        self.assertEqual(STAGE_DEGRADED.value(stage="applicability"), degraded + 1)
+
+    def test_expired_deadline_returns_partial_result_in_time(self):
+        """Test that slow providers past the deadline yield a partial result instead of an error."""
+        settings.OFFLINE_LLM_LATENCY_MS = 1000
+        start = time.perf_counter()
+        result = Orchestrator().analyze_transaction(TRANSACTION, deadline_s=0.2)
+        elapsed = time.perf_counter() - start
+
+        self.assertLess(elapsed, 0.8)
+        self.assertIn("deconstruct", result.degraded)
+        self.assertIn("retrieve", result.degraded)
+        self.assertEqual(result.fas_documents, [])
+
+    def test_endpoint_returns_partial_response(self):
+        """Test that the API answers 200 with the degraded stages instead of a 500."""
+        from fastapi.testclient import TestClient
+        from src.api.main import app
+
+        settings.OFFLINE_LLM_LATENCY_MS = 1000
+        response = TestClient(app).post("/api/analyze-transaction", json={"transaction_text": TRANSACTION, "deadline_s": 0.2})
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertTrue(body["partial"])
+        self.assertIn("deconstruct", body["degraded_stages"])
+        statuses = {step["step_name"]: step["status"] for step in body["steps"]}
+        self.assertEqual(statuses["Transaction Deconstruction"], "degraded")
+
+    def test_endpoint_stages_run_off_the_event_loop(self):
+        """Test that the blocking stages run in the threadpool, leaving the event loop free for other requests."""
+        import asyncio
+        from fastapi.testclient import TestClient
+        from src.api.endpoints import get_orchestrator
+        from src.api.main import app
+
+        orchestrator = get_orchestrator()
+        on_loop = {}
+
+        def recording(name):
+            run = getattr(orchestrator, name)
+
+            def wrapper(*args):
+                try:
+                    asyncio.get_running_loop()
+                    on_loop[name] = True
+                except RuntimeError:
+                    on_loop[name] = False
+                return run(*args)
+            return wrapper
+
+        stages = ("run_deconstruct", "run_retrieve", "run_summarize", "run_applicability")
+        for name in stages:
+            setattr(orchestrator, name, recording(name))
+        try:
+            response = TestClient(app).post("/api/analyze-transaction", json={"transaction_text": TRANSACTION})
+        finally:
+            for name in stages:
+                delattr(orchestrator, name)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(on_loop, {name: False for name in stages})
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Test script for near-duplicate chunk elimination.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.dedup import MinHasher, NearDuplicateIndex, deduplicate_chunks, estimated_jaccard, lsh_bands, shingles
+from src.core.offline import OFFLINE_SEED_CORPUS
+
+PREFACE = (
+    "The Accounting and Auditing Organization for Islamic Financial Institutions was established in accordance "
+    "with the Agreement of Association signed by Islamic financial institutions. This standard shall be read in "
+    "conjunction with the conceptual framework for financial reporting and the statements of objectives and "
+    "concepts of financial accounting. The standard applies to all Islamic financial institutions and is effective "
+    "for financial periods beginning on or after the first of January, with early adoption permitted for those "
+    "institutions which choose to adopt it in advance of the effective date set out above by the board."
+)
+
+
+def chunk(content: str, source_file: str, index: int) -> dict:
+    return {"content": content, "metadata": {"source_file": source_file, "chunk_index": index}}
+
+
+class TestDedup(unittest.TestCase):
+    def test_signature_estimates_jaccard(self):
+        """Test that signature agreement tracks the shingle-set similarity."""
+        hasher = MinHasher(num_perm=256)
+        words = PREFACE.split()
+        shifted = " ".join(words[4:] + ["board", "of", "standards", "approved"])
+        exact = len(set(shingles(PREFACE)) & set(shingles(shifted))) / len(set(shingles(PREFACE)) | set(shingles(shifted)))
+        self.assertAlmostEqual(estimated_jaccard(hasher.signature(PREFACE), hasher.signature(shifted)), exact, delta=0.1)
+        self.assertEqual(estimated_jaccard(hasher.signature(PREFACE), hasher.signature(PREFACE)), 1.0)
+
+    def test_lsh_bands(self):
+        """Test that the banding splits the signature and triggers below the threshold."""
+        bands, rows = lsh_bands(128, 0.85)
+        self.assertEqual(bands * rows, 128)
+        self.assertLessEqual((1 / bands) ** (1 / rows), 0.85)
+
+    def test_index_keeps_distinct_texts(self):
+        """Test that unrelated passages are all representatives."""
+        index = NearDuplicateIndex(threshold=0.8)
+        passages = [passage for _, _, items in OFFLINE_SEED_CORPUS for passage in items]
+        self.assertTrue(all(index.add(str(i), passage) is None for i, passage in enumerate(passages)))
+
+    def test_deduplicate_chunks_records_back_references(self):
+        """Test that shifted boilerplate collapses into its first occurrence."""
+        words = PREFACE.split()
+        chunks = [
+            chunk(PREFACE, "FAS_4_Musharaka.pdf", 0),
+            chunk(OFFLINE_SEED_CORPUS[0][2][0], "FAS_4_Musharaka.pdf", 1),
+            chunk(" ".join(words[3:]) + " by the board", "FAS_7_Salam_Parallel_Salam.pdf", 0),
+            chunk(PREFACE.replace("January", "July"), "FAS_10_Istisna.pdf", 0),
+            chunk(OFFLINE_SEED_CORPUS[1][2][0], "FAS_7_Salam_Parallel_Salam.pdf", 1),
+        ]
+        kept, report = deduplicate_chunks(chunks, threshold=0.8)
+
+        self.assertEqual([c["metadata"]["chunk_index"] for c in kept], [0, 1, 1])
+        self.assertEqual(kept[0]["metadata"]["duplicate_count"], 2)
+        self.assertEqual(kept[0]["metadata"]["duplicate_refs"], ["FAS_7_Salam_Parallel_Salam.pdf#0", "FAS_10_Istisna.pdf#0"])
+        self.assertNotIn("duplicate_refs", kept[1]["metadata"])
+        self.assertEqual((report.chunks_in, report.chunks_kept, report.chunks_removed, report.clusters), (5, 3, 2, 1))
+        self.assertAlmostEqual(report.shrink_ratio, 0.4)
+        self.assertIn("2 embedding calls saved", report.summary())
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Test script for federated FAS and Shariah Standards retrieval.
+"""
+
+import sys
+import time
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.federation import calibrate_scores, merge_calibrated
+from src.core.offline import get_in_memory_index, hash_embedding
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+QUERY = "murabaha deferred payment receivable bad debt default"
+SS_PASSAGES = [
+    "Murabahah to the purchase orderer requires the institution to own the commodity before selling it; a promise to purchase is binding on the customer only in the amount of actual damage.",
+    "In Murabahah the deferred price may not be increased when the customer defaults, although a late payment undertaking to donate to charity is permissible.",
+    "Ijarah requires the lessor to bear the major maintenance of the leased asset and ownership risks throughout the lease term.",
+]
+
+def doc(doc_id, score, source):
+    """Build a retrieved document with only a score and a source."""
+    from src.agents.fas_retriever import FASDocument
+
+    return FASDocument(id=doc_id, text="", relevance_score=score, document_type="", section_heading="",
+                       source_filename="", chunk_index=0, total_chunks=0, source=source)
+
+class TestCalibration(unittest.TestCase):
+    def test_calibrate_scores(self):
+        """Test that scores are standardised per index."""
+        calibrated = calibrate_scores([0.9, 0.8, 0.7])
+        self.assertAlmostEqual(sum(calibrated), 0.0, places=6)
+        self.assertGreater(calibrated[0], calibrated[1])
+        self.assertEqual(calibrate_scores([0.5, 0.5]), [0.0, 0.0])
+        self.assertEqual(calibrate_scores([]), [])
+
+    def test_merge_calibrated_ignores_score_range(self):
+        """Test that an index with uniformly lower raw scores still places its best results."""
+        merged = merge_calibrated({
+            "fas": [doc("f1", 0.90, "fas"), doc("f2", 0.88, "fas"), doc("f3", 0.70, "fas")],
+            "ss": [doc("s1", 0.60, "ss"), doc("s2", 0.40, "ss")],
+        }, top_n=3, quota=2)
+        self.assertEqual([d.id for d in merged], ["s1", "f1", "f2", "s2", "f3"])
+        self.assertIn("calibrated_score", merged[0].metadata)
+
+    def test_poor_secondary_index_keeps_to_its_quota(self):
+        """Test that an index whose scores are all low cannot take half of the primary's slots."""
+        merged = merge_calibrated({
+            "fas": [doc(f"f{i}", 0.90 - i * 0.02, "fas") for i in range(6)],
+            "ss": [doc(f"s{i}", 0.12 - i * 0.01, "ss") for i in range(6)],
+        }, top_n=6, quota=2)
+        self.assertEqual(sum(d.source == "fas" for d in merged), 6)
+        self.assertEqual([d.id for d in merged if d.source == "ss"], ["s0", "s1"])
+        self.assertEqual(merge_calibrated({"fas": [doc("f1", 0.9, "fas")], "ss": [doc("s1", 0.1, "ss")]}, top_n=1, quota=0)[0].id, "f1")
+
+
+class TestFederatedRetrieval(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._previous = (settings.PINECONE_INDEX_SS, settings.RETRIEVAL_SOURCES, settings.RETRIEVAL_ROUTING, settings.OFFLINE_VECTOR_LATENCY_MS)
+        settings.PINECONE_INDEX_SS = "federation-ss"
+        settings.RETRIEVAL_SOURCES = "fas,ss"
+        settings.RETRIEVAL_ROUTING = "off"
+        ss_index = get_in_memory_index("federation-ss")
+        ss_index.delete(delete_all=True, namespace="default")
+        ss_index.upsert(vectors=[
+            {"id": f"ss-{i}", "values": hash_embedding(text), "metadata": {"text": text, "document_type": "SS_8_Murabahah"}}
+            for i, text in enumerate(SS_PASSAGES)
+        ], namespace="default")
+
+    def tearDown(self):
+        settings.PINECONE_INDEX_SS, settings.RETRIEVAL_SOURCES, settings.RETRIEVAL_ROUTING, settings.OFFLINE_VECTOR_LATENCY_MS = self._previous
+        super().tearDown()
+
+    def test_federated_retrieval_merges_both_indexes(self):
+        """Test that one embedding serves both indexes and results are tagged with their source."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        with start_trace("federated") as trace:
+            documents = retriever.retrieve(QUERY, top_n=4)
+
+        self.assertEqual(len(trace.find("openai.embeddings.create")), 1)
+        self.assertEqual(len(trace.find("pinecone.query")), 2)
+        self.assertEqual(len(trace.find("retrieve.federated")), 1)
+        self.assertEqual({doc.source for doc in documents}, {"fas", "ss"})
+        self.assertEqual(sum(doc.source == "fas" for doc in documents), 4)
+        self.assertLessEqual(sum(doc.source == "ss" for doc in documents), settings.FEDERATED_SOURCE_TOP_N)
+        self.assertTrue(all("calibrated_score" in doc.metadata for doc in documents))
+        self.assertIn(documents[0].document_type, ("FAS_28_Murabaha_Deferred_Payment_Sales", "SS_8_Murabahah"))
+
+    def test_indexes_are_queried_in_parallel(self):
+        """Test that federated latency is that of the slower index, not the sum."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        retriever.retrieve(QUERY, top_n=3)
+        settings.OFFLINE_VECTOR_LATENCY_MS = 150
+        start = time.perf_counter()
+        retriever.retrieve(QUERY, top_n=3)
+        self.assertLess(time.perf_counter() - start, 0.28)
+
+    def test_requested_standards_skip_federation(self):
+        """Test that a query for specific FAS standards searches the FAS index only."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        with start_trace("filtered") as trace:
+            documents = retriever.retrieve(QUERY, top_n=3, document_types="FAS_28_Murabaha_Deferred_Payment_Sales")
+        self.assertEqual(len(trace.find("pinecone.query")), 1)
+        self.assertTrue(all(doc.source == "fas" for doc in documents))
+
+    def test_shariah_excerpts_reach_applicability_as_context(self):
+        """Test that Shariah chunks are passed as context and not as candidate standards."""
+        from src.agents.orchestrator import Orchestrator
+
+        orchestrator = Orchestrator()
+        documents = orchestrator.fas_retriever.retrieve(QUERY, top_n=6)
+        fas_excerpts = orchestrator._prepare_fas_excerpts(documents)
+        shariah_excerpts = orchestrator._prepare_fas_excerpts(documents, source="ss")
+        self.assertTrue(shariah_excerpts)
+        self.assertFalse(any(fas_id.startswith("SS") for fas_id in fas_excerpts))
+        prompt = orchestrator.fas_applicability._build_prompt("Murabaha sale", fas_excerpts, shariah_excerpts=shariah_excerpts)
+        self.assertIn("Related AAOIFI Shariah Standards", prompt)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
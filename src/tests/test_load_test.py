@@ -0,0 +1,114 @@
+"""
+Test script for the API load test harness.
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from benchmarks.load_test import LocalServer, find_saturation, run_levels, summarize_level
+from benchmarks.run_benchmark import load_transactions
+from src.core.config import settings
+from src.core.offline import OfflineLatency
+from src.tests.test_providers import OfflineTestCase
+
+def load_args(**overrides) -> argparse.Namespace:
+    args = {
+        "route": "/api/analyze-transaction", "params": [], "mode": "closed", "rates": [20.0], "concurrency": [1, 2],
+        "duration": 0.5, "drain": 10.0, "timeout": 30.0, "warmup": 1
+    }
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+class TestLatencyDistributions(unittest.TestCase):
+    def setUp(self):
+        self._previous = (settings.OFFLINE_LATENCY_DISTRIBUTION, settings.OFFLINE_JITTER_MS)
+
+    def tearDown(self):
+        settings.OFFLINE_LATENCY_DISTRIBUTION, settings.OFFLINE_JITTER_MS = self._previous
+
+    def test_distributions(self):
+        """Test the shape of each offline latency distribution."""
+        settings.OFFLINE_JITTER_MS = 10.0
+        settings.OFFLINE_LATENCY_DISTRIBUTION = "uniform"
+        first, second = OfflineLatency(seed=1).draw(100.0), OfflineLatency(seed=1).draw(100.0)
+        self.assertEqual(first, second)
+        self.assertTrue(90.0 <= first <= 110.0)
+
+        settings.OFFLINE_LATENCY_DISTRIBUTION = "lognormal"
+        latency = OfflineLatency(seed=1)
+        lognormal = [latency.draw(100.0) for _ in range(2000)]
+        self.assertAlmostEqual(statistics.median(lognormal), 100.0, delta=10.0)
+        self.assertGreater(statistics.mean(lognormal), statistics.median(lognormal))
+
+        settings.OFFLINE_LATENCY_DISTRIBUTION = "exponential"
+        latency = OfflineLatency(seed=1)
+        self.assertAlmostEqual(statistics.mean(latency.draw(100.0) for _ in range(2000)), 100.0, delta=10.0)
+        self.assertEqual(latency.draw(0.0), 0.0)
+
+class TestLoadTest(OfflineTestCase):
+    def test_closed_and_open_loop_levels(self):
+        """Test that both load modes report throughput, latency and loop lag against the in-process server."""
+        transactions = load_transactions()[:2]
+        with LocalServer() as server:
+            closed = asyncio.run(run_levels(server.url, load_args(), transactions, server.monitor))
+            opened = asyncio.run(run_levels(
+                server.url,
+                load_args(mode="open", route="/api/analyze-transaction/stream", params=["view=verdicts"]),
+                transactions, server.monitor
+            ))
+
+        self.assertEqual([level["concurrency"] for level in closed], [1, 2])
+        for level in closed + opened:
+            self.assertGreater(level["requests"], 0)
+            self.assertEqual(level["errors"], 0)
+            self.assertGreater(level["throughput_rps"], 0)
+            self.assertGreater(level["latency_ms"]["p50"], 0)
+            self.assertIn("loop_lag_ms", level)
+        self.assertEqual(opened[0]["rate_rps"], 20.0)
+        self.assertLessEqual(opened[0]["first_event_ms"]["p50"], opened[0]["latency_ms"]["p50"])
+
+    def test_analysis_scales_with_concurrency(self):
+        """Test that concurrent analyses overlap instead of queueing behind the event loop."""
+        previous = settings.OFFLINE_LLM_LATENCY_MS
+        settings.OFFLINE_LLM_LATENCY_MS = 100
+        try:
+            with LocalServer() as server:
+                levels = asyncio.run(run_levels(
+                    server.url, load_args(concurrency=[1, 4], duration=1.5), load_transactions()[:2], server.monitor
+                ))
+        finally:
+            settings.OFFLINE_LLM_LATENCY_MS = previous
+
+        single, parallel = levels
+        self.assertGreater(parallel["throughput_rps"], 2 * single["throughput_rps"])
+        self.assertLess(parallel["loop_lag_ms"]["max"], parallel["latency_ms"]["p50"] / 2)
+
+    def test_saturation(self):
+        """Test that the saturating level is the last one before throughput stops scaling or errors appear."""
+        def level(concurrency, rps, errors=0):
+            samples = [{"latency": 0.1}] * (10 - errors) + [{"latency": 0.1, "error": 1.0}] * errors
+            report = summarize_level(samples, 1.0, None, {"mode": "closed", "concurrency": concurrency})
+            report["throughput_rps"] = rps
+            return report
+
+        self.assertIsNone(find_saturation([level(1, 10.0), level(2, 19.0), level(4, 30.0)]))
+        self.assertEqual(find_saturation([level(1, 10.0), level(2, 19.0), level(4, 20.0)])["concurrency"], 2)
+        self.assertEqual(find_saturation([level(1, 10.0), level(2, 19.0, errors=1)])["concurrency"], 1)
+        self.assertNotIn("loop_lag_ms", level(1, 1.0))
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
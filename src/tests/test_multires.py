@@ -0,0 +1,83 @@
+"""
+Test script for multi-resolution retrieval.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.multires import build_coarse_index, coarse_record, rescore, truncate_embedding
+from src.core.offline import InMemoryIndex, hash_embedding, seed_index
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+QUERY = "murabaha deferred payment receivable bad debt default"
+
+class TestMultiResolution(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._previous = (settings.MULTIRES_DIMENSION, settings.RETRIEVAL_ROUTING)
+        settings.RETRIEVAL_ROUTING = "off"
+
+    def tearDown(self):
+        settings.MULTIRES_DIMENSION, settings.RETRIEVAL_ROUTING = self._previous
+        super().tearDown()
+
+    def test_truncate_embedding(self):
+        """Test that truncated embeddings are unit length and match the shortened offline embeddings."""
+        short = truncate_embedding(hash_embedding(QUERY), 256)
+        self.assertEqual(len(short), 256)
+        self.assertAlmostEqual(sum(v * v for v in short), 1.0, places=5)
+        self.assertEqual(hash_embedding(QUERY, 256), short)
+
+    def test_coarse_record_keeps_filter_fields_only(self):
+        """Test that the short copies carry only the metadata the retriever filters on."""
+        record = coarse_record("a", [1.0] * 8, {"document_type": "FAS_4", "text": "long text"}, 4)
+        self.assertEqual(record["metadata"], {"document_type": "FAS_4"})
+        self.assertEqual(len(record["values"]), 4)
+
+    def test_build_coarse_index(self):
+        """Test that every vector is copied at reduced dimension."""
+        index = InMemoryIndex("multires-full")
+        count = seed_index(index)
+        coarse = InMemoryIndex("multires-coarse", dimension=256)
+        self.assertEqual(build_coarse_index(index, coarse, 256, batch_size=3), count)
+        self.assertEqual(coarse.describe_index_stats().total_vector_count, count)
+
+    def test_rescore_orders_by_full_similarity(self):
+        """Test the exact rescore of fetched candidates."""
+        candidates = {"far": ([0.0, 1.0], {}), "near": ([1.0, 0.1], {}), "empty": ([], {})}
+        matches = rescore([1.0, 0.0], candidates, top_n=2)
+        self.assertEqual([match["id"] for match in matches], ["near", "far"])
+
+    def test_multires_retrieval_matches_full_search(self):
+        """Test that coarse search plus rescore finds the full search's top chunk with exact scores."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        settings.MULTIRES_DIMENSION = 0
+        full = retriever.retrieve(QUERY, top_n=3)
+
+        settings.MULTIRES_DIMENSION = 512
+        with start_trace("multires") as trace:
+            multires = retriever.retrieve(QUERY, top_n=3)
+
+        self.assertEqual(multires[0].id, full[0].id)
+        self.assertAlmostEqual(multires[0].relevance_score, full[0].relevance_score, places=5)
+        self.assertTrue(multires[0].text)
+        self.assertEqual(len(trace.find("retrieve.multires")), 1)
+        self.assertEqual(len(trace.find("pinecone.fetch")), 1)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
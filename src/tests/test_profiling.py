@@ -0,0 +1,204 @@
+"""
+Test script for on-demand request profiling.
+"""
+
+import contextvars
+import hashlib
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from fastapi.testclient import TestClient
+
+from src.api.main import app
+from src.core.config import settings
+from src.core.profiling import check_profile_token, current_profile, profile_request
+from src.core.tracing import span
+from src.tests.test_providers import OfflineTestCase, TRANSACTION
+
+def spin(seconds: float) -> int:
+    """Burn CPU for the given wall time."""
+    end = time.perf_counter() + seconds
+    rounds = 0
+    while time.perf_counter() < end:
+        hashlib.sha256(b"fas" * 1000).digest()
+        rounds += 1
+    return rounds
+
+def spin_in_span(name: str, seconds: float) -> int:
+    """Burn CPU inside a span, as an analysis stage does."""
+    with span(name):
+        return spin(seconds)
+
+def in_context(fn):
+    """Run fn with a copy of the caller's context, as the agents' thread pools do."""
+    context = contextvars.copy_context()
+    return lambda: context.run(fn)
+
+class TestProfiler(unittest.TestCase):
+    def setUp(self):
+        self._previous = (settings.PROFILE_TOKEN, settings.PROFILE_DIR)
+        self._directory = tempfile.TemporaryDirectory()
+        settings.PROFILE_TOKEN = "secret"
+        settings.PROFILE_DIR = self._directory.name
+
+    def tearDown(self):
+        settings.PROFILE_TOKEN, settings.PROFILE_DIR = self._previous
+        self._directory.cleanup()
+
+    def test_token(self):
+        """Test that only the configured token enables profiling."""
+        self.assertFalse(check_profile_token(None))
+        self.assertTrue(check_profile_token("secret"))
+        with self.assertRaises(PermissionError):
+            check_profile_token("guess")
+        settings.PROFILE_TOKEN = ""
+        with self.assertRaises(PermissionError):
+            check_profile_token("secret")
+
+    def test_wall_versus_cpu_per_stage_and_thread(self):
+        """Test that CPU work, waiting and spans in worker threads are attributed to their stages."""
+        def worker():
+            with span("llm.call", kind="provider"):
+                time.sleep(0.15)
+
+        with profile_request("test", interval_ms=2) as profile:
+            self.assertIs(current_profile(), profile)
+            with span("deconstruct"):
+                spin(0.15)
+            with span("applicability"):
+                thread = threading.Thread(target=in_context(worker))
+                thread.start()
+                thread.join()
+            summary = profile.stop()
+
+        self.assertIsNone(current_profile())
+        self.assertGreater(summary["samples"], 0)
+        stages = summary["stages"]
+        self.assertGreater(stages["deconstruct"]["wall_ms"], 50)
+        self.assertGreater(stages["applicability"]["wall_ms"], 50)
+        if summary["on_cpu_ms"] is not None:
+            self.assertGreater(stages["deconstruct"]["on_cpu_ms"], stages["deconstruct"]["wall_ms"] * 0.5)
+            self.assertLess(stages["applicability"]["on_cpu_ms"], stages["applicability"]["wall_ms"] * 0.5)
+        self.assertIn("test_profiling:spin", summary["folded"]["wall"])
+        self.assertIn("test_profiling:TestProfiler.test_wall_versus_cpu_per_stage_and_thread.<locals>.worker", summary["folded"]["wall"])
+        for line in summary["folded"]["wall"].splitlines():
+            stack, weight = line.rsplit(" ", 1)
+            self.assertGreater(int(weight), 0)
+        self.assertTrue(all(Path(path).exists() for path in summary["files"]))
+
+    def test_caller_thread_can_be_left_out(self):
+        """Test that without include_caller only the threads entered through the context are sampled."""
+        def shared_loop_work():
+            spin(0.15)
+
+        with profile_request("test", interval_ms=2, include_caller=False) as profile:
+            thread = threading.Thread(target=in_context(lambda: spin_in_span("deconstruct", 0.15)))
+            thread.start()
+            with span("loop"):
+                shared_loop_work()
+            thread.join()
+            summary = profile.stop()
+
+        self.assertIn("test_profiling:spin_in_span", summary["folded"]["wall"])
+        self.assertNotIn("shared_loop_work", summary["folded"]["wall"])
+        self.assertNotIn("loop", summary["stages"])
+
+    def test_disabled_profile(self):
+        """Test that an unprofiled block starts nothing."""
+        threads = threading.active_count()
+        with profile_request("test", enabled=False) as profile:
+            self.assertIsNone(profile)
+            self.assertIsNone(current_profile())
+            self.assertEqual(threading.active_count(), threads)
+
+class TestProfiledRequests(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._previous = (settings.PROFILE_TOKEN, settings.PROFILE_DIR)
+        settings.PROFILE_TOKEN = "secret"
+        settings.PROFILE_DIR = ""
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        settings.PROFILE_TOKEN, settings.PROFILE_DIR = self._previous
+        super().tearDown()
+
+    def test_profile_header(self):
+        """Test that an authorized request returns its profile and others are unchanged."""
+        response = self.client.post(
+            "/api/analyze-transaction?view=verdicts", json={"transaction_text": TRANSACTION},
+            headers={"X-Profile-Token": "secret"}
+        )
+        self.assertEqual(response.status_code, 200)
+        profile = response.json()["profile"]
+        self.assertEqual(response.headers["X-Profile-Id"], profile["profile_id"])
+        self.assertIn("stages", profile)
+        self.assertIn("wall", profile["folded"])
+        self.assertNotIn("files", profile)
+
+        response = self.client.post("/api/analyze-transaction?view=verdicts", json={"transaction_text": TRANSACTION})
+        self.assertNotIn("profile", response.json())
+        self.assertNotIn("X-Profile-Id", response.headers)
+
+        response = self.client.post(
+            "/api/analyze-transaction?view=verdicts&profile_token=guess", json={"transaction_text": TRANSACTION}
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_overlapping_requests_do_not_share_samples(self):
+        """Test that a profiled request's samples exclude the event loop and the stages of a concurrent request."""
+        from src.api.endpoints import get_orchestrator
+
+        deconstructor = get_orchestrator().transaction_deconstructor
+        deconstruct_transaction = deconstructor.deconstruct
+
+        def other_request_work():
+            spin(0.4)
+
+        def profiled_request_work():
+            spin(0.1)
+
+        def deconstruct(transaction_text):
+            if transaction_text.startswith("OTHER"):
+                other_request_work()
+            else:
+                profiled_request_work()
+            return deconstruct_transaction(transaction_text)
+
+        deconstructor.deconstruct = deconstruct
+        try:
+            with TestClient(app) as client:
+                other = threading.Thread(target=lambda: client.post(
+                    "/api/analyze-transaction?view=verdicts", json={"transaction_text": "OTHER " + TRANSACTION}
+                ))
+                other.start()
+                time.sleep(0.05)
+                response = client.post(
+                    "/api/analyze-transaction?view=verdicts", json={"transaction_text": TRANSACTION},
+                    headers={"X-Profile-Token": "secret"}
+                )
+                other.join()
+        finally:
+            del deconstructor.deconstruct
+
+        wall = response.json()["profile"]["folded"]["wall"]
+        self.assertIn("profiled_request_work", wall)
+        self.assertNotIn("other_request_work", wall)
+        self.assertNotIn("asyncio.base_events", wall)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
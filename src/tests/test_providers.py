@@ -0,0 +1,128 @@
+"""
+Test script for the offline provider stand-ins.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.offline import InMemoryIndex, hash_embedding
+from src.core.providers import create_openai_client, create_vector_index
+
+TRANSACTION = """
+Context: Buyer defaults, stopping project completion.
+Adjustments:
+Impairment of Receivables: $500,000
+Accounting Treatment:
+Recognition of bad debt
+Adjustment of work-in-progress valuation
+Journal Entry for Default Adjustment:
+Dr. Bad Debt Expense $500,000
+Cr. Accounts Receivable $500,000
+"""
+
+class OfflineTestCase(unittest.TestCase):
+    """Base class that switches the providers to offline mode for each test."""
+
+    def setUp(self):
+        self._previous_mode = settings.PROVIDER_MODE
+        settings.PROVIDER_MODE = "offline"
+
+    def tearDown(self):
+        settings.PROVIDER_MODE = self._previous_mode
+
+
+class TestOfflineProviders(OfflineTestCase):
+    def test_hash_embedding_is_deterministic(self):
+        """Test that hash embeddings are stable, normalised and lexically meaningful."""
+        first = hash_embedding("Murabaha deferred payment sale")
+        self.assertEqual(first, hash_embedding("Murabaha deferred payment sale"))
+        self.assertEqual(len(first), settings.VECTOR_DIMENSION)
+        self.assertAlmostEqual(sum(v * v for v in first), 1.0, places=5)
+
+        related = hash_embedding("deferred payment sale under Murabaha")
+        unrelated = hash_embedding("Salam commodity forward delivery")
+        dot = lambda a, b: sum(x * y for x, y in zip(a, b))
+        self.assertGreater(dot(first, related), dot(first, unrelated))
+
+    def test_in_memory_index_filters(self):
+        """Test metadata filters and namespaces of the in-memory index."""
+        index = InMemoryIndex("test", dimension=8)
+        index.upsert(vectors=[
+            {"id": "a", "values": [1, 0, 0, 0, 0, 0, 0, 0], "metadata": {"document_type": "FAS_4"}},
+            {"id": "b", "values": [1, 1, 0, 0, 0, 0, 0, 0], "metadata": {"document_type": "FAS_28"}},
+        ], namespace="ns")
+
+        results = index.query(vector=[1, 0, 0, 0, 0, 0, 0, 0], top_k=2, include_metadata=True, namespace="ns")
+        self.assertEqual([match.id for match in results.matches], ["a", "b"])
+
+        results = index.query(vector=[1, 0, 0, 0, 0, 0, 0, 0], top_k=2, filter={"document_type": {"$in": ["FAS_28"]}}, namespace="ns")
+        self.assertEqual([match["id"] for match in results.matches], ["b"])
+
+        self.assertEqual(index.query(vector=[1] * 8, namespace="other").matches, [])
+        self.assertEqual(index.describe_index_stats().total_vector_count, 2)
+
+    def test_openai_stand_in_shapes(self):
+        """Test that the OpenAI stand-in mirrors the SDK response shapes."""
+        client = create_openai_client()
+        embedding = client.embeddings.create(input="Ijarah lease", model="text-embedding-3-small")
+        self.assertEqual(len(embedding.data[0].embedding), settings.VECTOR_DIMENSION)
+        self.assertGreater(embedding.usage.total_tokens, 0)
+
+        completion = client.chat.completions.create(
+            model="gpt-4.1-mini",
+            messages=[{"role": "user", "content": "Hello"}]
+        )
+        self.assertEqual(completion.choices[0].message.content, "Understood.")
+
+    def test_vector_index_is_shared_and_seeded(self):
+        """Test that offline indexes are shared per name and seeded with the corpus."""
+        index = create_vector_index("fas-test")
+        seeded = index.describe_index_stats().total_vector_count
+        self.assertGreater(seeded, 0)
+
+        index.upsert(vectors=[{"id": "extra", "values": hash_embedding("extra"), "metadata": {}}], namespace="default")
+        self.assertEqual(create_vector_index("fas-test").describe_index_stats().total_vector_count, seeded + 1)
+
+    def test_ss_index_is_seeded_with_shariah_standards(self):
+        """Test that the Shariah Standards stand-in holds SS excerpts, not the FAS corpus."""
+        previous = settings.PINECONE_INDEX_SS
+        settings.PINECONE_INDEX_SS = "ss-seed-test"
+        try:
+            results = create_vector_index("ss-seed-test").query(
+                vector=hash_embedding("murabaha deferred price"), top_k=10, include_metadata=True, namespace="default"
+            )
+        finally:
+            settings.PINECONE_INDEX_SS = previous
+        document_types = {match["metadata"]["document_type"] for match in results["matches"]}
+        self.assertTrue(document_types)
+        self.assertTrue(all(document_type.startswith("SS_") for document_type in document_types))
+
+
+class TestOfflineOrchestrator(OfflineTestCase):
+    def test_end_to_end_offline(self):
+        """Test the complete agent chain against the offline stand-ins."""
+        from src.agents.orchestrator import Orchestrator
+
+        result = Orchestrator().analyze_transaction(TRANSACTION)
+
+        self.assertTrue(result.transaction_analysis["search_keywords"])
+        self.assertTrue(result.fas_documents)
+        self.assertTrue(all(doc.text for doc in result.fas_documents))
+        self.assertTrue(result.fas_summaries)
+        top = max(result.fas_applicability, key=lambda item: item.probability)
+        self.assertEqual(top.fas_id, "FAS 28")
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
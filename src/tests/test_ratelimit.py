@@ -0,0 +1,159 @@
+"""
+Test script for the rate-limit-aware provider scheduler.
+"""
+
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.metrics import RATE_LIMIT_HITS
+from src.core.providers import ProviderCall
+from src.core.ratelimit import (
+    BATCH,
+    ProviderLimiter,
+    RateLimitTimeout,
+    call_priority,
+    current_priority,
+    estimate_call_tokens,
+    rate_limit_delay,
+    rate_limit_middleware,
+    scheduler,
+    _load_limits
+)
+
+class RateLimited(Exception):
+    """Stand-in for an SDK 429 error."""
+
+    def __init__(self, retry_after: str):
+        super().__init__("429 Too Many Requests")
+        self.status_code = 429
+        self.response = SimpleNamespace(status_code=429, headers={"Retry-After": retry_after})
+
+
+class TestRateLimit(unittest.TestCase):
+    def setUp(self):
+        self._previous_mode = settings.RATE_LIMIT_MODE
+        settings.RATE_LIMIT_MODE = "on"
+        # Fresh buckets, so that throttling in one test does not slow the others
+        scheduler.configure(_load_limits())
+
+    def tearDown(self):
+        settings.RATE_LIMIT_MODE = self._previous_mode
+        scheduler.configure(_load_limits())
+
+    def test_request_bucket_limits_bursts(self):
+        """Test that the burst capacity is admitted at once and the next call would wait."""
+        limiter = ProviderLimiter("test", rpm=60)  # 10 s of burst = 10 requests
+        for _ in range(10):
+            self.assertEqual(limiter.acquire(max_wait=0), 0.0)
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(max_wait=0.1)
+
+    def test_batch_keeps_reserve_for_interactive(self):
+        """Test that batch calls leave the reserved capacity to interactive calls."""
+        limiter = ProviderLimiter("test", rpm=60)
+        for _ in range(8):
+            limiter.acquire(priority=BATCH, max_wait=0)
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(priority=BATCH, max_wait=0.1)
+        self.assertEqual(limiter.acquire(max_wait=0), 0.0)
+
+    def test_oversize_batch_call_is_admitted(self):
+        """Test that a batch call larger than the unreserved capacity is admitted once the bucket is full."""
+        limiter = ProviderLimiter("test", rpm=6000, tpm=600)  # 100 tokens of burst, 80 outside the reserve
+        self.assertEqual(limiter.acquire(tokens=95, priority=BATCH, max_wait=0), 0.0)
+        self.assertEqual(limiter.tokens.wait_time(95, settings.RATE_LIMIT_BATCH_RESERVE), 9.5)
+
+    def test_token_bucket_counts_tokens(self):
+        """Test that token limits apply alongside request limits."""
+        limiter = ProviderLimiter("test", rpm=6000, tpm=600)  # 100 tokens of burst
+        limiter.acquire(tokens=90, max_wait=0)
+        with self.assertRaises(RateLimitTimeout):
+            limiter.acquire(tokens=50, max_wait=0.1)
+
+    def test_throttle_after_429(self):
+        """Test that a rate-limit error halves the rate and pauses new calls."""
+        limiter = ProviderLimiter("test", rpm=6000)
+        limiter.throttle(0.2)
+        self.assertEqual(limiter.scale, 0.5)
+        start = time.monotonic()
+        limiter.acquire(max_wait=1)
+        self.assertGreaterEqual(time.monotonic() - start, 0.15)
+
+    def test_rate_limit_delay(self):
+        """Test recognising 429 errors and their Retry-After hints."""
+        self.assertEqual(rate_limit_delay(RateLimited("2")), 2.0)
+        self.assertIsNone(rate_limit_delay(ValueError("bad request")))
+
+    def test_priority_context(self):
+        """Test the priority context manager."""
+        self.assertEqual(current_priority(), "interactive")
+        with call_priority(BATCH):
+            self.assertEqual(current_priority(), BATCH)
+        self.assertEqual(current_priority(), "interactive")
+
+    def test_models_share_the_provider_bucket(self):
+        """Test that models without limits of their own draw on one provider-wide bucket."""
+        scheduler.configure({"testprov": {"rpm": 60}, "testprov:own": {"rpm": 60}})
+        shared = scheduler.limiter("testprov", "m1")
+        self.assertIs(scheduler.limiter("testprov", "m2"), shared)
+        self.assertIsNot(scheduler.limiter("testprov", "own"), shared)
+
+        for model in ["m1", "m2"] * 5:  # 10 requests of burst between the two models
+            scheduler.limiter("testprov", model).acquire(max_wait=0)
+        with self.assertRaises(RateLimitTimeout):
+            scheduler.limiter("testprov", "m2").acquire(max_wait=0)
+        self.assertEqual(scheduler.limiter("testprov", "own").acquire(max_wait=0), 0.0)
+
+    def test_middleware_throttles_on_429(self):
+        """Test that the middleware estimates tokens and reacts to a 429 response."""
+        call = ProviderCall(
+            provider="openai",
+            operation="chat.completions.create",
+            model="rate-limit-test",
+            kwargs={"messages": [{"role": "user", "content": "x" * 400}], "max_tokens": 50}
+        )
+        self.assertEqual(estimate_call_tokens(call), 150)
+
+        hits = RATE_LIMIT_HITS.value(provider="openai", model="rate-limit-test")
+        def proceed():
+            raise RateLimited("0.01")
+        with self.assertRaises(RateLimited):
+            rate_limit_middleware(call, proceed)
+
+        self.assertEqual(RATE_LIMIT_HITS.value(provider="openai", model="rate-limit-test"), hits + 1)
+        self.assertEqual(scheduler.limiter("openai", "rate-limit-test").scale, 0.5)
+
+    def test_admission_wait_ends_at_the_call_deadline(self):
+        """Test that a call is not admitted, and not sent, once its deadline has passed."""
+        limiter = scheduler.limiter("openai", "deadline-test")
+        limiter.throttle(5.0)
+        sent = []
+        call = ProviderCall(provider="openai", operation="embeddings.create", model="deadline-test", kwargs={"input": "x"})
+
+        call.deadline = time.monotonic() + 0.1
+        start = time.monotonic()
+        with self.assertRaises(RateLimitTimeout):
+            rate_limit_middleware(call, lambda: sent.append(1))
+        self.assertLess(time.monotonic() - start, 1.0)
+
+        call.deadline = time.monotonic() - 0.01
+        with self.assertRaises(RateLimitTimeout):
+            rate_limit_middleware(call, lambda: sent.append(1))
+        self.assertEqual(sent, [])
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
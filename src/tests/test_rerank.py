@@ -0,0 +1,93 @@
+"""
+Test script for MMR diversity reranking.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.offline import InMemoryIndex, hash_embedding
+from src.core.rerank import mmr
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+# Overlapping neighbours of one page plus two distinct chunks
+CHUNKS = [
+    ("page-1a", "Murabaha deferred payment receivables are measured at cost plus the agreed markup"),
+    ("page-1b", "Murabaha deferred payment receivables are measured at cost plus the agreed markup less"),
+    ("page-1c", "deferred payment receivables are measured at cost plus the agreed markup less impairment"),
+    ("page-2", "Murabaha default: impairment of deferred payment receivables is recognised as bad debt"),
+    ("page-3", "Murabaha sale price disclosure for deferred payment and markup"),
+]
+
+QUERY = "Murabaha deferred payment receivables markup"
+
+class TestMMR(unittest.TestCase):
+    def test_lambda_one_keeps_relevance_order(self):
+        """Test that lambda 1.0 selects by relevance only."""
+        vectors = [[1.0, 0.0], [0.9, 0.1], [0.0, 1.0]]
+        self.assertEqual(mmr([1.0, 0.0], vectors, top_n=3, lambda_mult=1.0), [0, 1, 2])
+
+    def test_near_duplicates_are_not_both_selected(self):
+        """Test that a near-duplicate of a selected vector loses to a distinct one."""
+        vectors = [[0.99, 0.05, 0.0], [1.0, 0.0, 0.0], [0.5, 0.8, 0.0]]
+        self.assertEqual(mmr([1.0, 0.5, 0.0], vectors, top_n=2, lambda_mult=1.0), [0, 1])
+        self.assertEqual(mmr([1.0, 0.5, 0.0], vectors, top_n=2, lambda_mult=0.5), [0, 2])
+
+    def test_empty_and_short_inputs(self):
+        """Test that top_n larger than the candidates and empty inputs are handled."""
+        self.assertEqual(mmr([1.0, 0.0], [], top_n=3), [])
+        self.assertEqual(sorted(mmr([1.0, 0.0], [[1.0, 0.0], [0.0, 1.0]], top_n=5)), [0, 1])
+
+
+class TestRerankedRetrieval(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._previous = (settings.RETRIEVAL_RERANK, settings.RETRIEVAL_ROUTING, settings.MMR_LAMBDA)
+        settings.RETRIEVAL_ROUTING = "off"
+
+    def tearDown(self):
+        settings.RETRIEVAL_RERANK, settings.RETRIEVAL_ROUTING, settings.MMR_LAMBDA = self._previous
+        super().tearDown()
+
+    def retriever(self):
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        retriever.index = InMemoryIndex("mmr-test")
+        retriever.index.upsert(vectors=[
+            {"id": chunk_id, "values": hash_embedding(text), "metadata": {"text": text, "document_type": "FAS_28"}}
+            for chunk_id, text in CHUNKS
+        ], namespace="default")
+        return retriever
+
+    def test_mmr_drops_overlapping_neighbours(self):
+        """Test that reranking replaces overlapping neighbours with distinct chunks."""
+        settings.RETRIEVAL_RERANK = "off"
+        plain = [doc.id for doc in self.retriever().retrieve(QUERY, top_n=3)]
+
+        settings.RETRIEVAL_RERANK = "mmr"
+        settings.MMR_LAMBDA = 0.5
+        with start_trace("mmr") as trace:
+            reranked = self.retriever().retrieve(QUERY, top_n=3)
+
+        self.assertEqual(len(reranked), 3)
+        self.assertEqual(reranked[0].id, plain[0])
+        page_1 = lambda ids: sum(chunk_id.startswith("page-1") for chunk_id in ids)
+        self.assertLess(page_1([doc.id for doc in reranked]), page_1(plain))
+        self.assertEqual(trace.find("retrieve.mmr")[0].attributes["candidates"], len(CHUNKS))
+        self.assertNotIn("_values", reranked[0].model_dump())
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Test script for provider call retries, hedging and deadlines.
+"""
+
+import sys
+import threading
+import time
+from pathlib import Path
+from types import SimpleNamespace
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.metrics import PROVIDER_HEDGES, PROVIDER_RETRIES
+from src.core.providers import create_openai_client, register_middleware, unregister_middleware, wrap_openai_client
+from src.core.resilience import (
+    ProviderDeadlineExceeded,
+    _pool,
+    is_transient,
+    latencies,
+    remaining_time,
+    request_deadline
+)
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+class ServiceUnavailable(Exception):
+    """Stand-in for an SDK 503 error."""
+    status_code = 503
+
+
+class BadRequest(Exception):
+    """Stand-in for an SDK 400 error."""
+    status_code = 400
+
+
+class TestResilience(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._previous = {
+            name: getattr(settings, name)
+            for name in (
+                "RETRY_BASE_DELAY_S", "PROVIDER_CALL_DEADLINE_S", "HEDGING_ENABLED", "HEDGE_MIN_SAMPLES",
+                "PROVIDER_MAX_ABANDONED_CALLS"
+            )
+        }
+        settings.RETRY_BASE_DELAY_S = 0.001
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def tearDown(self):
+        unregister_middleware("fault_injection")
+        for name, value in self._previous.items():
+            setattr(settings, name, value)
+        super().tearDown()
+
+    def inject(self, fault):
+        """Run fault(call number) inside the resilience middleware before every SDK call."""
+        def middleware(call, proceed):
+            with self.lock:
+                self.calls += 1
+                number = self.calls
+            fault(number)
+            return proceed()
+        register_middleware("fault_injection", middleware, order=500)
+
+    def test_transient_classification(self):
+        """Test which errors are retried."""
+        self.assertTrue(is_transient(ServiceUnavailable()))
+        self.assertTrue(is_transient(ConnectionError()))
+        self.assertFalse(is_transient(BadRequest()))
+        self.assertFalse(is_transient(ProviderDeadlineExceeded()))
+
+    def test_transient_errors_are_retried(self):
+        """Test that a call succeeds after transient failures and the retries are counted."""
+        def fault(number):
+            if number < 3:
+                raise ServiceUnavailable("503")
+        self.inject(fault)
+        retries = PROVIDER_RETRIES.value(provider="openai", operation="embeddings.create")
+
+        with start_trace("retry") as trace:
+            response = create_openai_client().embeddings.create(input="Ijarah", model="text-embedding-3-small")
+
+        self.assertTrue(response.data[0].embedding)
+        self.assertEqual(PROVIDER_RETRIES.value(provider="openai", operation="embeddings.create"), retries + 2)
+        self.assertEqual(trace.find("openai.embeddings.create")[0].attributes["attempts"], 3)
+
+    def test_permanent_errors_are_not_retried(self):
+        """Test that a client error fails on the first attempt."""
+        def fault(number):
+            raise BadRequest("400")
+        self.inject(fault)
+
+        with self.assertRaises(BadRequest):
+            create_openai_client().embeddings.create(input="Ijarah", model="text-embedding-3-small")
+        self.assertEqual(self.calls, 1)
+
+    def test_chat_messages_are_not_retried(self):
+        """Test that a failed send_message is not repeated, so the chat history cannot get the turn twice."""
+        from src.core.providers import create_gemini_model
+
+        def fault(number):
+            raise ServiceUnavailable("503")
+        self.inject(fault)
+
+        chat = create_gemini_model("gemini-pro").start_chat()
+        with self.assertRaises(ServiceUnavailable):
+            chat.send_message("Classify this transaction.")
+        self.assertEqual(self.calls, 1)
+
+    def test_call_deadline(self):
+        """Test that a slow call fails at its deadline instead of stalling the request."""
+        settings.PROVIDER_CALL_DEADLINE_S = 0.1
+        self.inject(lambda number: time.sleep(0.5))
+
+        start = time.monotonic()
+        with self.assertRaises(ProviderDeadlineExceeded):
+            create_openai_client().embeddings.create(input="Ijarah", model="text-embedding-3-small")
+        self.assertLess(time.monotonic() - start, 0.4)
+
+    def test_sdk_timeout_follows_deadline(self):
+        """Test that the SDK request is given the time left before the deadline as its timeout."""
+        settings.PROVIDER_CALL_DEADLINE_S = 5.0
+        timeouts = []
+
+        class Embeddings:
+            def create(self, **kwargs):
+                timeouts.append(kwargs.get("timeout"))
+                return "ok"
+
+        class Client:
+            embeddings = Embeddings()
+            chat = SimpleNamespace(completions=SimpleNamespace(create=None))
+
+        client = wrap_openai_client(Client())
+        client.embeddings.create(input="Ijarah", model="text-embedding-3-small")
+        client.embeddings.create(input="Ijarah", model="text-embedding-3-small", timeout=1.0)
+        self.assertGreater(timeouts[0], 0)
+        self.assertLessEqual(timeouts[0], 5.0)
+        self.assertEqual(timeouts[1], 1.0)
+
+    def test_abandoned_calls_are_capped(self):
+        """Test that new calls fail fast while too many abandoned calls are still running."""
+        drained = time.monotonic() + 2.0
+        while _pool.abandoned and time.monotonic() < drained:
+            # Let calls abandoned by earlier tests finish
+            time.sleep(0.01)
+        settings.PROVIDER_CALL_DEADLINE_S = 0.05
+        settings.PROVIDER_MAX_ABANDONED_CALLS = 1
+        self.inject(lambda number: time.sleep(0.3) if number == 1 else None)
+        client = create_openai_client()
+
+        with self.assertRaises(ProviderDeadlineExceeded):
+            client.embeddings.create(input="Ijarah", model="text-embedding-3-small")
+        with self.assertRaisesRegex(ProviderDeadlineExceeded, "abandoned"):
+            client.embeddings.create(input="Ijarah", model="text-embedding-3-small")
+        self.assertEqual(self.calls, 1)
+
+        time.sleep(0.4)
+        self.assertTrue(client.embeddings.create(input="Ijarah", model="text-embedding-3-small").data)
+        self.assertEqual(self.calls, 2)
+
+    def test_request_deadline_only_shortens(self):
+        """Test that nested request deadlines cannot extend the outer one."""
+        with request_deadline(1.0):
+            with request_deadline(10.0):
+                self.assertLessEqual(remaining_time(), 1.0)
+        self.assertIsNone(remaining_time())
+
+    def test_hedged_request_beats_slow_primary(self):
+        """Test that a duplicate sent after the p95 latency answers first."""
+        settings.HEDGING_ENABLED = True
+        settings.HEDGE_MIN_SAMPLES = 1
+        latencies.record(("openai", "embeddings.create", "hedge-test"), 0.02)
+        self.inject(lambda number: time.sleep(1.0) if number == 1 else None)
+        won = PROVIDER_HEDGES.value(provider="openai", operation="embeddings.create", outcome="hedge_won")
+
+        start = time.monotonic()
+        response = create_openai_client().embeddings.create(input="Ijarah", model="hedge-test")
+        self.assertTrue(response.data[0].embedding)
+        self.assertLess(time.monotonic() - start, 0.5)
+        self.assertEqual(PROVIDER_HEDGES.value(provider="openai", operation="embeddings.create", outcome="hedge_won"), won + 1)
+
+    def test_llm_generations_are_not_hedged_by_default(self):
+        """Test that a slow completion is not duplicated unless HEDGE_LLM_CALLS is set."""
+        settings.HEDGING_ENABLED = True
+        settings.HEDGE_MIN_SAMPLES = 1
+        latencies.record(("openai", "chat.completions.create", "hedge-test"), 0.01)
+        self.inject(lambda number: time.sleep(0.1))
+
+        response = create_openai_client().chat.completions.create(
+            model="hedge-test",
+            messages=[{"role": "user", "content": "Hello"}]
+        )
+        self.assertEqual(response.choices[0].message.content, "Understood.")
+        self.assertEqual(self.calls, 1)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,214 @@
+"""
+Test script for response field selection, serialization, compression and streaming.
+"""
+
+import gzip
+import json
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import numpy as np
+
+from src.api.main import app
+from src.api.responses import (
+    FastJSONResponse,
+    RESPONSE_FIELDS,
+    accepted_encodings,
+    choose_encoding,
+    select_fields,
+    snippet_document
+)
+from src.core.config import settings
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase, TRANSACTION
+
+class TestFieldSelection(unittest.TestCase):
+    def test_views_and_overrides(self):
+        """Test that views, explicit fields, exclusions and include_documents combine."""
+        self.assertEqual(select_fields(), frozenset(RESPONSE_FIELDS))
+        self.assertEqual(
+            select_fields("verdicts"),
+            frozenset({"fas_applicability", "processing_time", "partial", "degraded_stages"})
+        )
+        self.assertEqual(select_fields(fields="fas_applicability,steps", exclude="steps"), frozenset({"fas_applicability"}))
+        self.assertNotIn("fas_documents", select_fields("snippets", include_documents=False))
+
+    def test_unknown_names_are_rejected(self):
+        """Test that unknown views and fields raise a 400."""
+        with self.assertRaises(HTTPException) as raised:
+            select_fields("compact")
+        self.assertEqual(raised.exception.status_code, 400)
+        with self.assertRaises(HTTPException):
+            select_fields(fields="fas_applicability,verdict")
+
+    def test_snippet_document(self):
+        """Test that snippets cut at a word boundary and drop bulky metadata."""
+        document = {
+            "fas_id": "FAS_28",
+            "text": "word " * 100,
+            "relevance_score": 0.9,
+            "metadata": {"section_heading": "Scope", "text": "copy", "chunk_summary": "summary", "duplicate_refs": ["a#1"]}
+        }
+        snippet = snippet_document(document, 42)
+        self.assertLessEqual(len(snippet["text"]), 45)
+        self.assertTrue(snippet["text"].endswith("word..."))
+        self.assertEqual(snippet["metadata"], {"section_heading": "Scope"})
+        self.assertEqual(len(document["text"]), 500)  # The original is not modified
+
+    def test_fast_json_handles_numpy(self):
+        """Test that the orjson response serializes numpy scores."""
+        body = FastJSONResponse({"score": np.float32(0.5), "vector": np.arange(2)}).body
+        self.assertEqual(body, b'{"score":0.5,"vector":[0,1]}')
+
+
+class TestContentNegotiation(unittest.TestCase):
+    def test_quality_values(self):
+        """Test that Accept-Encoding is parsed into codings with their q-values."""
+        self.assertEqual(
+            accepted_encodings("br;q=0.5, GZIP, x-gzip;q=0.2, deflate;q=oops, *;q=0"),
+            {"br": 0.5, "gzip": 0.2, "deflate": 0.0, "*": 0.0}
+        )
+        self.assertEqual(accepted_encodings(""), {})
+
+    def test_highest_acceptable_quality_wins(self):
+        """Test that the acceptable coding with the highest q is chosen and q=0 is honoured."""
+        available = ("br", "gzip")
+        self.assertEqual(choose_encoding("gzip, br", available), "br")
+        self.assertEqual(choose_encoding("br;q=0.5, gzip;q=0.8", available), "gzip")
+        self.assertEqual(choose_encoding("br;q=0, gzip", available), "gzip")
+        self.assertEqual(choose_encoding("gzip;q=0", available), None)
+        self.assertEqual(choose_encoding("*", available), "br")
+        self.assertEqual(choose_encoding("*;q=0.5, br;q=0", available), "gzip")
+        self.assertEqual(choose_encoding("gzip;q=0.5, identity", available), None)
+        self.assertEqual(choose_encoding("deflate", available), None)
+        self.assertEqual(choose_encoding("br", ("gzip",)), None)
+
+
+class TestAnalyzeResponses(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client = TestClient(app)
+
+    def analyze(self, headers=None, **params):
+        response = self.client.post(
+            "/api/analyze-transaction", params=params, json={"transaction_text": TRANSACTION}, headers=headers
+        )
+        self.assertEqual(response.status_code, 200, response.text)
+        return response
+
+    def test_full_view_keeps_every_field(self):
+        """Test that the default response has the complete schema."""
+        body = self.analyze().json()
+        self.assertEqual(set(body), set(RESPONSE_FIELDS))
+        self.assertTrue(body["fas_documents"])
+        self.assertTrue(body["fas_summaries"])
+
+    def test_verdicts_view_skips_summarization(self):
+        """Test that a verdicts-only response is smaller and makes no summarization calls."""
+        full = self.analyze(headers={"Accept-Encoding": "identity"})
+        with start_trace("verdicts") as trace:
+            verdicts = self.analyze(headers={"Accept-Encoding": "identity"}, view="verdicts")
+
+        body = verdicts.json()
+        self.assertEqual(set(body), {"fas_applicability", "processing_time", "partial", "degraded_stages"})
+        self.assertTrue(body["fas_applicability"])
+        self.assertLess(len(verdicts.content), len(full.content) / 4)
+        self.assertEqual(trace.find("summarize"), [])
+
+    def test_snippets_view_shortens_documents(self):
+        """Test that the snippets view returns short texts and can leave the documents out."""
+        body = self.analyze(view="snippets", snippet_chars=40).json()
+        documents = [doc for docs in body["fas_documents"].values() for doc in docs]
+        self.assertTrue(documents)
+        self.assertTrue(all(len(doc["text"]) <= 43 for doc in documents))
+
+        body = self.analyze(view="snippets", include_documents="false").json()
+        self.assertNotIn("fas_documents", body)
+        self.assertIn("fas_summaries", body)
+
+    def test_unknown_field_is_a_client_error(self):
+        """Test that an unknown field is rejected before the analysis runs."""
+        response = self.client.post(
+            "/api/analyze-transaction", params={"fields": "verdict"}, json={"transaction_text": TRANSACTION}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_gzip_compression(self):
+        """Test that large responses are gzip-compressed when the client accepts it."""
+        response = self.client.post(
+            "/api/analyze-transaction",
+            json={"transaction_text": TRANSACTION},
+            headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.headers["content-encoding"], "gzip")
+        self.assertIn("accept-encoding", response.headers["vary"].lower())
+        self.assertIn("fas_applicability", response.json())  # httpx decodes the body
+
+        raw = self.client.build_request(
+            "POST", "/api/analyze-transaction", json={"transaction_text": TRANSACTION}, headers={"Accept-Encoding": "gzip"}
+        )
+        compressed = self.client.send(raw, stream=True)
+        payload = b"".join(compressed.iter_raw())
+        self.assertLess(len(payload), len(gzip.decompress(payload)))
+
+    def test_refused_encoding_is_not_used(self):
+        """Test that a coding with q=0 is never used, even though its name appears in the header."""
+        response = self.client.post(
+            "/api/analyze-transaction",
+            json={"transaction_text": TRANSACTION},
+            headers={"Accept-Encoding": "gzip;q=0, br;q=0"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("content-encoding", response.headers)
+
+
+class TestStreamingAnalysis(OfflineTestCase):
+    def stream(self, **params):
+        response = TestClient(app).post(
+            "/api/analyze-transaction/stream",
+            params=params,
+            json={"transaction_text": TRANSACTION},
+            headers={"Accept-Encoding": "gzip"}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.headers["content-type"].startswith("text/event-stream"))
+        self.assertNotIn("content-encoding", response.headers)  # Event streams are never buffered for compression
+        events = []
+        for block in response.text.strip().split("\n\n"):
+            event, data = block.split("\n")
+            events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+        return events
+
+    def test_stages_stream_in_order(self):
+        """Test that every stage is sent as its own event, the deconstruction first."""
+        events = self.stream()
+        self.assertEqual([name for name, _ in events], ["deconstruct", "retrieve", "summarize", "applicability", "done"])
+        self.assertIn("primary_financial_event", events[0][1]["transaction_analysis"])
+        documents = [doc for docs in events[1][1]["fas_documents"].values() for doc in docs]
+        self.assertTrue(all(len(doc["text"]) <= settings.RESPONSE_SNIPPET_CHARS + 3 for doc in documents))
+        self.assertTrue(events[3][1]["fas_applicability"])
+        self.assertFalse(events[4][1]["partial"])
+        self.assertIn("total", events[4][1]["usage"])
+
+    def test_verdicts_stream_skips_summaries(self):
+        """Test that the verdicts view streams no summarize event and no documents."""
+        events = dict(self.stream(view="verdicts"))
+        self.assertNotIn("summarize", events)
+        self.assertNotIn("fas_documents", events["retrieve"])
+        self.assertIn("applicability", events)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
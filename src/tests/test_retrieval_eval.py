@@ -0,0 +1,77 @@
+"""
+Test script for the retrieval quality versus latency evaluation.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from benchmarks.retrieval_eval import compare_to_baseline, evaluate_config, load_labels, score_ranking
+from src.agents.fas_retriever import FASDocument
+from src.core.config import settings
+from src.tests.test_providers import OfflineTestCase
+
+def document(document_type: str, text: str) -> FASDocument:
+    return FASDocument(
+        id=f"{document_type}-{len(text)}", text=text, relevance_score=0.5, document_type=document_type,
+        section_heading="", source_filename="", chunk_index=0, total_chunks=1
+    )
+
+class TestRetrievalEval(OfflineTestCase):
+    def test_score_ranking(self):
+        """Test recall@k and reciprocal rank against standards and key paragraphs."""
+        label = {"expected_standards": ["FAS_32", "FAS_28"], "key_paragraphs": ["right-of-use   ASSET"]}
+        ranking = [
+            document("FAS_4", "partnership capital"),
+            document("FAS_32", "Lessee recognises a right-of-use asset"),
+            document("FAS_28", "deferred payment"),
+        ]
+        score = score_ranking(ranking, label, k=2)
+        self.assertEqual(score["standard_recall"], 0.5)
+        self.assertEqual(score["paragraph_recall"], 1.0)
+        self.assertEqual(score["reciprocal_rank"], 0.5)
+
+        score = score_ranking(ranking, {"expected_standards": ["FAS_28"]}, k=2)
+        self.assertEqual(score["standard_recall"], 0.0)
+        self.assertIsNone(score["paragraph_recall"])
+        self.assertAlmostEqual(score["reciprocal_rank"], 1 / 3)
+
+    def test_offline_run_reports_quality_latency_and_size(self):
+        """Test that configurations run offline and leave the settings unchanged."""
+        labels = load_labels()
+        routing = settings.RETRIEVAL_ROUTING
+        results = [
+            evaluate_config({"name": "baseline", "top_n": 5}, labels),
+            evaluate_config({"name": "top_1", "top_n": 1, "settings": {"RETRIEVAL_ROUTING": "off"}}, labels),
+        ]
+
+        self.assertEqual(settings.RETRIEVAL_ROUTING, routing)
+        baseline, top_1 = results
+        self.assertGreaterEqual(baseline["standard_recall_at_k"], 0.8)
+        self.assertGreater(baseline["mrr"], 0)
+        self.assertLessEqual(top_1["paragraph_recall_at_k"], baseline["paragraph_recall_at_k"])
+        self.assertGreater(baseline["p95_ms"], 0)
+        self.assertEqual(baseline["vectors"], 10)
+        self.assertEqual(baseline["dimension"], settings.VECTOR_DIMENSION)
+
+    def test_regressions(self):
+        """Test that quality drops and latency increases beyond the thresholds are reported."""
+        baseline = {"results": [{"name": "baseline", "standard_recall_at_k": 0.9, "paragraph_recall_at_k": 0.7, "mrr": 0.6, "p95_ms": 10.0}]}
+        current = [{"name": "baseline", "standard_recall_at_k": 0.8, "paragraph_recall_at_k": 0.69, "mrr": 0.6, "p95_ms": 14.0}]
+        regressions = compare_to_baseline(current, baseline, quality_drop=0.02, latency_threshold=0.25)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith("baseline standard_recall_at_k"))
+        self.assertTrue(regressions[1].startswith("baseline p95"))
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Test script for centroid-based retrieval routing.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.centroids import StandardCentroids, build_centroids, compute_centroids
+from src.core.config import settings
+from src.core.offline import InMemoryIndex, hash_embedding, seed_index
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+MURABAHA_QUERY = "murabaha deferred payment receivable bad debt default"
+
+class TestCentroids(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.index = InMemoryIndex("centroids-test")
+        seed_index(self.index)
+
+    def test_compute_centroids_pages_through_index(self):
+        """Test that every document type gets a unit-length centroid."""
+        centroids = compute_centroids(self.index, batch_size=3)
+        self.assertEqual(len(centroids), 5)
+        for vector in centroids.values():
+            self.assertAlmostEqual(sum(v * v for v in vector), 1.0, places=4)
+
+    def test_classify_and_priors(self):
+        """Test that the closest centroid wins and priors form a distribution."""
+        centroids = StandardCentroids(compute_centroids(self.index))
+        query = hash_embedding(MURABAHA_QUERY)
+
+        self.assertEqual(centroids.classify(query, top_k=1)[0][0], "FAS_28_Murabaha_Deferred_Payment_Sales")
+        priors = centroids.priors(query, temperature=0.05)
+        self.assertAlmostEqual(sum(priors.values()), 1.0, places=5)
+        self.assertEqual(max(priors, key=priors.get), "FAS_28_Murabaha_Deferred_Payment_Sales")
+
+    def test_save_and_load(self):
+        """Test the centroid file round trip."""
+        centroids = StandardCentroids(compute_centroids(self.index))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "centroids.json")
+            centroids.save(path)
+            loaded = StandardCentroids.load(path)
+        self.assertEqual(loaded.document_types, centroids.document_types)
+
+
+class TestRoutedRetrieval(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        from src.core.providers import create_vector_index
+
+        self._previous = (settings.RETRIEVAL_ROUTING, settings.CENTROIDS_PATH)
+        self._directory = tempfile.TemporaryDirectory()
+        settings.RETRIEVAL_ROUTING = "centroid"
+        settings.CENTROIDS_PATH = os.path.join(self._directory.name, "centroids.json")
+        StandardCentroids(build_centroids(create_vector_index(settings.PINECONE_INDEX_FAS), ["default"])).save(
+            settings.CENTROIDS_PATH
+        )
+
+    def tearDown(self):
+        settings.RETRIEVAL_ROUTING, settings.CENTROIDS_PATH = self._previous
+        self._directory.cleanup()
+        super().tearDown()
+
+    def test_routed_retrieval_queries_top_standards(self):
+        """Test that routing issues one filtered query per candidate standard."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        with start_trace("routing") as trace:
+            documents = retriever.retrieve(MURABAHA_QUERY, top_n=3)
+
+        self.assertEqual(len(trace.find("pinecone.query")), settings.ROUTING_TOP_STANDARDS)
+        candidates = {document_type for document_type, _ in retriever.route(hash_embedding(MURABAHA_QUERY))}
+        self.assertTrue(documents)
+        self.assertTrue(all(doc.document_type in candidates for doc in documents))
+        self.assertEqual(documents[0].document_type, "FAS_28_Murabaha_Deferred_Payment_Sales")
+        self.assertIn("standard_prior", documents[0].metadata)
+
+    def test_missing_centroid_file_searches_all_standards(self):
+        """Test that without the centroid file a request searches every standard instead of scanning the index."""
+        from src.agents.fas_retriever import FASRetriever
+
+        settings.CENTROIDS_PATH = os.path.join(self._directory.name, "missing.json")
+        retriever = FASRetriever()
+        with start_trace("unrouted") as trace:
+            documents = retriever.retrieve(MURABAHA_QUERY, top_n=3)
+
+        self.assertTrue(documents)
+        self.assertEqual(retriever.route(hash_embedding(MURABAHA_QUERY)), [])
+        self.assertEqual(len(trace.find("pinecone.query")), 1)
+        self.assertEqual(trace.find("pinecone.list_paginated"), [])
+        self.assertEqual(trace.find("pinecone.fetch"), [])
+
+    def test_explicit_document_types_skip_routing(self):
+        """Test that a caller-supplied filter is not overridden by routing."""
+        from src.agents.fas_retriever import FASRetriever
+
+        documents = FASRetriever().retrieve(MURABAHA_QUERY, top_n=2, document_types="FAS_4_Musharaka")
+        self.assertTrue(all(doc.document_type == "FAS_4_Musharaka" for doc in documents))
+        self.assertTrue(all("standard_prior" not in doc.metadata for doc in documents))
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
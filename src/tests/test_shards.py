@@ -0,0 +1,106 @@
+"""
+Test script for per-standard namespace shards.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.config import settings
+from src.core.offline import get_in_memory_index
+from src.core.shards import ShardManifest, get_shard_manifest, shard_index, shard_namespace
+from src.core.tracing import start_trace
+from src.tests.test_providers import OfflineTestCase
+
+MURABAHA = "FAS_28_Murabaha_Deferred_Payment_Sales"
+QUERY = "murabaha deferred payment receivable bad debt default"
+
+class TestShards(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, "shards.json")
+        self._previous = (
+            settings.SHARD_MANIFEST_PATH, settings.RETRIEVAL_ROUTING, settings.PINECONE_INDEX_FAS, settings.CENTROIDS_PATH
+        )
+        settings.SHARD_MANIFEST_PATH = self.path
+        settings.PINECONE_INDEX_FAS = "shards-test"
+
+        self.manifest = ShardManifest()
+        self.copied = shard_index(get_in_memory_index("shards-test"), self.manifest, batch_size=3)
+        self.manifest.save(self.path)
+
+    def tearDown(self):
+        (settings.SHARD_MANIFEST_PATH, settings.RETRIEVAL_ROUTING, settings.PINECONE_INDEX_FAS,
+         settings.CENTROIDS_PATH) = self._previous
+        self._directory.cleanup()
+        super().tearDown()
+
+    def test_shard_namespace(self):
+        """Test that namespaces are safe names derived from the document type."""
+        self.assertEqual(shard_namespace(MURABAHA), MURABAHA)
+        self.assertEqual(shard_namespace(" SS 9: Ijarah "), "SS_9_Ijarah")
+
+    def test_shard_index_writes_manifest(self):
+        """Test that every document type gets a shard holding its vectors."""
+        stats = get_in_memory_index("shards-test").describe_index_stats().namespaces
+        self.assertEqual(len(self.manifest), 5)
+        self.assertEqual(self.copied, stats["default"]["vector_count"])
+        for document_type in self.manifest.document_types:
+            shard = self.manifest.shards[document_type]
+            self.assertEqual(stats[shard["namespace"]]["vector_count"], shard["vector_count"])
+        self.assertEqual(get_shard_manifest(self.path).shards, self.manifest.shards)
+
+    def test_known_standards_query_only_their_shards(self):
+        """Test that requested and routed standards are searched in their own namespaces, in parallel."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        settings.RETRIEVAL_ROUTING = "off"
+        with start_trace("shards") as trace:
+            documents = retriever.retrieve(QUERY, top_n=3, document_types=[MURABAHA, "FAS_4_Musharaka"])
+        namespaces = {query.attributes["namespace"] for query in trace.find("pinecone.query")}
+        self.assertEqual(namespaces, {MURABAHA, "FAS_4_Musharaka"})
+        self.assertEqual(documents[0].document_type, MURABAHA)
+
+        # Centroids are built offline over every shard of the manifest, as the CLI does
+        from src.core.centroids import main as build_centroid_file
+        settings.CENTROIDS_PATH = os.path.join(self._directory.name, "centroids.json")
+        self.assertEqual(build_centroid_file(["--output", settings.CENTROIDS_PATH]), 0)
+        retriever = FASRetriever()
+        settings.RETRIEVAL_ROUTING = "centroid"
+        with start_trace("routed-shards") as trace:
+            documents = retriever.retrieve(QUERY, top_n=3)
+        self.assertEqual(len(trace.find("pinecone.query")), settings.ROUTING_TOP_STANDARDS)
+        self.assertEqual(documents[0].document_type, MURABAHA)
+        self.assertIn("standard_prior", documents[0].metadata)
+
+    def test_unknown_standards_query_every_shard(self):
+        """Test that an unrouted query fans out over all shards and an explicit namespace bypasses them."""
+        from src.agents.fas_retriever import FASRetriever
+
+        retriever = FASRetriever()
+        settings.RETRIEVAL_ROUTING = "off"
+        with start_trace("all-shards") as trace:
+            documents = retriever.retrieve(QUERY, top_n=3)
+        self.assertEqual(len(trace.find("pinecone.query")), len(self.manifest))
+        self.assertEqual(documents[0].document_type, MURABAHA)
+
+        with start_trace("explicit") as trace:
+            retriever.retrieve(QUERY, top_n=3, namespace="default")
+        self.assertEqual([query.attributes["namespace"] for query in trace.find("pinecone.query")], ["default"])
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
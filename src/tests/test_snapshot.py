@@ -0,0 +1,87 @@
+"""
+Test script for index snapshot export and import.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.chunk_store import ChunkStore
+from src.core.config import settings
+from src.core.offline import InMemoryIndex, get_in_memory_index, hash_embedding, seed_index
+from src.core.snapshot import export_snapshot, import_snapshot, load_snapshot, main as snapshot_main
+from src.tests.test_providers import OfflineTestCase
+
+QUERY = "murabaha deferred payment receivable bad debt default"
+
+class TestSnapshot(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self._directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._directory.name, "snapshot")
+        self.index = InMemoryIndex("snapshot-source")
+        self.count = seed_index(self.index)
+        self.index.upsert(vectors=[{"id": "extra", "values": hash_embedding("shard text"), "metadata": {"document_type": "SS_8_Murabahah"}}], namespace="SS_8_Murabahah")
+        self._previous = (settings.OFFLINE_SNAPSHOT_PATH, settings.CHUNK_STORE_PATH, settings.SHARD_MANIFEST_PATH)
+
+    def tearDown(self):
+        settings.OFFLINE_SNAPSHOT_PATH, settings.CHUNK_STORE_PATH, settings.SHARD_MANIFEST_PATH = self._previous
+        self._directory.cleanup()
+        super().tearDown()
+
+    def test_round_trip(self):
+        """Test that an imported snapshot answers queries like its source, with texts in the chunk store."""
+        store = ChunkStore(os.path.join(self._directory.name, "source.sqlite"))
+        store.put_many([("extra", "full text of the extra chunk", None)])
+        self.assertEqual(export_snapshot(self.index, self.path, chunk_store=store, batch_size=3), self.count + 1)
+        store.close()
+
+        snapshot = load_snapshot(self.path)
+        self.assertEqual(snapshot.meta["namespaces"], {"SS_8_Murabahah": 1, "default": self.count})
+        self.assertEqual(snapshot.vectors.shape, (self.count + 1, settings.VECTOR_DIMENSION))
+
+        target = InMemoryIndex("snapshot-target")
+        restored = ChunkStore(os.path.join(self._directory.name, "restored.sqlite"))
+        self.assertEqual(import_snapshot(target, snapshot, chunk_store=restored, batch_size=4, workers=2), self.count + 1)
+        vector = hash_embedding(QUERY)
+        source_matches = self.index.query(vector=vector, top_k=3, namespace="default").matches
+        target_matches = target.query(vector=vector, top_k=3, namespace="default").matches
+        self.assertEqual([m["id"] for m in target_matches], [m["id"] for m in source_matches])
+        self.assertEqual(restored.get_texts(["extra"]), {"extra": "full text of the extra chunk"})
+        self.assertEqual(len(restored), self.count + 1)
+        restored.close()
+
+    def test_offline_index_starts_from_snapshot(self):
+        """Test that offline indexes of the snapshot's dimension are loaded from it instead of seeded."""
+        export_snapshot(self.index, self.path)
+        settings.OFFLINE_SNAPSHOT_PATH = self.path
+        index = get_in_memory_index("snapshot-offline")
+        self.assertEqual(index.describe_index_stats().total_vector_count, self.count + 1)
+        matches = index.query(vector=hash_embedding("shard text"), top_k=1, include_metadata=True, namespace="SS_8_Murabahah").matches
+        self.assertEqual(matches[0]["id"], "extra")
+
+        coarse = get_in_memory_index("snapshot-offline-256d", dimension=256)
+        self.assertEqual(coarse.describe_index_stats().total_vector_count, self.count)
+
+    def test_cli(self):
+        """Test the export and import commands against the offline backend."""
+        settings.CHUNK_STORE_PATH = os.path.join(self._directory.name, "chunks.sqlite")
+        settings.SHARD_MANIFEST_PATH = os.path.join(self._directory.name, "shards.json")
+        self.assertEqual(snapshot_main(["export", "--index", "snapshot-cli", "--output", self.path]), 0)
+        self.assertEqual(snapshot_main(["import", "--input", self.path, "--index", "snapshot-cli-copy"]), 0)
+        self.assertTrue(os.path.exists(settings.CHUNK_STORE_PATH))
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Test script for lazy agent construction, startup warm-up and the /ready probe.
+"""
+
+import sys
+import time
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.providers import register_middleware, unregister_middleware
+from src.tests.test_providers import OfflineTestCase
+
+class TestStartup(OfflineTestCase):
+    def setUp(self):
+        super().setUp()
+        self.calls = []
+        register_middleware("startup_test", lambda call, proceed: self.calls.append(call.operation) or proceed(), order=5)
+
+    def tearDown(self):
+        unregister_middleware("startup_test")
+        super().tearDown()
+
+    def test_orchestrator_construction_makes_no_provider_calls(self):
+        """Test that agents are created on first use, not with the Orchestrator."""
+        from src.agents.orchestrator import Orchestrator
+
+        orchestrator = Orchestrator()
+        self.assertEqual(self.calls, [])
+        self.assertIs(orchestrator.fas_retriever, orchestrator.fas_retriever)
+
+        # Priming the deconstructor chat is deferred to warm-up or the first analysis
+        orchestrator.transaction_deconstructor
+        self.assertEqual(self.calls, [])
+        orchestrator.warm_up()
+        self.assertEqual(self.calls[0], "describe_index_stats")
+        self.assertEqual(self.calls[-1], "send_message")
+
+    def test_ready_probe_reports_warmup(self):
+        """Test that the startup warm-up runs in the background and /ready reports it."""
+        from fastapi.testclient import TestClient
+        from src.api.main import app
+
+        with TestClient(app) as client:
+            self.assertEqual(client.get("/").status_code, 200)
+            deadline = time.time() + 5
+            response = client.get("/ready")
+            while response.status_code != 200 and time.time() < deadline:
+                time.sleep(0.05)
+                response = client.get("/ready")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ready")
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Test script for request tracing and the /metrics endpoint.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.metrics import Histogram, registry
+from src.core.tracing import recent_traces, span, start_trace
+from src.tests.test_providers import TRANSACTION, OfflineTestCase
+
+class TestTracing(OfflineTestCase):
+    def test_spans_nest_within_trace(self):
+        """Test that spans record their parent and land in the active trace."""
+        with start_trace("unit") as trace:
+            with span("outer") as outer:
+                with span("inner", kind="provider", model="m"):
+                    pass
+            with self.assertRaises(ValueError):
+                with span("failing"):
+                    raise ValueError("boom")
+
+        inner = trace.find("inner")[0]
+        self.assertEqual(inner.parent_id, outer.span_id)
+        self.assertEqual(trace.find("failing")[0].status, "error")
+        self.assertEqual(recent_traces()[-1]["trace_id"], trace.trace_id)
+
+    def test_histogram_exposition(self):
+        """Test the Prometheus text format of a histogram."""
+        histogram = Histogram("unit_seconds", "Unit test histogram", ["stage"], buckets=(0.1, 1.0))
+        histogram.observe(0.5, stage="a")
+        histogram.observe(2.0, stage="a")
+        lines = histogram.collect()
+        self.assertIn('unit_seconds_bucket{stage="a",le="0.1"} 0', lines)
+        self.assertIn('unit_seconds_bucket{stage="a",le="1.0"} 1', lines)
+        self.assertIn('unit_seconds_bucket{stage="a",le="+Inf"} 2', lines)
+        self.assertIn('unit_seconds_sum{stage="a"} 2.5', lines)
+
+    def test_orchestrator_trace_has_stage_and_provider_spans(self):
+        """Test that an analysis records every agent stage and outbound call."""
+        from src.agents.orchestrator import Orchestrator
+
+        orchestrator = Orchestrator()
+        with start_trace("analysis") as trace:
+            orchestrator.analyze_transaction(TRANSACTION)
+
+        names = {s.name for s in trace.spans}
+        self.assertTrue({"deconstruct", "retrieve", "summarize", "applicability"} <= names)
+        self.assertTrue({"gemini.send_message", "openai.embeddings.create", "pinecone.query", "openai.chat.completions.create"} <= names)
+        completion = trace.find("openai.chat.completions.create")[0]
+        self.assertGreater(completion.attributes["total_tokens"], 0)
+        self.assertGreater(completion.attributes["request_chars"], 0)
+        self.assertEqual(trace.find("pinecone.query")[0].attributes["vector_dim"], 1536)
+
+        rendered = registry.render()
+        self.assertIn('fas_stage_duration_seconds_count{stage="deconstruct"}', rendered)
+        self.assertIn('fas_provider_calls_total{provider="pinecone",operation="query",status="ok"}', rendered)
+
+    def test_metrics_endpoint(self):
+        """Test the /metrics route and the trace header of the API."""
+        from fastapi.testclient import TestClient
+        from src.api.main import app
+
+        client = TestClient(app)
+        response = client.post("/api/analyze-transaction", json={"transaction_text": TRANSACTION})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("x-trace-id", response.headers)
+        steps = {step["step_name"]: step for step in response.json()["steps"]}
+        self.assertGreater(steps["Token Usage"]["data"]["total"]["total_tokens"], 0)
+        self.assertIn("usage", steps["FAS Applicability Analysis"]["data"])
+
+        metrics = client.get("/metrics")
+        self.assertEqual(metrics.status_code, 200)
+        self.assertIn('fas_http_requests_total{method="POST",path="/api/analyze-transaction",status="200"}', metrics.text)
+
+        client.get("/no/such/path-12345")
+        metrics = client.get("/metrics")
+        self.assertIn('fas_http_requests_total{method="GET",path="unmatched",status="404"}', metrics.text)
+        self.assertNotIn("path-12345", metrics.text)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
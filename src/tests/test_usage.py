@@ -0,0 +1,64 @@
+"""
+Test script for token usage and cost accounting.
+"""
+
+import sys
+from pathlib import Path
+import unittest
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.core.metrics import registry
+from src.core.usage import UsageTracker, estimate_cost, track_usage
+from src.tests.test_providers import TRANSACTION, OfflineTestCase
+
+class TestUsage(OfflineTestCase):
+    def test_estimate_cost(self):
+        """Test pricing by longest model-name prefix."""
+        self.assertAlmostEqual(estimate_cost("gpt-4.1-mini", 1_000_000, 1_000_000), 2.0)
+        self.assertAlmostEqual(estimate_cost("gpt-4.1-2025-04-14", 1_000_000, 0), 2.0)
+        self.assertEqual(estimate_cost("unknown-model", 1000, 1000), 0.0)
+        self.assertEqual(estimate_cost(None, 1000, 1000), 0.0)
+
+    def test_tracker_totals(self):
+        """Test aggregation across stages."""
+        tracker = UsageTracker()
+        tracker.add("a", {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}, 0.001)
+        tracker.add("a", {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15}, 0.001)
+        tracker.add("b", {"prompt_tokens": 4, "total_tokens": 4}, 0.0)
+
+        self.assertEqual(tracker.stage_usage("a")["calls"], 2)
+        self.assertEqual(tracker.totals()["total_tokens"], 34)
+        self.assertEqual(tracker.stage_usage("missing")["calls"], 0)
+
+    def test_nested_tracking_joins_outer_tracker(self):
+        """Test that an inner track_usage reuses the active tracker."""
+        with track_usage() as outer:
+            with track_usage() as inner:
+                self.assertIs(inner, outer)
+
+    def test_orchestrator_usage_by_stage(self):
+        """Test that an analysis reports usage for every stage that calls a model."""
+        from src.agents.orchestrator import Orchestrator
+
+        result = Orchestrator().analyze_transaction(TRANSACTION)
+        by_stage = result.usage["by_stage"]
+        for stage in ("deconstruct", "retrieve", "summarize", "applicability"):
+            self.assertIn(stage, by_stage)
+        self.assertGreater(result.usage["total"]["total_tokens"], 0)
+        self.assertGreater(result.usage["total"]["cost_usd"], 0)
+
+        rendered = registry.render()
+        self.assertIn('stage="applicability",kind="prompt"', rendered)
+        self.assertIn("fas_provider_cost_usd_total", rendered)
+
+
+def main():
+    """Run the test suite."""
+    unittest.main(verbosity=2)
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,149 @@
 """
 Streamlit UI for FAS analysis system.
+
+Analyses are streamed from the API (/api/analyze-transaction/stream) so each stage is shown as soon
+as it completes. The HTTP session and the result cache are Streamlit resources shared by every
+rerun and browser session: reruns caused by widget interaction and repeated transactions are
+rendered from the cache without calling the API.
+
+    streamlit run src/ui/app.py
 """
 
+import hashlib
+import json
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+# Add project root to Python path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+import requests
 import streamlit as st
+from src.core.config import settings
+
+STAGES = ("deconstruct", "retrieve", "summarize", "applicability", "done")
+
+
+class ResultCache:
+    """Thread-safe LRU of completed analyses keyed by transaction."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._results: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Optional[str]) -> Optional[Dict]:
+        with self._lock:
+            if key not in self._results:
+                return None
+            self._results.move_to_end(key)
+            return self._results[key]
+
+    def put(self, key: str, result: Dict) -> None:
+        with self._lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_size:
+                self._results.popitem(last=False)
+
+
+@st.cache_resource
+def get_session() -> requests.Session:
+    """HTTP session shared by all reruns and browser sessions, so API connections are reused."""
+    return requests.Session()
+
+
+@st.cache_resource
+def get_result_cache() -> ResultCache:
+    """Completed analyses shared by all reruns and browser sessions."""
+    return ResultCache(settings.UI_RESULT_CACHE_SIZE)
+
+
+def transaction_key(transaction_text: str) -> str:
+    """Cache key of a transaction (whitespace differences do not change it)."""
+    return hashlib.sha256(" ".join(transaction_text.split()).encode("utf-8")).hexdigest()
+
+
+def stream_analysis(transaction_text: str) -> Iterator[Tuple[str, Dict]]:
+    """
+    Call the streaming API and yield its server-sent events as they arrive.
+
+    Args:
+        transaction_text: Transaction to analyze
+
+    Yields:
+        (event name, data) tuples: deconstruct, retrieve, summarize, applicability, done or error
+    """
+    response = get_session().post(
+        f"{settings.UI_API_URL.rstrip('/')}/api/analyze-transaction/stream",
+        params={"view": "snippets"},
+        json={"transaction_text": transaction_text},
+        stream=True,
+        timeout=settings.UI_REQUEST_TIMEOUT_S
+    )
+    with response:
+        if response.status_code != 200:
+            yield "error", {"stage": "request", "message": f"API returned {response.status_code}: {response.text}"}
+            return
+        event = None
+        for line in response.iter_lines(decode_unicode=True):
+            if line.startswith("event:"):
+                event = line[len("event:"):].strip()
+            elif line.startswith("data:") and event:
+                yield event, json.loads(line[len("data:"):])
+                event = None
+
+
+def render_stage(placeholder, stage: str, data: Dict, min_probability: float, show_documents: bool) -> None:
+    """Render one stage's result into its placeholder."""
+    with placeholder.container():
+        if data.get("status") == "degraded":
+            st.caption(f"Degraded: {data.get('message', '')}")
+
+        if stage == "deconstruct":
+            analysis = data["transaction_analysis"]
+            st.header("Transaction Analysis")
+            st.markdown(f"**Primary financial event:** {analysis['primary_financial_event']}")
+            st.markdown(f"**Transaction nature:** {analysis['transaction_nature']}")
+            items, treatments = st.columns(2)
+            items.markdown("**Key financial items**\n" + "".join(f"\n- {item}" for item in analysis["key_financial_items"]))
+            treatments.markdown("**Accounting treatments**\n" + "".join(f"\n- {item}" for item in analysis["accounting_treatments"]))
+
+        elif stage == "retrieve":
+            st.caption(f"Retrieved {data['results_count']} excerpts for: {data['query']}")
+            if show_documents:
+                for fas_id, documents in data.get("fas_documents", {}).items():
+                    with st.expander(f"{fas_id} ({len(documents)} excerpts)"):
+                        for document in documents:
+                            st.markdown(f"*{document['relevance_score']:.3f}* {document['text']}")
+
+        elif stage == "summarize":
+            st.header("FAS Summaries")
+            for summary in data["fas_summaries"]:
+                with st.expander(summary["fas_id"]):
+                    st.write(summary["summary"])
+
+        elif stage == "applicability":
+            st.header("FAS Applicability")
+            ranked = sorted(data["fas_applicability"], key=lambda item: item["probability"], reverse=True)
+            shown = [item for item in ranked if item["probability"] >= min_probability]
+            if not shown:
+                st.info(f"No standard reaches {min_probability:.0%}")
+            for item in shown:
+                st.markdown(f"**{item['fas_name']}** ({item['fas_id']}): {item['probability']:.0%}")
+                st.progress(min(max(float(item["probability"]), 0.0), 1.0))
+                st.caption(item["reasoning"])
+
+        elif stage == "done":
+            st.caption(f"Completed in {data['processing_time']:.1f}s")
+            if data.get("partial"):
+                st.warning("Partial result: " + "; ".join(f"{name}: {reason}" for name, reason in data["degraded_stages"].items()))
+
 
 def main():
     """Main Streamlit application."""
@@ -11,10 +152,10 @@ def main():
         page_icon="📊",
         layout="wide"
     )
-    
+
     st.title("FAS Analysis System")
     st.write("Analyze financial transactions against AAOIFI FAS standards")
-    
+
     # Transaction input
     st.header("Transaction Details")
     transaction_text = st.text_area(
@@ -22,10 +163,43 @@ def main():
         height=200,
         placeholder="Enter the transaction context, adjustments, and journal entries..."
     )
-    
-    if st.button("Analyze Transaction"):
+    options = st.columns(2)
+    min_probability = options[0].slider("Minimum applicability", 0.0, 1.0, 0.0, 0.05)
+    show_documents = options[1].checkbox("Show retrieved excerpts", value=False)
+
+    clicked = st.button("Analyze Transaction")
+    cache = get_result_cache()
+    placeholders = {stage: st.empty() for stage in STAGES}
+
+    if clicked:
         if transaction_text:
-            # TODO: Implement analysis logic
-            st.info("Analysis in progress...")
+            key = transaction_key(transaction_text)
+            st.session_state["result_key"] = key
+            if cache.get(key) is None:
+                result = {}
+                with st.spinner("Analysis in progress..."):
+                    for event, data in stream_analysis(transaction_text):
+                        if event == "error":
+                            st.error(f"{data['stage']} failed: {data['message']}")
+                            break
+                        result[event] = data
+                        if event in placeholders:
+                            render_stage(placeholders[event], event, data, min_probability, show_documents)
+                # Partial results are not memoized, so the transaction is analyzed again next time
+                if "done" in result and not result["done"].get("partial"):
+                    cache.put(key, result)
+                st.session_state["last_result"] = (key, result)
         else:
-            st.warning("Please enter transaction details") 
\ No newline at end of file
+            st.warning("Please enter transaction details")
+
+    # Widget interactions rerun the script; render the last result again without calling the API
+    key = st.session_state.get("result_key")
+    result = cache.get(key)
+    if result is None and st.session_state.get("last_result", (None,))[0] == key:
+        result = st.session_state["last_result"][1]
+    for stage, data in (result or {}).items():
+        if stage in placeholders:
+            render_stage(placeholders[stage], stage, data, min_probability, show_documents)
+
+if __name__ == "__main__":
+    main()